@@ -49,6 +49,7 @@ class ArchivoContenidoEnMoodle(BaseModel): # Nombre clarificado: ArchivoContenid
     timestamp_ultima_modificacion: int = Field(alias="timemodified", description="Timestamp Unix de la última vez que el archivo fue modificado en Moodle.") # Nombre clarificado
     autor_archivo: Optional[str] = Field(default=None, alias="author", description="Autor del archivo, si esta información está disponible en Moodle.") # Nombre clarificado
     licencia_archivo: Optional[str] = Field(default=None, alias="license", description="Licencia de uso del archivo, si se especifica en Moodle.") # Nombre clarificado
+    hash_contenido_moodle: Optional[str] = Field(default=None, alias="contenthash", description="Hash SHA-1 del contenido del archivo en el almacén de Moodle, si el servicio web lo incluye.")
 
 class ConfiguracionChatN8NMoodle(BaseModel): # Nombre definitivo
     """
@@ -156,6 +157,36 @@ class RespuestaBusquedaSemantica(BaseModel): # Nombre definitivo
     class Config:
         populate_by_name = True
 
+# --- Modelos para el Chat Nativo (RAG servido directamente por la API) ---
+
+class SolicitudChatCurso(BaseModel):
+    """Cuerpo de la petición para el chat con recuperación aumentada (RAG) servido por la propia API, sin pasar por N8N."""
+    pregunta_usuario: str = Field(alias="pregunta", description="Pregunta o mensaje del usuario para el asistente del curso.")
+    limite_fragmentos_contexto: int = Field(default=5, ge=1, le=20, alias="limite_fragmentos", description="Número máximo de fragmentos recuperados de la base vectorial que se pasan como contexto al modelo.")
+    historial_chat_previo: Optional[List[Dict[str, Any]]] = Field(default=None, alias="historial", description="Historial previo de la conversación, en el formato que espera el proveedor de IA configurado.")
+    mensaje_sistema_personalizado: Optional[str] = Field(default=None, alias="mensaje_sistema", description="Instrucción de sistema opcional para guiar el comportamiento del asistente.")
+    transmitir_respuesta: bool = Field(default=True, alias="transmitir", description="Si es verdadero, la respuesta se devuelve en flujo (streaming) de texto plano; si no, como un único JSON.")
+    class Config:
+        populate_by_name = True
+
+class TiemposRespuestaChat(BaseModel):
+    """Desglose de latencias (en milisegundos) de una respuesta del chat nativo, para comparar contra el camino de N8N."""
+    milisegundos_embedding_consulta: float = Field(alias="ms_embedding", description="Tiempo empleado en generar el embedding de la pregunta.")
+    milisegundos_busqueda_vectorial: float = Field(alias="ms_busqueda", description="Tiempo empleado en la búsqueda de fragmentos similares en PGVector.")
+    milisegundos_generacion_respuesta: float = Field(alias="ms_generacion", description="Tiempo empleado por el modelo en generar la respuesta completa.")
+    milisegundos_totales: float = Field(alias="ms_total", description="Tiempo total de extremo a extremo dentro de la API.")
+    class Config:
+        populate_by_name = True
+
+class RespuestaChatCurso(BaseModel):
+    """Respuesta (no transmitida) del chat nativo de un curso."""
+    id_curso: int = Field(description="ID del curso consultado.")
+    respuesta_asistente: str = Field(alias="respuesta", description="Texto de la respuesta generada por el modelo.")
+    ids_fragmentos_utilizados: List[str] = Field(default_factory=list, alias="fragmentos_utilizados", description="IDs de los fragmentos usados como contexto para la respuesta.")
+    tiempos_respuesta: TiemposRespuestaChat = Field(alias="tiempos", description="Desglose de latencias de la respuesta.")
+    class Config:
+        populate_by_name = True
+
 # --- Modelos Generales para Operaciones de la API ---
 
 class RespuestaConfiguracionCursoEntrenAI(BaseModel): # Nombre definitivo
@@ -193,10 +224,14 @@ class SolicitudProcesamientoArchivosDeCurso(BaseModel): # Nombre definitivo
     """Cuerpo de la petición para iniciar el procesamiento (o reprocesamiento) de los archivos de un curso."""
     id_curso: int = Field(description="ID del curso de Moodle cuyos archivos se van a procesar o actualizar.")
     id_usuario_moodle_solicitante: int = Field(alias="id_usuario", description="ID del usuario de Moodle (generalmente un profesor o administrador) que inicia la operación de procesamiento.") # Nombre clarificado
-    # Se podría añadir un flag opcional como 'forzar_reprocesamiento_total: bool = False'
+    forzar_reprocesamiento: bool = Field(default=False, description="Si es True, se reprocesan también los archivos sin cambios (p. ej. para reindexar el curso); su contenido se toma del almacén local de descargas si está disponible.")
     class Config:
         populate_by_name = True
 
+class SolicitudRevectorizacionCurso(BaseModel):
+    """Cuerpo de la petición para volver a generar los embeddings de los fragmentos ya almacenados de un curso."""
+    id_curso: int = Field(description="ID del curso de Moodle cuya tabla vectorial se va a revectorizar (con el modelo de embedding configurado).")
+
 class RespuestaEstadoTareaAsincronaCelery(BaseModel): # Nombre definitivo
     """Respuesta que informa sobre el estado de una tarea asíncrona gestionada por Celery (u otro sistema similar)."""
     id_tarea_asincrona: str = Field(alias="id_tarea", description="ID único de la tarea Celery o del sistema de tareas asíncronas utilizado.") # Nombre clarificado
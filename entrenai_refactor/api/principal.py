@@ -1,3 +1,4 @@
+import asyncio
 from pathlib import Path
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, status, Response # HTTPException y status no se usan directamente aquí, pero Response sí.
@@ -9,9 +10,13 @@ from fastapi.responses import FileResponse
 from entrenai_refactor.api.rutas import (
     enrutador_config_curso,
     enrutador_busqueda,
+    enrutador_chat,
     enrutador_procesamiento_interno
 )
 from entrenai_refactor.config.configuracion import configuracion_global # Configuración global de la aplicación
+from entrenai_refactor.nucleo.archivos import cerrar_ejecutor_extraccion_aislada
+from entrenai_refactor.nucleo.clientes import iniciar_pool_http_moodle, cerrar_pool_http_moodle
+from entrenai_refactor.nucleo.ia import obtener_contador_tokens_configurado
 from entrenai_refactor.config.registrador import obtener_registrador # Sistema de logging
 
 registrador = obtener_registrador(__name__) # Registrador específico para este módulo (principal.py)
@@ -34,11 +39,20 @@ async def ciclo_vida_app(app: FastAPI): # Nombre de la función y parámetro 'ap
     else:
         registrador.info(f"Directorio de archivos estáticos encontrado en: '{directorio_archivos_estaticos}'.")
 
+    # Pool de conexiones HTTP compartido por los clientes asíncronos de Moodle (keep-alive y HTTP/2)
+    await iniciar_pool_http_moodle()
+
+    # Tokenizador del modelo de embedding (si se fragmenta en tokens): se carga, o se descarga con tiempo límite,
+    # al arrancar y no durante la primera ingesta. Se ejecuta en un hilo para no bloquear el bucle de eventos.
+    await asyncio.to_thread(obtener_contador_tokens_configurado)
+
     yield # Punto donde la aplicación se ejecuta
 
     # Lógica de cierre de la aplicación
     registrador.info("Cerrando la API de EntrenAI (versión refactorizada)...")
     # Aquí se podrían añadir tareas de limpieza si fueran necesarias (ej. cerrar conexiones a BD si no se manejan por petición)
+    cerrar_ejecutor_extraccion_aislada() # Detener los procesos trabajadores de extracción de archivos
+    await cerrar_pool_http_moodle()
 
 # Instancia principal de la aplicación FastAPI. Cambiado a 'aplicacion' para consistencia.
 aplicacion = FastAPI(
@@ -96,6 +110,7 @@ async def obtener_icono_favicon_app(): # Nombre de función más descriptivo
 registrador.info("Incluyendo enrutadores específicos de la API en la aplicación principal...")
 aplicacion.include_router(enrutador_config_curso, prefix="/configuracion", tags=["Configuración de Cursos"])
 aplicacion.include_router(enrutador_busqueda, prefix="/busqueda", tags=["Búsqueda Semántica"])
+aplicacion.include_router(enrutador_chat, tags=["Chat Nativo (RAG)"]) # Sin prefijo extra: expone '/v1/chat/{id_curso}'
 aplicacion.include_router(enrutador_procesamiento_interno, prefix="/sistema", tags=["Procesamiento Interno y Tareas"])
 registrador.info("Todos los enrutadores específicos han sido incluidos y configurados con sus prefijos y etiquetas.")
 
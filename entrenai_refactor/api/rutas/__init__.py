@@ -6,6 +6,7 @@
 # definidos en los módulos de este paquete, facilitando su inclusión en la aplicación FastAPI principal.
 
 from .ruta_busqueda import enrutador_busqueda
+from .ruta_chat import enrutador_chat
 from .ruta_configuracion_curso import enrutador_config_curso
 from .ruta_procesamiento_interno import enrutador_procesamiento_interno
 
@@ -13,6 +14,7 @@ from .ruta_procesamiento_interno import enrutador_procesamiento_interno
 # Estos son los nombres que se exportarán con 'from entrenai_refactor.api.rutas import *'.
 __all__ = [
     "enrutador_busqueda",                # Enrutador para endpoints de búsqueda.
+    "enrutador_chat",                    # Enrutador para el chat nativo (RAG) servido por la API.
     "enrutador_config_curso",            # Enrutador para configuración de cursos.
     "enrutador_procesamiento_interno",   # Enrutador para tareas internas/asíncronas.
 ]
@@ -0,0 +1,190 @@
+import time # Para medir las latencias de cada etapa del chat (embedding, búsqueda, generación)
+from typing import List, Optional, Iterator
+
+from fastapi import APIRouter, HTTPException, Depends, status, Path as FastAPIPath
+from fastapi.responses import StreamingResponse
+
+# Importar modelos Pydantic refactorizados
+from entrenai_refactor.api import modelos as modelos_api
+# Importar clases refactorizadas del núcleo
+from entrenai_refactor.nucleo.clientes import ClienteMoodle, ErrorAPIMoodle, obtener_indice_nombres_cursos
+from entrenai_refactor.nucleo.bd import EnvoltorioPgVector, ErrorBaseDeDatosVectorial
+from entrenai_refactor.nucleo.ia import ProveedorInteligencia, ErrorProveedorInteligencia
+from entrenai_refactor.config.registrador import obtener_registrador
+
+registrador = obtener_registrador(__name__) # Registrador para este módulo de rutas
+
+# Enrutador para el chat nativo: responde preguntas con recuperación aumentada (RAG)
+# directamente desde la API, sin el salto adicional al flujo de chat de N8N.
+enrutador_chat = APIRouter(
+    prefix="/v1/chat",
+    tags=["Chat Nativo con Recuperación Aumentada (RAG)"],
+)
+
+# Mensaje de sistema por defecto si la petición no trae uno propio.
+MENSAJE_SISTEMA_CHAT_PREDETERMINADO = (
+    "Eres un asistente educativo de un curso de Moodle. Responde en el idioma de la pregunta, "
+    "basándote únicamente en el contexto proporcionado. Si el contexto no contiene la respuesta, dilo claramente."
+)
+
+# --- Funciones de Dependencia (Inyección de Dependencias de FastAPI) ---
+
+def obtener_dependencia_cliente_moodle_chat() -> ClienteMoodle:
+    """Dependencia para obtener una instancia del ClienteMoodle para el chat (resolución del nombre del curso)."""
+    try:
+        return ClienteMoodle()
+    except ErrorAPIMoodle as e_moodle:
+        registrador.error(f"Error específico al crear instancia de ClienteMoodle (chat): {e_moodle}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"No se pudo conectar con Moodle para el chat: {str(e_moodle)}")
+    except Exception as e_inesperado:
+        registrador.exception(f"Error inesperado al crear instancia de ClienteMoodle (chat): {e_inesperado}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error interno del servidor al configurar la conexión con Moodle para el chat.")
+
+def obtener_dependencia_envoltorio_pgvector_chat() -> EnvoltorioPgVector:
+    """Dependencia para obtener una instancia del EnvoltorioPgVector para el chat."""
+    try:
+        return EnvoltorioPgVector()
+    except ErrorBaseDeDatosVectorial as e_bd_vec:
+        registrador.error(f"Error específico al crear instancia de EnvoltorioPgVector (chat): {e_bd_vec}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"No se pudo conectar con la base de datos vectorial para el chat: {str(e_bd_vec)}")
+    except Exception as e_inesperado:
+        registrador.exception(f"Error inesperado al crear instancia de EnvoltorioPgVector (chat): {e_inesperado}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error interno del servidor al configurar el acceso a la base de datos vectorial para el chat.")
+
+def obtener_dependencia_proveedor_inteligencia_chat() -> ProveedorInteligencia:
+    """Dependencia para obtener una instancia del ProveedorInteligencia para el chat."""
+    try:
+        return ProveedorInteligencia()
+    except ErrorProveedorInteligencia as e_prov_ia:
+        registrador.error(f"Error específico al crear instancia de ProveedorInteligencia (chat): {e_prov_ia}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"No se pudo inicializar el proveedor de IA configurado para el chat: {str(e_prov_ia)}")
+    except Exception as e_inesperado:
+        registrador.exception(f"Error inesperado al crear instancia de ProveedorInteligencia (chat): {e_inesperado}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error interno del servidor al configurar el proveedor de IA para el chat.")
+
+# --- Funciones Auxiliares Internas ---
+
+def _milisegundos_desde(instante_inicio: float) -> float:
+    """Devuelve los milisegundos transcurridos desde 'instante_inicio' (obtenido con time.perf_counter)."""
+    return round((time.perf_counter() - instante_inicio) * 1000.0, 2)
+
+# --- Endpoint de Chat Nativo ---
+
+@enrutador_chat.post("/{id_curso}",
+                     summary="Chat con Recuperación Aumentada para un Curso",
+                     description="Responde la pregunta del usuario usando los fragmentos más similares del curso como contexto. "
+                                 "Por defecto la respuesta se transmite en flujo como texto plano; las latencias de embedding y "
+                                 "búsqueda se devuelven en cabeceras 'X-EntrenAI-*' para poder compararlas con el flujo de N8N.")
+def responder_pregunta_chat_curso( # Definida como 'def' para que FastAPI la ejecute en su pool de hilos (las llamadas al núcleo son bloqueantes)
+    solicitud_chat: modelos_api.SolicitudChatCurso,
+    id_curso: int = FastAPIPath(..., description="ID del curso de Moodle sobre cuyo contenido se pregunta."),
+    cliente_moodle: ClienteMoodle = Depends(obtener_dependencia_cliente_moodle_chat),
+    envoltorio_bd: EnvoltorioPgVector = Depends(obtener_dependencia_envoltorio_pgvector_chat),
+    proveedor_ia: ProveedorInteligencia = Depends(obtener_dependencia_proveedor_inteligencia_chat),
+):
+    """
+    1. Genera el embedding de la pregunta.
+    2. Recupera los fragmentos más similares de la tabla vectorial del curso.
+    3. Genera la respuesta con el proveedor de IA, en flujo o completa según la petición.
+    """
+    instante_inicio_total = time.perf_counter()
+    registrador.info(f"Chat nativo para curso ID {id_curso}: '{solicitud_chat.pregunta_usuario[:70]}...' (transmitir={solicitud_chat.transmitir_respuesta}).")
+
+    try:
+        identificador_tabla_curso = obtener_indice_nombres_cursos().obtener_nombre_curso_para_tabla(id_curso, cliente_moodle)
+
+        # Paso 1: Embedding de la pregunta.
+        instante_inicio_etapa = time.perf_counter()
+        embedding_pregunta = proveedor_ia.generar_embedding(texto_entrada=solicitud_chat.pregunta_usuario)
+        if not embedding_pregunta:
+            registrador.error("El proveedor de IA devolvió un embedding vacío para la pregunta del chat.")
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="No se pudo generar el embedding de la pregunta.")
+        milisegundos_embedding = _milisegundos_desde(instante_inicio_etapa)
+
+        # Paso 2: Recuperación de fragmentos similares.
+        instante_inicio_etapa = time.perf_counter()
+        resultados_similares = envoltorio_bd.buscar_fragmentos_similares_por_embedding(
+            identificador_curso=identificador_tabla_curso,
+            embedding_de_consulta=embedding_pregunta,
+            limite_resultados=solicitud_chat.limite_fragmentos_contexto,
+        )
+        milisegundos_busqueda = _milisegundos_desde(instante_inicio_etapa)
+
+        fragmentos_de_contexto: List[str] = [
+            resultado.get("payload", {}).get("texto", "") for resultado in resultados_similares
+            if resultado.get("payload", {}).get("texto")
+        ]
+        ids_fragmentos_utilizados: List[str] = [str(resultado.get("id_fragmento")) for resultado in resultados_similares]
+        registrador.debug(f"Chat curso {id_curso}: {len(fragmentos_de_contexto)} fragmentos de contexto recuperados (embedding {milisegundos_embedding} ms, búsqueda {milisegundos_busqueda} ms).")
+
+        mensaje_de_sistema = solicitud_chat.mensaje_sistema_personalizado or MENSAJE_SISTEMA_CHAT_PREDETERMINADO
+
+        # Paso 3a: Respuesta en flujo.
+        if solicitud_chat.transmitir_respuesta:
+            flujo_respuesta = proveedor_ia.generar_respuesta_de_chat_en_flujo(
+                prompt_usuario=solicitud_chat.pregunta_usuario,
+                mensaje_de_sistema=mensaje_de_sistema,
+                historial_chat_previo=solicitud_chat.historial_chat_previo,
+                fragmentos_de_contexto=fragmentos_de_contexto,
+            )
+
+            def _transmitir_y_medir() -> Iterator[str]:
+                """Reenvía los trozos del modelo y registra al final el tiempo al primer trozo y el total."""
+                instante_inicio_generacion = time.perf_counter()
+                milisegundos_primer_trozo: Optional[float] = None
+                try:
+                    for trozo_texto in flujo_respuesta:
+                        if milisegundos_primer_trozo is None:
+                            milisegundos_primer_trozo = _milisegundos_desde(instante_inicio_generacion)
+                        yield trozo_texto
+                except ErrorProveedorInteligencia as e_flujo:
+                    # Las cabeceras ya se enviaron: sólo se puede cortar el flujo y dejar constancia.
+                    registrador.error(f"Error del proveedor de IA a mitad del chat en flujo (curso {id_curso}): {e_flujo}")
+                    yield "\n\n[Error: la generación de la respuesta se interrumpió.]"
+                finally:
+                    registrador.info(
+                        f"Chat nativo curso {id_curso} finalizado: embedding={milisegundos_embedding} ms, búsqueda={milisegundos_busqueda} ms, "
+                        f"primer_trozo={milisegundos_primer_trozo} ms, generación={_milisegundos_desde(instante_inicio_generacion)} ms, "
+                        f"total={_milisegundos_desde(instante_inicio_total)} ms."
+                    )
+
+            cabeceras_latencia = {
+                "X-EntrenAI-Ms-Embedding": str(milisegundos_embedding),
+                "X-EntrenAI-Ms-Busqueda": str(milisegundos_busqueda),
+                "X-EntrenAI-Fragmentos-Contexto": str(len(fragmentos_de_contexto)),
+            }
+            return StreamingResponse(_transmitir_y_medir(), media_type="text/plain; charset=utf-8", headers=cabeceras_latencia)
+
+        # Paso 3b: Respuesta completa.
+        instante_inicio_etapa = time.perf_counter()
+        texto_respuesta = proveedor_ia.generar_respuesta_de_chat(
+            prompt_usuario=solicitud_chat.pregunta_usuario,
+            mensaje_de_sistema=mensaje_de_sistema,
+            historial_chat_previo=solicitud_chat.historial_chat_previo,
+            fragmentos_de_contexto=fragmentos_de_contexto,
+        )
+        tiempos_respuesta = modelos_api.TiemposRespuestaChat(
+            milisegundos_embedding_consulta=milisegundos_embedding,
+            milisegundos_busqueda_vectorial=milisegundos_busqueda,
+            milisegundos_generacion_respuesta=_milisegundos_desde(instante_inicio_etapa),
+            milisegundos_totales=_milisegundos_desde(instante_inicio_total),
+        )
+        registrador.info(f"Chat nativo curso {id_curso} finalizado (sin flujo): {tiempos_respuesta.model_dump()}.")
+        return modelos_api.RespuestaChatCurso(
+            id_curso=id_curso,
+            respuesta_asistente=texto_respuesta,
+            ids_fragmentos_utilizados=ids_fragmentos_utilizados,
+            tiempos_respuesta=tiempos_respuesta,
+        )
+
+    except ErrorBaseDeDatosVectorial as e_error_bd_chat:
+        registrador.error(f"Error de la base de datos vectorial durante el chat del curso {id_curso}: {e_error_bd_chat}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Error al acceder a la base de datos durante el chat: {str(e_error_bd_chat)}")
+    except ErrorProveedorInteligencia as e_error_ia_chat:
+        registrador.error(f"Error del proveedor de IA durante el chat del curso {id_curso}: {e_error_ia_chat}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Error con el servicio de inteligencia artificial durante el chat: {str(e_error_ia_chat)}")
+    except HTTPException:
+        raise
+    except Exception as e_error_general_chat:
+        registrador.exception(f"Error inesperado durante el chat del curso {id_curso}: {e_error_general_chat}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Se produjo un error interno en el servidor durante el chat: {str(e_error_general_chat)}")
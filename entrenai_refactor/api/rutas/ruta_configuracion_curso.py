@@ -8,7 +8,7 @@ from celery.result import AsyncResult # Para consultar resultados de tareas Cele
 # Importar modelos Pydantic refactorizados
 from entrenai_refactor.api import modelos as modelos_api
 # Importar clases refactorizadas del núcleo
-from entrenai_refactor.nucleo.clientes import ClienteMoodle, ErrorAPIMoodle
+from entrenai_refactor.nucleo.clientes import ClienteMoodle, ClienteMoodleAsincrono, ErrorAPIMoodle, obtener_indice_nombres_cursos
 from entrenai_refactor.nucleo.clientes import ClienteN8N, ErrorClienteN8N
 from entrenai_refactor.nucleo.bd import EnvoltorioPgVector, ErrorBaseDeDatosVectorial
 from entrenai_refactor.nucleo.ia import ProveedorInteligencia, ErrorProveedorInteligencia
@@ -40,6 +40,14 @@ def obtener_dependencia_cliente_moodle() -> ClienteMoodle: # Nombre más explíc
         registrador.exception(f"Error inesperado al crear instancia de ClienteMoodle: {e_inesperado}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error interno del servidor al configurar la conexión con Moodle.")
 
+def obtener_dependencia_cliente_moodle_asincrono() -> ClienteMoodleAsincrono:
+    """Dependencia para obtener un ClienteMoodleAsincrono (pool de conexiones compartido) para los endpoints de sólo consulta."""
+    try:
+        return ClienteMoodleAsincrono()
+    except ErrorAPIMoodle as e_moodle:
+        registrador.error(f"Error específico al crear instancia de ClienteMoodleAsincrono: {e_moodle}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"No se pudo conectar o inicializar el cliente de Moodle: {str(e_moodle)}")
+
 def obtener_dependencia_envoltorio_pgvector() -> EnvoltorioPgVector: # Nombre más explícito
     """Dependencia para obtener una instancia del EnvoltorioPgVector. Maneja errores."""
     try:
@@ -83,20 +91,8 @@ async def _obtener_nombre_curso_para_operaciones(id_curso: int, cliente_moodle:
     nombre_curso_obtenido: Optional[str] = None
     registrador.debug(f"Función auxiliar: Obteniendo nombre del curso con ID {id_curso} desde Moodle.")
     try:
-        # Intentar obtener el nombre del curso a través de los cursos del profesor por defecto, si está configurado.
-        id_profesor_defecto_moodle = configuracion_global.moodle.id_profesor_por_defecto # Nombre de campo refactorizado
-        if id_profesor_defecto_moodle:
-            cursos_del_profesor = cliente_moodle.obtener_cursos_de_usuario(id_usuario=id_profesor_defecto_moodle)
-            curso_encontrado_via_profesor = next((c for c in cursos_del_profesor if c.id == id_curso), None)
-            if curso_encontrado_via_profesor:
-                nombre_curso_obtenido = curso_encontrado_via_profesor.nombre_a_mostrar or curso_encontrado_via_profesor.nombre_completo
-
-        # Si no se encontró por profesor o no hay profesor por defecto, buscar en todos los cursos.
-        if not nombre_curso_obtenido:
-            todos_los_cursos_instancia_moodle = cliente_moodle.obtener_todos_los_cursos_disponibles()
-            curso_encontrado_en_todos = next((c for c in todos_los_cursos_instancia_moodle if c.id == id_curso), None)
-            if curso_encontrado_en_todos:
-                nombre_curso_obtenido = curso_encontrado_en_todos.nombre_a_mostrar or curso_encontrado_en_todos.nombre_completo
+        # Índice persistente ID -> nombre: consulta dirigida a Moodle sólo si el curso no está indexado.
+        nombre_curso_obtenido = obtener_indice_nombres_cursos().obtener_nombre_curso(id_curso, cliente_moodle)
 
         if not nombre_curso_obtenido:
             registrador.warning(f"No se pudo encontrar el curso con ID {id_curso} en Moodle para obtener su nombre.")
@@ -129,7 +125,7 @@ async def chequear_estado_salud_enrutador_config_cursos(): # Nombre de función
                              description="Obtiene una lista de cursos desde Moodle. Si se especifica 'id_usuario_moodle', filtra los cursos para ese usuario (generalmente un profesor). Si no, intenta usar un ID de profesor por defecto configurado en el servidor. Como último recurso, podría listar todos los cursos disponibles en la instancia de Moodle.")
 async def obtener_lista_cursos_moodle( # Nombre de función más descriptivo
     id_usuario_moodle: Optional[int] = Query(None, description="ID de Usuario de Moodle (ej. profesor) para filtrar los cursos a los que está asociado.", alias="idUsuarioMoodle"),
-    cliente_moodle: ClienteMoodle = Depends(obtener_dependencia_cliente_moodle) # Inyección de dependencia
+    cliente_moodle: ClienteMoodleAsincrono = Depends(obtener_dependencia_cliente_moodle_asincrono) # Asíncrono: no bloquea el bucle de eventos
 ):
     """Obtiene y devuelve una lista de cursos desde Moodle, filtrada opcionalmente por ID de usuario."""
     id_profesor_consulta_moodle = id_usuario_moodle if id_usuario_moodle is not None else configuracion_global.moodle.id_profesor_por_defecto # Usar campo refactorizado
@@ -138,7 +134,8 @@ async def obtener_lista_cursos_moodle( # Nombre de función más descriptivo
         registrador.warning("No se proporcionó ID de profesor y el ID por defecto no está configurado. Se procederá a listar todos los cursos disponibles en Moodle.")
         try:
             registrador.info("Obteniendo todos los cursos disponibles de la instancia de Moodle.")
-            cursos_moodle = cliente_moodle.obtener_todos_los_cursos_disponibles() # Método refactorizado
+            cursos_moodle = await cliente_moodle.obtener_todos_los_cursos_disponibles() # Método refactorizado
+            obtener_indice_nombres_cursos().registrar_cursos(cursos_moodle) # Ya descargados: se indexan sin coste adicional
             return cursos_moodle
         except ErrorAPIMoodle as e_error_api_moodle_todos:
             registrador.error(f"Error de API Moodle al obtener todos los cursos: {e_error_api_moodle_todos}")
@@ -149,7 +146,8 @@ async def obtener_lista_cursos_moodle( # Nombre de función más descriptivo
 
     registrador.info(f"Obteniendo cursos de Moodle para el ID de profesor/usuario: {id_profesor_consulta_moodle}.")
     try:
-        cursos_moodle_usuario = cliente_moodle.obtener_cursos_de_usuario(id_usuario=id_profesor_consulta_moodle) # Método refactorizado
+        cursos_moodle_usuario = await cliente_moodle.obtener_cursos_de_usuario(id_usuario=id_profesor_consulta_moodle) # Método refactorizado
+        obtener_indice_nombres_cursos().registrar_cursos(cursos_moodle_usuario)
         return cursos_moodle_usuario
     except ErrorAPIMoodle as e_error_api_moodle_usuario:
         registrador.error(f"Error de API Moodle al obtener cursos para el usuario {id_profesor_consulta_moodle}: {e_error_api_moodle_usuario}")
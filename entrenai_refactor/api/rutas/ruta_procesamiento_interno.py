@@ -1,21 +1,28 @@
 import os # Para operaciones del sistema de archivos como eliminar archivos temporales
+import time
 import traceback # Para el logging detallado de errores fatales en tareas de fondo
 from pathlib import Path
-from typing import List, Optional, Dict, Any # Tipos estándar, no se usan todos directamente aquí pero son comunes
+from typing import List, Optional, Dict, Any, Set # Tipos estándar, no se usan todos directamente aquí pero son comunes
 
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, status
 
 # Importar modelos Pydantic refactorizados
 from entrenai_refactor.api import modelos as modelos_api
 # Importar clases refactorizadas del núcleo de la aplicación
-from entrenai_refactor.nucleo.clientes import ClienteMoodle, ErrorAPIMoodle
+from entrenai_refactor.nucleo.clientes import (
+    ClienteMoodle, ErrorAPIMoodle, obtener_indice_nombres_cursos,
+    DescargadorAnticipado, ErrorEspacioDescargasInsuficiente, obtener_ejecutor_resiliente_http,
+    obtener_almacen_blobs_descargas
+)
 from entrenai_refactor.nucleo.bd import EnvoltorioPgVector, ErrorBaseDeDatosVectorial
 from entrenai_refactor.nucleo.ia import (
     ProveedorInteligencia, ErrorProveedorInteligencia,
-    GestorEmbeddings, ErrorGestorEmbeddings # Asumiendo que ErrorGestorEmbeddings existe y es relevante
+    GestorEmbeddings, ErrorGestorEmbeddings, # Asumiendo que ErrorGestorEmbeddings existe y es relevante
+    obtener_contador_tokens_configurado,
+    guardar_markdown_en_archivo, texto_parece_markdown_bien_formado
 )
 from entrenai_refactor.nucleo.archivos import (
-    GestorMaestroDeProcesadoresArchivos, ErrorProcesamientoArchivo, ErrorDependenciaFaltante
+    GestorMaestroDeProcesadoresArchivos, ErrorProcesamientoArchivo, ErrorDependenciaFaltante, ErrorExtraccionAislada
 )
 # Configuración global y sistema de logging
 from entrenai_refactor.config.configuracion import configuracion_global
@@ -75,7 +82,23 @@ def obtener_dependencia_gestor_embeddings_pi( # Nombre de función refactorizado
 ) -> GestorEmbeddings:
     """Dependencia para obtener una instancia del GestorEmbeddings."""
     try:
-        return GestorEmbeddings(proveedor_ia=proveedor_ia) # Parámetro 'proveedor_ia' refactorizado
+        config_procesamiento = configuracion_global.procesamiento
+        parametros_lotes_embeddings = {
+            "tamano_lote_embeddings": config_procesamiento.tamano_lote_embeddings,
+            "percentil_corte_semantico": float(config_procesamiento.percentil_corte_fragmentacion_semantica),
+        }
+        # Fragmentos dimensionados en tokens del modelo de embedding activo (tokenizador cargado al arrancar la API).
+        contador_tokens = obtener_contador_tokens_configurado()
+        if contador_tokens is None or contador_tokens.tokenizador_no_disponible:
+            if contador_tokens is not None:
+                registrador.warning(f"El tokenizador '{contador_tokens.identificador_tokenizador}' no está disponible; los fragmentos se dimensionarán en caracteres.")
+            return GestorEmbeddings(proveedor_ia=proveedor_ia, **parametros_lotes_embeddings) # Parámetro 'proveedor_ia' refactorizado
+        return GestorEmbeddings(
+            proveedor_ia=proveedor_ia,
+            contador_tokens=contador_tokens,
+            maximo_tokens_fragmento=config_procesamiento.fragmento_maximo_tokens,
+            **parametros_lotes_embeddings,
+        )
     except ErrorGestorEmbeddings as e_gestor_emb: # Asumiendo que GestorEmbeddings puede lanzar su propia excepción
         registrador.error(f"Error específico al crear instancia de GestorEmbeddings (procesamiento interno): {e_gestor_emb}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"No se pudo inicializar el gestor de embeddings para procesamiento interno: {str(e_gestor_emb)}")
@@ -94,14 +117,76 @@ def obtener_dependencia_gestor_procesadores_archivos_pi() -> GestorMaestroDeProc
 
 # --- Lógica Central de Procesamiento de Archivos de un Curso (Tarea Asíncrona) ---
 
-async def _ejecutar_tarea_procesamiento_archivos_curso( # Nombre de función refactorizado
+def _ingerir_archivo_en_flujo(
+    ruta_archivo_local: Path,
+    id_curso: int,
+    identificador_archivo: str,
+    nombre_tabla_curso: str,
+    envoltorio_bd: EnvoltorioPgVector,
+    gestor_embeddings: GestorEmbeddings,
+    gestor_archivos: GestorMaestroDeProcesadoresArchivos,
+) -> int:
+    """
+    Ingiere un archivo grande en memoria acotada: extrae sus bloques (páginas, diapositivas, párrafos...)
+    de uno en uno, los fragmenta en flujo y vectoriza e inserta los fragmentos por lotes.
+    En este camino no se formatea el texto a Markdown con el LLM (requeriría el documento completo).
+
+    Returns:
+        El número de fragmentos insertados en la base de datos vectorial.
+    """
+    tamano_lote_fragmentos = max(1, configuracion_global.procesamiento.ingesta_en_flujo_fragmentos_por_lote)
+    textos_lote: List[str] = []
+    metadatos_lote: List[Optional[Dict[str, Any]]] = []
+    numero_fragmento_secuencia = 0
+    total_fragmentos_insertados = 0
+
+    def _vectorizar_y_guardar_lote_fragmentos() -> int:
+        embeddings_lote = gestor_embeddings.generar_embeddings_para_lista_de_textos(
+            lista_de_textos=textos_lote,
+            nombre_archivo_origen=identificador_archivo,
+            titulo_documento_origen=identificador_archivo
+        )
+        fragmentos_lote_para_bd = gestor_embeddings.construir_objetos_fragmento_para_bd(
+            id_curso=id_curso,
+            id_documento=identificador_archivo,
+            nombre_archivo_original=identificador_archivo,
+            titulo_documento=identificador_archivo,
+            lista_textos_fragmentos=textos_lote,
+            lista_embeddings_fragmentos=embeddings_lote,
+            metadatos_adicionales_por_fragmento=metadatos_lote
+        )
+        envoltorio_bd.insertar_o_actualizar_fragmentos_documento(
+            identificador_curso=nombre_tabla_curso,
+            fragmentos_a_guardar=fragmentos_lote_para_bd
+        )
+        return len(fragmentos_lote_para_bd)
+
+    bloques_del_archivo = gestor_archivos.iterar_bloques_de_archivo_segun_tipo(ruta_archivo_local)
+    for texto_fragmento, metadatos_posicionales in gestor_embeddings.dividir_bloques_en_fragmentos_en_flujo(bloques_del_archivo):
+        numero_fragmento_secuencia += 1
+        textos_lote.append(texto_fragmento)
+        # El número de secuencia global sustituye al relativo al lote que asigna construir_objetos_fragmento_para_bd.
+        metadatos_lote.append({**metadatos_posicionales, "numero_fragmento_secuencia": numero_fragmento_secuencia})
+        if len(textos_lote) >= tamano_lote_fragmentos:
+            total_fragmentos_insertados += _vectorizar_y_guardar_lote_fragmentos()
+            textos_lote.clear()
+            metadatos_lote.clear()
+    if textos_lote:
+        total_fragmentos_insertados += _vectorizar_y_guardar_lote_fragmentos()
+
+    registrador.info(f"Ingesta en flujo de '{identificador_archivo}' (curso {id_curso}): {numero_fragmento_secuencia} fragmentos generados, {total_fragmentos_insertados} insertados en lotes de {tamano_lote_fragmentos}.")
+    return total_fragmentos_insertados
+
+
+def _ejecutar_tarea_procesamiento_archivos_curso( # Nombre de función refactorizado
     id_curso_para_procesar: int, # Parámetro renombrado
     id_usuario_que_solicita: int, # Parámetro renombrado (para auditoría o lógica futura, no usado activamente aquí)
     cliente_moodle: ClienteMoodle,
     envoltorio_bd: EnvoltorioPgVector, # Parámetro renombrado
     proveedor_ia: ProveedorInteligencia,
     gestor_embeddings: GestorEmbeddings,
-    gestor_archivos: GestorMaestroDeProcesadoresArchivos # Parámetro renombrado
+    gestor_archivos: GestorMaestroDeProcesadoresArchivos, # Parámetro renombrado
+    forzar_reprocesamiento: bool = False
 ):
     """
     Tarea principal, usualmente ejecutada en segundo plano (ej. por Celery o BackgroundTasks de FastAPI),
@@ -115,30 +200,24 @@ async def _ejecutar_tarea_procesamiento_archivos_curso( # Nombre de función ref
            generar embeddings para sus fragmentos, e insertar/actualizar en la BD vectorial.
         c. Marcar el archivo como procesado en la tabla de seguimiento.
     5. Registrar un resumen del proceso.
+
+    Con `forzar_reprocesamiento` se reprocesan también los archivos sin cambios (reindexación); los que tienen
+    un SHA-256 registrado se toman del almacén local de descargas, si está habilitado, sin acceder a Moodle.
+    La reindexación se escribe en una nueva generación de la tabla del curso, que sustituye a la publicada
+    al terminar: las búsquedas siguen usando el índice anterior mientras tanto. Los archivos que fallen se
+    copian de la tabla publicada a la nueva generación para no perder sus fragmentos. El seguimiento de los
+    archivos reprocesados se registra sólo cuando la generación se ha publicado: si se descarta, la tabla
+    publicada conserva el contenido anterior y la próxima ejecución debe volver a procesarlos.
+
+    Es una función síncrona a propósito: la extracción aislada espera a su trabajador con llamadas
+    bloqueantes, y BackgroundTasks ejecuta las funciones síncronas en su pool de hilos, sin detener el
+    bucle de eventos del servidor.
     """
-    registrador.info(f"Inicio de procesamiento de archivos (tarea asíncrona/interna) para el curso ID: {id_curso_para_procesar}, solicitado por usuario ID: {id_usuario_que_solicita}.")
+    generacion_iniciada = False
+    registrador.info(f"Inicio de procesamiento de archivos (tarea en segundo plano) para el curso ID: {id_curso_para_procesar}, solicitado por usuario ID: {id_usuario_que_solicita}.")
     try:
         # Paso 1: Obtener nombre del curso. Este nombre se usa para la tabla vectorial.
-        nombre_curso_para_tabla_bd: Optional[str] = None
-        try:
-            # Similar a _aux_obtener_nombre_curso en ruta_configuracion_curso.py, pero adaptado.
-            # Asumimos que el id_usuario_que_solicita podría ser relevante para filtrar cursos.
-            cursos_del_usuario_solicitante = cliente_moodle.obtener_cursos_de_usuario(id_usuario=id_usuario_que_solicita)
-            curso_objeto_moodle = next((c for c in cursos_del_usuario_solicitante if c.id == id_curso_para_procesar), None)
-            if curso_objeto_moodle:
-                nombre_curso_para_tabla_bd = curso_objeto_moodle.nombre_a_mostrar or curso_objeto_moodle.nombre_completo
-            else: # Fallback: buscar en todos los cursos si no se encontró en los del usuario.
-                todos_los_cursos_moodle_instancia = cliente_moodle.obtener_todos_los_cursos_disponibles()
-                curso_objeto_moodle_todos = next((c for c in todos_los_cursos_moodle_instancia if c.id == id_curso_para_procesar), None)
-                if curso_objeto_moodle_todos:
-                    nombre_curso_para_tabla_bd = curso_objeto_moodle_todos.nombre_a_mostrar or curso_objeto_moodle_todos.nombre_completo
-
-            if not nombre_curso_para_tabla_bd: # Si aún no se encuentra, usar un nombre genérico basado en ID.
-                nombre_curso_para_tabla_bd = f"curso_{id_curso_para_procesar}" # Nombre de fallback
-                registrador.warning(f"No se pudo obtener el nombre del curso {id_curso_para_procesar} desde Moodle. Se usará el nombre genérico '{nombre_curso_para_tabla_bd}' para la tabla vectorial y otros identificadores.")
-        except ErrorAPIMoodle as e_moodle_api_nombre:
-            registrador.error(f"Error de API Moodle al obtener el nombre del curso {id_curso_para_procesar} para el procesamiento de archivos: {e_moodle_api_nombre}. Se usará un nombre genérico para la tabla.")
-            nombre_curso_para_tabla_bd = f"curso_{id_curso_para_procesar}" # Fallback si la API de Moodle falla
+        nombre_curso_para_tabla_bd = obtener_indice_nombres_cursos().obtener_nombre_curso_para_tabla(id_curso_para_procesar, cliente_moodle)
 
         # Paso 2: Identificar la sección y carpeta de EntrenAI en Moodle donde residen los documentos.
         nombre_seccion_entrenai_configurada = configuracion_global.moodle.nombre_carpeta_recursos_ia # Nombre de la SECCIÓN, campo refactorizado
@@ -167,6 +246,14 @@ async def _ejecutar_tarea_procesamiento_archivos_curso( # Nombre de función ref
         # Paso 4: Iterar sobre cada archivo encontrado y procesarlo individualmente.
         contador_archivos_procesados_correctamente = 0
         contador_archivos_omitidos_por_no_cambios = 0
+        contador_descargas_evitadas_por_hash_moodle = 0 # 'timemodified' más reciente, pero mismo 'contenthash' de Moodle: ni se descarga
+        contador_procesamientos_evitados_por_huella = 0 # Descargado, pero con el mismo SHA-256 ya procesado: no se extrae ni vectoriza
+        bytes_descargas_evitadas = 0
+        contador_archivos_sin_formateo_llm = 0 # Archivos cuyo Markdown se obtuvo sin invocar al LLM
+        contador_archivos_ingeridos_en_flujo = 0 # Archivos grandes ingeridos por bloques en memoria acotada
+        fallos_extraccion_aislada_por_motivo: Dict[str, int] = {} # Archivos abortados por el aislamiento (tiempo, memoria...)
+        estrategia_fragmentacion_curso = configuracion_global.procesamiento.obtener_estrategia_fragmentacion_para_curso(id_curso_para_procesar)
+        registrador.info(f"Estrategia de fragmentación para el curso {id_curso_para_procesar}: '{estrategia_fragmentacion_curso}' (la ingesta en flujo de archivos grandes usa siempre ventana fija en caracteres).")
 
         # Crear directorios para descargas y archivos Markdown generados, si no existen.
         directorio_descargas_especifico_curso = Path(configuracion_global.ruta_absoluta_directorio_descargas) / str(id_curso_para_procesar)
@@ -174,42 +261,160 @@ async def _ejecutar_tarea_procesamiento_archivos_curso( # Nombre de función ref
         directorio_markdown_especifico_curso = Path(configuracion_global.ruta_absoluta_directorio_datos) / "markdown_cursos" / str(id_curso_para_procesar)
         directorio_markdown_especifico_curso.mkdir(parents=True, exist_ok=True)
 
-        for archivo_moodle_a_procesar in lista_archivos_en_carpeta_moodle:
+        # Primero se decide qué archivos hay que (re)procesar, para poder descargar por adelantado los siguientes
+        # mientras se extrae, fragmenta y vectoriza el actual.
+        # Moodle actualiza 'timemodified' también en operaciones que no tocan los bytes (renombrar, mover entre
+        # carpetas, restaurar copias), así que además del momento de modificación se compara el contenido:
+        # el 'contenthash' de Moodle (si el servicio web lo expone) antes de descargar, y el SHA-256 después.
+        try:
+            registros_seguimiento_curso = envoltorio_bd.obtener_registros_seguimiento_archivos_curso(id_curso_para_procesar)
+        except ErrorBaseDeDatosVectorial as e_error_registros_seguimiento:
+            # Como en 'verificar_si_archivo_es_nuevo_o_modificado': ante un error de BD es más seguro reprocesar.
+            registrador.error(f"No se pudo leer la tabla de seguimiento para el curso {id_curso_para_procesar}: {e_error_registros_seguimiento}. Se procesarán todos los archivos.")
+            registros_seguimiento_curso = {}
+
+        archivos_moodle_a_procesar: List[modelos_api.ArchivoMoodle] = []
+        huellas_contenido_vigente: Dict[str, str] = {} # Nombre -> SHA-256 de archivos cuyo contenido no ha cambiado desde que se registró
+        for archivo_moodle_evaluado in lista_archivos_en_carpeta_moodle:
             # Usar 'nombre_original_archivo' como identificador único dentro del contexto del curso.
             # Podría mejorarse usando 'ruta_relativa_archivo' si los nombres no son únicos globalmente en la carpeta.
+            registrador.debug(f"Evaluando archivo: '{archivo_moodle_evaluado.nombre_original_archivo}' (curso {id_curso_para_procesar}), última modificación en Moodle: {archivo_moodle_evaluado.timestamp_ultima_modificacion}.")
+            registro_seguimiento_archivo = registros_seguimiento_curso.get(archivo_moodle_evaluado.nombre_original_archivo)
+
+            if registro_seguimiento_archivo is None:
+                registrador.info(f"Archivo '{archivo_moodle_evaluado.nombre_original_archivo}' (curso {id_curso_para_procesar}) no encontrado en tabla de seguimiento. Se considera NUEVO.")
+                archivos_moodle_a_procesar.append(archivo_moodle_evaluado)
+            elif forzar_reprocesamiento:
+                registrador.info(f"Archivo '{archivo_moodle_evaluado.nombre_original_archivo}' (curso {id_curso_para_procesar}) se reprocesa por solicitud de reprocesamiento forzado.")
+                archivos_moodle_a_procesar.append(archivo_moodle_evaluado)
+                contenido_sin_cambios = (
+                    archivo_moodle_evaluado.timestamp_ultima_modificacion <= registro_seguimiento_archivo["tiempo_modificacion_moodle"]
+                    or (archivo_moodle_evaluado.hash_contenido_moodle and archivo_moodle_evaluado.hash_contenido_moodle == registro_seguimiento_archivo["hash_contenido_moodle"])
+                )
+                if contenido_sin_cambios and registro_seguimiento_archivo["huella_sha256"]:
+                    huellas_contenido_vigente[archivo_moodle_evaluado.nombre_original_archivo] = registro_seguimiento_archivo["huella_sha256"]
+            elif archivo_moodle_evaluado.timestamp_ultima_modificacion <= registro_seguimiento_archivo["tiempo_modificacion_moodle"]: # El archivo no es nuevo ni ha sido modificado
+                registrador.info(f"El archivo '{archivo_moodle_evaluado.nombre_original_archivo}' del curso {id_curso_para_procesar} no ha sido modificado desde el último procesamiento registrado. Se omite en esta ejecución.")
+                contador_archivos_omitidos_por_no_cambios +=1
+            elif (
+                archivo_moodle_evaluado.hash_contenido_moodle
+                and archivo_moodle_evaluado.hash_contenido_moodle == registro_seguimiento_archivo["hash_contenido_moodle"]
+                and registro_seguimiento_archivo["tamano_bytes"] in (None, archivo_moodle_evaluado.tamano_archivo_en_bytes)
+            ):
+                registrador.info(f"El archivo '{archivo_moodle_evaluado.nombre_original_archivo}' (curso {id_curso_para_procesar}) tiene un 'timemodified' más reciente pero el mismo 'contenthash' en Moodle. Se omite sin descargarlo.")
+                try:
+                    # Se registra el nuevo 'timemodified' para que las próximas ejecuciones lo omitan directamente.
+                    envoltorio_bd.marcar_archivo_como_procesado_en_seguimiento(
+                        id_curso_para_procesar, archivo_moodle_evaluado.nombre_original_archivo, archivo_moodle_evaluado.timestamp_ultima_modificacion,
+                        huella_sha256=registro_seguimiento_archivo["huella_sha256"],
+                        tamano_bytes=archivo_moodle_evaluado.tamano_archivo_en_bytes,
+                        hash_contenido_moodle=archivo_moodle_evaluado.hash_contenido_moodle,
+                    )
+                except ErrorBaseDeDatosVectorial as e_error_actualizar_seguimiento:
+                    registrador.warning(f"No se pudo actualizar el seguimiento del archivo '{archivo_moodle_evaluado.nombre_original_archivo}' (curso {id_curso_para_procesar}): {e_error_actualizar_seguimiento}")
+                contador_descargas_evitadas_por_hash_moodle += 1
+                bytes_descargas_evitadas += archivo_moodle_evaluado.tamano_archivo_en_bytes
+            else:
+                registrador.info(f"Archivo '{archivo_moodle_evaluado.nombre_original_archivo}' (curso {id_curso_para_procesar}) ha sido MODIFICADO (Moodle: {archivo_moodle_evaluado.timestamp_ultima_modificacion} > DB: {registro_seguimiento_archivo['tiempo_modificacion_moodle']}).")
+                archivos_moodle_a_procesar.append(archivo_moodle_evaluado)
+
+        # Una reindexación no escribe sobre la tabla publicada: construye una nueva generación y la publica al final.
+        identificadores_archivos_reprocesados: Set[str] = set()
+        seguimientos_pendientes_de_publicacion: List[Dict[str, Any]] = [] # Registros de seguimiento de los archivos escritos en la generación
+        if forzar_reprocesamiento:
+            try:
+                envoltorio_bd.iniciar_generacion_tabla_curso(nombre_curso_para_tabla_bd)
+                generacion_iniciada = True
+            except ErrorBaseDeDatosVectorial as e_error_iniciar_generacion:
+                registrador.error(f"No se pudo iniciar una nueva generación de la tabla del curso {id_curso_para_procesar}: {e_error_iniciar_generacion}. Se reindexará sobre la tabla publicada.")
+
+        # Las descargas se solapan con el procesamiento: mientras se procesa un archivo, un pequeño pool descarga
+        # los siguientes (hasta la profundidad de precarga), sin bajar del espacio libre mínimo en disco.
+        descargador_anticipado = DescargadorAnticipado(
+            fabrica_cliente_moodle=ClienteMoodle,
+            directorio_descargas=directorio_descargas_especifico_curso,
+            profundidad_precarga=configuracion_global.procesamiento.profundidad_precarga_descargas,
+            trabajadores_descarga=configuracion_global.procesamiento.trabajadores_descarga,
+            espacio_libre_minimo_bytes=configuracion_global.procesamiento.espacio_libre_minimo_descargas_mb * 1024 * 1024,
+            almacen_blobs=obtener_almacen_blobs_descargas(),
+        )
+        for archivo_moodle_a_procesar, archivo_descargado_moodle, error_descarga_archivo in descargador_anticipado.iterar_descargas(archivos_moodle_a_procesar, huellas_contenido_vigente):
+            ruta_archivo_descargado_localmente: Optional[Path] = archivo_descargado_moodle.ruta_local if archivo_descargado_moodle else None # Para control en bloque finally
             identificador_unico_del_archivo = archivo_moodle_a_procesar.nombre_original_archivo # Campo refactorizado
             timestamp_modificacion_archivo_moodle = archivo_moodle_a_procesar.timestamp_ultima_modificacion # Campo refactorizado
-
-            registrador.debug(f"Evaluando archivo: '{identificador_unico_del_archivo}' (curso {id_curso_para_procesar}), última modificación en Moodle: {timestamp_modificacion_archivo_moodle}.")
-
-            # Verificar si el archivo es nuevo o ha sido modificado desde el último procesamiento registrado.
-            if envoltorio_bd.verificar_si_archivo_es_nuevo_o_modificado(id_curso_para_procesar, identificador_unico_del_archivo, timestamp_modificacion_archivo_moodle): # Método refactorizado
-                registrador.info(f"Procesando archivo nuevo o modificado: '{identificador_unico_del_archivo}' para el curso ID: {id_curso_para_procesar}.")
-                ruta_archivo_descargado_localmente: Optional[Path] = None # Para control en bloque finally
-                try:
-                    # Descargar el archivo desde Moodle.
-                    ruta_archivo_descargado_localmente = cliente_moodle.descargar_archivo_moodle( # Método refactorizado
-                        url_archivo_moodle_original=str(archivo_moodle_a_procesar.url_descarga_directa_archivo), # Campo refactorizado
-                        directorio_destino_descarga=directorio_descargas_especifico_curso,
-                        nombre_final_archivo=archivo_moodle_a_procesar.nombre_original_archivo # Campo refactorizado
+            registrador.info(f"Procesando archivo nuevo o modificado: '{identificador_unico_del_archivo}' para el curso ID: {id_curso_para_procesar}.")
+            try:
+                if error_descarga_archivo is not None: # La descarga (anticipada) falló: se trata como los demás errores del archivo
+                    raise error_descarga_archivo
+                registrador.info(f"Archivo '{identificador_unico_del_archivo}' descargado en: {ruta_archivo_descargado_localmente}.")
+
+                # Si los bytes descargados son los mismos que se procesaron la última vez, no se repite ninguna etapa costosa.
+                registro_seguimiento_archivo = registros_seguimiento_curso.get(identificador_unico_del_archivo)
+                if not forzar_reprocesamiento and registro_seguimiento_archivo and registro_seguimiento_archivo["huella_sha256"] == archivo_descargado_moodle.huella_sha256:
+                    registrador.info(f"El contenido de '{identificador_unico_del_archivo}' (curso {id_curso_para_procesar}) es idéntico (SHA-256) al ya procesado. Se omiten extracción, formateo y vectorización.")
+                    envoltorio_bd.marcar_archivo_como_procesado_en_seguimiento(
+                        id_curso_para_procesar, identificador_unico_del_archivo, timestamp_modificacion_archivo_moodle,
+                        huella_sha256=archivo_descargado_moodle.huella_sha256,
+                        tamano_bytes=archivo_descargado_moodle.tamano_bytes,
+                        hash_contenido_moodle=archivo_moodle_a_procesar.hash_contenido_moodle,
+                    )
+                    contador_procesamientos_evitados_por_huella += 1
+                    continue # El bloque 'finally' elimina igualmente el archivo descargado
+
+                # Los archivos grandes se ingieren en flujo (memoria acotada, sin formateo por LLM);
+                # el resto sigue el camino completo: extracción, Markdown y fragmentación del texto entero.
+                umbral_ingesta_en_flujo_mb = configuracion_global.procesamiento.ingesta_en_flujo_tamano_minimo_mb
+                tamano_archivo_descargado_mb = archivo_descargado_moodle.tamano_bytes / (1024 * 1024)
+                if umbral_ingesta_en_flujo_mb > 0 and tamano_archivo_descargado_mb >= umbral_ingesta_en_flujo_mb:
+                    registrador.info(f"Archivo '{identificador_unico_del_archivo}' ({tamano_archivo_descargado_mb:.1f} MB) supera el umbral de {umbral_ingesta_en_flujo_mb} MB; se ingiere en flujo.")
+                    _ingerir_archivo_en_flujo(
+                        ruta_archivo_local=ruta_archivo_descargado_localmente,
+                        id_curso=id_curso_para_procesar,
+                        identificador_archivo=identificador_unico_del_archivo,
+                        nombre_tabla_curso=nombre_curso_para_tabla_bd,
+                        envoltorio_bd=envoltorio_bd,
+                        gestor_embeddings=gestor_embeddings,
+                        gestor_archivos=gestor_archivos,
                     )
-                    registrador.info(f"Archivo '{identificador_unico_del_archivo}' descargado en: {ruta_archivo_descargado_localmente}.")
-
-                    # Extraer texto del archivo descargado usando el gestor de procesadores.
-                    texto_contenido_extraido_archivo = gestor_archivos.procesar_archivo_segun_tipo(ruta_archivo_descargado_localmente) # Método refactorizado
-
-                    if texto_contenido_extraido_archivo and texto_contenido_extraido_archivo.strip(): # Si se extrajo texto y no está vacío
-                        # Opcional: Formatear el texto extraído a Markdown (si es necesario o deseado).
-                        # La decisión de formatear a Markdown aquí o delegarlo puede depender de la estrategia general.
-                        # Por ahora, asumimos que el proveedor de IA puede manejar texto crudo o que el formateo es beneficioso.
-                        ruta_archivo_markdown_generado = directorio_markdown_especifico_curso / f"{ruta_archivo_descargado_localmente.stem}.md"
-                        texto_contenido_en_markdown = proveedor_ia.formatear_texto_a_markdown( # Método refactorizado
-                            texto_original=texto_contenido_extraido_archivo,
-                            ruta_archivo_para_guardar=ruta_archivo_markdown_generado
+                    contador_archivos_ingeridos_en_flujo += 1
+                else:
+                    ruta_archivo_markdown_generado = directorio_markdown_especifico_curso / f"{ruta_archivo_descargado_localmente.stem}.md"
+                    texto_contenido_en_markdown: Optional[str] = None
+
+                    # Primero se intenta el camino determinista: formatos con estructura nativa (DOCX con estilos
+                    # de encabezado, PPTX con títulos de diapositiva, Markdown) se renderizan sin pasar por el LLM.
+                    texto_markdown_nativo = gestor_archivos.obtener_markdown_nativo_de_archivo(ruta_archivo_descargado_localmente)
+                    if texto_markdown_nativo:
+                        texto_contenido_en_markdown = texto_markdown_nativo.strip()
+                        guardar_markdown_en_archivo(texto_contenido_en_markdown, ruta_archivo_markdown_generado)
+                        contador_archivos_sin_formateo_llm += 1
+                        registrador.info(f"Archivo '{identificador_unico_del_archivo}' renderizado a Markdown por reglas; se omite el formateo por LLM.")
+                    else:
+                        # Extraer texto del archivo descargado usando el gestor de procesadores.
+                        texto_contenido_extraido_archivo = gestor_archivos.procesar_archivo_segun_tipo( # Método refactorizado
+                            ruta_archivo_descargado_localmente,
+                            huella_archivo=archivo_descargado_moodle.huella_sha256 # Calculada durante la descarga: no se vuelve a leer el archivo
+                        )
+                        if texto_contenido_extraido_archivo and texto_contenido_extraido_archivo.strip(): # Si se extrajo texto y no está vacío
+                            if texto_parece_markdown_bien_formado(texto_contenido_extraido_archivo):
+                                # El texto extraído ya es Markdown estructurado: el LLM no aportaría nada.
+                                texto_contenido_en_markdown = texto_contenido_extraido_archivo.strip()
+                                guardar_markdown_en_archivo(texto_contenido_en_markdown, ruta_archivo_markdown_generado)
+                                contador_archivos_sin_formateo_llm += 1
+                                registrador.info(f"El texto extraído de '{identificador_unico_del_archivo}' ya es Markdown estructurado; se omite el formateo por LLM.")
+                            else:
+                                texto_contenido_en_markdown = proveedor_ia.formatear_texto_a_markdown( # Método refactorizado
+                                    texto_original=texto_contenido_extraido_archivo,
+                                    ruta_archivo_para_guardar=ruta_archivo_markdown_generado
+                                )
+
+                    if texto_contenido_en_markdown and texto_contenido_en_markdown.strip():
+
+                        # Dividir el texto (Markdown o crudo) en fragmentos manejables para embeddings,
+                        # con la estrategia de fragmentación configurada para el curso.
+                        lista_fragmentos_de_texto, lista_metadatos_fragmentos = gestor_embeddings.fragmentar_texto_segun_estrategia(
+                            texto_contenido_en_markdown, estrategia_fragmentacion_curso
                         )
-
-                        # Dividir el texto (Markdown o crudo) en fragmentos manejables para embeddings.
-                        lista_fragmentos_de_texto = gestor_embeddings.dividir_texto_en_fragmentos(texto_contenido_en_markdown) # Método refactorizado
 
                         # Generar embeddings para cada fragmento.
                         # Aquí se aplica la contextualización dentro de generar_embeddings_para_lista_de_textos.
@@ -226,7 +431,8 @@ async def _ejecutar_tarea_procesamiento_archivos_curso( # Nombre de función ref
                             nombre_archivo_original=archivo_moodle_a_procesar.nombre_original_archivo, # Campo refactorizado
                             titulo_documento=archivo_moodle_a_procesar.nombre_original_archivo, # Título para metadatos
                             lista_textos_fragmentos=lista_fragmentos_de_texto,
-                            lista_embeddings_fragmentos=lista_embeddings_generados_fragmentos
+                            lista_embeddings_fragmentos=lista_embeddings_generados_fragmentos,
+                            metadatos_adicionales_por_fragmento=lista_metadatos_fragmentos
                         )
 
                         # Insertar o actualizar los fragmentos y sus embeddings en la base de datos vectorial (PGVector).
@@ -238,49 +444,214 @@ async def _ejecutar_tarea_procesamiento_archivos_curso( # Nombre de función ref
                     else:
                         registrador.warning(f"No se extrajo contenido textual del archivo '{identificador_unico_del_archivo}' (curso {id_curso_para_procesar}) o el contenido estaba vacío. No se generarán embeddings para este archivo.")
 
-                    # Marcar el archivo como procesado en la tabla de seguimiento, independientemente de si se extrajo texto
-                    # (para no reintentar procesar archivos vacíos o no soportados repetidamente).
-                    envoltorio_bd.marcar_archivo_como_procesado_en_seguimiento(id_curso_para_procesar, identificador_unico_del_archivo, timestamp_modificacion_archivo_moodle) # Método refactorizado
-                    contador_archivos_procesados_correctamente += 1
-
-                # Captura de excepciones específicas del flujo de procesamiento de un archivo
-                except ErrorDependenciaFaltante as e_error_dependencia_archivo:
-                    registrador.error(f"Dependencia faltante para procesar el archivo '{identificador_unico_del_archivo}' (curso {id_curso_para_procesar}): {e_error_dependencia_archivo}. Se omite este archivo.")
-                except ErrorProcesamientoArchivo as e_error_procesamiento_archivo:
-                    registrador.error(f"Error específico de procesamiento para el archivo '{identificador_unico_del_archivo}' (curso {id_curso_para_procesar}): {e_error_procesamiento_archivo}. Se omite este archivo.")
-                except ErrorAPIMoodle as e_error_api_moodle_descarga: # Error al descargar archivo de Moodle
-                     registrador.error(f"Error de API Moodle al descargar el archivo '{identificador_unico_del_archivo}' (curso {id_curso_para_procesar}): {e_error_api_moodle_descarga}. Se omite este archivo.")
-                except (ErrorProveedorInteligencia, ErrorGestorEmbeddings, ErrorBaseDeDatosVectorial) as e_error_nucleo_ia_bd: # Errores de IA o BD
-                    registrador.error(f"Error del núcleo de IA o Base de Datos al procesar el archivo '{identificador_unico_del_archivo}' (curso {id_curso_para_procesar}): {e_error_nucleo_ia_bd}. Se omite este archivo.")
-                except Exception as e_error_general_procesamiento_archivo: # Capturar cualquier otro error inesperado para un archivo
-                    registrador.exception(f"Error general inesperado al procesar el archivo '{identificador_unico_del_archivo}' (curso {id_curso_para_procesar}): {e_error_general_procesamiento_archivo}. Se omite este archivo.")
-                finally:
-                    # Limpiar el archivo local descargado después de procesarlo (o intentarlo), para no ocupar espacio.
-                    if ruta_archivo_descargado_localmente and ruta_archivo_descargado_localmente.exists():
-                        try:
-                            os.remove(ruta_archivo_descargado_localmente)
-                            registrador.debug(f"Archivo local temporal '{ruta_archivo_descargado_localmente}' eliminado tras procesamiento.")
-                        except OSError as e_error_os_remove: # Error al eliminar el archivo temporal
-                            registrador.error(f"No se pudo eliminar el archivo local temporal '{ruta_archivo_descargado_localmente}': {e_error_os_remove}")
-                    # Considerar si se debe mantener el archivo Markdown generado en 'directorio_markdown_especifico_curso' o eliminarlo también.
-                    # Por ahora, se mantiene.
-            else: # El archivo no es nuevo ni ha sido modificado
-                registrador.info(f"El archivo '{identificador_unico_del_archivo}' del curso {id_curso_para_procesar} no ha sido modificado desde el último procesamiento registrado. Se omite en esta ejecución.")
-                contador_archivos_omitidos_por_no_cambios +=1
+                # Marcar el archivo como procesado en la tabla de seguimiento, independientemente de si se extrajo texto
+                # (para no reintentar procesar archivos vacíos o no soportados repetidamente).
+                datos_seguimiento_archivo = {
+                    "id_curso": id_curso_para_procesar,
+                    "identificador_archivo": identificador_unico_del_archivo,
+                    "tiempo_modificacion_moodle": timestamp_modificacion_archivo_moodle,
+                    "huella_sha256": archivo_descargado_moodle.huella_sha256,
+                    "tamano_bytes": archivo_descargado_moodle.tamano_bytes,
+                    "hash_contenido_moodle": archivo_moodle_a_procesar.hash_contenido_moodle,
+                }
+                if generacion_iniciada: # Sus fragmentos aún no son visibles: se registra al publicar la generación
+                    seguimientos_pendientes_de_publicacion.append(datos_seguimiento_archivo)
+                else:
+                    envoltorio_bd.marcar_archivo_como_procesado_en_seguimiento(**datos_seguimiento_archivo) # Método refactorizado
+                contador_archivos_procesados_correctamente += 1
+                identificadores_archivos_reprocesados.add(identificador_unico_del_archivo)
+
+            # Captura de excepciones específicas del flujo de procesamiento de un archivo
+            except ErrorDependenciaFaltante as e_error_dependencia_archivo:
+                registrador.error(f"Dependencia faltante para procesar el archivo '{identificador_unico_del_archivo}' (curso {id_curso_para_procesar}): {e_error_dependencia_archivo}. Se omite este archivo.")
+            except ErrorExtraccionAislada as e_error_extraccion_aislada: # Abortado por tiempo, memoria o muerte del trabajador
+                fallos_extraccion_aislada_por_motivo[e_error_extraccion_aislada.motivo_fallo] = fallos_extraccion_aislada_por_motivo.get(e_error_extraccion_aislada.motivo_fallo, 0) + 1
+                registrador.error(f"Extracción aislada abortada para el archivo '{identificador_unico_del_archivo}' (curso {id_curso_para_procesar}), motivo '{e_error_extraccion_aislada.motivo_fallo}': {e_error_extraccion_aislada}. Se omite este archivo.")
+            except ErrorProcesamientoArchivo as e_error_procesamiento_archivo:
+                registrador.error(f"Error específico de procesamiento para el archivo '{identificador_unico_del_archivo}' (curso {id_curso_para_procesar}): {e_error_procesamiento_archivo}. Se omite este archivo.")
+            except ErrorEspacioDescargasInsuficiente as e_error_espacio_descargas:
+                registrador.error(f"Sin espacio en disco para descargar el archivo '{identificador_unico_del_archivo}' (curso {id_curso_para_procesar}): {e_error_espacio_descargas}. Se omite este archivo.")
+            except ErrorAPIMoodle as e_error_api_moodle_descarga: # Error al descargar archivo de Moodle
+                 registrador.error(f"Error de API Moodle al descargar el archivo '{identificador_unico_del_archivo}' (curso {id_curso_para_procesar}): {e_error_api_moodle_descarga}. Se omite este archivo.")
+            except (ErrorProveedorInteligencia, ErrorGestorEmbeddings, ErrorBaseDeDatosVectorial) as e_error_nucleo_ia_bd: # Errores de IA o BD
+                registrador.error(f"Error del núcleo de IA o Base de Datos al procesar el archivo '{identificador_unico_del_archivo}' (curso {id_curso_para_procesar}): {e_error_nucleo_ia_bd}. Se omite este archivo.")
+            except Exception as e_error_general_procesamiento_archivo: # Capturar cualquier otro error inesperado para un archivo
+                registrador.exception(f"Error general inesperado al procesar el archivo '{identificador_unico_del_archivo}' (curso {id_curso_para_procesar}): {e_error_general_procesamiento_archivo}. Se omite este archivo.")
+            finally:
+                # Limpiar el archivo local descargado después de procesarlo (o intentarlo), para no ocupar espacio.
+                if ruta_archivo_descargado_localmente and ruta_archivo_descargado_localmente.exists():
+                    try:
+                        os.remove(ruta_archivo_descargado_localmente)
+                        registrador.debug(f"Archivo local temporal '{ruta_archivo_descargado_localmente}' eliminado tras procesamiento.")
+                    except OSError as e_error_os_remove: # Error al eliminar el archivo temporal
+                        registrador.error(f"No se pudo eliminar el archivo local temporal '{ruta_archivo_descargado_localmente}': {e_error_os_remove}")
+                # Considerar si se debe mantener el archivo Markdown generado en 'directorio_markdown_especifico_curso' o eliminarlo también.
+                # Por ahora, se mantiene.
+
+        if generacion_iniciada:
+            ids_documentos_sin_reprocesar = [
+                archivo_moodle.nombre_original_archivo for archivo_moodle in lista_archivos_en_carpeta_moodle
+                if archivo_moodle.nombre_original_archivo not in identificadores_archivos_reprocesados
+            ]
+            generacion_publicada = False
+            try:
+                envoltorio_bd.copiar_documentos_a_generacion(nombre_curso_para_tabla_bd, ids_documentos_sin_reprocesar)
+                generacion_publicada = envoltorio_bd.publicar_generacion_tabla_curso(nombre_curso_para_tabla_bd)
+            except ErrorBaseDeDatosVectorial as e_error_publicar_generacion:
+                registrador.error(f"No se pudo publicar la nueva generación de la tabla del curso {id_curso_para_procesar}: {e_error_publicar_generacion}. Se conserva la tabla publicada.")
+                envoltorio_bd.descartar_generacion_tabla_curso(nombre_curso_para_tabla_bd)
+            generacion_iniciada = False
+            if generacion_publicada:
+                for datos_seguimiento_archivo in seguimientos_pendientes_de_publicacion:
+                    try:
+                        envoltorio_bd.marcar_archivo_como_procesado_en_seguimiento(**datos_seguimiento_archivo)
+                    except ErrorBaseDeDatosVectorial as e_error_seguimiento_publicado:
+                        registrador.error(f"No se pudo registrar el seguimiento del archivo '{datos_seguimiento_archivo['identificador_archivo']}' (curso {id_curso_para_procesar}) tras publicar la generación: {e_error_seguimiento_publicado}")
+            elif seguimientos_pendientes_de_publicacion:
+                registrador.warning(f"La nueva generación del curso {id_curso_para_procesar} no se publicó: el seguimiento de {len(seguimientos_pendientes_de_publicacion)} archivos reprocesados no se actualiza y se volverán a procesar.")
 
         registrador.info(
-            f"Procesamiento de archivos (tarea asíncrona/interna) para el curso ID: {id_curso_para_procesar} finalizado. "
+            f"Procesamiento de archivos (tarea en segundo plano) para el curso ID: {id_curso_para_procesar} finalizado. "
             f"Archivos procesados/actualizados con éxito en esta ejecución: {contador_archivos_procesados_correctamente}. "
-            f"Archivos omitidos por no presentar cambios: {contador_archivos_omitidos_por_no_cambios}."
+            f"Archivos omitidos por no presentar cambios: {contador_archivos_omitidos_por_no_cambios}. "
+            f"Trabajo evitado por contenido idéntico: {contador_descargas_evitadas_por_hash_moodle} descargas "
+            f"({bytes_descargas_evitadas / (1024 * 1024):.1f} MB, por 'contenthash' de Moodle) y "
+            f"{contador_procesamientos_evitados_por_huella} procesamientos (por SHA-256 tras descargar). "
+            f"Archivos tomados del almacén local en lugar de Moodle: {descargador_anticipado.archivos_obtenidos_del_almacen}. "
+            f"Archivos convertidos a Markdown sin LLM: {contador_archivos_sin_formateo_llm}. "
+            f"Archivos ingeridos en flujo: {contador_archivos_ingeridos_en_flujo}. "
+            f"Extracciones abortadas por el aislamiento: {fallos_extraccion_aislada_por_motivo or 'ninguna'}."
         )
+        if descargador_anticipado.almacen_blobs is not None:
+            estadisticas_almacen_descargas = descargador_anticipado.almacen_blobs.obtener_estadisticas()
+            registrador.info(
+                f"Almacén de descargas: {estadisticas_almacen_descargas['aciertos']} archivos recuperados, "
+                f"{estadisticas_almacen_descargas['fallos']} no encontrados y {estadisticas_almacen_descargas['archivos_deduplicados']} descargas ya presentes (acumulado); "
+                f"tamaño {estadisticas_almacen_descargas['tamano_bytes'] / (1024 * 1024):.1f} MB."
+            )
+        estadisticas_resiliencia_http = obtener_ejecutor_resiliente_http().obtener_estadisticas()
+        if estadisticas_resiliencia_http:
+            registrador.info(f"Resiliencia HTTP (acumulado por host): {estadisticas_resiliencia_http}.")
+        if gestor_archivos.ejecutor_extraccion_aislada is not None:
+            estadisticas_extraccion_aislada = gestor_archivos.ejecutor_extraccion_aislada.obtener_estadisticas()
+            registrador.info(
+                f"Extracción aislada: {estadisticas_extraccion_aislada['archivos_extraidos']} extracciones y "
+                f"{estadisticas_extraccion_aislada['trabajadores_reciclados']} trabajadores reciclados acumulados; "
+                f"fallos por motivo: {estadisticas_extraccion_aislada['fallos_por_motivo']}."
+            )
+        if gestor_archivos.cache_texto_extraido is not None:
+            estadisticas_cache_texto = gestor_archivos.cache_texto_extraido.obtener_estadisticas()
+            registrador.info(
+                f"Caché de texto extraído: {estadisticas_cache_texto['aciertos']} aciertos, "
+                f"{estadisticas_cache_texto['fallos']} fallos acumulados; tamaño {estadisticas_cache_texto['tamano_bytes'] / (1024 * 1024):.1f} MB."
+            )
+        if proveedor_ia.cache_conversiones_markdown is not None:
+            estadisticas_cache_markdown = proveedor_ia.cache_conversiones_markdown.obtener_estadisticas()
+            registrador.info(
+                f"Caché de conversiones Markdown: {estadisticas_cache_markdown['aciertos']} aciertos, "
+                f"{estadisticas_cache_markdown['fallos']} fallos acumulados; tamaño {estadisticas_cache_markdown['tamano_bytes'] / (1024 * 1024):.1f} MB."
+            )
 
     except Exception as e_error_fatal_tarea_curso: # Error muy general que impide iniciar o continuar el procesamiento del curso
         # Este es un error a nivel de la tarea completa para el curso, no de un archivo individual.
         registrador.error(f"Error fatal durante la ejecución de la tarea de procesamiento de archivos para el curso {id_curso_para_procesar}: {e_error_fatal_tarea_curso}")
         registrador.error(traceback.format_exc()) # Loguear el traceback completo para depuración de errores fatales.
+        if generacion_iniciada: # La tabla publicada no se ha tocado: basta con descartar la generación a medio construir
+            try:
+                envoltorio_bd.descartar_generacion_tabla_curso(nombre_curso_para_tabla_bd)
+            except ErrorBaseDeDatosVectorial as e_error_descarte_generacion:
+                registrador.error(f"No se pudo descartar la nueva generación de la tabla del curso {id_curso_para_procesar}: {e_error_descarte_generacion}")
         # Aquí se podría notificar a un sistema de monitoreo o reintentar la tarea si la infraestructura lo permite.
 
 
+def _ejecutar_tarea_revectorizacion_curso(
+    id_curso: int,
+    cliente_moodle: ClienteMoodle,
+    envoltorio_bd: EnvoltorioPgVector,
+    gestor_embeddings: GestorEmbeddings,
+) -> Optional[Dict[str, Any]]:
+    """
+    Vuelve a generar los embeddings de todos los fragmentos de un curso (p. ej. tras cambiar el modelo de
+    embedding) sin descargar, extraer, formatear ni fragmentar de nuevo: los textos se leen de la tabla del
+    curso por páginas, se vectorizan en lotes grandes y se escriben en una nueva generación de la tabla que,
+    completa e indexada, sustituye a la publicada en una sola transacción. Si algún fragmento no obtiene
+    embedding, la generación se descarta y la tabla publicada queda intacta.
+
+    Se usa siempre el modelo de embedding configurado, el mismo con el que las rutas de chat y búsqueda
+    vectorizan las consultas: una tabla vectorizada con otro modelo devolvería vecinos sin sentido.
+
+    Los fragmentos que se ingieran en el curso mientras dura la revectorización no se copian a la nueva
+    generación: conviene lanzarla cuando no haya procesamientos de archivos en curso para ese curso.
+
+    Returns:
+        Estadísticas de la revectorización, o None si falló o el curso no tenía fragmentos.
+    """
+    config_procesamiento = configuracion_global.procesamiento
+    nombre_curso_para_tabla_bd = obtener_indice_nombres_cursos().obtener_nombre_curso_para_tabla(id_curso, cliente_moodle)
+    generacion_iniciada = False
+    try:
+        total_fragmentos_curso = envoltorio_bd.contar_fragmentos_curso(nombre_curso_para_tabla_bd)
+        if not total_fragmentos_curso:
+            registrador.warning(f"El curso {id_curso} no tiene fragmentos en su tabla vectorial; no hay nada que revectorizar.")
+            return None
+        registrador.info(f"Inicio de la revectorización del curso {id_curso}: {total_fragmentos_curso} fragmentos, con el modelo de embedding configurado.")
+        envoltorio_bd.iniciar_generacion_tabla_curso(nombre_curso_para_tabla_bd)
+        generacion_iniciada = True
+
+        momento_inicio = time.monotonic()
+        segundos_embeddings = 0.0
+        fragmentos_revectorizados = 0
+        ultimo_id_fragmento: Optional[str] = None
+        while True:
+            filas_pagina = envoltorio_bd.leer_pagina_fragmentos_curso(nombre_curso_para_tabla_bd, ultimo_id_fragmento, config_procesamiento.tamano_pagina_revectorizacion)
+            if not filas_pagina:
+                break
+            ultimo_id_fragmento = filas_pagina[-1]["id_fragmento"]
+
+            momento_inicio_lote = time.monotonic()
+            embeddings_pagina = gestor_embeddings.generar_embeddings_de_fragmentos_almacenados(
+                filas_pagina, tamano_lote=config_procesamiento.tamano_lote_embeddings_revectorizacion
+            )
+            segundos_embeddings += time.monotonic() - momento_inicio_lote
+            fragmentos_sin_embedding = [fila["id_fragmento"] for fila, embedding in zip(filas_pagina, embeddings_pagina) if not embedding]
+            if fragmentos_sin_embedding:
+                raise ErrorGestorEmbeddings(
+                    f"{len(fragmentos_sin_embedding)} fragmentos sin embedding (p. ej. '{fragmentos_sin_embedding[0]}'); "
+                    f"se conserva la tabla publicada del curso."
+                )
+
+            # La generación se crea con el primer lote, con la dimensión de vector del nuevo modelo.
+            fragmentos_revectorizados += envoltorio_bd.insertar_fragmentos_revectorizados(nombre_curso_para_tabla_bd, filas_pagina, embeddings_pagina)
+            registrador.info(
+                f"Revectorización del curso {id_curso}: {fragmentos_revectorizados}/{total_fragmentos_curso} fragmentos "
+                f"({fragmentos_revectorizados / max(time.monotonic() - momento_inicio, 1e-9):.1f} fragmentos/s)."
+            )
+
+        envoltorio_bd.publicar_generacion_tabla_curso(nombre_curso_para_tabla_bd)
+        generacion_iniciada = False
+        segundos_totales = time.monotonic() - momento_inicio
+        estadisticas_revectorizacion = {
+            "id_curso": id_curso,
+            "fragmentos_revectorizados": fragmentos_revectorizados,
+            "segundos_totales": round(segundos_totales, 2),
+            "segundos_embeddings": round(segundos_embeddings, 2),
+            "fragmentos_por_segundo": round(fragmentos_revectorizados / max(segundos_totales, 1e-9), 1),
+        }
+        registrador.info(f"Revectorización del curso {id_curso} completada: {estadisticas_revectorizacion}.")
+        return estadisticas_revectorizacion
+
+    except (ErrorGestorEmbeddings, ErrorBaseDeDatosVectorial) as e_error_revectorizacion:
+        registrador.error(f"Revectorización del curso {id_curso} abortada: {e_error_revectorizacion}")
+    except Exception as e_error_inesperado_revectorizacion:
+        registrador.exception(f"Error inesperado en la revectorización del curso {id_curso}: {e_error_inesperado_revectorizacion}")
+    if generacion_iniciada:
+        try:
+            envoltorio_bd.descartar_generacion_tabla_curso(nombre_curso_para_tabla_bd)
+        except ErrorBaseDeDatosVectorial as e_error_descarte_generacion:
+            registrador.error(f"No se pudo descartar la nueva generación de la tabla del curso {id_curso}: {e_error_descarte_generacion}")
+    return None
+
+
 @enrutador_procesamiento_interno.post("/curso/procesar-archivos-en-segundo-plano", # Ruta en español
                                       summary="Disparador para Procesamiento Asíncrono de Archivos de un Curso (Llamado por Celery)",
                                       description="Este endpoint está diseñado para ser llamado por una tarea Celery. Recibe los IDs necesarios e invoca la lógica de procesamiento de archivos del curso en una tarea de fondo de FastAPI para liberar rápidamente al worker de Celery.")
@@ -315,7 +686,8 @@ async def disparar_procesamiento_archivos_curso_en_segundo_plano( # Nombre de fu
         envoltorio_bd=envoltorio_bd, # Parámetro renombrado
         proveedor_ia=proveedor_ia,
         gestor_embeddings=gestor_embeddings,
-        gestor_archivos=gestor_archivos # Parámetro renombrado
+        gestor_archivos=gestor_archivos, # Parámetro renombrado
+        forzar_reprocesamiento=solicitud_desde_celery.forzar_reprocesamiento
     )
 
     mensaje_respuesta_api = (
@@ -326,4 +698,28 @@ async def disparar_procesamiento_archivos_curso_en_segundo_plano( # Nombre de fu
     # Devolver una respuesta inmediata para liberar al worker de Celery.
     return {"mensaje": mensaje_respuesta_api, "id_curso_solicitado": solicitud_desde_celery.id_curso}
 
+
+@enrutador_procesamiento_interno.post("/curso/revectorizar-fragmentos-en-segundo-plano",
+                                      summary="Revectorización de los Fragmentos de un Curso (Cambio de Modelo de Embedding)",
+                                      description="Vuelve a generar en segundo plano los embeddings de los fragmentos ya almacenados de un curso, sin reprocesar sus archivos, y sustituye atómicamente su tabla vectorial.")
+async def disparar_revectorizacion_curso_en_segundo_plano(
+    solicitud_revectorizacion: modelos_api.SolicitudRevectorizacionCurso,
+    tareas_en_segundo_plano_fastapi: BackgroundTasks,
+    cliente_moodle: ClienteMoodle = Depends(obtener_dependencia_cliente_moodle_pi),
+    envoltorio_bd: EnvoltorioPgVector = Depends(obtener_dependencia_envoltorio_pgvector_pi),
+    gestor_embeddings: GestorEmbeddings = Depends(obtener_dependencia_gestor_embeddings_pi),
+):
+    """Añade la revectorización del curso a las tareas de fondo de FastAPI y responde de inmediato."""
+    registrador.info(f"Recibida solicitud de revectorización del curso ID: {solicitud_revectorizacion.id_curso}.")
+    tareas_en_segundo_plano_fastapi.add_task(
+        _ejecutar_tarea_revectorizacion_curso,
+        id_curso=solicitud_revectorizacion.id_curso,
+        cliente_moodle=cliente_moodle,
+        envoltorio_bd=envoltorio_bd,
+        gestor_embeddings=gestor_embeddings,
+    )
+    mensaje_respuesta_api = f"La revectorización de los fragmentos del curso {solicitud_revectorizacion.id_curso} ha sido añadida a la cola de tareas de fondo de FastAPI."
+    registrador.info(mensaje_respuesta_api)
+    return {"mensaje": mensaje_respuesta_api, "id_curso_solicitado": solicitud_revectorizacion.id_curso}
+
 [end of entrenai_refactor/api/rutas/ruta_procesamiento_interno.py]
@@ -23,7 +23,7 @@ TIMEOUT_PETICION_API_SEGUNDOS = 30 # Segundos para timeout de conexión y lectur
 # Nombre de la tarea refactorizado y más descriptivo.
 # Es buena práctica nombrar explícitamente las tareas para evitar problemas si se mueve el archivo.
 @shared_task(name="entrenai_refactor.celery.tareas.delegar_procesamiento_curso_a_api")
-def delegar_procesamiento_curso_a_api(id_curso: int, id_usuario_solicitante: Optional[int] = None):
+def delegar_procesamiento_curso_a_api(id_curso: int, id_usuario_solicitante: Optional[int] = None, forzar_reprocesamiento: bool = False):
     """
     Tarea Celery que delega el procesamiento de archivos de un curso a la API principal de FastAPI.
     La API principal (específicamente el endpoint de procesamiento interno) es la que realmente
@@ -34,6 +34,7 @@ def delegar_procesamiento_curso_a_api(id_curso: int, id_usuario_solicitante: Opt
         id_curso: El ID del curso de Moodle cuyos archivos se van a procesar.
         id_usuario_solicitante: Opcional. El ID del usuario de Moodle que inició la solicitud de procesamiento.
                                 Si no se provee, se intentará usar el ID del profesor por defecto de la configuración.
+        forzar_reprocesamiento: Si es True, se reprocesan también los archivos sin cambios (reindexación del curso).
     Returns:
         Un diccionario con el estado de la delegación de la tarea y un mensaje.
     """
@@ -59,7 +60,8 @@ def delegar_procesamiento_curso_a_api(id_curso: int, id_usuario_solicitante: Opt
     # esperado por el endpoint en 'ruta_procesamiento_interno.py' (SolicitudProcesamientoArchivosCurso).
     cuerpo_peticion_json = {
         "id_curso": id_curso,
-        "id_usuario_solicitante": id_usuario_solicitante
+        "id_usuario_solicitante": id_usuario_solicitante,
+        "forzar_reprocesamiento": forzar_reprocesamiento
     }
 
     registrador.info(f"Enviando solicitud POST a la API interna: {url_completa_endpoint_api} con cuerpo: {cuerpo_peticion_json}")
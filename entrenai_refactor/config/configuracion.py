@@ -1,6 +1,6 @@
 import os
 from functools import lru_cache
-from typing import Optional, Union # Union para campos que pueden ser None por default_factory
+from typing import Dict, Optional, Union # Union para campos que pueden ser None por default_factory
 
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field, HttpUrl
@@ -54,6 +54,34 @@ def _aux_obtener_entorno_como_booleano(clave_env: str, valor_por_defecto: bool)
     valor_str = os.getenv(clave_env, str(valor_por_defecto)).lower()
     return valor_str in ("true", "1", "yes", "on")
 
+def _aux_obtener_entorno_como_mapa_por_curso(clave_env: str) -> Dict[int, str]:
+    """
+    Obtiene una variable de entorno con valores por curso, en formato 'id_curso:valor,id_curso:valor'
+    (ej. '12:estructural,40:ventana_fija'). Las entradas mal formadas se ignoran.
+    """
+    mapa_por_curso: Dict[int, str] = {}
+    for entrada_mapa in os.getenv(clave_env, "").split(","):
+        id_curso_str, separador, valor_curso = entrada_mapa.partition(":")
+        if separador and id_curso_str.strip().isdigit() and valor_curso.strip():
+            mapa_por_curso[int(id_curso_str.strip())] = valor_curso.strip().lower()
+        elif entrada_mapa.strip():
+            registrador_config.warning(f"Entrada ignorada en la variable de entorno '{clave_env}': '{entrada_mapa.strip()}' (formato esperado 'id_curso:valor').")
+    return mapa_por_curso
+
+def _aux_obtener_entorno_como_mapa_de_texto(clave_env: str) -> Dict[str, str]:
+    """
+    Obtiene una variable de entorno con pares 'clave=valor' separados por comas
+    (ej. 'nomic-embed-text=nomic-ai/nomic-embed-text-v1.5'). Las entradas mal formadas se ignoran.
+    """
+    mapa_texto: Dict[str, str] = {}
+    for entrada_mapa in os.getenv(clave_env, "").split(","):
+        clave_mapa, separador, valor_mapa = entrada_mapa.partition("=")
+        if separador and clave_mapa.strip() and valor_mapa.strip():
+            mapa_texto[clave_mapa.strip()] = valor_mapa.strip()
+        elif entrada_mapa.strip():
+            registrador_config.warning(f"Entrada ignorada en la variable de entorno '{clave_env}': '{entrada_mapa.strip()}' (formato esperado 'clave=valor').")
+    return mapa_texto
+
 # --- Modelos Pydantic para Secciones de Configuración Anidadas ---
 
 class _ConfiguracionAnidadaMoodle(BaseModel):
@@ -76,6 +104,34 @@ class _ConfiguracionAnidadaMoodle(BaseModel):
         default_factory=lambda: _aux_obtener_entorno_opcional_como_entero("MOODLE_DEFAULT_TEACHER_ID"),
         description="ID del usuario de Moodle (generalmente un profesor o administrador) que se usará por defecto para ciertas operaciones que requieren un contexto de usuario (ej. listar cursos, tareas asíncronas)."
     )
+    timeout_peticiones_moodle: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("MOODLE_REQUEST_TIMEOUT_SECONDS", 30),
+        description="Tiempo máximo de espera (segundos) de cada petición a los Web Services de Moodle."
+    )
+    timeout_descargas_moodle: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("MOODLE_DOWNLOAD_TIMEOUT_SECONDS", 120),
+        description="Tiempo máximo de espera (segundos) sin recibir datos durante la descarga de un archivo de Moodle."
+    )
+    tamano_bufer_descargas_kb: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("MOODLE_DOWNLOAD_BUFFER_KB", 1024),
+        description="Tamaño (en KB) del búfer con el que se copian al disco los archivos descargados de Moodle (mínimo 64)."
+    )
+    http2_habilitado: bool = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_booleano("MOODLE_HTTP2_ENABLED", True),
+        description="Usar HTTP/2 en el cliente asíncrono de Moodle cuando el servidor lo admite (requiere el paquete 'h2'; si no, HTTP/1.1)."
+    )
+    maximo_peticiones_concurrentes_por_host: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("MOODLE_MAX_CONCURRENT_REQUESTS_PER_HOST", 8),
+        description="Máximo de peticiones simultáneas del cliente asíncrono a un mismo servidor Moodle (también acota el pool de conexiones)."
+    )
+    ttl_cache_contenidos_curso_segundos: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("MOODLE_COURSE_CONTENTS_CACHE_TTL_SECONDS", 0),
+        description="Segundos durante los que los contenidos de un curso (core_course_get_contents) se reutilizan entre peticiones. 0 desactiva la caché compartida (dentro de una misma operación se obtienen siempre una sola vez)."
+    )
+    ttl_indice_nombres_cursos_segundos: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("MOODLE_COURSE_NAME_INDEX_TTL_SECONDS", 3600),
+        description="Antigüedad a partir de la cual una entrada del índice persistente ID de curso -> nombre se refresca en segundo plano (mientras tanto se sigue usando)."
+    )
 
 class _ConfiguracionAnidadaPostgres(BaseModel):
     """Configuraciones para la conexión a la base de datos PostgreSQL con la extensión pgvector."""
@@ -98,6 +154,10 @@ class _ConfiguracionAnidadaPostgres(BaseModel):
         default_factory=lambda: _aux_obtener_entorno_como_entero("DEFAULT_VECTOR_SIZE", 768), # Ejemplo de tamaño común, ajustar
         description="Dimensión (tamaño) por defecto de los vectores de embedding que se almacenarán. Debe coincidir con el modelo de embedding usado."
     )
+    segundos_gracia_generaciones_retiradas: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("VECTOR_TABLE_RETIRED_GRACE_SECONDS", 900),
+        description="Segundos que se conserva la tabla vectorial anterior de un curso tras publicar una nueva generación (reprocesamiento forzado o revectorización) antes de eliminarla."
+    )
 
 class _ConfiguracionAnidadaOllama(BaseModel):
     """Configuraciones para interactuar con un servidor Ollama como proveedor de IA."""
@@ -134,6 +194,173 @@ class _ConfiguracionAnidadaCelery(BaseModel):
     url_broker_celery: str = Field(default_factory=lambda: os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0"), description="URL del broker de mensajes para Celery (ej. Redis o RabbitMQ).")
     backend_resultados_celery: str = Field(default_factory=lambda: os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/0"), description="URL del backend donde Celery almacena los resultados de las tareas.")
 
+class _ConfiguracionAnidadaResilienciaHttp(BaseModel):
+    """Reintentos y cortacircuitos compartidos por los clientes HTTP de servicios externos (Moodle, N8N)."""
+    intentos_maximos: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("HTTP_RETRY_MAX_ATTEMPTS", 3),
+        description="Número máximo de intentos (incluido el primero) de una petición idempotente ante fallos transitorios (timeouts, errores de conexión, 429/502/503/504). 1 desactiva los reintentos."
+    )
+    espera_base_reintento_ms: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("HTTP_RETRY_BASE_DELAY_MS", 500),
+        description="Espera base (en milisegundos) del reintento exponencial; cada reintento espera un tiempo aleatorio entre 0 y base * 2^(n-1)."
+    )
+    espera_maxima_reintento_ms: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("HTTP_RETRY_MAX_DELAY_MS", 10000),
+        description="Espera máxima (en milisegundos) entre reintentos."
+    )
+    umbral_fallos_cortacircuitos: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("HTTP_CIRCUIT_BREAKER_FAILURE_THRESHOLD", 5),
+        description="Fallos transitorios consecutivos contra un mismo host que abren su cortacircuitos (las peticiones fallan al instante)."
+    )
+    segundos_apertura_cortacircuitos: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("HTTP_CIRCUIT_BREAKER_OPEN_SECONDS", 30),
+        description="Segundos que el cortacircuitos de un host permanece abierto antes de dejar pasar una petición de prueba."
+    )
+
+class _ConfiguracionAnidadaProcesamiento(BaseModel):
+    """Ajustes de rendimiento del pipeline de ingesta (extracción, formateo a Markdown, fragmentación)."""
+    formateo_markdown_por_secciones_habilitado: bool = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_booleano("MARKDOWN_SECTIONED_FORMATTING_ENABLED", True),
+        description="Si está habilitado, los textos largos se dividen en secciones que se formatean a Markdown en paralelo, en lugar de enviar el documento completo en una única llamada al LLM."
+    )
+    tamano_maximo_seccion_formateo_markdown: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("MARKDOWN_SECTION_MAX_CHARS", 6000),
+        description="Tamaño máximo (en caracteres) de cada sección enviada al LLM para formateo a Markdown. Textos más cortos se envían en una sola llamada."
+    )
+    maximo_secciones_formateo_concurrentes: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("MARKDOWN_SECTION_MAX_CONCURRENCY", 3),
+        description="Número máximo de secciones que se formatean a Markdown de forma concurrente (limita la carga sobre el servidor del modelo)."
+    )
+    cache_conversiones_markdown_habilitada: bool = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_booleano("MARKDOWN_CACHE_ENABLED", True),
+        description="Si está habilitado, las conversiones a Markdown hechas por el LLM se guardan en una caché en disco direccionada por el hash del texto, y se reutilizan si el mismo contenido se vuelve a procesar."
+    )
+    tamano_maximo_cache_markdown_mb: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("MARKDOWN_CACHE_MAX_MB", 512),
+        description="Tamaño máximo (en MB) de la caché de conversiones Markdown. Al superarlo se desalojan las entradas usadas menos recientemente."
+    )
+    cache_texto_extraido_habilitada: bool = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_booleano("TEXT_EXTRACTION_CACHE_ENABLED", True),
+        description="Si está habilitado, el texto extraído de cada archivo se guarda en una caché en disco direccionada por el hash de sus bytes, y se reutiliza para archivos idénticos."
+    )
+    tamano_maximo_cache_texto_extraido_mb: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("TEXT_EXTRACTION_CACHE_MAX_MB", 1024),
+        description="Tamaño máximo (en MB) de la caché de texto extraído. Al superarlo se desalojan las entradas usadas menos recientemente."
+    )
+    pdf_minimo_caracteres_capa_texto: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("PDF_TEXT_LAYER_MIN_CHARS", 50),
+        description="Mínimo de caracteres visibles que debe tener la capa de texto embebida de una página PDF para usarla directamente; las páginas por debajo se procesan con OCR."
+    )
+    pdf_resolucion_dpi_rasterizado: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("PDF_RASTER_DPI", 200),
+        description="Resolución (DPI) con la que se rasterizan las páginas PDF para OCR. Valores más altos mejoran el OCR de letra pequeña a costa de memoria y tiempo."
+    )
+    pdf_paginas_por_ventana_rasterizado: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("PDF_RASTER_WINDOW_PAGES", 8),
+        description="Número máximo de páginas PDF rasterizadas a la vez para OCR. Acota la memoria usada con documentos escaneados largos."
+    )
+    pdf_trabajadores_ocr: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("PDF_OCR_WORKERS", 1),
+        description="Número de procesos para aplicar OCR en paralelo a las páginas de un PDF. 1 = secuencial; 0 = tantos como núcleos disponibles."
+    )
+    pdf_limite_segundos_ocr_documento: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("PDF_OCR_DEADLINE_SECONDS", 900),
+        description="Plazo máximo (en segundos) para el OCR de un documento PDF. Al agotarse, se matan los subprocesos de rasterizado y Tesseract en curso y las páginas pendientes se omiten."
+    )
+    ingesta_en_flujo_tamano_minimo_mb: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("STREAMING_INGESTION_MIN_MB", 20),
+        description="Tamaño (en MB) a partir del cual un archivo se ingiere en flujo: se extrae por bloques, se fragmenta y se vectoriza por lotes sin cargar el documento completo en memoria. 0 desactiva la ingesta en flujo."
+    )
+    ingesta_en_flujo_fragmentos_por_lote: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("STREAMING_INGESTION_BATCH_FRAGMENTS", 64),
+        description="Número de fragmentos que se vectorizan e insertan en la base de datos en cada lote durante la ingesta en flujo."
+    )
+    profundidad_precarga_descargas: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("DOWNLOAD_PREFETCH_DEPTH", 2),
+        description="Número de archivos de Moodle que se descargan por adelantado mientras se procesa el actual. 0 = descargas secuenciales."
+    )
+    trabajadores_descarga: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("DOWNLOAD_WORKERS", 2),
+        description="Número de hilos que descargan archivos de Moodle en paralelo durante la precarga."
+    )
+    espacio_libre_minimo_descargas_mb: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("DOWNLOAD_MIN_FREE_DISK_MB", 512),
+        description="Espacio libre mínimo (en MB) que debe quedar en el directorio de descargas; no se descargan por adelantado archivos que lo rebasarían. 0 desactiva la comprobación."
+    )
+    almacen_descargas_habilitado: bool = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_booleano("DOWNLOAD_BLOB_STORE_ENABLED", False),
+        description="Si está habilitado, cada archivo descargado de Moodle se conserva en un almacén local direccionado por su SHA-256 (enlaces duros para contenidos repetidos entre cursos), del que se toma al reprocesar un curso en lugar de volver a descargarlo."
+    )
+    tamano_maximo_almacen_descargas_mb: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("DOWNLOAD_BLOB_STORE_MAX_MB", 4096),
+        description="Tamaño máximo (en MB) del almacén de archivos descargados. Al superarlo se desalojan los archivos usados menos recientemente."
+    )
+    estrategia_fragmentacion_predeterminada: str = Field(
+        default_factory=lambda: os.getenv("CHUNKING_STRATEGY", "ventana_fija").strip().lower(),
+        description="Estrategia de fragmentación por defecto: 'ventana_fija' (ventanas de tamaño fijo con solapamiento), 'estructural' (encabezados, párrafos y oraciones) o 'semantico' (cortes donde cambia el tema, según la similitud de los embeddings de oraciones consecutivas)."
+    )
+    estrategias_fragmentacion_por_curso: Dict[int, str] = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_mapa_por_curso("CHUNKING_STRATEGY_BY_COURSE"),
+        description="Estrategia de fragmentación para cursos concretos, con prioridad sobre la predeterminada (formato 'id_curso:estrategia,...')."
+    )
+    percentil_corte_fragmentacion_semantica: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("SEMANTIC_CHUNKING_BREAKPOINT_PERCENTILE", 25),
+        description="Percentil de similitud entre oraciones consecutivas por debajo del cual la fragmentación semántica considera un cambio de tema. Valores menores producen menos cortes (fragmentos más largos)."
+    )
+    tamano_lote_embeddings: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("EMBEDDING_BATCH_SIZE", 32),
+        description="Número de textos enviados al proveedor de IA en cada petición de embeddings en lote."
+    )
+    tamano_pagina_revectorizacion: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("REEMBED_PAGE_SIZE", 1000),
+        description="Número de fragmentos que la revectorización de un curso lee de la base de datos, vectoriza e inserta en la nueva generación de la tabla del curso en cada paso."
+    )
+    tamano_lote_embeddings_revectorizacion: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("REEMBED_EMBEDDING_BATCH_SIZE", 128),
+        description="Número de textos por petición de embeddings en lote durante la revectorización (lotes mayores que en la ingesta, pues todos los textos están disponibles de antemano)."
+    )
+    unidad_tamano_fragmento: str = Field(
+        default_factory=lambda: os.getenv("CHUNK_SIZE_UNIT", "caracteres").strip().lower(),
+        description="Unidad en la que se dimensionan los fragmentos: 'caracteres' o 'tokens' (con el tokenizador local del modelo de embedding, hasta CHUNK_MAX_TOKENS)."
+    )
+    fragmento_maximo_tokens: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("CHUNK_MAX_TOKENS", 512),
+        description="Número máximo de tokens por fragmento cuando la unidad es 'tokens'. Se limita al máximo de entrada del modelo de embedding."
+    )
+    tokenizadores_embedding_por_modelo: Dict[str, str] = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_mapa_de_texto("EMBEDDING_TOKENIZER_BY_MODEL"),
+        description="Tokenizador local (id del Hub de Hugging Face o ruta a 'tokenizer.json') por modelo de embedding, con prioridad sobre los conocidos (formato 'modelo=tokenizador,...')."
+    )
+    segundos_limite_descarga_tokenizador: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("EMBEDDING_TOKENIZER_DOWNLOAD_TIMEOUT_SECONDS", 20),
+        description="Tiempo máximo (en segundos) de descarga de un tokenizador del Hub de Hugging Face al arrancar. Con 0 no se descarga (sólo rutas locales). Si no se puede cargar, los fragmentos se dimensionan en caracteres."
+    )
+    extraccion_aislada_habilitada: bool = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_booleano("EXTRACTION_ISOLATION_ENABLED", True),
+        description="Si está habilitado, la extracción de texto de los archivos se ejecuta en procesos trabajadores aislados, con límites de tiempo y memoria, en lugar de en el proceso de la API."
+    )
+    extraccion_aislada_trabajadores: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("EXTRACTION_WORKERS", 2),
+        description="Número máximo de procesos trabajadores de extracción por instancia de la API."
+    )
+    extraccion_aislada_limite_segundos_por_archivo: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("EXTRACTION_TIMEOUT_SECONDS", 1200),
+        description="Tiempo máximo (en segundos) de extracción de un archivo en un trabajador aislado. Al superarse, el trabajador se termina y el archivo se omite."
+    )
+    extraccion_aislada_limite_memoria_mb: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("EXTRACTION_MAX_RSS_MB", 2048),
+        description="Memoria residente máxima (en MB) de un trabajador de extracción y sus procesos hijos. Al superarse, el trabajador se termina y el archivo se omite. 0 desactiva el límite."
+    )
+    extraccion_aislada_archivos_por_trabajador: int = Field(
+        default_factory=lambda: _aux_obtener_entorno_como_entero("EXTRACTION_WORKER_MAX_FILES", 25),
+        description="Número de archivos que procesa un trabajador de extracción antes de ser reemplazado por uno nuevo (evita acumular fugas de memoria)."
+    )
+
+    def obtener_estrategia_fragmentacion_para_curso(self, id_curso: int) -> str:
+        """Devuelve la estrategia de fragmentación configurada para el curso (o la predeterminada)."""
+        return self.estrategias_fragmentacion_por_curso.get(id_curso, self.estrategia_fragmentacion_predeterminada)
+
+
 # --- Clase Principal de Configuración de la Aplicación ---
 
 class ConfiguracionPrincipal(BaseModel):
@@ -177,6 +404,8 @@ class ConfiguracionPrincipal(BaseModel):
     gemini: _ConfiguracionAnidadaGemini = Field(default_factory=_ConfiguracionAnidadaGemini)
     n8n: _ConfiguracionAnidadaN8N = Field(default_factory=_ConfiguracionAnidadaN8N)
     celery: _ConfiguracionAnidadaCelery = Field(default_factory=_ConfiguracionAnidadaCelery)
+    procesamiento: _ConfiguracionAnidadaProcesamiento = Field(default_factory=_ConfiguracionAnidadaProcesamiento)
+    resiliencia_http: _ConfiguracionAnidadaResilienciaHttp = Field(default_factory=_ConfiguracionAnidadaResilienciaHttp)
 
 
 # --- Función Singleton para Obtener la Configuración Global ---
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+# Paquete: entrenai_refactor.herramientas
+# Descripción:
+# Scripts auxiliares de línea de comandos (mediciones de rendimiento, comparativas, mantenimiento).
+# No forman parte de la API ni de los workers; se ejecutan manualmente con
+# 'python -m entrenai_refactor.herramientas.<nombre_script>'.
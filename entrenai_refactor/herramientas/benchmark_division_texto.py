@@ -0,0 +1,121 @@
+"""
+Micro-benchmark de la división en ventanas fijas y la contextualización de fragmentos: mide el
+rendimiento (MB/s) y el pico de memoria asignada (tracemalloc) sobre un texto de varios MB.
+
+Uso:
+    python -m entrenai_refactor.herramientas.benchmark_division_texto --megabytes 5 --repeticiones 5
+    python -m entrenai_refactor.herramientas.benchmark_division_texto --archivo documento.md
+
+Se comparan:
+  - 'referencia': el bucle anterior, que formateaba la vista previa de depuración de cada fragmento
+    (aunque DEBUG estuviera desactivado) y reconstruía el prefijo contextual para cada fragmento;
+  - 'tramos': `iterar_tramos_de_fragmentos` (sólo desplazamientos, sin copiar texto);
+  - 'lista': `dividir_texto_en_fragmentos` (fragmentos materializados);
+  - 'contextualizados': `iterar_fragmentos_de_texto` + `iterar_textos_contextualizados`, consumidos de uno en uno.
+"""
+import argparse
+import logging
+import random
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from entrenai_refactor.nucleo.ia.gestor_embeddings import GestorEmbeddings
+
+_registrador_referencia = logging.getLogger("benchmark_division_texto.referencia") # Nivel INFO: los debug se descartan
+
+
+def _generar_texto_sintetico(numero_megabytes: float) -> str:
+    """Genera texto en español con párrafos y saltos de línea, de aproximadamente el tamaño indicado."""
+    generador_aleatorio = random.Random(0)
+    palabras = "el la de que en los las un una por con para su del al se lo como más pero sus le ya o este sí porque esta entre cuando muy sin sobre también me hasta hay donde quien desde todo nos durante todos uno les ni contra otros ese eso ante ellos e esto mí antes algunos qué unos yo otro otras otra él tanto esa estos mucho quienes nada muchos cual poco ella estar estas algunas algo nosotros cinemática energía ecuación función derivada integral vector matriz análisis".split()
+    longitud_objetivo = int(numero_megabytes * 1024 * 1024)
+    partes_texto: List[str] = []
+    longitud_actual = 0
+    while longitud_actual < longitud_objetivo:
+        parrafo = " ".join(generador_aleatorio.choice(palabras) for _ in range(generador_aleatorio.randint(40, 160))) + ".\n\n"
+        partes_texto.append(parrafo)
+        longitud_actual += len(parrafo)
+    return "".join(partes_texto)[:longitud_objetivo]
+
+
+def _referencia_implementacion_anterior(texto_completo: str, tamano: int, solapamiento: int, nombre_archivo: str, titulo: str) -> int:
+    """Reproduce el coste del bucle anterior: vista previa de depuración y prefijo reconstruidos por fragmento."""
+    numero_fragmentos = 0
+    indice_inicio_actual = 0
+    longitud_total_texto = len(texto_completo)
+    while indice_inicio_actual < longitud_total_texto:
+        indice_fin_actual = min(indice_inicio_actual + tamano, longitud_total_texto)
+        fragmento_actual = texto_completo[indice_inicio_actual:indice_fin_actual]
+        vista_previa = fragmento_actual[:50].replace("\n", " ")
+        _registrador_referencia.debug(f"Fragmento generado (índices {indice_inicio_actual}-{indice_fin_actual}): '{vista_previa}...'")
+        elementos_contexto = [f"Fuente del archivo: {nombre_archivo}.", f"Título del documento: {titulo}."]
+        prefijo_contextual = " ".join(elementos_contexto)
+        texto_contextualizado = f"{prefijo_contextual}\n\nContenido del fragmento:\n{fragmento_actual}"
+        _registrador_referencia.debug(f"Contexto añadido al fragmento: '{prefijo_contextual}'")
+        numero_fragmentos += 1 if texto_contextualizado else 0
+        if indice_fin_actual == longitud_total_texto:
+            break
+        indice_inicio_actual += tamano - solapamiento
+    return numero_fragmentos
+
+
+def _medir(funcion_medida: Callable[[], int], repeticiones: int) -> Tuple[float, float, int]:
+    """Devuelve (mejor tiempo en segundos, pico de memoria asignada en KB, resultado) de la función."""
+    mejor_tiempo = float("inf")
+    resultado = 0
+    for _ in range(max(1, repeticiones)):
+        instante_inicio = time.perf_counter()
+        resultado = funcion_medida()
+        mejor_tiempo = min(mejor_tiempo, time.perf_counter() - instante_inicio)
+    tracemalloc.start() # Medición de memoria aparte: tracemalloc ralentiza la ejecución
+    funcion_medida()
+    _, pico_memoria_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return mejor_tiempo, pico_memoria_bytes / 1024, resultado
+
+
+def main() -> None:
+    analizador_argumentos = argparse.ArgumentParser(description="Mide MB/s y memoria de la división y contextualización de fragmentos.")
+    analizador_argumentos.add_argument("--archivo", type=Path, default=None, help="Texto a dividir (por defecto, texto sintético).")
+    analizador_argumentos.add_argument("--megabytes", type=float, default=5.0, help="Tamaño del texto sintético en MB.")
+    analizador_argumentos.add_argument("--tamano", type=int, default=1000, help="Tamaño de fragmento en caracteres.")
+    analizador_argumentos.add_argument("--solapamiento", type=int, default=150, help="Solapamiento en caracteres.")
+    analizador_argumentos.add_argument("--repeticiones", type=int, default=5, help="Repeticiones por variante (se informa la mejor).")
+    argumentos = analizador_argumentos.parse_args()
+
+    logging.getLogger("entrenai_refactor").setLevel(logging.WARNING) # Como en producción: sin DEBUG (ni INFO por llamada)
+    texto_completo = (
+        argumentos.archivo.read_text(encoding="utf-8", errors="replace") if argumentos.archivo
+        else _generar_texto_sintetico(argumentos.megabytes)
+    )
+    megabytes_texto = len(texto_completo.encode("utf-8")) / (1024 * 1024)
+    gestor_embeddings = GestorEmbeddings(None, argumentos.tamano, argumentos.solapamiento) # type: ignore[arg-type]
+    nombre_archivo, titulo_documento = "apuntes_fisica.pdf", "Apuntes de Física I"
+
+    def _consumir_contextualizados() -> int:
+        fragmentos = gestor_embeddings.iterar_fragmentos_de_texto(texto_completo)
+        return sum(1 for texto in gestor_embeddings.iterar_textos_contextualizados(fragmentos, nombre_archivo, titulo_documento) if texto)
+
+    variantes: List[Tuple[str, Callable[[], int]]] = [
+        ("referencia", lambda: _referencia_implementacion_anterior(texto_completo, argumentos.tamano, argumentos.solapamiento, nombre_archivo, titulo_documento)),
+        ("tramos", lambda: sum(1 for _ in gestor_embeddings.iterar_tramos_de_fragmentos(texto_completo))),
+        ("lista", lambda: len(gestor_embeddings.dividir_texto_en_fragmentos(texto_completo))),
+        ("contextualizados", _consumir_contextualizados),
+    ]
+
+    print(f"Texto: {megabytes_texto:.2f} MB ({len(texto_completo)} caracteres); fragmento={argumentos.tamano}, solapamiento={argumentos.solapamiento}.")
+    tiempo_referencia: Optional[float] = None
+    for nombre_variante, funcion_variante in variantes:
+        mejor_tiempo, pico_memoria_kb, numero_fragmentos = _medir(funcion_variante, argumentos.repeticiones)
+        tiempo_referencia = tiempo_referencia or mejor_tiempo
+        print(
+            f"{nombre_variante:<17} fragmentos={numero_fragmentos:<7} tiempo={mejor_tiempo * 1000:8.2f} ms  "
+            f"MB/s={megabytes_texto / mejor_tiempo if mejor_tiempo else 0.0:9.1f}  pico memoria={pico_memoria_kb:9.1f} KB  "
+            f"aceleración={tiempo_referencia / mejor_tiempo if mejor_tiempo else 0.0:6.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
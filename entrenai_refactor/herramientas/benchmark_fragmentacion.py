@@ -0,0 +1,154 @@
+"""
+Benchmark de estrategias de fragmentación: compara la ventana fija con la fragmentación estructural
+y la semántica en número de fragmentos, bytes almacenados y recall de recuperación.
+
+Uso:
+    python -m entrenai_refactor.herramientas.benchmark_fragmentacion datos/markdown_cursos/12 \\
+        --consultas consultas.jsonl --top-k 5 --modo-recuperacion lexico
+
+El archivo de consultas (opcional) es JSONL con una consulta por línea:
+    {"pregunta": "¿Qué estudia la cinemática?", "fragmento_esperado": "La cinemática estudia el movimiento"}
+Una consulta cuenta como acierto si alguno de los `top-k` fragmentos recuperados contiene el
+fragmento esperado completo (ignorando diferencias de espacios y mayúsculas). Con el modo 'lexico'
+la recuperación usa TF-IDF y no necesita servicios externos; con 'embeddings' usa el proveedor de IA configurado.
+
+Con --tokens-maximos los fragmentos se dimensionan en tokens (con el tokenizador indicado en --tokenizador,
+o con la estimación aproximada si no se indica) y se informa también la media de tokens por fragmento.
+"""
+import argparse
+import json
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from entrenai_refactor.nucleo.ia.gestor_embeddings import (
+    GestorEmbeddings, ESTRATEGIAS_FRAGMENTACION_DISPONIBLES, ESTRATEGIA_FRAGMENTACION_SEMANTICA, RESERVA_TOKENS_CONTEXTO,
+)
+from entrenai_refactor.nucleo.ia.tokenizador_embeddings import ContadorTokensEmbedding
+
+
+def _normalizar(texto: str) -> str:
+    return " ".join(texto.lower().split())
+
+
+def _leer_documentos(rutas_entrada: List[Path]) -> Dict[str, str]:
+    """Lee los archivos .md/.txt indicados (o contenidos en los directorios indicados)."""
+    documentos: Dict[str, str] = {}
+    for ruta_entrada in rutas_entrada:
+        rutas_archivos = sorted(ruta_entrada.rglob("*")) if ruta_entrada.is_dir() else [ruta_entrada]
+        for ruta_archivo in rutas_archivos:
+            if ruta_archivo.is_file() and ruta_archivo.suffix.lower() in (".md", ".markdown", ".txt"):
+                documentos[str(ruta_archivo)] = ruta_archivo.read_text(encoding="utf-8", errors="replace")
+    return documentos
+
+
+def _crear_recuperador_lexico(textos_fragmentos: List[str]) -> Callable[[str, int], List[int]]:
+    """Devuelve una función (pregunta, k) -> índices de los k fragmentos más similares por TF-IDF (coseno)."""
+    tokenizar = lambda texto: re.findall(r"\w+", texto.lower())
+    conteos_fragmentos = [Counter(tokenizar(texto)) for texto in textos_fragmentos]
+    frecuencia_documental = Counter(termino for conteo in conteos_fragmentos for termino in conteo)
+    total_fragmentos = len(textos_fragmentos)
+    idf = {termino: math.log((total_fragmentos + 1) / (df + 1)) + 1.0 for termino, df in frecuencia_documental.items()}
+
+    def _vectorizar(conteo: Counter) -> Dict[str, float]:
+        return {termino: frecuencia * idf.get(termino, 0.0) for termino, frecuencia in conteo.items()}
+
+    vectores_fragmentos = [_vectorizar(conteo) for conteo in conteos_fragmentos]
+    normas_fragmentos = [math.sqrt(sum(peso * peso for peso in vector.values())) or 1.0 for vector in vectores_fragmentos]
+
+    def _recuperar(pregunta: str, k: int) -> List[int]:
+        vector_pregunta = _vectorizar(Counter(tokenizar(pregunta)))
+        puntuaciones = [
+            sum(peso * vector_fragmento.get(termino, 0.0) for termino, peso in vector_pregunta.items()) / norma_fragmento
+            for vector_fragmento, norma_fragmento in zip(vectores_fragmentos, normas_fragmentos)
+        ]
+        return sorted(range(total_fragmentos), key=puntuaciones.__getitem__, reverse=True)[:k]
+
+    return _recuperar
+
+
+def _crear_recuperador_embeddings(textos_fragmentos: List[str], gestor_embeddings: GestorEmbeddings) -> Callable[[str, int], List[int]]:
+    """Devuelve una función (pregunta, k) -> índices de los k fragmentos más similares por coseno de embeddings."""
+    embeddings_fragmentos = gestor_embeddings.generar_embeddings_para_lista_de_textos(textos_fragmentos)
+
+    def _coseno(vector_a: List[float], vector_b: List[float]) -> float:
+        producto = sum(a * b for a, b in zip(vector_a, vector_b))
+        return producto / ((math.sqrt(sum(a * a for a in vector_a)) * math.sqrt(sum(b * b for b in vector_b))) or 1.0)
+
+    def _recuperar(pregunta: str, k: int) -> List[int]:
+        embedding_pregunta = gestor_embeddings.proveedor_ia.generar_embedding(pregunta)
+        puntuaciones = [_coseno(embedding_pregunta, embedding) if embedding else -1.0 for embedding in embeddings_fragmentos]
+        return sorted(range(len(textos_fragmentos)), key=puntuaciones.__getitem__, reverse=True)[:k]
+
+    return _recuperar
+
+
+def main() -> None:
+    analizador_argumentos = argparse.ArgumentParser(description="Compara estrategias de fragmentación en número de fragmentos, almacenamiento y recall.")
+    analizador_argumentos.add_argument("rutas", type=Path, nargs="+", help="Archivos .md/.txt o directorios que los contengan.")
+    analizador_argumentos.add_argument("--consultas", type=Path, default=None, help="JSONL con 'pregunta' y 'fragmento_esperado' para medir recall.")
+    analizador_argumentos.add_argument("--top-k", type=int, default=5, help="Número de fragmentos recuperados por consulta.")
+    analizador_argumentos.add_argument("--tamano", type=int, default=1000, help="Tamaño (objetivo) de fragmento en caracteres.")
+    analizador_argumentos.add_argument("--solapamiento", type=int, default=150, help="Solapamiento de la ventana fija en caracteres.")
+    analizador_argumentos.add_argument("--dimension-embedding", type=int, default=768, help="Dimensión de los embeddings, para estimar los bytes almacenados.")
+    analizador_argumentos.add_argument("--tokens-maximos", type=int, default=None, help="Dimensionar los fragmentos en tokens, con este máximo por fragmento.")
+    analizador_argumentos.add_argument("--tokenizador", default=None, help="Tokenizador (id del Hub de Hugging Face o ruta a tokenizer.json) para --tokens-maximos.")
+    analizador_argumentos.add_argument("--modo-recuperacion", choices=["lexico", "embeddings"], default="lexico", help="Método de recuperación para medir recall.")
+    argumentos = analizador_argumentos.parse_args()
+
+    documentos = _leer_documentos(argumentos.rutas)
+    if not documentos:
+        print("No se encontraron documentos .md/.txt en las rutas indicadas.")
+        return
+    consultas: List[Dict[str, str]] = []
+    if argumentos.consultas:
+        with open(argumentos.consultas, "r", encoding="utf-8") as archivo_consultas:
+            consultas = [json.loads(linea) for linea in archivo_consultas if linea.strip()]
+
+    proveedor_ia: Optional[object] = None
+    if argumentos.modo_recuperacion == "embeddings":
+        from entrenai_refactor.nucleo.ia.proveedor_inteligencia import ProveedorInteligencia
+        proveedor_ia = ProveedorInteligencia()
+    contador_tokens: Optional[ContadorTokensEmbedding] = None
+    maximo_tokens_con_reserva: Optional[int] = None
+    if argumentos.tokens_maximos:
+        # El gestor descuenta la reserva del prefijo contextual: se suma para que el máximo efectivo sea el pedido.
+        maximo_tokens_con_reserva = argumentos.tokens_maximos + RESERVA_TOKENS_CONTEXTO
+        contador_tokens = ContadorTokensEmbedding(argumentos.tokenizador, maximo_tokens_modelo=maximo_tokens_con_reserva)
+    gestor_embeddings = GestorEmbeddings(proveedor_ia, argumentos.tamano, argumentos.solapamiento, contador_tokens, maximo_tokens_con_reserva) # type: ignore[arg-type]
+
+    print(f"Documentos: {len(documentos)} ({sum(len(texto) for texto in documentos.values())} caracteres); consultas: {len(consultas)}.")
+    for estrategia in ESTRATEGIAS_FRAGMENTACION_DISPONIBLES:
+        if estrategia == ESTRATEGIA_FRAGMENTACION_SEMANTICA and proveedor_ia is None:
+            print(f"{estrategia:<13} omitida: requiere --modo-recuperacion embeddings (usa el proveedor de IA para los embeddings de oraciones).")
+            continue
+        textos_fragmentos: List[str] = []
+        for texto_documento in documentos.values():
+            textos_fragmentos.extend(gestor_embeddings.fragmentar_texto_segun_estrategia(texto_documento, estrategia)[0])
+        bytes_texto = sum(len(texto.encode("utf-8")) for texto in textos_fragmentos)
+        bytes_almacenados = bytes_texto + len(textos_fragmentos) * argumentos.dimension_embedding * 4 # float32 por componente
+        linea_resultado = (
+            f"{estrategia:<13} fragmentos={len(textos_fragmentos):<6} tamaño medio={bytes_texto / max(1, len(textos_fragmentos)):7.1f} B  "
+            f"texto={bytes_texto / 1024:9.1f} KB  almacenado≈{bytes_almacenados / 1024:9.1f} KB"
+        )
+        if contador_tokens is not None and textos_fragmentos:
+            conteos_tokens = contador_tokens.contar_tokens_en_lote(textos_fragmentos)
+            linea_resultado += f"  tokens medio={sum(conteos_tokens) / len(conteos_tokens):6.1f} (máx. {max(conteos_tokens)})"
+        if consultas and textos_fragmentos:
+            recuperar = (
+                _crear_recuperador_lexico(textos_fragmentos) if argumentos.modo_recuperacion == "lexico"
+                else _crear_recuperador_embeddings(textos_fragmentos, gestor_embeddings)
+            )
+            fragmentos_normalizados = [_normalizar(texto) for texto in textos_fragmentos]
+            aciertos = sum(
+                any(_normalizar(consulta["fragmento_esperado"]) in fragmentos_normalizados[indice] for indice in recuperar(consulta["pregunta"], argumentos.top_k))
+                for consulta in consultas
+            )
+            linea_resultado += f"  recall@{argumentos.top_k}={aciertos / len(consultas):.3f}"
+        print(linea_resultado)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark del OCR de PDF en paralelo: mide páginas/segundo con distinto número de procesos trabajadores.
+
+Uso:
+    python -m entrenai_refactor.herramientas.benchmark_ocr_pdf documento_escaneado.pdf \\
+        --trabajadores 1 2 4 8 --repeticiones 1
+
+Por defecto se fuerza el OCR de todas las páginas (se ignora la capa de texto) para medir
+sólo el rendimiento de Tesseract; usar --respetar-capa-texto para medir el camino real.
+"""
+import argparse
+import time
+from pathlib import Path
+from typing import List
+
+from entrenai_refactor.nucleo.archivos.procesador_archivos import ProcesadorArchivosPDF, pdfinfo_from_path
+
+
+def _medir_extraccion(ruta_pdf: Path, numero_trabajadores: int, forzar_ocr: bool) -> float:
+    """Extrae el texto del PDF con el número de trabajadores indicado y devuelve los segundos transcurridos."""
+    procesador_pdf = ProcesadorArchivosPDF(
+        minimo_caracteres_capa_texto=10**9 if forzar_ocr else None, # Ninguna página alcanza el mínimo: todas van a OCR
+        trabajadores_ocr=numero_trabajadores,
+    )
+    instante_inicio = time.perf_counter()
+    procesador_pdf.extraer_texto_de_archivo(ruta_pdf)
+    return time.perf_counter() - instante_inicio
+
+
+def main() -> None:
+    analizador_argumentos = argparse.ArgumentParser(description="Mide páginas/segundo del OCR de PDF con distinto número de procesos.")
+    analizador_argumentos.add_argument("ruta_pdf", type=Path, help="PDF a procesar (idealmente escaneado).")
+    analizador_argumentos.add_argument("--trabajadores", type=int, nargs="+", default=[1, 2, 4, 8], help="Números de procesos a comparar.")
+    analizador_argumentos.add_argument("--repeticiones", type=int, default=1, help="Repeticiones por configuración (se informa la mejor).")
+    analizador_argumentos.add_argument("--respetar-capa-texto", action="store_true", help="No forzar OCR en las páginas con capa de texto utilizable.")
+    argumentos = analizador_argumentos.parse_args()
+
+    total_paginas = int(pdfinfo_from_path(str(argumentos.ruta_pdf)).get("Pages", 0))
+    print(f"PDF: {argumentos.ruta_pdf} ({total_paginas} páginas)")
+    tiempo_base: float = 0.0
+    for numero_trabajadores in argumentos.trabajadores:
+        tiempos_medidos: List[float] = [
+            _medir_extraccion(argumentos.ruta_pdf, numero_trabajadores, not argumentos.respetar_capa_texto)
+            for _ in range(max(1, argumentos.repeticiones))
+        ]
+        mejor_tiempo = min(tiempos_medidos)
+        tiempo_base = tiempo_base or mejor_tiempo
+        print(
+            f"trabajadores={numero_trabajadores:<3} tiempo={mejor_tiempo:8.2f} s  "
+            f"páginas/s={total_paginas / mejor_tiempo if mejor_tiempo else 0.0:7.2f}  aceleración={tiempo_base / mejor_tiempo:5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Comparativa de latencia de extremo a extremo entre el chat nativo de la API
+('/v1/chat/{id_curso}') y el flujo de chat de N8N (webhook del Chat Trigger).
+
+Uso:
+    python -m entrenai_refactor.herramientas.comparar_latencia_chat \\
+        --url-api http://localhost:8000 --id-curso 2 \\
+        --url-webhook-n8n http://localhost:5678/webhook/<id>/chat \\
+        --pregunta "¿Qué temas cubre la unidad 1?" --repeticiones 5
+
+Para cada camino se mide el tiempo hasta el primer byte (TTFB) y el tiempo total,
+y al final se imprime la mediana y el p95 de cada uno.
+"""
+import argparse
+import statistics
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import requests
+
+
+def _medir_chat_nativo(sesion_http: requests.Session, url_api: str, id_curso: int, pregunta: str) -> Dict[str, float]:
+    """Lanza una pregunta al chat nativo en flujo y mide TTFB y tiempo total (en milisegundos)."""
+    url_chat = f"{url_api.rstrip('/')}/v1/chat/{id_curso}"
+    instante_inicio = time.perf_counter()
+    milisegundos_primer_byte: Optional[float] = None
+    with sesion_http.post(url_chat, json={"pregunta": pregunta, "transmitir": True}, stream=True, timeout=300) as respuesta_http:
+        respuesta_http.raise_for_status()
+        for trozo_bytes in respuesta_http.iter_content(chunk_size=None):
+            if trozo_bytes and milisegundos_primer_byte is None:
+                milisegundos_primer_byte = (time.perf_counter() - instante_inicio) * 1000.0
+    milisegundos_totales = (time.perf_counter() - instante_inicio) * 1000.0
+    return {"ttfb": milisegundos_primer_byte or milisegundos_totales, "total": milisegundos_totales}
+
+
+def _medir_chat_n8n(sesion_http: requests.Session, url_webhook_n8n: str, pregunta: str) -> Dict[str, float]:
+    """Lanza una pregunta al webhook del Chat Trigger de N8N (respuesta completa) y mide su latencia."""
+    cuerpo_peticion = {"action": "sendMessage", "sessionId": str(uuid.uuid4()), "chatInput": pregunta}
+    instante_inicio = time.perf_counter()
+    respuesta_http = sesion_http.post(url_webhook_n8n, json=cuerpo_peticion, timeout=300)
+    respuesta_http.raise_for_status()
+    milisegundos_totales = (time.perf_counter() - instante_inicio) * 1000.0
+    # El Chat Trigger de N8N no transmite en flujo: el primer byte llega con la respuesta completa.
+    return {"ttfb": milisegundos_totales, "total": milisegundos_totales}
+
+
+def _resumir_mediciones(nombre_camino: str, mediciones: List[Dict[str, float]]) -> None:
+    """Imprime mediana y p95 de TTFB y tiempo total para un camino."""
+    if not mediciones:
+        print(f"{nombre_camino:<8} sin mediciones válidas.")
+        return
+    for metrica in ("ttfb", "total"):
+        valores_ordenados = sorted(m[metrica] for m in mediciones)
+        indice_p95 = max(0, int(round(0.95 * len(valores_ordenados))) - 1)
+        print(
+            f"{nombre_camino:<8} {metrica:<6} mediana={statistics.median(valores_ordenados):9.1f} ms  "
+            f"p95={valores_ordenados[indice_p95]:9.1f} ms  (n={len(valores_ordenados)})"
+        )
+
+
+def main() -> None:
+    analizador_argumentos = argparse.ArgumentParser(description="Compara la latencia del chat nativo de la API contra el flujo de chat de N8N.")
+    analizador_argumentos.add_argument("--url-api", required=True, help="URL base de la API de EntrenAI (ej. http://localhost:8000).")
+    analizador_argumentos.add_argument("--id-curso", type=int, required=True, help="ID del curso de Moodle a consultar.")
+    analizador_argumentos.add_argument("--url-webhook-n8n", default=None, help="URL del webhook del chat de N8N del mismo curso (opcional).")
+    analizador_argumentos.add_argument("--pregunta", required=True, help="Pregunta a enviar en cada repetición.")
+    analizador_argumentos.add_argument("--repeticiones", type=int, default=5, help="Número de repeticiones por camino.")
+    argumentos = analizador_argumentos.parse_args()
+
+    sesion_http = requests.Session()
+    mediciones_nativo: List[Dict[str, float]] = []
+    mediciones_n8n: List[Dict[str, float]] = []
+
+    for numero_repeticion in range(1, argumentos.repeticiones + 1):
+        try:
+            mediciones_nativo.append(_medir_chat_nativo(sesion_http, argumentos.url_api, argumentos.id_curso, argumentos.pregunta))
+        except requests.exceptions.RequestException as e_nativo:
+            print(f"[{numero_repeticion}] Error en el chat nativo: {e_nativo}")
+        if argumentos.url_webhook_n8n:
+            try:
+                mediciones_n8n.append(_medir_chat_n8n(sesion_http, argumentos.url_webhook_n8n, argumentos.pregunta))
+            except requests.exceptions.RequestException as e_n8n:
+                print(f"[{numero_repeticion}] Error en el chat de N8N: {e_n8n}")
+
+    _resumir_mediciones("nativo", mediciones_nativo)
+    if argumentos.url_webhook_n8n:
+        _resumir_mediciones("n8n", mediciones_n8n)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,17 @@
 # Importar la clase principal para la gestión del procesamiento de archivos.
 # GestorMaestroDeProcesadoresArchivos centraliza la lógica para delegar
 # el procesamiento de archivos al procesador específico según el tipo de archivo.
-from .procesador_archivos import GestorMaestroDeProcesadoresArchivos
+from .procesador_archivos import GestorMaestroDeProcesadoresArchivos, BloqueTextoExtraido, TextoExtraidoIncompleto
+
+# Extracción en procesos trabajadores aislados, con límites de tiempo y memoria por archivo.
+from .extraccion_aislada import (
+    EjecutorExtraccionAislada,
+    obtener_ejecutor_extraccion_aislada,
+    cerrar_ejecutor_extraccion_aislada,
+)
+
+# Caché en disco del texto extraído, direccionada por el hash de los bytes de cada archivo.
+from .cache_texto_extraido import CacheTextoExtraido, obtener_cache_texto_extraido
 
 # Importar excepciones personalizadas definidas en 'procesador_archivos.py'.
 # Estas excepciones permiten un manejo de errores más granular y específico
@@ -17,12 +27,21 @@ from .procesador_archivos import (
     ErrorProcesamientoArchivo,      # Excepción base para errores generales de procesamiento.
     ErrorTipoArchivoNoSoportado,  # Lanzada cuando no hay un procesador para un tipo de archivo.
     ErrorDependenciaFaltante,     # Lanzada si falta una biblioteca externa necesaria.
+    ErrorExtraccionAislada,       # Lanzada si una extracción aislada se aborta por tiempo, memoria o muerte del trabajador.
 )
 
 # La lista __all__ define la interfaz pública de este paquete.
 # Especifica qué nombres se importarán cuando se use 'from .archivos import *'.
 __all__ = [
     "GestorMaestroDeProcesadoresArchivos",
+    "BloqueTextoExtraido",
+    "TextoExtraidoIncompleto",
+    "CacheTextoExtraido",
+    "obtener_cache_texto_extraido",
+    "EjecutorExtraccionAislada",
+    "ErrorExtraccionAislada",
+    "obtener_ejecutor_extraccion_aislada",
+    "cerrar_ejecutor_extraccion_aislada",
     "ErrorProcesamientoArchivo",
     "ErrorTipoArchivoNoSoportado",
     "ErrorDependenciaFaltante",
@@ -0,0 +1,59 @@
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from entrenai_refactor.config.configuracion import configuracion_global
+from entrenai_refactor.config.registrador import obtener_registrador
+from entrenai_refactor.nucleo.cache_disco import CacheDiscoDireccionadaPorContenido
+
+registrador = obtener_registrador(__name__)
+
+# Tamaño de bloque para calcular el hash de los archivos sin cargarlos completos en memoria.
+TAMANO_BLOQUE_HASH_BYTES = 1024 * 1024
+
+
+class CacheTextoExtraido(CacheDiscoDireccionadaPorContenido):
+    """
+    Caché persistente en disco del texto extraído de los archivos, direccionada por el SHA-256 de los bytes
+    del archivo y por la firma de configuración del procesador que lo extrajo (tipo, versión, idioma OCR...).
+    Así, un archivo idéntico (resincronización de un curso sin cambios, o el mismo PDF en varios cursos)
+    sólo cuesta calcular su hash, en lugar de volver a extraer el texto o aplicar OCR.
+    """
+
+    def __init__(self, directorio_cache: Path, tamano_maximo_bytes: int):
+        super().__init__(directorio_cache, tamano_maximo_bytes, extension_entradas=".txt", descripcion_cache="texto extraído")
+
+    @staticmethod
+    def calcular_huella_archivo(ruta_archivo: Path) -> str:
+        """Calcula el SHA-256 (hex) de los bytes del archivo, leyéndolo por bloques."""
+        resumen_hash = hashlib.sha256()
+        with open(ruta_archivo, "rb") as archivo_binario:
+            for bloque_bytes in iter(lambda: archivo_binario.read(TAMANO_BLOQUE_HASH_BYTES), b""):
+                resumen_hash.update(bloque_bytes)
+        return resumen_hash.hexdigest()
+
+    @staticmethod
+    def calcular_clave(huella_archivo: str, firma_procesador: str) -> str:
+        """Combina la huella del archivo con la firma del procesador en la clave de caché."""
+        return hashlib.sha256(f"{firma_procesador}\0{huella_archivo}".encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=1)
+def obtener_cache_texto_extraido() -> Optional[CacheTextoExtraido]:
+    """
+    Devuelve la caché de texto extraído del proceso, o None si está deshabilitada o no se pudo crear.
+    Se comparte entre los `GestorMaestroDeProcesadoresArchivos` (uno por petición), igual que la caché
+    de conversiones Markdown.
+    """
+    config_procesamiento = configuracion_global.procesamiento
+    if not config_procesamiento.cache_texto_extraido_habilitada:
+        return None
+    try:
+        return CacheTextoExtraido(
+            directorio_cache=configuracion_global.ruta_absoluta_directorio_datos / "cache_texto_extraido",
+            tamano_maximo_bytes=config_procesamiento.tamano_maximo_cache_texto_extraido_mb * 1024 * 1024,
+        )
+    except OSError as e_cache:
+        registrador.warning(f"No se pudo inicializar la caché de texto extraído; se continuará sin caché: {e_cache}")
+        return None
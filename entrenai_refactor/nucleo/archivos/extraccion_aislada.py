@@ -0,0 +1,365 @@
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from entrenai_refactor.config.configuracion import configuracion_global
+from entrenai_refactor.config.registrador import obtener_registrador
+from .procesador_archivos import (
+    ErrorProcesamientoArchivo, ErrorDependenciaFaltante, ErrorExtraccionAislada, ProcesadorArchivoInterfaz
+)
+
+registrador = obtener_registrador(__name__)
+
+# --- Motivos estructurados de fallo de una extracción aislada ---
+MOTIVO_TIEMPO_AGOTADO = "tiempo_agotado" # Se superó el límite de tiempo por archivo
+MOTIVO_MEMORIA_EXCEDIDA = "memoria_excedida" # El trabajador superó el límite de memoria residente (o lanzó MemoryError)
+MOTIVO_TRABAJADOR_TERMINADO = "trabajador_terminado" # El trabajador murió sin responder (segfault, OOM killer...)
+MOTIVO_TRABAJADOR_NO_DISPONIBLE = "trabajador_no_disponible" # No se pudo iniciar un proceso trabajador
+MOTIVO_ERROR_PROCESADOR = "error_procesador" # El procesador lanzó una excepción (archivo corrupto, formato inválido...)
+MOTIVO_DEPENDENCIA_FALTANTE = "dependencia_faltante" # El procesador no tiene disponible una biblioteca necesaria
+
+# Cada cuánto (en segundos) se comprueba la memoria del trabajador mientras se espera su respuesta.
+INTERVALO_SUPERVISION_SEGUNDOS = 0.5
+
+
+def _medir_memoria_residente_arbol_mb(pid_raiz: int) -> Optional[float]:
+    """
+    Devuelve la memoria residente (RSS) en MB del proceso indicado más la de todos sus descendientes
+    (p. ej. el pool de OCR o los 'pdftoppm' lanzados por pdf2image), leyendo /proc en Linux.
+    Devuelve None si /proc no está disponible, en cuyo caso no se aplica el límite de memoria.
+    """
+    tamano_pagina_bytes = os.sysconf("SC_PAGE_SIZE")
+    total_bytes = 0
+    pids_pendientes: List[int] = [pid_raiz]
+    while pids_pendientes:
+        pid_actual = pids_pendientes.pop()
+        try:
+            with open(f"/proc/{pid_actual}/statm", "r", encoding="ascii") as archivo_statm:
+                total_bytes += int(archivo_statm.read().split()[1]) * tamano_pagina_bytes
+        except (OSError, ValueError, IndexError):
+            if pid_actual == pid_raiz:
+                return None
+            continue # El descendiente terminó mientras se medía
+        try:
+            with open(f"/proc/{pid_actual}/task/{pid_actual}/children", "r", encoding="ascii") as archivo_hijos:
+                pids_pendientes.extend(int(pid_hijo) for pid_hijo in archivo_hijos.read().split())
+        except (OSError, ValueError):
+            pass
+    return total_bytes / (1024 * 1024)
+
+
+def _bucle_proceso_trabajador_extraccion(conexion_trabajador) -> None:
+    """
+    Bucle principal de un proceso trabajador de extracción. Recibe peticiones
+    (procesador, nombre de método, ruta, en flujo) y responde por la misma conexión:
+    ('resultado', valor), una serie de ('bloque', bloque) terminada en ('fin', None),
+    o ('error', motivo, nombre de la excepción, mensaje). Termina al recibir None o al cerrarse la conexión.
+    """
+    # Nueva sesión: el proceso padre puede terminar de una vez al trabajador y a todos sus descendientes.
+    os.setsid()
+    while True:
+        try:
+            peticion_extraccion = conexion_trabajador.recv()
+        except (EOFError, OSError): # El proceso padre terminó o cerró la conexión
+            break
+        if peticion_extraccion is None:
+            break
+        procesador_archivo, nombre_metodo, ruta_archivo_str, en_flujo = peticion_extraccion
+        try:
+            metodo_procesador = getattr(procesador_archivo, nombre_metodo)
+            if en_flujo:
+                for elemento_extraido in metodo_procesador(Path(ruta_archivo_str)):
+                    conexion_trabajador.send(("bloque", elemento_extraido))
+                conexion_trabajador.send(("fin", None))
+            else:
+                conexion_trabajador.send(("resultado", metodo_procesador(Path(ruta_archivo_str))))
+        except MemoryError:
+            conexion_trabajador.send(("error", MOTIVO_MEMORIA_EXCEDIDA, "MemoryError", "El procesador agotó la memoria disponible."))
+        except Exception as e_extraccion:
+            motivo_error = MOTIVO_DEPENDENCIA_FALTANTE if isinstance(e_extraccion, ErrorDependenciaFaltante) else MOTIVO_ERROR_PROCESADOR
+            conexion_trabajador.send(("error", motivo_error, type(e_extraccion).__name__, str(e_extraccion)))
+
+
+class _TrabajadorExtraccion:
+    """Un proceso trabajador de extracción junto con el extremo de su conexión y sus contadores."""
+
+    def __init__(self, contexto_multiproceso):
+        self.conexion, conexion_trabajador = contexto_multiproceso.Pipe(duplex=True)
+        # No es 'daemon': los procesos daemon no pueden crear hijos, y el procesador de PDF usa su propio pool de OCR.
+        self.proceso = contexto_multiproceso.Process(
+            target=_bucle_proceso_trabajador_extraccion, args=(conexion_trabajador,), name="entrenai-extraccion", daemon=False
+        )
+        self.proceso.start()
+        conexion_trabajador.close() # El extremo del trabajador sólo debe quedar abierto en el proceso hijo
+        self.archivos_procesados = 0
+
+    def esta_vivo(self) -> bool:
+        return self.proceso.is_alive()
+
+    def detener(self, forzado: bool = False) -> None:
+        """Detiene el trabajador: de forma ordenada, o matando su grupo de procesos completo si `forzado`."""
+        if not forzado and self.proceso.is_alive():
+            try:
+                self.conexion.send(None)
+                self.proceso.join(timeout=5)
+            except (OSError, BrokenPipeError):
+                pass
+        if self.proceso.is_alive():
+            try:
+                os.killpg(self.proceso.pid, signal.SIGKILL) # El trabajador es líder de su sesión (os.setsid)
+            except (ProcessLookupError, PermissionError, OSError):
+                self.proceso.kill()
+            self.proceso.join(timeout=5)
+        self.conexion.close()
+
+
+class EjecutorExtraccionAislada:
+    """
+    Pool de procesos trabajadores en los que se ejecutan los procesadores de archivos, aislando al
+    proceso de la API de archivos malformados o patológicos. Cada extracción tiene un límite de tiempo
+    y de memoria residente (del trabajador y sus descendientes); al superarse, el trabajador se mata
+    y se lanza `ErrorExtraccionAislada` con el motivo. Los trabajadores se reciclan tras procesar un
+    número máximo de archivos, para que las fugas de memoria de las bibliotecas no se acumulen.
+
+    Los procesos se crean con el método 'spawn': el proceso de la API tiene hilos y conexiones abiertas
+    que no deben duplicarse con 'fork'.
+    """
+
+    def __init__(
+        self,
+        numero_trabajadores: int,
+        limite_segundos_por_archivo: float,
+        limite_memoria_residente_mb: int,
+        archivos_por_trabajador: int,
+    ):
+        self.numero_trabajadores = max(1, numero_trabajadores)
+        self.limite_segundos_por_archivo = limite_segundos_por_archivo
+        self.limite_memoria_residente_mb = limite_memoria_residente_mb # 0 o negativo: sin límite de memoria
+        self.archivos_por_trabajador = max(1, archivos_por_trabajador)
+        self._contexto_multiproceso = multiprocessing.get_context("spawn")
+        self._semaforo_trabajadores = threading.BoundedSemaphore(self.numero_trabajadores)
+        self._candado = threading.Lock()
+        self._trabajadores_libres: List[_TrabajadorExtraccion] = []
+        self.archivos_extraidos = 0
+        self.trabajadores_reciclados = 0
+        self.fallos_por_motivo: Dict[str, int] = {}
+        registrador.info(
+            f"Ejecutor de extracción aislada configurado: {self.numero_trabajadores} trabajadores, "
+            f"límite {self.limite_segundos_por_archivo:.0f} s y {self.limite_memoria_residente_mb} MB por archivo, "
+            f"reciclado cada {self.archivos_por_trabajador} archivos."
+        )
+
+    # --- Gestión de los trabajadores ---
+
+    def _adquirir_trabajador(self, ruta_archivo: Path) -> _TrabajadorExtraccion:
+        self._semaforo_trabajadores.acquire()
+        with self._candado:
+            trabajador = self._trabajadores_libres.pop() if self._trabajadores_libres else None
+        if trabajador is not None and trabajador.esta_vivo():
+            return trabajador
+        if trabajador is not None:
+            trabajador.detener(forzado=True)
+        try:
+            return _TrabajadorExtraccion(self._contexto_multiproceso)
+        except OSError as e_inicio_trabajador:
+            self._semaforo_trabajadores.release()
+            self._registrar_fallo(MOTIVO_TRABAJADOR_NO_DISPONIBLE)
+            raise ErrorExtraccionAislada(
+                "No se pudo iniciar un proceso trabajador de extracción.", MOTIVO_TRABAJADOR_NO_DISPONIBLE,
+                error_original=e_inicio_trabajador, ruta_archivo=ruta_archivo,
+            )
+
+    def _liberar_trabajador(self, trabajador: _TrabajadorExtraccion, reutilizable: bool) -> None:
+        """Devuelve el trabajador al pool, o lo detiene si quedó en un estado inconsistente o debe reciclarse."""
+        try:
+            if reutilizable and trabajador.esta_vivo() and trabajador.archivos_procesados < self.archivos_por_trabajador:
+                with self._candado:
+                    self._trabajadores_libres.append(trabajador)
+                return
+            if reutilizable and trabajador.archivos_procesados >= self.archivos_por_trabajador:
+                registrador.debug(f"Reciclando el trabajador de extracción (PID {trabajador.proceso.pid}) tras {trabajador.archivos_procesados} archivos.")
+                with self._candado:
+                    self.trabajadores_reciclados += 1
+            trabajador.detener(forzado=not reutilizable)
+        finally:
+            self._semaforo_trabajadores.release()
+
+    def _registrar_fallo(self, motivo_fallo: str) -> None:
+        with self._candado:
+            self.fallos_por_motivo[motivo_fallo] = self.fallos_por_motivo.get(motivo_fallo, 0) + 1
+
+    def _esperar_mensaje(self, trabajador: _TrabajadorExtraccion, ruta_archivo: Path, segundos_disponibles: float) -> Tuple[Any, float]:
+        """
+        Espera el siguiente mensaje del trabajador, vigilando el tiempo y la memoria.
+
+        Returns:
+            Una tupla (mensaje, segundos esperados).
+
+        Raises:
+            ErrorExtraccionAislada: Si se agota el tiempo, se supera la memoria o el trabajador muere.
+        """
+        instante_inicio_espera = time.monotonic()
+        memoria_residente_mb: Optional[float] = None
+        while True:
+            segundos_esperados = time.monotonic() - instante_inicio_espera
+            segundos_restantes = segundos_disponibles - segundos_esperados
+            if segundos_restantes <= 0:
+                raise ErrorExtraccionAislada(
+                    f"La extracción superó el límite de {self.limite_segundos_por_archivo:.0f} segundos por archivo.",
+                    MOTIVO_TIEMPO_AGOTADO, ruta_archivo=ruta_archivo,
+                    segundos_transcurridos=segundos_esperados, memoria_residente_mb=memoria_residente_mb,
+                )
+            try:
+                if trabajador.conexion.poll(min(segundos_restantes, INTERVALO_SUPERVISION_SEGUNDOS)):
+                    return trabajador.conexion.recv(), time.monotonic() - instante_inicio_espera
+            except (EOFError, OSError) as e_conexion:
+                trabajador.proceso.join(timeout=1)
+                raise ErrorExtraccionAislada(
+                    f"El proceso trabajador terminó inesperadamente (código de salida: {trabajador.proceso.exitcode}).",
+                    MOTIVO_TRABAJADOR_TERMINADO, error_original=e_conexion, ruta_archivo=ruta_archivo,
+                    segundos_transcurridos=time.monotonic() - instante_inicio_espera, memoria_residente_mb=memoria_residente_mb,
+                )
+            if self.limite_memoria_residente_mb > 0:
+                memoria_residente_mb = _medir_memoria_residente_arbol_mb(trabajador.proceso.pid)
+                if memoria_residente_mb is not None and memoria_residente_mb > self.limite_memoria_residente_mb:
+                    raise ErrorExtraccionAislada(
+                        f"La extracción superó el límite de memoria residente ({memoria_residente_mb:.0f} MB > {self.limite_memoria_residente_mb} MB).",
+                        MOTIVO_MEMORIA_EXCEDIDA, ruta_archivo=ruta_archivo,
+                        segundos_transcurridos=time.monotonic() - instante_inicio_espera, memoria_residente_mb=memoria_residente_mb,
+                    )
+
+    @staticmethod
+    def _convertir_error_del_procesador(mensaje_trabajador: Tuple, ruta_archivo: Path) -> ErrorProcesamientoArchivo:
+        """Reconstruye en el proceso padre la excepción lanzada por el procesador dentro del trabajador."""
+        _, motivo_error, nombre_excepcion, texto_excepcion = mensaje_trabajador
+        mensaje_error = f"{nombre_excepcion}: {texto_excepcion}"
+        if motivo_error == MOTIVO_DEPENDENCIA_FALTANTE:
+            return ErrorDependenciaFaltante(mensaje_error, ruta_archivo=ruta_archivo)
+        if motivo_error == MOTIVO_MEMORIA_EXCEDIDA:
+            return ErrorExtraccionAislada(mensaje_error, MOTIVO_MEMORIA_EXCEDIDA, ruta_archivo=ruta_archivo)
+        return ErrorProcesamientoArchivo(f"El procesador falló en el trabajador aislado: {mensaje_error}", ruta_archivo=ruta_archivo)
+
+    # --- API pública ---
+
+    def ejecutar(self, procesador_archivo: ProcesadorArchivoInterfaz, nombre_metodo: str, ruta_archivo: Path) -> Any:
+        """
+        Ejecuta `procesador_archivo.<nombre_metodo>(ruta_archivo)` en un trabajador aislado y devuelve su resultado.
+
+        Raises:
+            ErrorExtraccionAislada: Si la extracción se aborta por tiempo, memoria o muerte del trabajador.
+            ErrorDependenciaFaltante, ErrorProcesamientoArchivo: Si el propio procesador falla.
+        """
+        ruta_archivo = Path(ruta_archivo)
+        trabajador = self._adquirir_trabajador(ruta_archivo)
+        trabajador_reutilizable = False
+        try:
+            trabajador.archivos_procesados += 1
+            trabajador.conexion.send((procesador_archivo, nombre_metodo, str(ruta_archivo), False))
+            try:
+                mensaje_trabajador, _ = self._esperar_mensaje(trabajador, ruta_archivo, self.limite_segundos_por_archivo)
+            except ErrorExtraccionAislada as e_aislamiento:
+                self._registrar_fallo(e_aislamiento.motivo_fallo)
+                raise
+            with self._candado:
+                self.archivos_extraidos += 1
+            if mensaje_trabajador[0] == "error":
+                self._registrar_fallo(mensaje_trabajador[1])
+                # Tras un MemoryError el estado del trabajador no es fiable: se descarta.
+                trabajador_reutilizable = mensaje_trabajador[1] != MOTIVO_MEMORIA_EXCEDIDA
+                raise self._convertir_error_del_procesador(mensaje_trabajador, ruta_archivo)
+            trabajador_reutilizable = True
+            return mensaje_trabajador[1]
+        finally:
+            self._liberar_trabajador(trabajador, trabajador_reutilizable)
+
+    def iterar(self, procesador_archivo: ProcesadorArchivoInterfaz, nombre_metodo: str, ruta_archivo: Path) -> Iterator[Any]:
+        """
+        Versión en flujo de `ejecutar` para métodos generadores (p. ej. `iterar_bloques_de_archivo`): produce
+        los elementos a medida que el trabajador los envía. El límite de tiempo se aplica al tiempo acumulado
+        esperando al trabajador, no al que el llamador dedica a consumir cada elemento. Si el llamador deja de
+        iterar antes del final, el trabajador se descarta (no puede retomarse a mitad de un flujo).
+
+        Raises:
+            ErrorExtraccionAislada, ErrorDependenciaFaltante, ErrorProcesamientoArchivo: Como en `ejecutar`.
+        """
+        ruta_archivo = Path(ruta_archivo)
+        trabajador = self._adquirir_trabajador(ruta_archivo)
+        trabajador_reutilizable = False
+        try:
+            trabajador.archivos_procesados += 1
+            trabajador.conexion.send((procesador_archivo, nombre_metodo, str(ruta_archivo), True))
+            segundos_disponibles = self.limite_segundos_por_archivo
+            while True:
+                try:
+                    mensaje_trabajador, segundos_esperados = self._esperar_mensaje(trabajador, ruta_archivo, segundos_disponibles)
+                except ErrorExtraccionAislada as e_aislamiento:
+                    self._registrar_fallo(e_aislamiento.motivo_fallo)
+                    raise
+                segundos_disponibles -= segundos_esperados
+                if mensaje_trabajador[0] == "bloque":
+                    yield mensaje_trabajador[1]
+                    continue
+                with self._candado:
+                    self.archivos_extraidos += 1
+                if mensaje_trabajador[0] == "error":
+                    self._registrar_fallo(mensaje_trabajador[1])
+                    trabajador_reutilizable = mensaje_trabajador[1] != MOTIVO_MEMORIA_EXCEDIDA
+                    raise self._convertir_error_del_procesador(mensaje_trabajador, ruta_archivo)
+                trabajador_reutilizable = True
+                return # ('fin', None)
+        finally:
+            self._liberar_trabajador(trabajador, trabajador_reutilizable)
+
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        """Devuelve los contadores acumulados: archivos extraídos, trabajadores reciclados y fallos por motivo."""
+        with self._candado:
+            return {
+                "archivos_extraidos": self.archivos_extraidos,
+                "trabajadores_reciclados": self.trabajadores_reciclados,
+                "fallos_por_motivo": dict(self.fallos_por_motivo),
+            }
+
+    def cerrar(self) -> None:
+        """Detiene todos los trabajadores libres (los ocupados se detienen al terminar su extracción)."""
+        with self._candado:
+            trabajadores_a_detener, self._trabajadores_libres = self._trabajadores_libres, []
+        for trabajador in trabajadores_a_detener:
+            trabajador.detener()
+
+
+# --- Instancia compartida por todo el proceso de la API ---
+
+_ejecutor_extraccion_compartido: Optional[EjecutorExtraccionAislada] = None
+_candado_ejecutor_compartido = threading.Lock()
+
+
+def obtener_ejecutor_extraccion_aislada() -> EjecutorExtraccionAislada:
+    """
+    Devuelve el ejecutor de extracción aislada del proceso, creándolo con la configuración global
+    la primera vez. Se comparte entre peticiones para que el número de trabajadores esté acotado
+    por instancia de la API, y no por cada tarea de procesamiento.
+    """
+    global _ejecutor_extraccion_compartido
+    with _candado_ejecutor_compartido:
+        if _ejecutor_extraccion_compartido is None:
+            config_procesamiento = configuracion_global.procesamiento
+            _ejecutor_extraccion_compartido = EjecutorExtraccionAislada(
+                numero_trabajadores=config_procesamiento.extraccion_aislada_trabajadores,
+                limite_segundos_por_archivo=config_procesamiento.extraccion_aislada_limite_segundos_por_archivo,
+                limite_memoria_residente_mb=config_procesamiento.extraccion_aislada_limite_memoria_mb,
+                archivos_por_trabajador=config_procesamiento.extraccion_aislada_archivos_por_trabajador,
+            )
+        return _ejecutor_extraccion_compartido
+
+
+def cerrar_ejecutor_extraccion_aislada() -> None:
+    """Detiene los trabajadores del ejecutor compartido, si existe (se llama al apagar la aplicación)."""
+    global _ejecutor_extraccion_compartido
+    with _candado_ejecutor_compartido:
+        if _ejecutor_extraccion_compartido is not None:
+            _ejecutor_extraccion_compartido.cerrar()
+            _ejecutor_extraccion_compartido = None
@@ -1,5 +1,11 @@
+import codecs
+import mmap
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 from pathlib import Path
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Tuple, Iterator, NamedTuple
 
 # --- Importaciones opcionales de bibliotecas de terceros ---
 # Estas dependencias deben estar listadas en el archivo requirements.txt del proyecto.
@@ -10,17 +16,30 @@ except ImportError:
 
 try:
     import pytesseract # Biblioteca para OCR (Reconocimiento Óptico de Caracteres)
-    from pdf2image import convert_from_path # Utilidad para convertir páginas de PDF a imágenes
+    from pdf2image import convert_from_path, pdfinfo_from_path # Utilidades para convertir páginas de PDF a imágenes
 except ImportError:
     pytesseract = None
     convert_from_path = None
+    pdfinfo_from_path = None
+
+try:
+    import pypdfium2 as pdfium # Biblioteca para leer la capa de texto embebida de los PDF
+except ImportError:
+    pdfium = None
+
+try:
+    import chardet # Detector estadístico de codificación para archivos de texto que no son UTF-8
+except ImportError:
+    chardet = None
 
 try:
     from pptx import Presentation # Biblioteca para leer archivos .pptx (Microsoft PowerPoint)
 except ImportError:
     Presentation = None
 
+from entrenai_refactor.config.configuracion import configuracion_global
 from entrenai_refactor.config.registrador import obtener_registrador
+from .cache_texto_extraido import CacheTextoExtraido, obtener_cache_texto_extraido
 
 registrador = obtener_registrador(__name__) # Registrador específico para este módulo
 
@@ -49,8 +68,50 @@ class ErrorDependenciaFaltante(ErrorProcesamientoArchivo):
     """Excepción para cuando falta una dependencia de software necesaria para procesar un tipo de archivo."""
     pass
 
+class ErrorExtraccionAislada(ErrorProcesamientoArchivo):
+    """
+    Excepción para extracciones abortadas por el aislamiento: el proceso trabajador agotó su tiempo,
+    superó su límite de memoria o terminó de forma inesperada. `motivo_fallo` contiene uno de los
+    motivos MOTIVO_* de 'extraccion_aislada', para que el llamador pueda contabilizarlos y decidir qué hacer.
+    """
+    def __init__(
+        self,
+        mensaje: str,
+        motivo_fallo: str,
+        error_original: Optional[Exception] = None,
+        ruta_archivo: Optional[Path] = None,
+        segundos_transcurridos: Optional[float] = None,
+        memoria_residente_mb: Optional[float] = None,
+    ):
+        self.motivo_fallo = motivo_fallo
+        self.segundos_transcurridos = segundos_transcurridos
+        self.memoria_residente_mb = memoria_residente_mb
+        super().__init__(mensaje, error_original=error_original, ruta_archivo=ruta_archivo)
+
+    def __str__(self):
+        return f"[{self.motivo_fallo}] {super().__str__()}"
+
 # --- Interfaz Base para Procesadores de Archivos ---
 
+class BloqueTextoExtraido(NamedTuple):
+    """
+    Bloque de texto producido por la API de extracción en flujo (`iterar_bloques_de_archivo`),
+    con su posición dentro del documento de origen.
+    """
+    texto: str
+    tipo_bloque: str # 'pagina', 'diapositiva', 'parrafo', 'tabla', 'lineas' o 'documento'
+    posicion: int # Número de página/diapositiva/párrafo/línea inicial (desde 1) según el tipo de bloque
+    metadatos: Optional[Dict[str, Any]] = None
+
+
+class TextoExtraidoIncompleto(str):
+    """
+    Texto extraído al que le faltan partes (p. ej. páginas de un PDF cuyo OCR no terminó antes del plazo).
+    Se usa como un `str` normal, también al volver del proceso de extracción aislada, pero no se guarda en
+    la caché de texto extraído: la próxima extracción del mismo archivo vuelve a intentarlo completo.
+    """
+
+
 class ProcesadorArchivoInterfaz:
     """
     Clase base abstracta (interfaz informal) que define la estructura esperada
@@ -61,6 +122,18 @@ class ProcesadorArchivoInterfaz:
     # Ejemplo: [".txt", ".log"]
     EXTENSIONES_ARCHIVOS_SOPORTADAS: List[str] = []
 
+    # Versión de la lógica de extracción. Forma parte de la clave de la caché de texto extraído:
+    # debe incrementarse al cambiar el texto que produce el procesador para un mismo archivo.
+    VERSION_PROCESADOR: str = "1"
+
+    def obtener_firma_configuracion(self) -> str:
+        """
+        Devuelve una firma de todo lo que determina el texto extraído por este procesador (tipo, versión
+        y, en las subclases que lo necesiten, parámetros como el idioma del OCR). Se usa como parte de
+        la clave de la caché de texto extraído.
+        """
+        return f"{type(self).__name__}:{self.VERSION_PROCESADOR}"
+
     def extraer_texto_de_archivo(self, ruta_archivo_entrada: Path) -> str: # Parámetro renombrado
         """
         Método abstracto para extraer contenido textual de un archivo.
@@ -81,6 +154,41 @@ class ProcesadorArchivoInterfaz:
         registrador.error(mensaje_error_no_implementado)
         raise NotImplementedError(mensaje_error_no_implementado)
 
+    def iterar_bloques_de_archivo(self, ruta_archivo_entrada: Path) -> Iterator[BloqueTextoExtraido]:
+        """
+        Extrae el contenido del archivo en flujo, como una secuencia de bloques (páginas, diapositivas,
+        párrafos...) con su posición, sin construir el texto completo en memoria. Es la alternativa a
+        `extraer_texto_de_archivo` para documentos muy grandes.
+
+        Por defecto produce un único bloque con el texto completo; las subclases que pueden leer el
+        archivo por partes sobrescriben este método.
+
+        Raises:
+            ErrorProcesamientoArchivo: Si ocurre un error durante la extracción.
+        """
+        texto_completo_extraido = self.extraer_texto_de_archivo(ruta_archivo_entrada)
+        if texto_completo_extraido and texto_completo_extraido.strip():
+            yield BloqueTextoExtraido(texto_completo_extraido, "documento", 1)
+
+    def extraer_markdown_de_archivo(self, ruta_archivo_entrada: Path) -> Optional[str]:
+        """
+        Renderiza el archivo directamente a Markdown usando su estructura nativa
+        (estilos de encabezado, títulos de diapositiva, etc.), sin pasar por un LLM.
+        Por defecto los procesadores no tienen estructura nativa y devuelven None;
+        las subclases que sí la tienen sobrescriben este método.
+
+        Args:
+            ruta_archivo_entrada: Objeto Path apuntando al archivo a procesar.
+
+        Returns:
+            El Markdown generado, o None si el archivo no tiene estructura suficiente
+            para renderizarlo de forma determinista (el llamador debe usar el texto plano).
+
+        Raises:
+            ErrorProcesamientoArchivo: Si ocurre un error durante la lectura del archivo.
+        """
+        return None
+
     def puede_procesar_extension(self, ruta_archivo_entrada: Path) -> bool: # Parámetro renombrado
         """
         Verifica si este procesador es capaz de manejar la extensión del archivo proporcionado.
@@ -102,33 +210,148 @@ class ProcesadorArchivoInterfaz:
 class ProcesadorArchivosTextoPlano(ProcesadorArchivoInterfaz):
     """Procesador especializado para archivos de texto plano (ej. .txt, .log, .csv)."""
     EXTENSIONES_ARCHIVOS_SOPORTADAS = [".txt", ".text", ".log", ".csv", ".tsv"] # Ampliada lista de extensiones comunes
+    VERSION_PROCESADOR = "2" # 2: detección de codificación por BOM / UTF-8 estricto / detector estadístico
+
+    # Marcas de orden de bytes (BOM) reconocidas y la codificación que indican.
+    # Las de UTF-32 van primero porque la BOM de UTF-32 LE empieza con la de UTF-16 LE.
+    MARCAS_ORDEN_BYTES = [
+        (codecs.BOM_UTF32_LE, "utf-32"),
+        (codecs.BOM_UTF32_BE, "utf-32"),
+        (codecs.BOM_UTF8, "utf-8-sig"),
+        (codecs.BOM_UTF16_LE, "utf-16"),
+        (codecs.BOM_UTF16_BE, "utf-16"),
+    ]
+    # Bytes que se pasan al detector estadístico cuando el archivo no es UTF-8 válido.
+    TAMANO_MUESTRA_DETECCION_BYTES = 64 * 1024
+    # Confianza mínima del detector estadístico para aceptar su estimación (por debajo se asume cp1252).
+    CONFIANZA_MINIMA_DETECCION = 0.2
+    # A partir de este tamaño el archivo se mapea en memoria en lugar de copiarse a un buffer.
+    UMBRAL_LECTURA_MAPEADA_BYTES = 8 * 1024 * 1024
+
+    @classmethod
+    def _detectar_codificacion_por_bom(cls, bytes_iniciales: bytes) -> Optional[str]:
+        """Devuelve la codificación indicada por la BOM al inicio del contenido, o None si no tiene BOM."""
+        for marca_orden_bytes, codificacion_marca in cls.MARCAS_ORDEN_BYTES:
+            if bytes_iniciales.startswith(marca_orden_bytes):
+                return codificacion_marca
+        return None
+
+    @classmethod
+    def _detectar_codificacion_de_muestra(cls, muestra_bytes: bytes) -> str:
+        """
+        Estima la codificación de una muestra que no es UTF-8 válido con el detector estadístico
+        (chardet). Sin detector, o si su confianza es baja, se asume cp1252 (superconjunto práctico
+        de latin-1 en documentos de oficina).
+        """
+        if chardet is not None and muestra_bytes:
+            resultado_deteccion = chardet.detect(muestra_bytes)
+            codificacion_detectada = resultado_deteccion.get("encoding")
+            confianza_deteccion = resultado_deteccion.get("confidence") or 0.0
+            if (codificacion_detectada and confianza_deteccion >= cls.CONFIANZA_MINIMA_DETECCION
+                    and codificacion_detectada.lower().replace("_", "-") not in ("ascii", "utf-8")):
+                try:
+                    return codecs.lookup(codificacion_detectada).name
+                except LookupError:
+                    pass
+        return "cp1252"
+
+    @classmethod
+    def _decodificar_contenido(cls, contenido_bytes) -> Tuple[str, str]:
+        """
+        Decodifica el contenido completo de un archivo (bytes o mmap) con una sola pasada en el caso común:
+        BOM si la hay; si no, UTF-8 estricto sobre el buffer; y, si falla, la codificación estimada por el
+        detector estadístico sobre una muestra (el inicio del archivo más la zona del primer byte inválido).
+
+        Returns:
+            Una tupla (texto decodificado, codificación usada).
+        """
+        codificacion_bom = cls._detectar_codificacion_por_bom(bytes(contenido_bytes[:4]))
+        if codificacion_bom:
+            return str(contenido_bytes, codificacion_bom, "replace"), codificacion_bom
+        try:
+            return str(contenido_bytes, "utf-8"), "utf-8"
+        except UnicodeDecodeError as e_no_utf8:
+            posicion_byte_invalido = e_no_utf8.start
+
+        mitad_muestra = cls.TAMANO_MUESTRA_DETECCION_BYTES // 2
+        muestra_deteccion = bytes(contenido_bytes[:mitad_muestra])
+        if posicion_byte_invalido >= mitad_muestra:
+            muestra_deteccion += bytes(contenido_bytes[posicion_byte_invalido:posicion_byte_invalido + mitad_muestra])
+        codificacion_estimada = cls._detectar_codificacion_de_muestra(muestra_deteccion)
+        for codificacion_candidata in (codificacion_estimada, "cp1252"):
+            try:
+                return str(contenido_bytes, codificacion_candidata), codificacion_candidata
+            except (UnicodeDecodeError, LookupError):
+                continue
+        return str(contenido_bytes, "latin-1"), "latin-1" # latin-1 asigna un carácter a cada byte: nunca falla
 
     def extraer_texto_de_archivo(self, ruta_archivo_entrada: Path) -> str:
         registrador.info(f"Intentando extraer texto del archivo de texto plano: '{ruta_archivo_entrada}'.")
-        # Lista de codificaciones comunes a intentar, en orden de probabilidad o preferencia.
-        codificaciones_comunes_a_intentar = ["utf-8", "latin-1", "iso-8859-1", "cp1252"]
-
-        for codificacion_prueba in codificaciones_comunes_a_intentar:
+        try:
+            with open(ruta_archivo_entrada, "rb") as archivo_binario:
+                tamano_archivo_bytes = os.fstat(archivo_binario.fileno()).st_size
+                if tamano_archivo_bytes == 0:
+                    return ""
+                if tamano_archivo_bytes >= self.UMBRAL_LECTURA_MAPEADA_BYTES:
+                    # Archivo grande: se decodifica directamente desde el mapeo, sin copiar sus bytes al heap.
+                    with mmap.mmap(archivo_binario.fileno(), 0, access=mmap.ACCESS_READ) as contenido_mapeado:
+                        texto_extraido_del_archivo, codificacion_usada = self._decodificar_contenido(contenido_mapeado)
+                else:
+                    texto_extraido_del_archivo, codificacion_usada = self._decodificar_contenido(archivo_binario.read())
+        except (IOError, ValueError) as e_error_io: # ValueError: el mapeo en memoria no es posible
+            mensaje_error_io_especifico = f"Error de E/S al leer el archivo de texto '{ruta_archivo_entrada}': {e_error_io}"
+            registrador.error(mensaje_error_io_especifico)
+            raise ErrorProcesamientoArchivo(mensaje_error_io_especifico, e_error_io, ruta_archivo=ruta_archivo_entrada) from e_error_io
+        registrador.info(f"Texto extraído de '{ruta_archivo_entrada}' utilizando la codificación '{codificacion_usada}'.")
+        return texto_extraido_del_archivo
+
+    # Tamaño aproximado (en caracteres) de cada bloque de líneas producido por la extracción en flujo.
+    TAMANO_BLOQUE_LINEAS_CARACTERES = 64 * 1024
+
+    @classmethod
+    def _detectar_codificacion_en_flujo(cls, ruta_archivo_entrada: Path) -> str:
+        """
+        Determina la codificación del archivo sin cargarlo completo: BOM si la hay; si no, valida UTF-8
+        de forma incremental por bloques y, si falla, estima la codificación sobre una muestra.
+        """
+        decodificador_utf8 = codecs.getincrementaldecoder("utf-8")(errors="strict")
+        with open(ruta_archivo_entrada, "rb") as archivo_binario:
+            muestra_inicial = archivo_binario.read(cls.TAMANO_MUESTRA_DETECCION_BYTES)
+            codificacion_bom = cls._detectar_codificacion_por_bom(muestra_inicial)
+            if codificacion_bom:
+                return codificacion_bom
+            bloque_bytes = muestra_inicial
             try:
-                with open(ruta_archivo_entrada, "r", encoding=codificacion_prueba) as archivo_abierto:
-                    texto_extraido_del_archivo = archivo_abierto.read()
-                registrador.info(f"Texto extraído de '{ruta_archivo_entrada}' utilizando la codificación '{codificacion_prueba}'.")
-                return texto_extraido_del_archivo
-            except UnicodeDecodeError: # Error específico al intentar decodificar con una codificación incorrecta
-                registrador.debug(f"Falló la decodificación del archivo '{ruta_archivo_entrada}' con la codificación '{codificacion_prueba}'. Intentando siguiente codificación.")
-                continue # Probar la siguiente codificación en la lista
-            except IOError as e_error_io: # Errores de lectura/escritura del archivo
-                mensaje_error_io_especifico = f"Error de E/S al leer el archivo de texto '{ruta_archivo_entrada}' con codificación '{codificacion_prueba}': {e_error_io}"
-                registrador.error(mensaje_error_io_especifico)
-                raise ErrorProcesamientoArchivo(mensaje_error_io_especifico, e_error_io, ruta_archivo=ruta_archivo_entrada) from e_error_io
-            except Exception as e_error_inesperado: # Otros errores no previstos
-                registrador.warning(f"Error inesperado leyendo '{ruta_archivo_entrada}' con '{codificacion_prueba}': {e_error_inesperado}. Se intentará con otra codificación si es posible.")
-                continue # Continuar con la siguiente codificación por si acaso
-
-        # Si todas las codificaciones fallan
-        mensaje_error_extraccion_final = f"No se pudo extraer texto del archivo '{ruta_archivo_entrada}' después de intentar con las codificaciones: {', '.join(codificaciones_comunes_a_intentar)}."
-        registrador.error(mensaje_error_extraccion_final)
-        raise ErrorProcesamientoArchivo(mensaje_error_extraccion_final, ruta_archivo=ruta_archivo_entrada)
+                while bloque_bytes:
+                    decodificador_utf8.decode(bloque_bytes)
+                    bloque_bytes = archivo_binario.read(1024 * 1024)
+                decodificador_utf8.decode(b"", final=True)
+                return "utf-8"
+            except UnicodeDecodeError: # Se muestrean el inicio del archivo y el bloque donde falló UTF-8
+                muestra_deteccion = muestra_inicial if bloque_bytes is muestra_inicial else muestra_inicial + bloque_bytes[:cls.TAMANO_MUESTRA_DETECCION_BYTES]
+                return cls._detectar_codificacion_de_muestra(muestra_deteccion)
+
+    def iterar_bloques_de_archivo(self, ruta_archivo_entrada: Path) -> Iterator[BloqueTextoExtraido]:
+        """Lee el archivo línea a línea y produce bloques de líneas de ~64 KB con el número de la línea inicial."""
+        try:
+            codificacion_detectada = self._detectar_codificacion_en_flujo(ruta_archivo_entrada)
+            registrador.info(f"Extrayendo en flujo el archivo de texto plano '{ruta_archivo_entrada}' (codificación '{codificacion_detectada}').")
+            with open(ruta_archivo_entrada, "r", encoding=codificacion_detectada, errors="replace") as archivo_abierto:
+                lineas_bloque_actual: List[str] = []
+                caracteres_bloque_actual = 0
+                linea_inicial_bloque = 1
+                for numero_linea, linea_actual in enumerate(archivo_abierto, start=1):
+                    lineas_bloque_actual.append(linea_actual)
+                    caracteres_bloque_actual += len(linea_actual)
+                    if caracteres_bloque_actual >= self.TAMANO_BLOQUE_LINEAS_CARACTERES:
+                        yield BloqueTextoExtraido("".join(lineas_bloque_actual), "lineas", linea_inicial_bloque)
+                        lineas_bloque_actual, caracteres_bloque_actual, linea_inicial_bloque = [], 0, numero_linea + 1
+                if lineas_bloque_actual:
+                    yield BloqueTextoExtraido("".join(lineas_bloque_actual), "lineas", linea_inicial_bloque)
+        except IOError as e_error_io:
+            mensaje_error_io_flujo = f"Error de E/S al leer en flujo el archivo de texto '{ruta_archivo_entrada}': {e_error_io}"
+            registrador.error(mensaje_error_io_flujo)
+            raise ErrorProcesamientoArchivo(mensaje_error_io_flujo, e_error_io, ruta_archivo=ruta_archivo_entrada) from e_error_io
 
 
 class ProcesadorArchivosMarkdown(ProcesadorArchivoInterfaz):
@@ -138,8 +361,9 @@ class ProcesadorArchivosMarkdown(ProcesadorArchivoInterfaz):
     def extraer_texto_de_archivo(self, ruta_archivo_entrada: Path) -> str:
         registrador.info(f"Extrayendo texto del archivo Markdown: '{ruta_archivo_entrada}'.")
         try:
-            # Los archivos Markdown suelen estar codificados en UTF-8.
-            with open(ruta_archivo_entrada, "r", encoding="utf-8") as archivo_md:
+            # Los archivos Markdown suelen estar codificados en UTF-8; se descargan tal cual, sin recodificar,
+            # así que los bytes inválidos se reemplazan en lugar de abortar la lectura.
+            with open(ruta_archivo_entrada, "r", encoding="utf-8", errors="replace") as archivo_md:
                 texto_extraido_md = archivo_md.read()
             registrador.info(f"Texto extraído correctamente del archivo Markdown '{ruta_archivo_entrada}'.")
             return texto_extraido_md
@@ -152,70 +376,432 @@ class ProcesadorArchivosMarkdown(ProcesadorArchivoInterfaz):
             registrador.exception(mensaje_error_inesperado_md) # Usar exception para incluir traceback completo en logs
             raise ErrorProcesamientoArchivo(mensaje_error_inesperado_md, e_error_inesperado_md, ruta_archivo=ruta_archivo_entrada) from e_error_inesperado_md
 
+    def extraer_markdown_de_archivo(self, ruta_archivo_entrada: Path) -> Optional[str]:
+        """El archivo ya es Markdown: se devuelve tal cual (passthrough), sin formateo por LLM."""
+        return self.extraer_texto_de_archivo(ruta_archivo_entrada)
+
+
+def _medir_memoria_residente_mb() -> float:
+    """
+    Devuelve la memoria residente (RSS) actual del proceso en MB, leyendo /proc/self/statm en Linux.
+    En otros sistemas recurre al pico histórico del proceso (ru_maxrss), que es una cota superior.
+    """
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as archivo_statm:
+            paginas_residentes = int(archivo_statm.read().split()[1])
+        return paginas_residentes * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pico_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss está en KB en Linux y en bytes en macOS.
+        return pico_rss / (1024 * 1024) if os.uname().sysname == "Darwin" else pico_rss / 1024
+
+
+def _inicializar_proceso_trabajador_ocr() -> None:
+    """
+    Inicializador de los procesos del pool de OCR: limita Tesseract a un hilo OpenMP por proceso,
+    ya que el paralelismo lo aportan los propios procesos (evita sobresuscribir los núcleos).
+    """
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def _obtener_numero_nucleos_disponibles() -> int:
+    """Número de núcleos que puede usar este proceso (respeta la afinidad de CPU de contenedores cuando está disponible)."""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError: # sched_getaffinity no existe en macOS/Windows
+        return max(1, os.cpu_count() or 1)
+
+
+def _aplicar_ocr_a_ventana_pdf(
+    ruta_archivo_pdf: str, primera_pagina: int, ultima_pagina: int, resolucion_dpi: int, lenguaje_ocr: str,
+    instante_limite: Optional[float] = None,
+) -> Tuple[Dict[int, str], float, int]:
+    """
+    Rasteriza una ventana de páginas consecutivas del PDF y les aplica OCR, liberando cada imagen en
+    cuanto se termina con ella. Es una función de módulo (y no un método) para poder ejecutarse en
+    los procesos de un ProcessPoolExecutor.
+
+    Con `instante_limite` (marca de tiempo `time.time()`, válida también en otros procesos) el rasterizado
+    y cada llamada a Tesseract reciben como timeout el tiempo que queda hasta el plazo: al agotarse, el
+    subproceso en curso ('pdftoppm' o 'tesseract') se mata y las páginas restantes de la ventana se omiten.
+
+    Returns:
+        Tupla (número_de_página -> texto OCR de las páginas con texto, memoria residente en MB tras rasterizar,
+        número de páginas que no completaron el OCR por plazo agotado o error).
+    """
+    def _segundos_restantes(maximo_segundos: float) -> float:
+        return maximo_segundos if instante_limite is None else min(maximo_segundos, instante_limite - time.time())
+
+    textos_ocr_por_pagina: Dict[int, str] = {}
+    total_paginas_ventana = ultima_pagina - primera_pagina + 1
+    segundos_rasterizado = _segundos_restantes(60) # Timeout para la conversión
+    if segundos_rasterizado <= 0:
+        return textos_ocr_por_pagina, _medir_memoria_residente_mb(), total_paginas_ventana
+    registrador.debug(f"Convirtiendo páginas {primera_pagina}-{ultima_pagina} del PDF '{ruta_archivo_pdf}' a imágenes para OCR ({resolucion_dpi} DPI)...")
+    try:
+        imagenes_ventana = convert_from_path(
+            ruta_archivo_pdf, dpi=resolucion_dpi,
+            first_page=primera_pagina, last_page=ultima_pagina, timeout=segundos_rasterizado
+        )
+    except Exception:
+        if instante_limite is not None and time.time() >= instante_limite: # 'pdftoppm' interrumpido por el plazo
+            return textos_ocr_por_pagina, _medir_memoria_residente_mb(), total_paginas_ventana
+        raise
+    memoria_residente_mb = _medir_memoria_residente_mb()
+    paginas_sin_completar = total_paginas_ventana - len(imagenes_ventana)
+    for numero_pagina, imagen_pagina_pdf_actual in zip(range(primera_pagina, ultima_pagina + 1), imagenes_ventana):
+        try:
+            segundos_ocr_pagina = _segundos_restantes(30) # Timeout para OCR por página
+            if segundos_ocr_pagina <= 0: # Un timeout de 0 desactivaría el límite en pytesseract
+                paginas_sin_completar += 1
+                continue
+            registrador.debug(f"Procesando OCR para página {numero_pagina} del PDF '{ruta_archivo_pdf}'...")
+            # Extraer texto de la imagen de la página usando Tesseract OCR
+            texto_extraido_pagina_actual = pytesseract.image_to_string(imagen_pagina_pdf_actual, lang=lenguaje_ocr, timeout=segundos_ocr_pagina)
+            if texto_extraido_pagina_actual and texto_extraido_pagina_actual.strip():
+                textos_ocr_por_pagina[numero_pagina] = texto_extraido_pagina_actual.strip()
+                registrador.debug(f"Texto extraído por OCR de página {numero_pagina} (longitud: {len(textos_ocr_por_pagina[numero_pagina])}).")
+            else:
+                registrador.debug(f"No se extrajo texto de la página {numero_pagina} del PDF '{ruta_archivo_pdf}' (página posiblemente vacía o sin texto detectable por OCR).")
+        except pytesseract.TesseractError as error_tesseract_ocr: # Errores específicos de Tesseract
+            paginas_sin_completar += 1
+            registrador.warning(f"Error de Tesseract OCR procesando página {numero_pagina} del PDF '{ruta_archivo_pdf}': {error_tesseract_ocr}. Se omitirá esta página.")
+        except Exception as e_procesamiento_pagina_pdf: # Otros errores al procesar una imagen de página (incluye el timeout de Tesseract)
+            paginas_sin_completar += 1
+            registrador.warning(f"Error inesperado procesando la imagen de la página {numero_pagina} del PDF '{ruta_archivo_pdf}': {e_procesamiento_pagina_pdf}. Se omitirá esta página.")
+        finally:
+            imagen_pagina_pdf_actual.close() # Liberar el búfer de la imagen en cuanto se termina con la página
+    imagenes_ventana.clear()
+    return textos_ocr_por_pagina, memoria_residente_mb, paginas_sin_completar
+
 
 class ProcesadorArchivosPDF(ProcesadorArchivoInterfaz):
     """
-    Procesador especializado para archivos PDF. Intenta extraer texto directamente si es posible (no implementado aquí),
-    y como fallback utiliza OCR (Tesseract) convirtiendo las páginas del PDF a imágenes.
+    Procesador especializado para archivos PDF. Primero extrae la capa de texto embebida de cada página
+    (PDFs generados digitalmente) con pypdfium2 y sólo aplica OCR (Tesseract), convirtiendo la página
+    a imagen, en las páginas que no tienen una capa de texto utilizable (páginas escaneadas).
     """
     EXTENSIONES_ARCHIVOS_SOPORTADAS = [".pdf"]
-
-    def __init__(self, lenguaje_ocr_predeterminado: str = "spa+eng"): # Español e Inglés por defecto para OCR
+    VERSION_PROCESADOR = "2" # Capa de texto primero, OCR por página como respaldo
+
+    def __init__(
+        self,
+        lenguaje_ocr_predeterminado: str = "spa+eng", # Español e Inglés por defecto para OCR
+        minimo_caracteres_capa_texto: Optional[int] = None,
+        resolucion_dpi_rasterizado: Optional[int] = None,
+        paginas_por_ventana_rasterizado: Optional[int] = None,
+        trabajadores_ocr: Optional[int] = None,
+        limite_segundos_ocr_documento: Optional[int] = None,
+    ):
+        if pdfium is None:
+            registrador.warning("Dependencia 'pypdfium2' no está instalada. No se podrá aprovechar la capa de texto de los PDF y todas las páginas se procesarán con OCR.")
         if pytesseract is None or convert_from_path is None:
             mensaje_advertencia_dependencia = "Dependencias 'pytesseract' y/o 'pdf2image' no están instaladas. El procesamiento de PDF con OCR no estará completamente funcional."
             registrador.warning(mensaje_advertencia_dependencia)
             # No se lanza ErrorDependenciaFaltante aquí para permitir que la aplicación inicie.
             # El error se lanzará si se intenta usar `extraer_texto_de_archivo`.
         self.lenguaje_ocr = lenguaje_ocr_predeterminado
-        registrador.debug(f"ProcesadorArchivosPDF inicializado. Lenguaje OCR predeterminado: '{self.lenguaje_ocr}'.")
+        self.minimo_caracteres_capa_texto = (
+            minimo_caracteres_capa_texto if minimo_caracteres_capa_texto is not None
+            else configuracion_global.procesamiento.pdf_minimo_caracteres_capa_texto
+        )
+        self.resolucion_dpi_rasterizado = resolucion_dpi_rasterizado or configuracion_global.procesamiento.pdf_resolucion_dpi_rasterizado
+        # Número máximo de páginas rasterizadas a la vez: acota la memoria usada por las imágenes de un documento largo.
+        self.paginas_por_ventana_rasterizado = max(1, paginas_por_ventana_rasterizado or configuracion_global.procesamiento.pdf_paginas_por_ventana_rasterizado)
+        # Procesos para el OCR en paralelo (0 = tantos como núcleos disponibles; 1 = OCR secuencial en el proceso actual).
+        trabajadores_ocr_configurados = trabajadores_ocr if trabajadores_ocr is not None else configuracion_global.procesamiento.pdf_trabajadores_ocr
+        self.trabajadores_ocr = trabajadores_ocr_configurados if trabajadores_ocr_configurados > 0 else _obtener_numero_nucleos_disponibles()
+        self.limite_segundos_ocr_documento = limite_segundos_ocr_documento or configuracion_global.procesamiento.pdf_limite_segundos_ocr_documento
+        registrador.debug(
+            f"ProcesadorArchivosPDF inicializado. Lenguaje OCR predeterminado: '{self.lenguaje_ocr}', mínimo de caracteres para capa de texto utilizable: "
+            f"{self.minimo_caracteres_capa_texto}, DPI de rasterizado: {self.resolucion_dpi_rasterizado}, páginas por ventana: {self.paginas_por_ventana_rasterizado}, "
+            f"trabajadores OCR: {self.trabajadores_ocr}, plazo OCR por documento: {self.limite_segundos_ocr_documento} s."
+        )
+
+    def obtener_firma_configuracion(self) -> str:
+        """Incluye el idioma del OCR, el umbral de capa de texto y los DPI, que cambian el texto extraído."""
+        return (
+            f"{super().obtener_firma_configuracion()}:ocr={self.lenguaje_ocr}:"
+            f"min_capa={self.minimo_caracteres_capa_texto}:dpi={self.resolucion_dpi_rasterizado}"
+        )
+
+    def _capa_texto_es_utilizable(self, texto_capa_pagina: str) -> bool:
+        """
+        Decide si la capa de texto de una página es utilizable midiendo su densidad: debe tener un mínimo
+        de caracteres visibles y una proporción razonable de caracteres alfanuméricos (las capas de texto
+        corruptas suelen contener glifos sin mapear, caracteres de reemplazo o secuencias '(cid:NN)').
+        """
+        caracteres_visibles = [caracter for caracter in texto_capa_pagina if not caracter.isspace()]
+        if len(caracteres_visibles) < self.minimo_caracteres_capa_texto:
+            return False
+        proporcion_alfanumerica = sum(1 for caracter in caracteres_visibles if caracter.isalnum()) / len(caracteres_visibles)
+        proporcion_reemplazo = caracteres_visibles.count("\ufffd") / len(caracteres_visibles)
+        return proporcion_alfanumerica >= 0.5 and proporcion_reemplazo < 0.05 and "(cid:" not in texto_capa_pagina
+
+    def _aplicar_ocr_a_paginas(self, ruta_archivo_entrada: Path, numeros_paginas_para_ocr: List[int]) -> Tuple[Dict[int, str], float, int]:
+        """
+        Aplica OCR a las páginas indicadas (numeradas desde 1). Las páginas se rasterizan por ventanas de
+        páginas consecutivas (first_page/last_page) de como máximo `paginas_por_ventana_rasterizado` páginas,
+        y las imágenes de cada ventana se liberan en cuanto se terminan de procesar, de modo que la memoria
+        usada no crece con el número de páginas del documento.
+
+        Si hay más de un trabajador OCR configurado y más de una ventana, las ventanas se reparten entre
+        procesos (`_aplicar_ocr_a_paginas_en_paralelo`). En ambos modos se respeta el plazo máximo por
+        documento: los subprocesos de rasterizado y de Tesseract reciben como timeout el tiempo restante,
+        de modo que al agotarse el plazo se matan y las páginas pendientes se omiten con una advertencia.
+
+        Devuelve una tupla con el diccionario número_de_página -> texto OCR (sólo las páginas con texto),
+        la memoria residente máxima (MB) observada tras rasterizar cada ventana y el número de páginas
+        que no completaron el OCR (el texto del documento está incompleto si es mayor que 0).
+        """
+        instante_limite = time.time() + self.limite_segundos_ocr_documento
+        numero_trabajadores = min(self.trabajadores_ocr, len(numeros_paginas_para_ocr))
+        if numero_trabajadores > 1:
+            # Ventanas más pequeñas para repartir la carga entre todos los trabajadores.
+            paginas_por_trabajador = -(-len(numeros_paginas_para_ocr) // numero_trabajadores) # División con redondeo hacia arriba
+            ventanas_paginas = self._calcular_ventanas_paginas(numeros_paginas_para_ocr, min(self.paginas_por_ventana_rasterizado, paginas_por_trabajador))
+            if len(ventanas_paginas) > 1:
+                return self._aplicar_ocr_a_paginas_en_paralelo(ruta_archivo_entrada, ventanas_paginas, numero_trabajadores, instante_limite)
+
+        textos_ocr_por_pagina: Dict[int, str] = {}
+        paginas_sin_completar = 0
+        pico_memoria_residente_mb = _medir_memoria_residente_mb()
+        for primera_pagina, ultima_pagina in self._calcular_ventanas_paginas(numeros_paginas_para_ocr):
+            textos_ventana, pico_ventana_mb, paginas_sin_completar_ventana = _aplicar_ocr_a_ventana_pdf(
+                str(ruta_archivo_entrada), primera_pagina, ultima_pagina, self.resolucion_dpi_rasterizado, self.lenguaje_ocr, instante_limite
+            )
+            textos_ocr_por_pagina.update(textos_ventana)
+            paginas_sin_completar += paginas_sin_completar_ventana
+            pico_memoria_residente_mb = max(pico_memoria_residente_mb, pico_ventana_mb)
+        if time.time() >= instante_limite and paginas_sin_completar:
+            registrador.warning(f"Se agotó el plazo de {self.limite_segundos_ocr_documento} s para el OCR del PDF '{ruta_archivo_entrada}'. {paginas_sin_completar} páginas quedaron sin OCR.")
+        return textos_ocr_por_pagina, pico_memoria_residente_mb, paginas_sin_completar
+
+    def _aplicar_ocr_a_paginas_en_paralelo(
+        self, ruta_archivo_entrada: Path, ventanas_paginas: List[List[int]], numero_trabajadores: int, instante_limite: float
+    ) -> Tuple[Dict[int, str], float, int]:
+        """
+        Reparte las ventanas de páginas entre un ProcessPoolExecutor (Tesseract es monohilo por llamada).
+        Cada proceso limita los hilos OpenMP de Tesseract a 1 (OMP_THREAD_LIMIT) para no sobresuscribir
+        los núcleos. El orden de las páginas se preserva porque el resultado se indexa por número de página.
+        La memoria residente reportada es el máximo observado en cualquiera de los procesos trabajadores.
 
+        Al agotarse el plazo, las ventanas que no empezaron se cancelan y las que están en curso terminan
+        por sí solas: cada trabajador aplica el mismo `instante_limite` como timeout de sus subprocesos.
+        """
+        registrador.info(f"OCR en paralelo del PDF '{ruta_archivo_entrada}': {len(ventanas_paginas)} ventanas de páginas repartidas en {numero_trabajadores} procesos.")
+        textos_ocr_por_pagina: Dict[int, str] = {}
+        paginas_sin_completar = 0
+        pico_memoria_residente_mb = _medir_memoria_residente_mb()
+        ejecutor_ocr = ProcessPoolExecutor(max_workers=numero_trabajadores, initializer=_inicializar_proceso_trabajador_ocr)
+        futuros_por_ventana = {
+            ejecutor_ocr.submit(
+                _aplicar_ocr_a_ventana_pdf, str(ruta_archivo_entrada), primera_pagina, ultima_pagina, self.resolucion_dpi_rasterizado, self.lenguaje_ocr, instante_limite
+            ): (primera_pagina, ultima_pagina)
+            for primera_pagina, ultima_pagina in ventanas_paginas
+        }
+        try:
+            # Margen de unos segundos sobre el plazo para recoger las ventanas que los trabajadores cortan al agotarse.
+            for futuro_ventana in as_completed(futuros_por_ventana, timeout=max(0.0, instante_limite - time.time()) + 5):
+                primera_pagina, ultima_pagina = futuros_por_ventana[futuro_ventana]
+                try:
+                    textos_ventana, pico_ventana_mb, paginas_sin_completar_ventana = futuro_ventana.result()
+                except Exception as e_ventana_ocr: # Un fallo en una ventana no invalida el resto del documento
+                    registrador.warning(f"Falló el OCR de las páginas {primera_pagina}-{ultima_pagina} del PDF '{ruta_archivo_entrada}': {e_ventana_ocr}. Se omitirán esas páginas.")
+                    paginas_sin_completar += ultima_pagina - primera_pagina + 1
+                    continue
+                textos_ocr_por_pagina.update(textos_ventana)
+                paginas_sin_completar += paginas_sin_completar_ventana
+                pico_memoria_residente_mb = max(pico_memoria_residente_mb, pico_ventana_mb)
+        except FuturesTimeoutError:
+            ventanas_pendientes = sorted(ventana for futuro, ventana in futuros_por_ventana.items() if not futuro.done())
+            paginas_sin_completar += sum(ultima_pagina - primera_pagina + 1 for primera_pagina, ultima_pagina in ventanas_pendientes)
+            registrador.warning(f"Se agotó el plazo de {self.limite_segundos_ocr_documento} s para el OCR del PDF '{ruta_archivo_entrada}'. Se omiten las ventanas de páginas pendientes: {ventanas_pendientes}.")
+        finally:
+            # Las ventanas que no empezaron se cancelan; las que estén en curso ya no pueden pasar del plazo.
+            ejecutor_ocr.shutdown(wait=False, cancel_futures=True)
+        return textos_ocr_por_pagina, pico_memoria_residente_mb, paginas_sin_completar
+
+    def _calcular_ventanas_paginas(self, numeros_paginas: List[int], tamano_maximo_ventana: Optional[int] = None) -> List[List[int]]:
+        """
+        Agrupa los números de página en ventanas [primera, última] de páginas consecutivas, de como máximo
+        `tamano_maximo_ventana` páginas cada una (por defecto `paginas_por_ventana_rasterizado`).
+        P. ej. con ventanas de 2: [1, 2, 3, 7, 8] -> [[1, 2], [3, 3], [7, 8]].
+        """
+        tamano_maximo_ventana = max(1, tamano_maximo_ventana or self.paginas_por_ventana_rasterizado)
+        ventanas_paginas: List[List[int]] = []
+        for numero_pagina in sorted(numeros_paginas):
+            if ventanas_paginas and numero_pagina == ventanas_paginas[-1][1] + 1 and \
+               ventanas_paginas[-1][1] - ventanas_paginas[-1][0] + 1 < tamano_maximo_ventana:
+                ventanas_paginas[-1][1] = numero_pagina
+            else:
+                ventanas_paginas.append([numero_pagina, numero_pagina])
+        return ventanas_paginas
 
     def extraer_texto_de_archivo(self, ruta_archivo_entrada: Path) -> str:
-        if pytesseract is None or convert_from_path is None:
+        ocr_disponible = pytesseract is not None and convert_from_path is not None
+        if pdfium is None and not ocr_disponible:
             # Comprobación de dependencias en tiempo de ejecución del método.
-            mensaje_error_dependencia_pdf = "Faltan dependencias cruciales ('pytesseract' y/o 'pdf2image') para procesar archivos PDF."
+            mensaje_error_dependencia_pdf = "Faltan dependencias cruciales ('pypdfium2', o 'pytesseract' y 'pdf2image') para procesar archivos PDF."
             registrador.error(mensaje_error_dependencia_pdf)
             raise ErrorDependenciaFaltante(mensaje_error_dependencia_pdf, ruta_archivo=ruta_archivo_entrada)
 
-        registrador.info(f"Iniciando extracción de texto del PDF: '{ruta_archivo_entrada}' mediante OCR.")
-        lista_textos_por_pagina: List[str] = []
+        registrador.info(f"Iniciando extracción de texto del PDF: '{ruta_archivo_entrada}' (capa de texto primero, OCR por página como respaldo).")
+        pico_memoria_residente_mb = _medir_memoria_residente_mb()
         try:
-            # Convertir páginas del PDF a una lista de imágenes (objetos PIL.Image)
-            registrador.debug(f"Convirtiendo PDF '{ruta_archivo_entrada}' a imágenes para OCR...")
-            lista_imagenes_de_paginas_pdf = convert_from_path(ruta_archivo_entrada, timeout=60) # Timeout para la conversión
-
-            if not lista_imagenes_de_paginas_pdf:
-                registrador.warning(f"No se pudieron convertir páginas a imágenes desde el PDF '{ruta_archivo_entrada}'. El PDF podría estar vacío, corrupto o protegido contra extracción.")
-                return "" # Devolver string vacío si no se obtuvieron imágenes
-
-            registrador.info(f"PDF '{ruta_archivo_entrada}' convertido a {len(lista_imagenes_de_paginas_pdf)} imágenes. Procediendo con OCR en cada página...")
-            for i, imagen_pagina_pdf_actual in enumerate(lista_imagenes_de_paginas_pdf):
-                try:
-                    registrador.debug(f"Procesando OCR para página {i + 1} del PDF '{ruta_archivo_entrada}'...")
-                    # Extraer texto de la imagen de la página usando Tesseract OCR
-                    texto_extraido_pagina_actual = pytesseract.image_to_string(imagen_pagina_pdf_actual, lang=self.lenguaje_ocr, timeout=30) # Timeout para OCR por página
-                    if texto_extraido_pagina_actual and texto_extraido_pagina_actual.strip():
-                        lista_textos_por_pagina.append(texto_extraido_pagina_actual.strip())
-                        registrador.debug(f"Texto extraído de página {i + 1} (longitud: {len(texto_extraido_pagina_actual.strip())}).")
-                    else:
-                        registrador.debug(f"No se extrajo texto de la página {i + 1} del PDF '{ruta_archivo_entrada}' (página posiblemente vacía o sin texto detectable por OCR).")
-                except pytesseract.TesseractError as error_tesseract_ocr: # Errores específicos de Tesseract
-                    registrador.warning(f"Error de Tesseract OCR procesando página {i + 1} del PDF '{ruta_archivo_entrada}': {error_tesseract_ocr}. Se omitirá esta página.")
-                except Exception as e_procesamiento_pagina_pdf: # Otros errores al procesar una imagen de página
-                    registrador.warning(f"Error inesperado procesando la imagen de la página {i + 1} del PDF '{ruta_archivo_entrada}': {e_procesamiento_pagina_pdf}. Se omitirá esta página.")
-
-            if not lista_textos_por_pagina and lista_imagenes_de_paginas_pdf: # Si se procesaron imágenes pero no se obtuvo texto
-                 registrador.warning(f"No se extrajo texto de ninguna página del PDF '{ruta_archivo_entrada}' mediante OCR. El PDF podría no contener texto legible o el OCR falló consistentemente en todas las páginas.")
-
-            texto_completo_extraido_pdf = "\n\n".join(filter(None, lista_textos_por_pagina)) # Unir textos de páginas, con doble salto de línea como separador
-            registrador.info(f"Extracción de texto del PDF '{ruta_archivo_entrada}' completada. Páginas procesadas: {len(lista_imagenes_de_paginas_pdf)}, fragmentos de texto con contenido: {len(lista_textos_por_pagina)}.")
+            # Sin capa de texto disponible, todas las páginas llegan vacías y se procesan con OCR (comportamiento clásico).
+            textos_capa_por_pagina = [texto_capa for _, texto_capa in self._iterar_capa_texto_por_pagina(ruta_archivo_entrada)]
+
+            total_paginas_pdf = len(textos_capa_por_pagina)
+            if total_paginas_pdf == 0:
+                registrador.warning(f"El PDF '{ruta_archivo_entrada}' no contiene páginas. El PDF podría estar vacío, corrupto o protegido contra extracción.")
+                return "" # Devolver string vacío si no hay páginas
+
+            textos_por_pagina: Dict[int, str] = {}
+            numeros_paginas_para_ocr: List[int] = []
+            for numero_pagina, texto_capa_pagina in enumerate(textos_capa_por_pagina, start=1):
+                if self._capa_texto_es_utilizable(texto_capa_pagina):
+                    textos_por_pagina[numero_pagina] = texto_capa_pagina.strip()
+                else:
+                    numeros_paginas_para_ocr.append(numero_pagina)
+            paginas_con_capa_texto = len(textos_por_pagina)
+            paginas_sin_completar_ocr = 0 # Páginas cuyo OCR no terminó (plazo agotado o error)
+
+            if numeros_paginas_para_ocr:
+                if ocr_disponible:
+                    registrador.info(f"PDF '{ruta_archivo_entrada}': {len(numeros_paginas_para_ocr)} de {total_paginas_pdf} páginas sin capa de texto utilizable. Procediendo con OCR en esas páginas...")
+                    textos_ocr_por_pagina, pico_memoria_ocr_mb, paginas_sin_completar_ocr = self._aplicar_ocr_a_paginas(ruta_archivo_entrada, numeros_paginas_para_ocr)
+                    textos_por_pagina.update(textos_ocr_por_pagina)
+                    pico_memoria_residente_mb = max(pico_memoria_residente_mb, pico_memoria_ocr_mb)
+                elif not textos_por_pagina:
+                    raise ErrorDependenciaFaltante("El PDF no tiene capa de texto utilizable y faltan 'pytesseract' y/o 'pdf2image' para aplicar OCR.", ruta_archivo=ruta_archivo_entrada)
+                else:
+                    registrador.warning(f"PDF '{ruta_archivo_entrada}': {len(numeros_paginas_para_ocr)} páginas sin capa de texto se omitirán porque el OCR no está disponible.")
+            paginas_con_ocr = len(textos_por_pagina) - paginas_con_capa_texto
+
+            if not textos_por_pagina:
+                 registrador.warning(f"No se extrajo texto de ninguna página del PDF '{ruta_archivo_entrada}'. El PDF podría no contener texto legible o el OCR falló consistentemente en todas las páginas.")
+
+            # Unir textos de páginas en su orden original, con doble salto de línea como separador
+            texto_completo_extraido_pdf = "\n\n".join(textos_por_pagina[numero_pagina] for numero_pagina in sorted(textos_por_pagina))
+            registrador.info(
+                f"Extracción de texto del PDF '{ruta_archivo_entrada}' completada. Páginas: {total_paginas_pdf} "
+                f"(capa de texto: {paginas_con_capa_texto}, OCR: {paginas_con_ocr}, sin texto: {total_paginas_pdf - len(textos_por_pagina)}, "
+                f"OCR sin completar: {paginas_sin_completar_ocr}). "
+                f"Memoria residente máxima observada: {max(pico_memoria_residente_mb, _medir_memoria_residente_mb()):.0f} MB."
+            )
+            if paginas_sin_completar_ocr:
+                return TextoExtraidoIncompleto(texto_completo_extraido_pdf)
             return texto_completo_extraido_pdf
 
-        except Exception as e_error_general_pdf: # Captura errores de convert_from_path o cualquier otro no previsto
+        except ErrorProcesamientoArchivo:
+            raise # Incluye ErrorDependenciaFaltante; ya está registrado y tipado
+        except Exception as e_error_general_pdf: # Captura errores de pdf2image/pypdfium2 o cualquier otro no previsto
             mensaje_error_pdf_general = f"No se pudo extraer texto del PDF '{ruta_archivo_entrada}' debido a un error general: {e_error_general_pdf}"
             registrador.exception(mensaje_error_pdf_general) # Loguear con traceback
             raise ErrorProcesamientoArchivo(mensaje_error_pdf_general, e_error_general_pdf, ruta_archivo=ruta_archivo_entrada) from e_error_general_pdf
 
+    def _iterar_capa_texto_por_pagina(self, ruta_archivo_entrada: Path) -> Iterator[Tuple[int, str]]:
+        """
+        Recorre las páginas del PDF de una en una y produce (número_de_página, texto de la capa embebida).
+        Si pypdfium2 no está disponible o no puede abrir el documento, produce todas las páginas con texto
+        vacío (para que se procesen con OCR), obteniendo el número de páginas con pdfinfo.
+        """
+        documento_pdf = None
+        if pdfium is not None:
+            try:
+                documento_pdf = pdfium.PdfDocument(str(ruta_archivo_entrada))
+            except Exception as e_apertura_pdfium:
+                registrador.warning(f"pypdfium2 no pudo abrir el PDF '{ruta_archivo_entrada}': {e_apertura_pdfium}. Se recurrirá al OCR de todas las páginas.")
+        if documento_pdf is None:
+            if pdfinfo_from_path is None:
+                raise ErrorDependenciaFaltante("No se pudo leer la capa de texto del PDF y falta 'pdf2image' para aplicar OCR.", ruta_archivo=ruta_archivo_entrada)
+            total_paginas_pdf = int(pdfinfo_from_path(ruta_archivo_entrada, timeout=60).get("Pages", 0))
+            for numero_pagina in range(1, total_paginas_pdf + 1):
+                yield numero_pagina, ""
+            return
+        try:
+            for indice_pagina in range(len(documento_pdf)):
+                texto_capa_pagina = ""
+                try:
+                    pagina_pdf = documento_pdf[indice_pagina]
+                    pagina_texto_pdf = pagina_pdf.get_textpage()
+                    texto_capa_pagina = pagina_texto_pdf.get_text_range() or ""
+                    pagina_texto_pdf.close()
+                    pagina_pdf.close()
+                except Exception as e_pagina_pdfium:
+                    registrador.debug(f"No se pudo leer la capa de texto de la página {indice_pagina + 1} del PDF '{ruta_archivo_entrada}': {e_pagina_pdfium}. Se aplicará OCR.")
+                yield indice_pagina + 1, texto_capa_pagina
+        finally:
+            documento_pdf.close()
+
+    def iterar_bloques_de_archivo(self, ruta_archivo_entrada: Path) -> Iterator[BloqueTextoExtraido]:
+        """
+        Extrae el PDF en flujo, página a página y en orden. Las páginas con capa de texto utilizable se
+        producen directamente; las que necesitan OCR se acumulan en una ventana de páginas consecutivas
+        (como máximo `paginas_por_ventana_rasterizado`) que se rasteriza y procesa antes de continuar,
+        de modo que en memoria sólo hay una ventana de imágenes y el texto de las páginas pendientes.
+        En este modo el OCR es secuencial (no usa el pool de procesos). Se aplica el mismo plazo de OCR por
+        documento que en la extracción completa: agotado, las páginas restantes sin capa de texto se omiten.
+        """
+        ocr_disponible = pytesseract is not None and convert_from_path is not None
+        registrador.info(f"Extrayendo en flujo el PDF '{ruta_archivo_entrada}' (capa de texto primero, OCR por ventanas como respaldo).")
+        instante_limite = time.time() + self.limite_segundos_ocr_documento
+        paginas_pendientes_ocr: List[int] = []
+        contador_paginas_capa_texto = 0
+        contador_paginas_ocr = 0
+        paginas_sin_completar_ocr = 0 # Páginas cuyo OCR no terminó (plazo agotado o error)
+
+        def _vaciar_paginas_pendientes_ocr() -> Iterator[BloqueTextoExtraido]:
+            nonlocal paginas_sin_completar_ocr
+            if not paginas_pendientes_ocr:
+                return
+            if ocr_disponible and time.time() >= instante_limite: # Plazo agotado: no se rasteriza más
+                paginas_sin_completar_ocr += len(paginas_pendientes_ocr)
+            elif ocr_disponible:
+                textos_ventana, _, paginas_sin_completar_ventana = _aplicar_ocr_a_ventana_pdf(
+                    str(ruta_archivo_entrada), paginas_pendientes_ocr[0], paginas_pendientes_ocr[-1],
+                    self.resolucion_dpi_rasterizado, self.lenguaje_ocr, instante_limite
+                )
+                paginas_sin_completar_ocr += paginas_sin_completar_ventana
+                for numero_pagina_ocr in paginas_pendientes_ocr:
+                    if textos_ventana.get(numero_pagina_ocr):
+                        yield BloqueTextoExtraido(textos_ventana[numero_pagina_ocr], "pagina", numero_pagina_ocr, {"metodo_extraccion": "ocr"})
+            else:
+                registrador.warning(f"PDF '{ruta_archivo_entrada}': páginas {paginas_pendientes_ocr[0]}-{paginas_pendientes_ocr[-1]} sin capa de texto se omitirán porque el OCR no está disponible.")
+            paginas_pendientes_ocr.clear()
+
+        try:
+            for numero_pagina, texto_capa_pagina in self._iterar_capa_texto_por_pagina(ruta_archivo_entrada):
+                if self._capa_texto_es_utilizable(texto_capa_pagina):
+                    # Vaciar antes las páginas pendientes de OCR para preservar el orden del documento.
+                    for bloque_ocr in _vaciar_paginas_pendientes_ocr():
+                        contador_paginas_ocr += 1
+                        yield bloque_ocr
+                    contador_paginas_capa_texto += 1
+                    yield BloqueTextoExtraido(texto_capa_pagina.strip(), "pagina", numero_pagina, {"metodo_extraccion": "capa_texto"})
+                    continue
+                if paginas_pendientes_ocr and (numero_pagina != paginas_pendientes_ocr[-1] + 1 or len(paginas_pendientes_ocr) >= self.paginas_por_ventana_rasterizado):
+                    for bloque_ocr in _vaciar_paginas_pendientes_ocr():
+                        contador_paginas_ocr += 1
+                        yield bloque_ocr
+                paginas_pendientes_ocr.append(numero_pagina)
+            for bloque_ocr in _vaciar_paginas_pendientes_ocr():
+                contador_paginas_ocr += 1
+                yield bloque_ocr
+        except ErrorProcesamientoArchivo:
+            raise
+        except Exception as e_error_flujo_pdf:
+            mensaje_error_flujo_pdf = f"No se pudo extraer en flujo el PDF '{ruta_archivo_entrada}': {e_error_flujo_pdf}"
+            registrador.exception(mensaje_error_flujo_pdf)
+            raise ErrorProcesamientoArchivo(mensaje_error_flujo_pdf, e_error_flujo_pdf, ruta_archivo=ruta_archivo_entrada) from e_error_flujo_pdf
+        if time.time() >= instante_limite and paginas_sin_completar_ocr:
+            registrador.warning(
+                f"Se agotó el plazo de {self.limite_segundos_ocr_documento} s para el OCR del PDF '{ruta_archivo_entrada}' (extracción en flujo). "
+                f"{paginas_sin_completar_ocr} páginas quedaron sin OCR."
+            )
+        registrador.info(f"Extracción en flujo del PDF '{ruta_archivo_entrada}' completada (capa de texto: {contador_paginas_capa_texto} páginas, OCR: {contador_paginas_ocr} páginas).")
+
 
 class ProcesadorArchivosDocx(ProcesadorArchivoInterfaz):
     """Procesador especializado para archivos DOCX (formato de Microsoft Word)."""
@@ -256,6 +842,143 @@ class ProcesadorArchivosDocx(ProcesadorArchivoInterfaz):
             registrador.exception(mensaje_error_docx)
             raise ErrorProcesamientoArchivo(mensaje_error_docx, e_error_docx, ruta_archivo=ruta_archivo_entrada) from e_error_docx
 
+    def iterar_bloques_de_archivo(self, ruta_archivo_entrada: Path) -> Iterator[BloqueTextoExtraido]:
+        """Produce los párrafos y las tablas del DOCX como bloques, en el orden en que aparecen en el documento."""
+        if docx is None:
+            mensaje_error_dependencia_docx = "La dependencia 'python-docx' no está instalada. No se puede procesar el archivo DOCX."
+            registrador.error(mensaje_error_dependencia_docx)
+            raise ErrorDependenciaFaltante(mensaje_error_dependencia_docx, ruta_archivo=ruta_archivo_entrada)
+
+        registrador.info(f"Extrayendo en flujo el archivo DOCX: '{ruta_archivo_entrada}'.")
+        try:
+            from docx.table import Table as TablaDocx
+            from docx.text.paragraph import Paragraph as ParrafoDocx
+
+            documento_word_abierto = docx.Document(str(ruta_archivo_entrada))
+            numero_parrafo = 0
+            numero_tabla = 0
+            for elemento_cuerpo in documento_word_abierto.element.body.iterchildren():
+                etiqueta_elemento = elemento_cuerpo.tag.rsplit("}", 1)[-1]
+                if etiqueta_elemento == "p":
+                    numero_parrafo += 1
+                    texto_parrafo = ParrafoDocx(elemento_cuerpo, documento_word_abierto).text
+                    if texto_parrafo and texto_parrafo.strip():
+                        yield BloqueTextoExtraido(texto_parrafo.strip(), "parrafo", numero_parrafo)
+                elif etiqueta_elemento == "tbl":
+                    numero_tabla += 1
+                    textos_celdas = [
+                        celda_tabla.text.strip()
+                        for fila_tabla in TablaDocx(elemento_cuerpo, documento_word_abierto).rows
+                        for celda_tabla in fila_tabla.cells
+                        if celda_tabla.text and celda_tabla.text.strip()
+                    ]
+                    if textos_celdas:
+                        yield BloqueTextoExtraido("\n\n".join(textos_celdas), "tabla", numero_tabla)
+        except Exception as e_error_docx_flujo:
+            mensaje_error_docx_flujo = f"No se pudo extraer en flujo el archivo DOCX '{ruta_archivo_entrada}': {e_error_docx_flujo}"
+            registrador.exception(mensaje_error_docx_flujo)
+            raise ErrorProcesamientoArchivo(mensaje_error_docx_flujo, e_error_docx_flujo, ruta_archivo=ruta_archivo_entrada) from e_error_docx_flujo
+
+    @staticmethod
+    def _nivel_encabezado_segun_estilo(nombre_estilo: str) -> Optional[int]:
+        """
+        Devuelve el nivel de encabezado Markdown (1-6) correspondiente a un estilo de párrafo de Word,
+        o None si el estilo no es un encabezado. Reconoce los nombres en inglés y en español.
+        """
+        nombre_estilo_normalizado = (nombre_estilo or "").strip().lower()
+        if nombre_estilo_normalizado in ("title", "título", "titulo"):
+            return 1
+        for prefijo_estilo in ("heading ", "título ", "titulo ", "encabezado "):
+            if nombre_estilo_normalizado.startswith(prefijo_estilo):
+                sufijo_nivel = nombre_estilo_normalizado[len(prefijo_estilo):].strip()
+                if sufijo_nivel.isdigit():
+                    return max(1, min(6, int(sufijo_nivel)))
+        return None
+
+    @staticmethod
+    def _renderizar_tabla_markdown(tabla_docx: Any) -> str:
+        """Renderiza una tabla de python-docx como tabla Markdown (la primera fila se usa como cabecera)."""
+        filas_celdas = [
+            [celda.text.strip().replace("\n", " ").replace("|", "\\|") for celda in fila_tabla.cells]
+            for fila_tabla in tabla_docx.rows
+        ]
+        filas_celdas = [fila for fila in filas_celdas if any(fila)]
+        if not filas_celdas:
+            return ""
+        numero_columnas = max(len(fila) for fila in filas_celdas)
+        filas_celdas = [fila + [""] * (numero_columnas - len(fila)) for fila in filas_celdas]
+        lineas_tabla = [
+            "| " + " | ".join(filas_celdas[0]) + " |",
+            "| " + " | ".join(["---"] * numero_columnas) + " |",
+        ]
+        lineas_tabla.extend("| " + " | ".join(fila) + " |" for fila in filas_celdas[1:])
+        return "\n".join(lineas_tabla)
+
+    def extraer_markdown_de_archivo(self, ruta_archivo_entrada: Path) -> Optional[str]:
+        """
+        Renderiza el DOCX a Markdown de forma determinista a partir de sus estilos:
+        'Heading N'/'Título N' pasan a encabezados, 'List Bullet'/'List Number' a listas
+        y las tablas a tablas Markdown, respetando el orden del documento.
+        Devuelve None si el documento no tiene encabezados (no hay estructura que aprovechar).
+        """
+        if docx is None:
+            mensaje_error_dependencia_docx = "La dependencia 'python-docx' no está instalada. No se puede procesar el archivo DOCX."
+            registrador.error(mensaje_error_dependencia_docx)
+            raise ErrorDependenciaFaltante(mensaje_error_dependencia_docx, ruta_archivo=ruta_archivo_entrada)
+
+        registrador.info(f"Renderizando DOCX a Markdown por estilos: '{ruta_archivo_entrada}'.")
+        try:
+            from docx.table import Table as TablaDocx
+            from docx.text.paragraph import Paragraph as ParrafoDocx
+
+            documento_word_abierto = docx.Document(str(ruta_archivo_entrada))
+            bloques_markdown: List[str] = []
+            numero_encabezados = 0
+            # Recorrer el cuerpo en orden para intercalar correctamente párrafos y tablas.
+            for elemento_cuerpo in documento_word_abierto.element.body.iterchildren():
+                etiqueta_elemento = elemento_cuerpo.tag.rsplit("}", 1)[-1]
+                if etiqueta_elemento == "tbl":
+                    tabla_markdown = self._renderizar_tabla_markdown(TablaDocx(elemento_cuerpo, documento_word_abierto))
+                    if tabla_markdown:
+                        bloques_markdown.append(tabla_markdown)
+                    continue
+                if etiqueta_elemento != "p":
+                    continue
+                parrafo_docx = ParrafoDocx(elemento_cuerpo, documento_word_abierto)
+                texto_parrafo = parrafo_docx.text.strip() if parrafo_docx.text else ""
+                if not texto_parrafo:
+                    continue
+                nombre_estilo_parrafo = parrafo_docx.style.name if parrafo_docx.style is not None else ""
+                nivel_encabezado = self._nivel_encabezado_segun_estilo(nombre_estilo_parrafo)
+                if nivel_encabezado:
+                    numero_encabezados += 1
+                    bloques_markdown.append(f"{'#' * nivel_encabezado} {texto_parrafo}")
+                elif nombre_estilo_parrafo.lower().startswith(("list bullet", "lista con viñetas")):
+                    bloques_markdown.append(f"- {texto_parrafo}")
+                elif nombre_estilo_parrafo.lower().startswith(("list number", "lista con números")):
+                    bloques_markdown.append(f"1. {texto_parrafo}")
+                else:
+                    bloques_markdown.append(texto_parrafo)
+
+            if numero_encabezados == 0:
+                registrador.info(f"El DOCX '{ruta_archivo_entrada}' no usa estilos de encabezado; no se genera Markdown nativo.")
+                return None
+
+            # Los elementos de lista consecutivos se unen con un solo salto de línea para formar una lista continua.
+            texto_markdown_docx = ""
+            for indice_bloque, bloque_markdown in enumerate(bloques_markdown):
+                es_item_lista = bloque_markdown.startswith(("- ", "1. "))
+                anterior_es_item_lista = indice_bloque > 0 and bloques_markdown[indice_bloque - 1].startswith(("- ", "1. "))
+                separador_bloque = "" if indice_bloque == 0 else ("\n" if es_item_lista and anterior_es_item_lista else "\n\n")
+                texto_markdown_docx += separador_bloque + bloque_markdown
+
+            registrador.info(f"DOCX '{ruta_archivo_entrada}' renderizado a Markdown ({numero_encabezados} encabezados, {len(texto_markdown_docx)} caracteres).")
+            return texto_markdown_docx
+        except Exception as e_error_docx_md:
+            mensaje_error_docx_md = f"No se pudo renderizar a Markdown el archivo DOCX '{ruta_archivo_entrada}': {e_error_docx_md}"
+            registrador.exception(mensaje_error_docx_md)
+            raise ErrorProcesamientoArchivo(mensaje_error_docx_md, e_error_docx_md, ruta_archivo=ruta_archivo_entrada) from e_error_docx_md
+
 
 class ProcesadorArchivosPptx(ProcesadorArchivoInterfaz):
     """Procesador especializado para archivos PPTX (formato de Microsoft PowerPoint)."""
@@ -273,10 +996,21 @@ class ProcesadorArchivosPptx(ProcesadorArchivoInterfaz):
             raise ErrorDependenciaFaltante(mensaje_error_dependencia_pptx, ruta_archivo=ruta_archivo_entrada)
 
         registrador.info(f"Extrayendo texto del archivo PPTX: '{ruta_archivo_entrada}'.")
+        # La extracción completa es la concatenación de los bloques por diapositiva de la extracción en flujo.
+        texto_completo_extraido_pptx = "\n\n".join(bloque.texto for bloque in self.iterar_bloques_de_archivo(ruta_archivo_entrada)) # Unir textos de todas las diapositivas
+        registrador.info(f"Texto extraído correctamente del archivo PPTX '{ruta_archivo_entrada}'. Longitud total: {len(texto_completo_extraido_pptx)}.")
+        return texto_completo_extraido_pptx
+
+    def iterar_bloques_de_archivo(self, ruta_archivo_entrada: Path) -> Iterator[BloqueTextoExtraido]:
+        """Produce un bloque por diapositiva con texto (formas y notas del orador), en orden."""
+        if Presentation is None: # Comprobar dependencia en tiempo de ejecución
+            mensaje_error_dependencia_pptx = "La dependencia 'python-pptx' no está instalada. No se puede procesar el archivo PPTX."
+            registrador.error(mensaje_error_dependencia_pptx)
+            raise ErrorDependenciaFaltante(mensaje_error_dependencia_pptx, ruta_archivo=ruta_archivo_entrada)
+
         try:
             presentacion_powerpoint_abierta = Presentation(str(ruta_archivo_entrada)) # python-pptx espera un string con la ruta o un stream
 
-            textos_extraidos_diapositivas = []
             for i, diapositiva_actual_ppt in enumerate(presentacion_powerpoint_abierta.slides):
                 textos_formas_diapositiva_actual = []
                 # Extraer texto de las formas (shapes) en cada diapositiva
@@ -297,16 +1031,61 @@ class ProcesadorArchivosPptx(ProcesadorArchivoInterfaz):
 
                 texto_consolidado_diapositiva_actual = "\n".join(filter(None, textos_formas_diapositiva_actual)) # Unir textos de formas y notas de la diapositiva
                 if texto_consolidado_diapositiva_actual: # Solo añadir si la diapositiva tiene texto
-                    textos_extraidos_diapositivas.append(f"[Contenido Diapositiva {i + 1}]:\n{texto_consolidado_diapositiva_actual}")
-
-            texto_completo_extraido_pptx = "\n\n".join(filter(None, textos_extraidos_diapositivas)) # Unir textos de todas las diapositivas
-            registrador.info(f"Texto extraído correctamente del archivo PPTX '{ruta_archivo_entrada}'. Longitud total: {len(texto_completo_extraido_pptx)}.")
-            return texto_completo_extraido_pptx
+                    yield BloqueTextoExtraido(f"[Contenido Diapositiva {i + 1}]:\n{texto_consolidado_diapositiva_actual}", "diapositiva", i + 1)
         except Exception as e_error_pptx: # Capturar excepciones específicas de python-pptx si se conocen, o genéricas
             mensaje_error_pptx = f"No se pudo extraer texto del archivo PPTX '{ruta_archivo_entrada}': {e_error_pptx}"
             registrador.exception(mensaje_error_pptx)
             raise ErrorProcesamientoArchivo(mensaje_error_pptx, e_error_pptx, ruta_archivo=ruta_archivo_entrada) from e_error_pptx
 
+    def extraer_markdown_de_archivo(self, ruta_archivo_entrada: Path) -> Optional[str]:
+        """
+        Renderiza el PPTX a Markdown de forma determinista: cada diapositiva es una sección
+        '## Diapositiva N: <título>', los párrafos de las demás formas pasan a viñetas
+        (indentadas según su nivel) y las notas del orador se añaden como cita.
+        """
+        if Presentation is None:
+            mensaje_error_dependencia_pptx = "La dependencia 'python-pptx' no está instalada. No se puede procesar el archivo PPTX."
+            registrador.error(mensaje_error_dependencia_pptx)
+            raise ErrorDependenciaFaltante(mensaje_error_dependencia_pptx, ruta_archivo=ruta_archivo_entrada)
+
+        registrador.info(f"Renderizando PPTX a Markdown por diapositivas: '{ruta_archivo_entrada}'.")
+        try:
+            presentacion_powerpoint_abierta = Presentation(str(ruta_archivo_entrada))
+            secciones_markdown_diapositivas: List[str] = []
+            for i, diapositiva_actual_ppt in enumerate(presentacion_powerpoint_abierta.slides):
+                forma_titulo = diapositiva_actual_ppt.shapes.title
+                texto_titulo = forma_titulo.text_frame.text.strip() if forma_titulo is not None and forma_titulo.has_text_frame else ""
+                encabezado_diapositiva = f"## Diapositiva {i + 1}: {texto_titulo}" if texto_titulo else f"## Diapositiva {i + 1}"
+
+                lineas_cuerpo_diapositiva: List[str] = []
+                for forma_ppt_actual in diapositiva_actual_ppt.shapes:
+                    if forma_titulo is not None and forma_ppt_actual.shape_id == forma_titulo.shape_id:
+                        continue
+                    if not getattr(forma_ppt_actual, "has_text_frame", False) or not forma_ppt_actual.text_frame.text.strip():
+                        continue
+                    for parrafo_ppt in forma_ppt_actual.text_frame.paragraphs:
+                        texto_parrafo_ppt = "".join(run.text for run in parrafo_ppt.runs).strip()
+                        if texto_parrafo_ppt:
+                            lineas_cuerpo_diapositiva.append(f"{'  ' * (parrafo_ppt.level or 0)}- {texto_parrafo_ppt}")
+
+                bloques_diapositiva = [encabezado_diapositiva]
+                if lineas_cuerpo_diapositiva:
+                    bloques_diapositiva.append("\n".join(lineas_cuerpo_diapositiva))
+                if diapositiva_actual_ppt.has_notes_slide and diapositiva_actual_ppt.notes_slide.notes_text_frame is not None:
+                    texto_notas_diapositiva = diapositiva_actual_ppt.notes_slide.notes_text_frame.text.strip()
+                    if texto_notas_diapositiva:
+                        bloques_diapositiva.append("\n".join(f"> {linea}" if linea.strip() else ">" for linea in f"**Notas:** {texto_notas_diapositiva}".split("\n")))
+                if texto_titulo or len(bloques_diapositiva) > 1: # Omitir diapositivas sin ningún texto
+                    secciones_markdown_diapositivas.append("\n\n".join(bloques_diapositiva))
+
+            texto_markdown_pptx = "\n\n".join(secciones_markdown_diapositivas)
+            registrador.info(f"PPTX '{ruta_archivo_entrada}' renderizado a Markdown ({len(secciones_markdown_diapositivas)} diapositivas con texto, {len(texto_markdown_pptx)} caracteres).")
+            return texto_markdown_pptx or None
+        except Exception as e_error_pptx_md:
+            mensaje_error_pptx_md = f"No se pudo renderizar a Markdown el archivo PPTX '{ruta_archivo_entrada}': {e_error_pptx_md}"
+            registrador.exception(mensaje_error_pptx_md)
+            raise ErrorProcesamientoArchivo(mensaje_error_pptx_md, e_error_pptx_md, ruta_archivo=ruta_archivo_entrada) from e_error_pptx_md
+
 # --- Gestor Principal de Procesadores de Archivos ---
 
 class GestorMaestroDeProcesadoresArchivos:
@@ -318,6 +1097,18 @@ class GestorMaestroDeProcesadoresArchivos:
     def __init__(self):
         self.mapeo_procesadores_por_extension: Dict[str, ProcesadorArchivoInterfaz] = {}
         self._registrar_procesadores_disponibles_por_defecto() # Registrar procesadores al inicializar
+
+        # Caché de texto extraído (opcional), compartida por todo el proceso: el gestor se crea en cada petición.
+        self.cache_texto_extraido: Optional[CacheTextoExtraido] = obtener_cache_texto_extraido()
+        config_procesamiento = configuracion_global.procesamiento
+
+        # Ejecutor de extracción aislada (opcional): los procesadores se ejecutan en procesos trabajadores
+        # con límites de tiempo y memoria, para que un archivo patológico no afecte al proceso de la API.
+        self.ejecutor_extraccion_aislada = None
+        if config_procesamiento.extraccion_aislada_habilitada:
+            # Importación diferida: el módulo de extracción aislada depende de este módulo.
+            from .extraccion_aislada import obtener_ejecutor_extraccion_aislada
+            self.ejecutor_extraccion_aislada = obtener_ejecutor_extraccion_aislada()
         registrador.info("GestorMaestroDeProcesadoresArchivos inicializado con procesadores de archivo por defecto.")
 
     def _registrar_procesadores_disponibles_por_defecto(self):
@@ -329,10 +1120,11 @@ class GestorMaestroDeProcesadoresArchivos:
         self.intentar_registrar_procesador(ProcesadorArchivosMarkdown())
 
         # Registrar procesador de PDF solo si las dependencias están presentes
-        if pytesseract and convert_from_path:
+        # (basta con la capa de texto de pypdfium2 o con el OCR de pytesseract + pdf2image)
+        if pdfium or (pytesseract and convert_from_path):
             self.intentar_registrar_procesador(ProcesadorArchivosPDF())
         else:
-            registrador.warning("Procesador de PDF (ProcesadorArchivosPDF) no será registrado debido a que faltan las dependencias 'pytesseract' y/o 'pdf2image'.")
+            registrador.warning("Procesador de PDF (ProcesadorArchivosPDF) no será registrado debido a que faltan las dependencias 'pypdfium2' y 'pytesseract'/'pdf2image'.")
 
         # Registrar procesador de DOCX solo si la dependencia está presente
         if docx:
@@ -363,17 +1155,63 @@ class GestorMaestroDeProcesadoresArchivos:
             self.mapeo_procesadores_por_extension[extension_normalizada_actual] = procesador_para_registrar
             registrador.info(f"Procesador para extensión '{extension_normalizada_actual}' registrado: {type(procesador_para_registrar).__name__}")
 
-    def procesar_archivo_segun_tipo(self, ruta_archivo_entrada_a_procesar: Path) -> Optional[str]: # Parámetro renombrado
+    def _invocar_procesador(self, procesador: ProcesadorArchivoInterfaz, nombre_metodo: str, ruta_archivo: Path) -> Any:
+        """Invoca un método de extracción del procesador, en un trabajador aislado si el aislamiento está habilitado."""
+        if self.ejecutor_extraccion_aislada is not None:
+            return self.ejecutor_extraccion_aislada.ejecutar(procesador, nombre_metodo, ruta_archivo)
+        return getattr(procesador, nombre_metodo)(ruta_archivo)
+
+    def obtener_markdown_nativo_de_archivo(self, ruta_archivo_entrada: Path) -> Optional[str]:
+        """
+        Intenta obtener el Markdown del archivo directamente desde su estructura nativa
+        (ver `ProcesadorArchivoInterfaz.extraer_markdown_de_archivo`), evitando el formateo por LLM.
+
+        Returns:
+            El Markdown renderizado, o None si el tipo de archivo no tiene estructura nativa,
+            no hay procesador registrado, o la renderización falla (el llamador debe usar
+            `procesar_archivo_segun_tipo` y el formateo habitual).
+        """
+        ruta_archivo_entrada = Path(ruta_archivo_entrada)
+        if not ruta_archivo_entrada.is_file():
+            registrador.error(f"El archivo especificado '{ruta_archivo_entrada}' no existe o no es un archivo válido.")
+            return None
+
+        procesador_seleccionado = self.mapeo_procesadores_por_extension.get(ruta_archivo_entrada.suffix.lower())
+        if not procesador_seleccionado:
+            return None
+        try:
+            texto_markdown_nativo = self._invocar_procesador(procesador_seleccionado, "extraer_markdown_de_archivo", ruta_archivo_entrada)
+        except ErrorExtraccionAislada:
+            raise # Extracción abortada por el aislamiento: reintentar con la extracción habitual fallaría igual
+        except ErrorProcesamientoArchivo as e_error_markdown_nativo: # Incluye ErrorDependenciaFaltante
+            registrador.warning(f"No se pudo obtener Markdown nativo de '{ruta_archivo_entrada}' con {type(procesador_seleccionado).__name__}: {e_error_markdown_nativo}. Se usará la extracción de texto habitual.")
+            return None
+        except Exception as e_error_inesperado_markdown:
+            registrador.exception(f"Error inesperado al obtener Markdown nativo de '{ruta_archivo_entrada}': {e_error_inesperado_markdown}")
+            return None
+
+        if texto_markdown_nativo and texto_markdown_nativo.strip():
+            registrador.info(f"Markdown nativo obtenido de '{ruta_archivo_entrada}' con {type(procesador_seleccionado).__name__} (longitud: {len(texto_markdown_nativo)}).")
+            return texto_markdown_nativo
+        return None
+
+    def procesar_archivo_segun_tipo(self, ruta_archivo_entrada_a_procesar: Path, huella_archivo: Optional[str] = None) -> Optional[str]: # Parámetro renombrado
         """
         Procesa un archivo utilizando el procesador adecuado según su extensión.
 
         Args:
             ruta_archivo_entrada_a_procesar: Objeto Path que apunta al archivo a procesar.
+            huella_archivo: Opcional. SHA-256 (hex) de los bytes del archivo, si ya se conoce (p. ej. calculado
+                            durante la descarga); evita volver a leer el archivo para consultar la caché.
 
         Returns:
             El texto extraído como un string, o None si el archivo no existe,
             no hay un procesador registrado para su extensión, o si ocurre un error
             durante el procesamiento y el procesador específico no maneja la excepción.
+
+        Raises:
+            ErrorExtraccionAislada: Si la extracción en un trabajador aislado se aborta (tiempo agotado,
+                                    memoria excedida o trabajador terminado); `motivo_fallo` indica la causa.
         """
         if not isinstance(ruta_archivo_entrada_a_procesar, Path): # Verificar tipo de entrada
             try:
@@ -395,13 +1233,32 @@ class GestorMaestroDeProcesadoresArchivos:
             nombre_procesador_seleccionado = type(procesador_seleccionado_para_extension).__name__
             registrador.info(f"Procesando archivo '{ruta_archivo_entrada_a_procesar}' con el procesador: {nombre_procesador_seleccionado}.")
             try:
-                texto_extraido_del_archivo = procesador_seleccionado_para_extension.extraer_texto_de_archivo(ruta_archivo_entrada_a_procesar)
+                # Consultar la caché de texto extraído: un archivo con los mismos bytes y la misma
+                # configuración del procesador sólo cuesta calcular su hash.
+                clave_cache: Optional[str] = None
+                if self.cache_texto_extraido is not None:
+                    clave_cache = CacheTextoExtraido.calcular_clave(
+                        huella_archivo or CacheTextoExtraido.calcular_huella_archivo(ruta_archivo_entrada_a_procesar),
+                        procesador_seleccionado_para_extension.obtener_firma_configuracion(),
+                    )
+                    texto_cacheado = self.cache_texto_extraido.obtener(clave_cache)
+                    if texto_cacheado is not None:
+                        registrador.info(f"Texto de '{ruta_archivo_entrada_a_procesar}' reutilizado desde la caché de texto extraído (longitud: {len(texto_cacheado)}); se omite la extracción.")
+                        return texto_cacheado
+
+                texto_extraido_del_archivo = self._invocar_procesador(procesador_seleccionado_para_extension, "extraer_texto_de_archivo", ruta_archivo_entrada_a_procesar)
                 registrador.info(f"Procesamiento de '{ruta_archivo_entrada_a_procesar}' con '{nombre_procesador_seleccionado}' finalizado. Longitud del texto extraído: {len(texto_extraido_del_archivo) if texto_extraido_del_archivo is not None else 'N/A'}.")
+                if isinstance(texto_extraido_del_archivo, TextoExtraidoIncompleto):
+                    registrador.warning(f"El texto extraído de '{ruta_archivo_entrada_a_procesar}' está incompleto; no se guarda en la caché de texto extraído.")
+                elif clave_cache is not None and texto_extraido_del_archivo is not None:
+                    self.cache_texto_extraido.guardar(clave_cache, texto_extraido_del_archivo)
                 return texto_extraido_del_archivo
             except ErrorDependenciaFaltante as e_error_dependencia: # Capturar error de dependencia específica si es lanzado por el procesador
                 registrador.error(f"Error de dependencia faltante al procesar '{ruta_archivo_entrada_a_procesar}' con {nombre_procesador_seleccionado}: {e_error_dependencia}")
                 # No relanzar, simplemente devolver None para indicar fallo de procesamiento.
                 return None
+            except ErrorExtraccionAislada: # Abortada por el aislamiento: se propaga para que el llamador conozca el motivo
+                raise
             except ErrorProcesamientoArchivo as e_error_procesamiento_archivo: # Otros errores de procesamiento definidos
                 registrador.error(f"Error específico de procesamiento al procesar '{ruta_archivo_entrada_a_procesar}' con {nombre_procesador_seleccionado}: {e_error_procesamiento_archivo}")
                 return None # Devolver None para indicar fallo
@@ -416,4 +1273,27 @@ class GestorMaestroDeProcesadoresArchivos:
             # Si se espera que todos los archivos sean soportados, lanzar una excepción sería mejor.
             # Por ahora, se devuelve None, y el llamador puede verificar si el resultado es None.
             return None
+
+    def iterar_bloques_de_archivo_segun_tipo(self, ruta_archivo_entrada: Path) -> Iterator[BloqueTextoExtraido]:
+        """
+        Extrae en flujo el archivo con el procesador adecuado según su extensión
+        (ver `ProcesadorArchivoInterfaz.iterar_bloques_de_archivo`). A diferencia de
+        `procesar_archivo_segun_tipo`, los errores se propagan, ya que pueden producirse
+        a mitad de la iteración, después de que el llamador haya consumido bloques.
+
+        Raises:
+            ErrorTipoArchivoNoSoportado: Si no hay un procesador registrado para la extensión.
+            ErrorProcesamientoArchivo: Si el archivo no existe o falla la extracción (incluye ErrorDependenciaFaltante).
+        """
+        ruta_archivo_entrada = Path(ruta_archivo_entrada)
+        if not ruta_archivo_entrada.is_file():
+            raise ErrorProcesamientoArchivo(f"El archivo especificado '{ruta_archivo_entrada}' no existe o no es un archivo válido.", ruta_archivo=ruta_archivo_entrada)
+        procesador_seleccionado = self.mapeo_procesadores_por_extension.get(ruta_archivo_entrada.suffix.lower())
+        if not procesador_seleccionado:
+            raise ErrorTipoArchivoNoSoportado(f"No se encontró un procesador adecuado para la extensión '{ruta_archivo_entrada.suffix.lower()}'.", ruta_archivo=ruta_archivo_entrada)
+        registrador.info(f"Extrayendo en flujo '{ruta_archivo_entrada}' con el procesador: {type(procesador_seleccionado).__name__}.")
+        if self.ejecutor_extraccion_aislada is not None:
+            yield from self.ejecutor_extraccion_aislada.iterar(procesador_seleccionado, "iterar_bloques_de_archivo", ruta_archivo_entrada)
+        else:
+            yield from procesador_seleccionado.iterar_bloques_de_archivo(ruta_archivo_entrada)
 [end of entrenai_refactor/nucleo/archivos/procesador_archivos.py]
@@ -1,3 +1,4 @@
+import hashlib
 import re
 import time
 import psycopg2
@@ -33,15 +34,20 @@ class EnvoltorioPgVector:
     Envoltorio para interactuar con una base de datos PostgreSQL que utiliza la extensión pgvector.
     Gestiona las conexiones, la creación dinámica de tablas para cursos, la inserción/actualización (upsert)
     de fragmentos de documentos con sus embeddings, y la búsqueda de similitud vectorial.
-    También maneja una tabla de seguimiento para archivos procesados.
+    También maneja una tabla de seguimiento para archivos procesados, y la reconstrucción de la tabla de un
+    curso en una nueva generación que se publica de forma atómica al terminar.
     """
 
     _NOMBRE_TABLA_SEGUIMIENTO_ARCHIVOS_PROCESADOS = "seguimiento_archivos_procesados" # Nombre fijo para la tabla de seguimiento
+    _NOMBRE_TABLA_GENERACIONES_TABLAS_CURSOS = "generaciones_tablas_cursos" # Generaciones en construcción y tablas retiradas
+    _SEGUNDOS_ABANDONO_GENERACION_EN_CONSTRUCCION = 24 * 3600 # Una generación sin publicar tras este tiempo se considera abandonada
+    _LONGITUD_MAXIMA_IDENTIFICADOR_SQL = 63 # PostgreSQL recorta en silencio los identificadores más largos
 
     def __init__(self):
         self.config_db = configuracion_global.db # Configuración específica de la BD desde la config global
         self._conexion_activa_db: Optional[psycopg2.extensions.connection] = None # Conexión activa
         self._cursor_activo_db: Optional[RealDictCursor] = None # Cursor activo
+        self._generaciones_en_construccion: Dict[str, str] = {} # Tabla publicada del curso -> generación que escribe esta instancia
         registrador.info("EnvoltorioPgVector inicializado. La conexión a la base de datos se establecerá de forma perezosa (al primer uso).")
 
     def _establecer_o_verificar_conexion_db(self):
@@ -89,6 +95,7 @@ class EnvoltorioPgVector:
 
             registrador.info(f"Conexión a PgVector establecida y extensión 'vector' asegurada para: {self.config_db.host_db}:{self.config_db.puerto_db}/{self.config_db.nombre_base_datos}")
             self._asegurar_existencia_tabla_seguimiento_archivos() # Asegurar que la tabla de seguimiento de archivos exista
+            self._asegurar_existencia_tabla_generaciones()
         except psycopg2.OperationalError as e_operacional: # Errores como BD no disponible, credenciales incorrectas
             registrador.error(f"Error operacional al conectar a PostgreSQL/pgvector: {e_operacional}")
             self._cerrar_conexion_db_interna() # Limpiar recursos
@@ -180,7 +187,9 @@ class EnvoltorioPgVector:
 
         # Limpiar el prefijo de la configuración por si acaso contiene caracteres no deseados (aunque no debería)
         prefijo_tabla_limpio = self.config_db.prefijo_tabla_cursos_vectorial.strip().replace('"', '')
-        nombre_tabla_final = f"{prefijo_tabla_limpio}{nombre_normalizado_curso}"
+        # Se recorta a 63 caracteres igual que lo hace PostgreSQL, para que el nombre coincida con el de las
+        # tablas ya creadas. Las generaciones y tablas retiradas son las que se acortan con un resumen.
+        nombre_tabla_final = f"{prefijo_tabla_limpio}{nombre_normalizado_curso}"[:self._LONGITUD_MAXIMA_IDENTIFICADOR_SQL]
         registrador.debug(f"Nombre de tabla SQL normalizado generado para curso '{identificador_curso}': '{nombre_tabla_final}'")
         return nombre_tabla_final
 
@@ -188,9 +197,12 @@ class EnvoltorioPgVector:
         """
         Asegura que la tabla para un curso específico exista en la BD. Si no existe, la crea
         junto con un índice HNSW para búsquedas de similitud eficientes.
+        Si esta instancia está construyendo una nueva generación de la tabla del curso, se asegura la de la
+        generación, sin índice: se construye una sola vez al publicarla, más rápido que mantenerlo en la carga.
         """
         self._establecer_o_verificar_conexion_db() # Asegurar conexión
-        nombre_tabla_curso_seguro = self.obtener_nombre_tabla_curso_normalizado(identificador_curso)
+        nombre_tabla_curso_seguro = self._nombre_tabla_escritura_curso(identificador_curso)
+        es_generacion_en_construccion = nombre_tabla_curso_seguro != self.obtener_nombre_tabla_curso_normalizado(identificador_curso)
 
         try:
             # Verificar si la tabla ya existe usando information_schema.
@@ -220,6 +232,9 @@ class EnvoltorioPgVector:
             """
             self.cursor.execute(sql_crear_tabla_curso)
             registrador.info(f"Tabla '{nombre_tabla_curso_seguro}' creada con dimensión de vector {dimension_vector_embeddings}.")
+            if es_generacion_en_construccion:
+                self._confirmar_transaccion_actual()
+                return True
 
             # Crear un índice HNSW (Hierarchical Navigable Small World) para búsquedas de similitud eficientes.
             # El tipo de operador de distancia (vector_l2_ops, vector_cosine_ops, vector_ip_ops)
@@ -227,7 +242,7 @@ class EnvoltorioPgVector:
             # L2 (Euclidiana) es común: `embedding <=> otro_embedding`.
             # Coseno: `1 - (embedding <=> otro_embedding)` para similitud, o `<=>` para distancia coseno.
             # Producto Interno (IP): `embedding <#> otro_embedding` (negativo para distancia).
-            nombre_indice_hnsw = f"idx_hnsw_{nombre_tabla_curso_seguro}"
+            nombre_indice_hnsw = self._nombre_indice_hnsw(nombre_tabla_curso_seguro)
             sql_crear_indice_hnsw = f'CREATE INDEX IF NOT EXISTS "{nombre_indice_hnsw}" ON "{nombre_tabla_curso_seguro}" USING hnsw (embedding vector_l2_ops);'
             registrador.info(f"Creando índice HNSW (vector_l2_ops) llamado '{nombre_indice_hnsw}' para tabla '{nombre_tabla_curso_seguro}'.")
             self.cursor.execute(sql_crear_indice_hnsw)
@@ -256,7 +271,7 @@ class EnvoltorioPgVector:
             registrador.info("No hay fragmentos proporcionados para insertar o actualizar.")
             return True # Nada que hacer
 
-        nombre_tabla_curso_seguro = self.obtener_nombre_tabla_curso_normalizado(identificador_curso)
+        nombre_tabla_curso_seguro = self._nombre_tabla_escritura_curso(identificador_curso) # La generación en construcción, si la hay
 
         # Determinar la dimensión del vector del primer fragmento válido para asegurar la tabla.
         # Se asume que todos los fragmentos en una llamada tendrán la misma dimensión.
@@ -393,9 +408,9 @@ class EnvoltorioPgVector:
 
 
     def eliminar_fragmentos_por_id_documento(self, identificador_curso: Any, id_documento_a_eliminar: str) -> bool:
-        """Elimina todos los fragmentos asociados a un ID de documento específico de la tabla del curso."""
+        """Elimina todos los fragmentos asociados a un ID de documento específico de la tabla del curso (o de la generación en construcción)."""
         self._establecer_o_verificar_conexion_db()
-        nombre_tabla_curso_seguro = self.obtener_nombre_tabla_curso_normalizado(identificador_curso)
+        nombre_tabla_curso_seguro = self._nombre_tabla_escritura_curso(identificador_curso)
         registrador.info(f"Intentando eliminar fragmentos para ID de documento '{id_documento_a_eliminar}' de tabla '{nombre_tabla_curso_seguro}'.")
 
         try:
@@ -421,6 +436,322 @@ class EnvoltorioPgVector:
             self._revertir_transaccion_actual()
             raise ErrorBaseDeDatosVectorial(f"Error inesperado al eliminar fragmentos del documento '{id_documento_a_eliminar}'.", e_inesperado_delete, tabla_implicada=nombre_tabla_curso_seguro)
 
+    # --- Generaciones de la tabla de un curso (reconstrucción e intercambio atómico "azul/verde") ---
+
+    @classmethod
+    def _identificador_con_sufijo(cls, nombre_base: str, sufijo: str) -> str:
+        """
+        Añade un sufijo (p. ej. '_g<ms>' de una generación) a un identificador SQL. Si no cabe en los 63 caracteres
+        de PostgreSQL, la base se recorta y termina en un resumen de la base completa, que distingue las tablas
+        de cursos con el mismo comienzo.
+        """
+        longitud_maxima_base = cls._LONGITUD_MAXIMA_IDENTIFICADOR_SQL - len(sufijo)
+        if len(nombre_base) > longitud_maxima_base:
+            nombre_base = cls._identificador_recortado_con_resumen(nombre_base, longitud_maxima_base)
+        return f"{nombre_base}{sufijo}"
+
+    @staticmethod
+    def _identificador_recortado_con_resumen(identificador: str, longitud_maxima: int, texto_resumido: Optional[str] = None) -> str:
+        """
+        Recorta un identificador SQL a `longitud_maxima` caracteres terminándolo en un resumen (8 hex) de
+        `texto_resumido` (por defecto, el identificador completo), que distingue los nombres con el mismo comienzo.
+        """
+        resumen_nombre = hashlib.sha1((texto_resumido or identificador).encode("utf-8")).hexdigest()[:8]
+        return f"{identificador[:longitud_maxima - len(resumen_nombre) - 1]}_{resumen_nombre}"
+
+    @classmethod
+    def _nombre_indice_hnsw(cls, nombre_tabla: str) -> str:
+        """Nombre del índice HNSW de una tabla: 'idx_hnsw_<tabla>', o recortado con resumen si pasaría de 63 caracteres."""
+        nombre_indice = f"idx_hnsw_{nombre_tabla}"
+        if len(nombre_indice) <= cls._LONGITUD_MAXIMA_IDENTIFICADOR_SQL:
+            return nombre_indice
+        return cls._identificador_recortado_con_resumen(nombre_indice, cls._LONGITUD_MAXIMA_IDENTIFICADOR_SQL)
+
+    def _nombre_tabla_escritura_curso(self, identificador_curso: Any) -> str:
+        """Tabla en la que esta instancia escribe los fragmentos del curso: la generación en construcción, si la hay, o la publicada."""
+        nombre_tabla_curso_seguro = self.obtener_nombre_tabla_curso_normalizado(identificador_curso)
+        return self._generaciones_en_construccion.get(nombre_tabla_curso_seguro, nombre_tabla_curso_seguro)
+
+    def _existe_tabla(self, nombre_tabla: str) -> bool:
+        self.cursor.execute("SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = %s);", (nombre_tabla,))
+        resultado_existencia_tabla = self.cursor.fetchone()
+        return bool(resultado_existencia_tabla and resultado_existencia_tabla["exists"])
+
+    def _existe_indice(self, nombre_tabla: str, nombre_indice: str) -> bool:
+        self.cursor.execute("SELECT EXISTS (SELECT FROM pg_indexes WHERE tablename = %s AND indexname = %s);", (nombre_tabla, nombre_indice))
+        resultado_existencia_indice = self.cursor.fetchone()
+        return bool(resultado_existencia_indice and resultado_existencia_indice["exists"])
+
+    def _asegurar_existencia_tabla_generaciones(self):
+        """
+        Asegura que exista la tabla que registra las generaciones de tablas de cursos en construcción y las
+        retiradas pendientes de eliminar. Se llama desde `_establecer_o_verificar_conexion_db`.
+        """
+        nombre_tabla_generaciones = self._NOMBRE_TABLA_GENERACIONES_TABLAS_CURSOS
+        try:
+            self.cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS "{nombre_tabla_generaciones}" (
+                nombre_tabla_generacion TEXT PRIMARY KEY,
+                nombre_tabla_curso TEXT NOT NULL, -- Tabla publicada a la que sustituye (o sustituía) la generación
+                estado TEXT NOT NULL, -- 'en_construccion' o 'retirada'
+                momento_estado BIGINT NOT NULL -- Timestamp Unix del último cambio de estado
+            );
+            """)
+            self._confirmar_transaccion_actual()
+        except psycopg2.Error as e_db_generaciones:
+            registrador.error(f"Error de base de datos al asegurar la tabla de generaciones '{nombre_tabla_generaciones}': {e_db_generaciones}")
+            self._revertir_transaccion_actual()
+            raise ErrorBaseDeDatosVectorial("Error al asegurar la tabla de generaciones de tablas de cursos.", e_db_generaciones, tabla_implicada=nombre_tabla_generaciones)
+
+    def iniciar_generacion_tabla_curso(self, identificador_curso: Any) -> str:
+        """
+        Inicia una nueva generación de la tabla del curso. Desde ese momento, las escrituras de esta instancia
+        para el curso (`insertar_o_actualizar_fragmentos_documento`, `eliminar_fragmentos_por_id_documento`,
+        `insertar_fragmentos_revectorizados`) van a la generación, mientras las búsquedas siguen leyendo la
+        tabla publicada completa. La generación se crea al insertar el primer fragmento (con la dimensión de
+        su embedding) y se publica con `publicar_generacion_tabla_curso` o se descarta con `descartar_generacion_tabla_curso`.
+
+        Las escrituras de otras instancias durante la construcción van a la tabla publicada y no se trasladan
+        a la generación: una reconstrucción no debe solaparse con otros procesamientos del mismo curso.
+        """
+        self._establecer_o_verificar_conexion_db()
+        nombre_tabla_curso_seguro = self.obtener_nombre_tabla_curso_normalizado(identificador_curso)
+        if nombre_tabla_curso_seguro in self._generaciones_en_construccion:
+            self.descartar_generacion_tabla_curso(identificador_curso)
+        self.eliminar_generaciones_caducadas()
+        nombre_tabla_generacion = self._identificador_con_sufijo(nombre_tabla_curso_seguro, f"_g{int(time.time() * 1000)}")
+        try:
+            self.cursor.execute(f'DROP TABLE IF EXISTS "{nombre_tabla_generacion}";')
+            self.cursor.execute(
+                f'INSERT INTO "{self._NOMBRE_TABLA_GENERACIONES_TABLAS_CURSOS}" (nombre_tabla_generacion, nombre_tabla_curso, estado, momento_estado) '
+                f"VALUES (%s, %s, 'en_construccion', %s);",
+                (nombre_tabla_generacion, nombre_tabla_curso_seguro, int(time.time())),
+            )
+            self._confirmar_transaccion_actual()
+        except psycopg2.Error as e_db_inicio_generacion:
+            registrador.error(f"Error de base de datos al iniciar la generación '{nombre_tabla_generacion}': {e_db_inicio_generacion}")
+            self._revertir_transaccion_actual()
+            raise ErrorBaseDeDatosVectorial(f"Error al iniciar una nueva generación de la tabla '{nombre_tabla_curso_seguro}'.", e_db_inicio_generacion, tabla_implicada=nombre_tabla_curso_seguro)
+        self._generaciones_en_construccion[nombre_tabla_curso_seguro] = nombre_tabla_generacion
+        registrador.info(f"Iniciada la generación '{nombre_tabla_generacion}' de la tabla del curso '{nombre_tabla_curso_seguro}'.")
+        return nombre_tabla_generacion
+
+    def copiar_documentos_a_generacion(self, identificador_curso: Any, ids_documentos: List[str]) -> int:
+        """
+        Copia a la generación en construcción los fragmentos publicados de los documentos indicados (p. ej. los
+        archivos que no se pudieron reprocesar), para que no desaparezcan de las búsquedas al publicarla.
+        Antes se eliminan de la generación los fragmentos que esos documentos ya tuvieran (un archivo que falló a
+        medio ingerir), para que cada documento quede entero con su versión publicada y no mezcle ambas.
+        Sólo es posible si la generación usa la misma dimensión de vector que la tabla publicada.
+        """
+        self._establecer_o_verificar_conexion_db()
+        nombre_tabla_curso_seguro = self.obtener_nombre_tabla_curso_normalizado(identificador_curso)
+        nombre_tabla_generacion = self._generaciones_en_construccion.get(nombre_tabla_curso_seguro)
+        if nombre_tabla_generacion is None or not ids_documentos:
+            return 0
+        try:
+            if not self._existe_tabla(nombre_tabla_curso_seguro):
+                return 0
+            if not self._existe_tabla(nombre_tabla_generacion): # Ningún documento reprocesado: la generación hereda el esquema publicado
+                self.cursor.execute(f'CREATE TABLE "{nombre_tabla_generacion}" (LIKE "{nombre_tabla_curso_seguro}" INCLUDING DEFAULTS);')
+                self.cursor.execute(f'ALTER TABLE "{nombre_tabla_generacion}" ADD PRIMARY KEY (id_fragmento);')
+            else:
+                self.cursor.execute(f'DELETE FROM "{nombre_tabla_generacion}" WHERE id_documento = ANY(%s);', (list(ids_documentos),))
+            self.cursor.execute(
+                f'INSERT INTO "{nombre_tabla_generacion}" (id_fragmento, id_curso, id_documento, texto, metadatos, embedding) '
+                f'SELECT id_fragmento, id_curso, id_documento, texto, metadatos, embedding FROM "{nombre_tabla_curso_seguro}" '
+                f"WHERE id_documento = ANY(%s) ON CONFLICT (id_fragmento) DO NOTHING;",
+                (list(ids_documentos),),
+            )
+            fragmentos_copiados = self.cursor.rowcount
+            self._confirmar_transaccion_actual()
+            registrador.info(f"Copiados {fragmentos_copiados} fragmentos de {len(ids_documentos)} documentos de '{nombre_tabla_curso_seguro}' a la generación '{nombre_tabla_generacion}'.")
+            return fragmentos_copiados
+        except psycopg2.Error as e_db_copia:
+            registrador.error(f"Error de base de datos al copiar documentos a la generación '{nombre_tabla_generacion}': {e_db_copia}")
+            self._revertir_transaccion_actual()
+            raise ErrorBaseDeDatosVectorial(f"Error al copiar documentos a la generación '{nombre_tabla_generacion}'.", e_db_copia, tabla_implicada=nombre_tabla_generacion)
+
+    def publicar_generacion_tabla_curso(self, identificador_curso: Any) -> bool:
+        """
+        Construye el índice HNSW de la generación en construcción y la publica en una única transacción: la
+        tabla publicada se renombra como retirada y la generación toma su nombre, de modo que cada búsqueda ve
+        la tabla antigua completa o la nueva completa. La tabla retirada se conserva durante el periodo de
+        gracia configurado (las búsquedas en curso terminan sobre ella) y la elimina `eliminar_generaciones_caducadas`.
+
+        Returns:
+            True si se publicó; False si no había generación o estaba vacía (en ese caso se descarta y
+            la tabla publicada no cambia).
+        """
+        self._establecer_o_verificar_conexion_db()
+        nombre_tabla_curso_seguro = self.obtener_nombre_tabla_curso_normalizado(identificador_curso)
+        nombre_tabla_generacion = self._generaciones_en_construccion.get(nombre_tabla_curso_seguro)
+        if nombre_tabla_generacion is None:
+            registrador.warning(f"No hay ninguna generación en construcción de la tabla '{nombre_tabla_curso_seguro}' que publicar.")
+            return False
+        nombre_tabla_generaciones = self._NOMBRE_TABLA_GENERACIONES_TABLAS_CURSOS
+        try:
+            if not self._existe_tabla(nombre_tabla_generacion):
+                registrador.warning(f"La generación '{nombre_tabla_generacion}' no contiene fragmentos; se descarta y se mantiene la tabla publicada.")
+                self.descartar_generacion_tabla_curso(identificador_curso)
+                return False
+
+            nombre_indice_hnsw = self._nombre_indice_hnsw(nombre_tabla_generacion)
+            if not self._existe_indice(nombre_tabla_generacion, nombre_indice_hnsw):
+                registrador.info(f"Creando índice HNSW (vector_l2_ops) '{nombre_indice_hnsw}' sobre la generación '{nombre_tabla_generacion}'.")
+                self.cursor.execute(f'CREATE INDEX "{nombre_indice_hnsw}" ON "{nombre_tabla_generacion}" USING hnsw (embedding vector_l2_ops);')
+                self._confirmar_transaccion_actual()
+            # Una generación sin índice no se publica: las búsquedas del curso pasarían a recorrer la tabla entera.
+            if not self._existe_indice(nombre_tabla_generacion, nombre_indice_hnsw):
+                raise ErrorBaseDeDatosVectorial(
+                    f"El índice HNSW '{nombre_indice_hnsw}' no existe tras crearlo; no se publica la generación '{nombre_tabla_generacion}'.",
+                    tabla_implicada=nombre_tabla_generacion,
+                )
+
+            momento_publicacion = int(time.time())
+            if self._existe_tabla(nombre_tabla_curso_seguro):
+                nombre_tabla_retirada = self._identificador_con_sufijo(nombre_tabla_curso_seguro, f"_r{int(time.time() * 1000)}")
+                self.cursor.execute(f'ALTER TABLE "{nombre_tabla_curso_seguro}" RENAME TO "{nombre_tabla_retirada}";')
+                self.cursor.execute(
+                    f'INSERT INTO "{nombre_tabla_generaciones}" (nombre_tabla_generacion, nombre_tabla_curso, estado, momento_estado) '
+                    f"VALUES (%s, %s, 'retirada', %s);",
+                    (nombre_tabla_retirada, nombre_tabla_curso_seguro, momento_publicacion),
+                )
+            self.cursor.execute(f'ALTER TABLE "{nombre_tabla_generacion}" RENAME TO "{nombre_tabla_curso_seguro}";')
+            self.cursor.execute(f'DELETE FROM "{nombre_tabla_generaciones}" WHERE nombre_tabla_generacion = %s;', (nombre_tabla_generacion,))
+            self._confirmar_transaccion_actual()
+        except psycopg2.Error as e_db_publicacion:
+            registrador.error(f"Error de base de datos al publicar la generación '{nombre_tabla_generacion}' como '{nombre_tabla_curso_seguro}': {e_db_publicacion}")
+            self._revertir_transaccion_actual()
+            raise ErrorBaseDeDatosVectorial(f"Error al publicar la nueva generación de la tabla '{nombre_tabla_curso_seguro}'.", e_db_publicacion, tabla_implicada=nombre_tabla_curso_seguro)
+        del self._generaciones_en_construccion[nombre_tabla_curso_seguro]
+        registrador.info(f"Generación '{nombre_tabla_generacion}' publicada como tabla del curso '{nombre_tabla_curso_seguro}'.")
+        self.eliminar_generaciones_caducadas()
+        return True
+
+    def descartar_generacion_tabla_curso(self, identificador_curso: Any) -> None:
+        """Elimina la generación en construcción del curso (reconstrucción abortada). La tabla publicada no se toca."""
+        self._establecer_o_verificar_conexion_db()
+        nombre_tabla_curso_seguro = self.obtener_nombre_tabla_curso_normalizado(identificador_curso)
+        nombre_tabla_generacion = self._generaciones_en_construccion.pop(nombre_tabla_curso_seguro, None)
+        if nombre_tabla_generacion is None:
+            return
+        try:
+            self.cursor.execute(f'DROP TABLE IF EXISTS "{nombre_tabla_generacion}";')
+            self.cursor.execute(f'DELETE FROM "{self._NOMBRE_TABLA_GENERACIONES_TABLAS_CURSOS}" WHERE nombre_tabla_generacion = %s;', (nombre_tabla_generacion,))
+            self._confirmar_transaccion_actual()
+            registrador.info(f"Generación '{nombre_tabla_generacion}' de la tabla '{nombre_tabla_curso_seguro}' descartada.")
+        except psycopg2.Error as e_db_descarte:
+            registrador.error(f"Error de base de datos al descartar la generación '{nombre_tabla_generacion}': {e_db_descarte}")
+            self._revertir_transaccion_actual()
+            raise ErrorBaseDeDatosVectorial(f"Error al descartar la generación '{nombre_tabla_generacion}'.", e_db_descarte, tabla_implicada=nombre_tabla_generacion)
+
+    def eliminar_generaciones_caducadas(self) -> int:
+        """
+        Elimina las tablas retiradas cuyo periodo de gracia ha vencido y las generaciones en construcción
+        abandonadas (proceso interrumpido) hace más de `_SEGUNDOS_ABANDONO_GENERACION_EN_CONSTRUCCION`.
+        Un fallo se registra y no se propaga: se reintentará en la próxima publicación.
+
+        Returns:
+            El número de tablas eliminadas.
+        """
+        self._establecer_o_verificar_conexion_db()
+        nombre_tabla_generaciones = self._NOMBRE_TABLA_GENERACIONES_TABLAS_CURSOS
+        momento_actual = int(time.time())
+        tablas_eliminadas = 0
+        try:
+            self.cursor.execute(
+                f'SELECT nombre_tabla_generacion FROM "{nombre_tabla_generaciones}" '
+                f"WHERE (estado = 'retirada' AND momento_estado <= %s) OR (estado = 'en_construccion' AND momento_estado <= %s);",
+                (momento_actual - self.config_db.segundos_gracia_generaciones_retiradas, momento_actual - self._SEGUNDOS_ABANDONO_GENERACION_EN_CONSTRUCCION),
+            )
+            generaciones_caducadas = [fila["nombre_tabla_generacion"] for fila in self.cursor.fetchall()]
+            self._confirmar_transaccion_actual()
+            for nombre_tabla_caducada in generaciones_caducadas:
+                if nombre_tabla_caducada in self._generaciones_en_construccion.values():
+                    continue
+                self.cursor.execute(f'DROP TABLE IF EXISTS "{nombre_tabla_caducada}";')
+                self.cursor.execute(f'DELETE FROM "{nombre_tabla_generaciones}" WHERE nombre_tabla_generacion = %s;', (nombre_tabla_caducada,))
+                self._confirmar_transaccion_actual()
+                tablas_eliminadas += 1
+                registrador.info(f"Tabla de curso retirada o abandonada '{nombre_tabla_caducada}' eliminada.")
+        except psycopg2.Error as e_db_limpieza:
+            registrador.warning(f"No se pudieron eliminar las generaciones caducadas de tablas de cursos: {e_db_limpieza}")
+            self._revertir_transaccion_actual()
+        return tablas_eliminadas
+
+    # --- Métodos para revectorizar un curso (cambio de modelo de embedding) ---
+
+    def contar_fragmentos_curso(self, identificador_curso: Any) -> int:
+        """Devuelve el número de fragmentos de la tabla publicada del curso (0 si la tabla no existe)."""
+        self._establecer_o_verificar_conexion_db()
+        nombre_tabla_curso_seguro = self.obtener_nombre_tabla_curso_normalizado(identificador_curso)
+        try:
+            if not self._existe_tabla(nombre_tabla_curso_seguro):
+                return 0
+            self.cursor.execute(f'SELECT count(*) AS total_fragmentos FROM "{nombre_tabla_curso_seguro}";')
+            return self.cursor.fetchone()["total_fragmentos"]
+        except psycopg2.Error as e_db_conteo:
+            registrador.error(f"Error de base de datos al contar los fragmentos de la tabla '{nombre_tabla_curso_seguro}': {e_db_conteo}")
+            raise ErrorBaseDeDatosVectorial(f"Error al contar los fragmentos de '{nombre_tabla_curso_seguro}'.", e_db_conteo, tabla_implicada=nombre_tabla_curso_seguro)
+
+    def leer_pagina_fragmentos_curso(self, identificador_curso: Any, ultimo_id_fragmento: Optional[str], tamano_pagina: int) -> List[Dict[str, Any]]:
+        """
+        Lee, en orden de `id_fragmento`, los fragmentos (sin el embedding) posteriores a `ultimo_id_fragmento`.
+        La paginación por clave no mantiene cursores abiertos entre páginas, así que pueden confirmarse
+        transacciones (las inserciones en la nueva generación) entre lectura y lectura. Los metadatos se devuelven como dict.
+        """
+        self._establecer_o_verificar_conexion_db()
+        nombre_tabla_curso_seguro = self.obtener_nombre_tabla_curso_normalizado(identificador_curso)
+        try:
+            sql_pagina_fragmentos = f'SELECT id_fragmento, id_curso, id_documento, texto, metadatos FROM "{nombre_tabla_curso_seguro}"'
+            if ultimo_id_fragmento is None:
+                self.cursor.execute(f"{sql_pagina_fragmentos} ORDER BY id_fragmento LIMIT %s;", (tamano_pagina,))
+            else:
+                self.cursor.execute(f"{sql_pagina_fragmentos} WHERE id_fragmento > %s ORDER BY id_fragmento LIMIT %s;", (ultimo_id_fragmento, tamano_pagina))
+            filas_pagina = [dict(fila_db) for fila_db in self.cursor.fetchall()]
+            self._confirmar_transaccion_actual() # No dejar la transacción de lectura abierta mientras se generan los embeddings
+        except psycopg2.Error as e_db_lectura:
+            registrador.error(f"Error de base de datos al leer fragmentos de la tabla '{nombre_tabla_curso_seguro}': {e_db_lectura}")
+            self._revertir_transaccion_actual()
+            raise ErrorBaseDeDatosVectorial(f"Error al leer los fragmentos de '{nombre_tabla_curso_seguro}'.", e_db_lectura, tabla_implicada=nombre_tabla_curso_seguro)
+        for fila_fragmento in filas_pagina:
+            if isinstance(fila_fragmento.get("metadatos"), str):
+                try:
+                    fila_fragmento["metadatos"] = json.loads(fila_fragmento["metadatos"])
+                except json.JSONDecodeError:
+                    registrador.warning(f"No se pudo decodificar metadatos JSON para fragmento {fila_fragmento['id_fragmento']} en tabla '{nombre_tabla_curso_seguro}'.")
+                    fila_fragmento["metadatos"] = {}
+            fila_fragmento["metadatos"] = fila_fragmento.get("metadatos") or {}
+        return filas_pagina
+
+    def insertar_fragmentos_revectorizados(self, identificador_curso: Any, filas_fragmentos: List[Dict[str, Any]], embeddings_fragmentos: List[List[float]]) -> int:
+        """
+        Inserta los fragmentos leídos de la tabla del curso con sus nuevos embeddings en la tabla de escritura
+        del curso (normalmente una generación en construcción, creada aquí con la dimensión del nuevo modelo).
+        """
+        if not filas_fragmentos:
+            return 0
+        self.asegurar_existencia_tabla_curso(identificador_curso, len(embeddings_fragmentos[0]))
+        nombre_tabla_destino = self._nombre_tabla_escritura_curso(identificador_curso)
+        datos_para_insercion_masiva = [
+            (fila["id_fragmento"], fila["id_curso"], fila["id_documento"], fila["texto"], json.dumps(fila["metadatos"]), embedding)
+            for fila, embedding in zip(filas_fragmentos, embeddings_fragmentos)
+        ]
+        try:
+            execute_values(
+                self.cursor,
+                f'INSERT INTO "{nombre_tabla_destino}" (id_fragmento, id_curso, id_documento, texto, metadatos, embedding) VALUES %s;',
+                datos_para_insercion_masiva,
+                page_size=500,
+            )
+            self._confirmar_transaccion_actual()
+            return len(datos_para_insercion_masiva)
+        except psycopg2.Error as e_db_insercion:
+            registrador.error(f"Error de base de datos al insertar fragmentos revectorizados en la tabla '{nombre_tabla_destino}': {e_db_insercion}")
+            self._revertir_transaccion_actual()
+            raise ErrorBaseDeDatosVectorial(f"Error al insertar fragmentos revectorizados en '{nombre_tabla_destino}'.", e_db_insercion, tabla_implicada=nombre_tabla_destino)
+
     # --- Métodos para seguimiento de archivos procesados ---
 
     def _asegurar_existencia_tabla_seguimiento_archivos(self):
@@ -440,21 +771,36 @@ class EnvoltorioPgVector:
             self.cursor.execute(f"SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = '{nombre_tabla_fijo_seguimiento}');")
             if (resultado_existencia_seguimiento := self.cursor.fetchone()) and resultado_existencia_seguimiento["exists"]:
                 registrador.debug(f"Tabla de seguimiento '{nombre_tabla_fijo_seguimiento}' ya existe.")
-                return # La tabla ya existe
-
-            registrador.info(f"Tabla de seguimiento '{nombre_tabla_fijo_seguimiento}' no existe. Creando tabla...")
-            sql_crear_tabla_fijo_seguimiento = f"""
-            CREATE TABLE IF NOT EXISTS "{nombre_tabla_fijo_seguimiento}" (
-                id_curso INTEGER NOT NULL,
-                identificador_archivo TEXT NOT NULL, -- Podría ser un ID de Moodle, un hash de contenido, o un path único
-                tiempo_modificacion_moodle BIGINT NOT NULL, -- Timestamp Unix de Moodle (o del archivo)
-                procesado_en BIGINT NOT NULL, -- Timestamp Unix de cuándo fue procesado por EntrenAI
-                PRIMARY KEY (id_curso, identificador_archivo) -- Clave primaria compuesta
-            );
-            """
-            self.cursor.execute(sql_crear_tabla_fijo_seguimiento)
-            self._confirmar_transaccion_actual() # Importante hacer commit después de CREATE TABLE
-            registrador.info(f"Tabla de seguimiento de archivos '{nombre_tabla_fijo_seguimiento}' creada exitosamente.")
+            else:
+                registrador.info(f"Tabla de seguimiento '{nombre_tabla_fijo_seguimiento}' no existe. Creando tabla...")
+                sql_crear_tabla_fijo_seguimiento = f"""
+                CREATE TABLE IF NOT EXISTS "{nombre_tabla_fijo_seguimiento}" (
+                    id_curso INTEGER NOT NULL,
+                    identificador_archivo TEXT NOT NULL, -- Podría ser un ID de Moodle, un hash de contenido, o un path único
+                    tiempo_modificacion_moodle BIGINT NOT NULL, -- Timestamp Unix de Moodle (o del archivo)
+                    procesado_en BIGINT NOT NULL, -- Timestamp Unix de cuándo fue procesado por EntrenAI
+                    PRIMARY KEY (id_curso, identificador_archivo) -- Clave primaria compuesta
+                );
+                """
+                self.cursor.execute(sql_crear_tabla_fijo_seguimiento)
+                registrador.info(f"Tabla de seguimiento de archivos '{nombre_tabla_fijo_seguimiento}' creada exitosamente.")
+
+            # Columnas de contenido, añadidas después de la versión inicial de la tabla: permiten reconocer un archivo
+            # cuyos bytes no cambiaron aunque Moodle haya actualizado su 'timemodified'. Sólo se ejecuta el ALTER
+            # (que bloquea la tabla) si falta alguna.
+            self.cursor.execute(
+                "SELECT column_name FROM information_schema.columns WHERE table_name = %s;", (nombre_tabla_fijo_seguimiento,)
+            )
+            columnas_existentes_seguimiento = {fila_columna["column_name"] for fila_columna in self.cursor.fetchall()}
+            if not {"hash_contenido_moodle", "huella_sha256", "tamano_bytes"} <= columnas_existentes_seguimiento:
+                registrador.info(f"Añadiendo columnas de contenido (hash y tamaño) a la tabla de seguimiento '{nombre_tabla_fijo_seguimiento}'.")
+                self.cursor.execute(f"""
+                    ALTER TABLE "{nombre_tabla_fijo_seguimiento}"
+                        ADD COLUMN IF NOT EXISTS hash_contenido_moodle TEXT, -- 'contenthash' del registro de archivo de Moodle (SHA-1), si se expone
+                        ADD COLUMN IF NOT EXISTS huella_sha256 TEXT, -- SHA-256 de los bytes, calculado durante la descarga
+                        ADD COLUMN IF NOT EXISTS tamano_bytes BIGINT; -- Tamaño del archivo en bytes
+                """)
+            self._confirmar_transaccion_actual() # Importante hacer commit después de CREATE/ALTER TABLE
         except psycopg2.Error as e_db_seguimiento:
             registrador.error(f"Error de base de datos al asegurar la tabla de seguimiento '{nombre_tabla_fijo_seguimiento}': {e_db_seguimiento}")
             self._revertir_transaccion_actual() # Revertir si la creación falla
@@ -486,6 +832,39 @@ class EnvoltorioPgVector:
             registrador.exception(f"Error inesperado al obtener marcas de tiempo para curso ID '{id_curso}': {e_inesperado_marcas}")
             raise ErrorBaseDeDatosVectorial(f"Error inesperado obteniendo marcas de tiempo para curso {id_curso}.", e_inesperado_marcas, tabla_implicada=nombre_tabla_fijo_seguimiento)
 
+    def obtener_registros_seguimiento_archivos_curso(self, id_curso: int) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene, en una sola consulta, el registro de seguimiento de todos los archivos procesados de un curso:
+        {identificador_archivo: {"tiempo_modificacion_moodle", "hash_contenido_moodle", "huella_sha256", "tamano_bytes"}}.
+        Las columnas de contenido son None en los archivos registrados antes de que existieran.
+        """
+        self._establecer_o_verificar_conexion_db()
+        nombre_tabla_fijo_seguimiento = self._NOMBRE_TABLA_SEGUIMIENTO_ARCHIVOS_PROCESADOS
+        registrador.debug(f"Obteniendo registros de seguimiento de archivos para curso ID {id_curso} desde tabla '{nombre_tabla_fijo_seguimiento}'.")
+        try:
+            sql_consulta_registros = (
+                f'SELECT identificador_archivo, tiempo_modificacion_moodle, hash_contenido_moodle, huella_sha256, tamano_bytes '
+                f'FROM "{nombre_tabla_fijo_seguimiento}" WHERE id_curso = %s;'
+            )
+            self.cursor.execute(sql_consulta_registros, (id_curso,))
+            registros_seguimiento_curso = {
+                fila_resultado["identificador_archivo"]: {
+                    "tiempo_modificacion_moodle": fila_resultado["tiempo_modificacion_moodle"],
+                    "hash_contenido_moodle": fila_resultado["hash_contenido_moodle"],
+                    "huella_sha256": fila_resultado["huella_sha256"],
+                    "tamano_bytes": fila_resultado["tamano_bytes"],
+                }
+                for fila_resultado in self.cursor.fetchall()
+            }
+            registrador.info(f"Se encontraron {len(registros_seguimiento_curso)} registros de seguimiento de archivos para el curso ID {id_curso}.")
+            return registros_seguimiento_curso
+        except psycopg2.Error as e_db_registros:
+            registrador.error(f"Error de base de datos al obtener registros de seguimiento para curso ID '{id_curso}': {e_db_registros}")
+            raise ErrorBaseDeDatosVectorial(f"Error al obtener registros de seguimiento para curso {id_curso}.", e_db_registros, tabla_implicada=nombre_tabla_fijo_seguimiento)
+        except Exception as e_inesperado_registros:
+            registrador.exception(f"Error inesperado al obtener registros de seguimiento para curso ID '{id_curso}': {e_inesperado_registros}")
+            raise ErrorBaseDeDatosVectorial(f"Error inesperado obteniendo registros de seguimiento para curso {id_curso}.", e_inesperado_registros, tabla_implicada=nombre_tabla_fijo_seguimiento)
+
     def verificar_si_archivo_es_nuevo_o_modificado(self, id_curso: int, identificador_archivo: str, tiempo_modificacion_actual_moodle: int) -> bool:
         """
         Comprueba si un archivo es nuevo (no está en seguimiento) o ha sido modificado
@@ -520,10 +899,20 @@ class EnvoltorioPgVector:
             return True # Asumir que necesita reprocesamiento por seguridad
 
 
-    def marcar_archivo_como_procesado_en_seguimiento(self, id_curso: int, identificador_archivo: str, tiempo_modificacion_moodle: int) -> bool:
+    def marcar_archivo_como_procesado_en_seguimiento(
+        self,
+        id_curso: int,
+        identificador_archivo: str,
+        tiempo_modificacion_moodle: int,
+        huella_sha256: Optional[str] = None,
+        tamano_bytes: Optional[int] = None,
+        hash_contenido_moodle: Optional[str] = None,
+    ) -> bool:
         """
         Registra o actualiza un archivo en la tabla de seguimiento, marcándolo como procesado
         con el `tiempo_modificacion_moodle` actual y el timestamp de procesamiento actual.
+        Si se conocen, guarda también la huella SHA-256, el tamaño y el 'contenthash' de Moodle del contenido
+        procesado, para omitir en el futuro las versiones con los mismos bytes.
         """
         self._establecer_o_verificar_conexion_db()
         timestamp_unix_procesamiento_actual = int(time.time()) # Timestamp Unix actual
@@ -532,13 +921,19 @@ class EnvoltorioPgVector:
 
         try:
             sql_upsert_seguimiento_archivo = f"""
-            INSERT INTO "{nombre_tabla_fijo_seguimiento}" (id_curso, identificador_archivo, tiempo_modificacion_moodle, procesado_en)
-            VALUES (%s, %s, %s, %s)
+            INSERT INTO "{nombre_tabla_fijo_seguimiento}" (id_curso, identificador_archivo, tiempo_modificacion_moodle, procesado_en, hash_contenido_moodle, huella_sha256, tamano_bytes)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
             ON CONFLICT (id_curso, identificador_archivo) DO UPDATE SET
                 tiempo_modificacion_moodle = EXCLUDED.tiempo_modificacion_moodle,
-                procesado_en = EXCLUDED.procesado_en;
+                procesado_en = EXCLUDED.procesado_en,
+                hash_contenido_moodle = EXCLUDED.hash_contenido_moodle,
+                huella_sha256 = EXCLUDED.huella_sha256,
+                tamano_bytes = EXCLUDED.tamano_bytes;
             """
-            self.cursor.execute(sql_upsert_seguimiento_archivo, (id_curso, identificador_archivo, tiempo_modificacion_moodle, timestamp_unix_procesamiento_actual))
+            self.cursor.execute(sql_upsert_seguimiento_archivo, (
+                id_curso, identificador_archivo, tiempo_modificacion_moodle, timestamp_unix_procesamiento_actual,
+                hash_contenido_moodle, huella_sha256, tamano_bytes,
+            ))
             self._confirmar_transaccion_actual()
             registrador.info(f"Archivo '{identificador_archivo}' (curso {id_curso}) marcado como procesado exitosamente en tabla de seguimiento.")
             return True
@@ -0,0 +1,110 @@
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from entrenai_refactor.config.registrador import obtener_registrador
+
+registrador = obtener_registrador(__name__)
+
+
+class CacheDiscoDireccionadaPorContenido:
+    """
+    Caché persistente en disco de textos, direccionada por una clave hexadecimal (normalmente un SHA-256
+    calculado por la subclase a partir del contenido de origen y de los parámetros que afectan al resultado).
+
+    Las entradas se guardan como '<directorio>/<2 primeros caracteres>/<clave><extensión>' y se escriben
+    de forma atómica. Cuando el tamaño total supera el máximo configurado se eliminan las entradas
+    menos usadas recientemente (se usa la fecha de modificación del archivo, que se actualiza en cada acierto).
+    """
+
+    def __init__(self, directorio_cache: Path, tamano_maximo_bytes: int, extension_entradas: str, descripcion_cache: str):
+        self.directorio_cache = Path(directorio_cache)
+        self.tamano_maximo_bytes = max(0, tamano_maximo_bytes)
+        self.extension_entradas = extension_entradas
+        self.descripcion_cache = descripcion_cache # Sólo para los mensajes de log
+        self._candado = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.directorio_cache.mkdir(parents=True, exist_ok=True)
+        self._tamano_total_bytes = sum(ruta.stat().st_size for ruta in self.directorio_cache.glob(f"*/*{self.extension_entradas}"))
+        registrador.info(
+            f"Caché de {self.descripcion_cache} inicializada en '{self.directorio_cache}' "
+            f"({self._tamano_total_bytes / (1024 * 1024):.1f} MB usados de {self.tamano_maximo_bytes / (1024 * 1024):.1f} MB)."
+        )
+
+    def _ruta_entrada(self, clave_cache: str) -> Path:
+        return self.directorio_cache / clave_cache[:2] / f"{clave_cache}{self.extension_entradas}"
+
+    def obtener(self, clave_cache: str) -> Optional[str]:
+        """Devuelve el texto cacheado para la clave, o None si no existe (o no se puede leer)."""
+        ruta_entrada = self._ruta_entrada(clave_cache)
+        try:
+            contenido_texto = ruta_entrada.read_text(encoding="utf-8")
+            os.utime(ruta_entrada) # Marcar como usada recientemente para la política de desalojo
+        except FileNotFoundError:
+            with self._candado:
+                self.fallos += 1
+            return None
+        except OSError as e_lectura:
+            registrador.warning(f"No se pudo leer la entrada de caché de {self.descripcion_cache} '{ruta_entrada}': {e_lectura}")
+            with self._candado:
+                self.fallos += 1
+            return None
+        with self._candado:
+            self.aciertos += 1
+        registrador.debug(f"Acierto en caché de {self.descripcion_cache} para la clave {clave_cache[:12]}...")
+        return contenido_texto
+
+    def guardar(self, clave_cache: str, contenido_texto: str) -> None:
+        """Guarda un texto en la caché (escritura atómica) y desaloja entradas antiguas si se supera el tamaño máximo."""
+        contenido_bytes = contenido_texto.encode("utf-8")
+        if len(contenido_bytes) > self.tamano_maximo_bytes:
+            registrador.debug(f"Entrada de {len(contenido_bytes)} bytes supera el tamaño máximo de la caché de {self.descripcion_cache}; no se guarda.")
+            return
+        ruta_entrada = self._ruta_entrada(clave_cache)
+        ruta_temporal = ruta_entrada.with_name(f"{ruta_entrada.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            ruta_entrada.parent.mkdir(parents=True, exist_ok=True)
+            tamano_previo = ruta_entrada.stat().st_size if ruta_entrada.exists() else 0
+            ruta_temporal.write_bytes(contenido_bytes)
+            os.replace(ruta_temporal, ruta_entrada)
+        except OSError as e_escritura:
+            registrador.warning(f"No se pudo guardar la entrada de caché de {self.descripcion_cache} '{ruta_entrada}': {e_escritura}")
+            ruta_temporal.unlink(missing_ok=True)
+            return
+        with self._candado:
+            self._tamano_total_bytes += len(contenido_bytes) - tamano_previo
+            if self._tamano_total_bytes > self.tamano_maximo_bytes:
+                self._desalojar_entradas_antiguas()
+
+    def _desalojar_entradas_antiguas(self) -> None:
+        """Elimina las entradas menos usadas recientemente hasta quedar por debajo del 90% del tamaño máximo. Requiere el candado."""
+        entradas_por_antiguedad = []
+        for ruta_entrada in self.directorio_cache.glob(f"*/*{self.extension_entradas}"):
+            try:
+                estado_archivo = ruta_entrada.stat()
+            except OSError:
+                continue
+            entradas_por_antiguedad.append((estado_archivo.st_mtime, estado_archivo.st_size, ruta_entrada))
+        entradas_por_antiguedad.sort()
+
+        self._tamano_total_bytes = sum(tamano for _, tamano, _ in entradas_por_antiguedad)
+        objetivo_bytes = int(self.tamano_maximo_bytes * 0.9)
+        entradas_eliminadas = 0
+        for _, tamano_entrada, ruta_entrada in entradas_por_antiguedad:
+            if self._tamano_total_bytes <= objetivo_bytes:
+                break
+            try:
+                ruta_entrada.unlink()
+            except OSError as e_borrado:
+                registrador.warning(f"No se pudo desalojar la entrada de caché de {self.descripcion_cache} '{ruta_entrada}': {e_borrado}")
+                continue
+            self._tamano_total_bytes -= tamano_entrada
+            entradas_eliminadas += 1
+        registrador.info(f"Caché de {self.descripcion_cache}: {entradas_eliminadas} entradas desalojadas; tamaño actual {self._tamano_total_bytes / (1024 * 1024):.1f} MB.")
+
+    def obtener_estadisticas(self) -> Dict[str, int]:
+        """Devuelve aciertos, fallos y tamaño actual (bytes) de la caché."""
+        with self._candado:
+            return {"aciertos": self.aciertos, "fallos": self.fallos, "tamano_bytes": self._tamano_total_bytes}
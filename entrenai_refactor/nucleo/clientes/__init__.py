@@ -8,11 +8,27 @@
 # Importar las clases refactorizadas para que estén disponibles
 # al importar el paquete 'clientes'.
 from .cliente_moodle import ClienteMoodle, ErrorAPIMoodle
+from .cliente_moodle_asincrono import ClienteMoodleAsincrono, iniciar_pool_http_moodle, cerrar_pool_http_moodle
 from .cliente_n8n import ClienteN8N, ErrorClienteN8N
+from .indice_nombres_cursos import IndiceNombresCursos, obtener_indice_nombres_cursos
+from .almacen_blobs_descargas import AlmacenBlobsDescargas, obtener_almacen_blobs_descargas
+from .descargas_anticipadas import DescargadorAnticipado, ErrorEspacioDescargasInsuficiente
+from .resiliencia_http import EjecutorResilienteHttp, obtener_ejecutor_resiliente_http
 
 __all__ = [
     "ClienteMoodle",
     "ErrorAPIMoodle",
+    "ClienteMoodleAsincrono",
+    "iniciar_pool_http_moodle",
+    "cerrar_pool_http_moodle",
     "ClienteN8N",
     "ErrorClienteN8N",
+    "IndiceNombresCursos",
+    "obtener_indice_nombres_cursos",
+    "AlmacenBlobsDescargas",
+    "obtener_almacen_blobs_descargas",
+    "DescargadorAnticipado",
+    "ErrorEspacioDescargasInsuficiente",
+    "EjecutorResilienteHttp",
+    "obtener_ejecutor_resiliente_http",
 ]
\ No newline at end of file
@@ -0,0 +1,122 @@
+import os
+import shutil
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+from entrenai_refactor.config.configuracion import configuracion_global
+from entrenai_refactor.config.registrador import obtener_registrador
+from entrenai_refactor.nucleo.cache_disco import CacheDiscoDireccionadaPorContenido
+
+registrador = obtener_registrador(__name__)
+
+
+class AlmacenBlobsDescargas(CacheDiscoDireccionadaPorContenido):
+    """
+    Almacén local de los archivos descargados de Moodle, direccionado por el SHA-256 de sus bytes: cada
+    contenido distinto se guarda una sola vez como '<directorio>/<2 primeros caracteres>/<sha256>.blob',
+    aunque aparezca en varios cursos o con varios nombres.
+
+    Los archivos entran y salen del almacén como enlaces duros (el mismo inodo, sin copiar bytes) y sólo se
+    copian si el directorio de descargas está en otro sistema de archivos. Así un curso puede reindexarse
+    (reprocesamiento forzado) tomando los archivos del almacén en lugar de volver a descargarlos de Moodle.
+    Hereda de la caché en disco el límite de tamaño y el desalojo de los blobs usados menos recientemente.
+    """
+
+    def __init__(self, directorio_almacen: Path, tamano_maximo_bytes: int):
+        super().__init__(directorio_almacen, tamano_maximo_bytes, extension_entradas=".blob", descripcion_cache="archivos descargados")
+        self.archivos_deduplicados = 0
+
+    @staticmethod
+    def _enlazar_o_copiar(ruta_origen: Path, ruta_destino: Path) -> None:
+        """Crea `ruta_destino` como enlace duro de `ruta_origen`; si no es posible (otro sistema de archivos), la copia."""
+        try:
+            os.link(ruta_origen, ruta_destino)
+        except OSError:
+            shutil.copyfile(ruta_origen, ruta_destino)
+
+    def contiene(self, huella_sha256: str) -> bool:
+        return self._ruta_entrada(huella_sha256).exists()
+
+    def guardar_archivo(self, ruta_archivo: Path, huella_sha256: str) -> None:
+        """
+        Incorpora al almacén un archivo recién descargado cuyo SHA-256 ya se conoce. Si el contenido ya estaba
+        guardado sólo se marca como usado recientemente. Un fallo se registra y se ignora: el almacén es opcional.
+        """
+        ruta_entrada = self._ruta_entrada(huella_sha256)
+        ruta_temporal = ruta_entrada.with_name(f"{ruta_entrada.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            if ruta_entrada.exists():
+                os.utime(ruta_entrada) # Marcar como usado recientemente para la política de desalojo
+                with self._candado:
+                    self.archivos_deduplicados += 1
+                registrador.debug(f"Contenido de '{ruta_archivo.name}' ya presente en el almacén de {self.descripcion_cache} ({huella_sha256[:12]}...).")
+                return
+            tamano_archivo_bytes = ruta_archivo.stat().st_size
+            if tamano_archivo_bytes > self.tamano_maximo_bytes:
+                registrador.debug(f"Archivo de {tamano_archivo_bytes} bytes supera el tamaño máximo del almacén de {self.descripcion_cache}; no se guarda.")
+                return
+            ruta_entrada.parent.mkdir(parents=True, exist_ok=True)
+            self._enlazar_o_copiar(ruta_archivo, ruta_temporal)
+            os.replace(ruta_temporal, ruta_entrada)
+            os.utime(ruta_entrada) # Un enlace duro conserva la fecha del archivo original
+        except OSError as e_escritura:
+            registrador.warning(f"No se pudo guardar '{ruta_archivo}' en el almacén de {self.descripcion_cache}: {e_escritura}")
+            ruta_temporal.unlink(missing_ok=True)
+            return
+        with self._candado:
+            self._tamano_total_bytes += tamano_archivo_bytes
+            if self._tamano_total_bytes > self.tamano_maximo_bytes:
+                self._desalojar_entradas_antiguas()
+
+    def materializar_archivo(self, huella_sha256: str, ruta_destino: Path) -> bool:
+        """
+        Coloca en `ruta_destino` el contenido con ese SHA-256 (enlace duro o copia, reemplazando de forma atómica
+        lo que hubiera). Devuelve False si el contenido no está (o ya no está) en el almacén.
+        """
+        ruta_entrada = self._ruta_entrada(huella_sha256)
+        ruta_temporal = ruta_destino.with_name(f"{ruta_destino.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            ruta_destino.parent.mkdir(parents=True, exist_ok=True)
+            self._enlazar_o_copiar(ruta_entrada, ruta_temporal)
+            os.replace(ruta_temporal, ruta_destino)
+            os.utime(ruta_entrada)
+        except FileNotFoundError: # Nunca guardado, o desalojado desde entonces
+            ruta_temporal.unlink(missing_ok=True)
+            with self._candado:
+                self.fallos += 1
+            return False
+        except OSError as e_lectura:
+            registrador.warning(f"No se pudo recuperar el contenido {huella_sha256[:12]}... del almacén de {self.descripcion_cache}: {e_lectura}")
+            ruta_temporal.unlink(missing_ok=True)
+            with self._candado:
+                self.fallos += 1
+            return False
+        with self._candado:
+            self.aciertos += 1
+        registrador.debug(f"Contenido {huella_sha256[:12]}... recuperado del almacén de {self.descripcion_cache} en '{ruta_destino}'.")
+        return True
+
+    def obtener_estadisticas(self) -> Dict[str, int]:
+        """Como en la caché en disco, más el número de descargas cuyo contenido ya estaba guardado."""
+        estadisticas_almacen = super().obtener_estadisticas()
+        with self._candado:
+            estadisticas_almacen["archivos_deduplicados"] = self.archivos_deduplicados
+        return estadisticas_almacen
+
+
+@lru_cache(maxsize=1)
+def obtener_almacen_blobs_descargas() -> Optional[AlmacenBlobsDescargas]:
+    """Devuelve el almacén de descargas del proceso, o None si está deshabilitado o no se pudo crear."""
+    config_procesamiento = configuracion_global.procesamiento
+    if not config_procesamiento.almacen_descargas_habilitado:
+        return None
+    try:
+        return AlmacenBlobsDescargas(
+            directorio_almacen=configuracion_global.ruta_absoluta_directorio_datos / "almacen_descargas",
+            tamano_maximo_bytes=config_procesamiento.tamano_maximo_almacen_descargas_mb * 1024 * 1024,
+        )
+    except OSError as e_almacen:
+        registrador.warning(f"No se pudo inicializar el almacén de archivos descargados; se continuará sin él: {e_almacen}")
+        return None
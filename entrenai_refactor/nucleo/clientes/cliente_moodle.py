@@ -1,12 +1,18 @@
+import hashlib
+import os
+import threading
+import time
 from pathlib import Path
-from typing import List, Optional, Dict, Any
-from urllib.parse import urljoin
+from typing import List, Optional, Dict, Any, Tuple, NamedTuple
+from urllib.parse import urljoin, urlsplit
 
 import requests
 
 from entrenai_refactor.api import modelos as modelos_api # Modelos Pydantic para la API
 from entrenai_refactor.config.configuracion import configuracion_global
 from entrenai_refactor.config.registrador import obtener_registrador
+from entrenai_refactor.nucleo.clientes.almacen_blobs_descargas import obtener_almacen_blobs_descargas
+from entrenai_refactor.nucleo.clientes.resiliencia_http import es_fallo_transitorio_requests, obtener_ejecutor_resiliente_http
 
 registrador = obtener_registrador(__name__)
 
@@ -34,42 +40,126 @@ class ErrorAPIMoodle(Exception):
         return f"{super().__str__()}{detalle_ws}{detalle_codigo}"
 
 
-class ClienteMoodle:
-    """Cliente para interactuar con la API de Web Services de Moodle."""
+class ArchivoDescargadoMoodle(NamedTuple):
+    """Resultado de una descarga: ruta local, SHA-256 (hex) calculado durante la descarga y tamaño en bytes."""
+    ruta_local: Path
+    huella_sha256: str
+    tamano_bytes: int
+
+
+class InstantaneaContenidosCurso:
+    """
+    Instantánea de la respuesta de `core_course_get_contents` de un curso, obtenida una sola vez por
+    operación y con índices precalculados por nombre de sección, por ID de módulo de curso (cmid) y por
+    (sección, nombre de módulo). Las búsquedas de sección, módulo y carpeta de una misma operación la
+    comparten en lugar de volver a descargar y recorrer los contenidos completos del curso.
+    """
+
+    def __init__(self, id_curso: int, secciones: List[Dict[str, Any]]):
+        self.id_curso = id_curso
+        self.secciones = secciones # Estructura cruda, tal como la devuelve la API
+        self.momento_obtencion = time.monotonic()
+        self._secciones_por_nombre: Dict[str, Dict[str, Any]] = {}
+        self._modulos_por_id: Dict[int, Dict[str, Any]] = {}
+        self._modulos_por_seccion_y_nombre: Dict[Tuple[Any, Any], List[Dict[str, Any]]] = {}
+
+        for datos_seccion_api in secciones:
+            if not isinstance(datos_seccion_api, dict):
+                registrador.warning(f"Elemento de sección en contenidos del curso {id_curso} no es un diccionario: {datos_seccion_api}")
+                continue
+            # Ante nombres de sección repetidos se conserva la primera, como en la búsqueda lineal.
+            self._secciones_por_nombre.setdefault(datos_seccion_api.get("name"), datos_seccion_api)
+            modulos_en_seccion_api = datos_seccion_api.get("modules", [])
+            if not isinstance(modulos_en_seccion_api, list):
+                registrador.warning(f"Los módulos en la sección {datos_seccion_api.get('id')} (curso {id_curso}) no son una lista: {modulos_en_seccion_api}")
+                continue
+            for datos_modulo_api in modulos_en_seccion_api:
+                if not isinstance(datos_modulo_api, dict):
+                    registrador.warning(f"Elemento de módulo en sección {datos_seccion_api.get('id')} no es un diccionario: {datos_modulo_api}")
+                    continue
+                self._modulos_por_id.setdefault(datos_modulo_api.get("id"), datos_modulo_api)
+                clave_modulo = (datos_seccion_api.get("id"), datos_modulo_api.get("name"))
+                self._modulos_por_seccion_y_nombre.setdefault(clave_modulo, []).append(datos_modulo_api)
+
+    def obtener_seccion_por_nombre(self, nombre_seccion: str) -> Optional[Dict[str, Any]]:
+        """Devuelve los datos crudos de la (primera) sección con ese nombre, o None."""
+        return self._secciones_por_nombre.get(nombre_seccion)
+
+    def obtener_modulo_por_id(self, id_modulo_curso: int) -> Optional[Dict[str, Any]]:
+        """Devuelve los datos crudos del módulo con ese ID de módulo de curso (cmid), o None."""
+        return self._modulos_por_id.get(id_modulo_curso)
+
+    def obtener_modulo_por_nombre(self, id_seccion: int, nombre_modulo: str, tipo_modulo: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Devuelve los datos crudos del primer módulo de la sección con ese nombre (y tipo, si se indica), o None."""
+        for datos_modulo_api in self._modulos_por_seccion_y_nombre.get((id_seccion, nombre_modulo), []):
+            if tipo_modulo is None or datos_modulo_api.get("modname") == tipo_modulo:
+                return datos_modulo_api
+        return None
+
+
+class CacheContenidosCursos:
+    """
+    Caché en memoria, segura entre hilos y compartida entre peticiones, de instantáneas de contenidos de
+    curso con un tiempo de vida corto. Las operaciones que modifican un curso la invalidan explícitamente.
+    La clave incluye la URL de la API para no mezclar instancias de Moodle distintas.
+    """
+
+    def __init__(self):
+        self._entradas: Dict[Tuple[str, int], InstantaneaContenidosCurso] = {}
+        self._candado = threading.Lock()
+
+    def obtener(self, clave: Tuple[str, int], ttl_segundos: float) -> Optional[InstantaneaContenidosCurso]:
+        with self._candado:
+            instantanea = self._entradas.get(clave)
+            if instantanea is None:
+                return None
+            if time.monotonic() - instantanea.momento_obtencion > ttl_segundos:
+                del self._entradas[clave]
+                return None
+            return instantanea
 
-    url_base_api: Optional[str] # URL completa al endpoint server.php de Moodle
+    def guardar(self, clave: Tuple[str, int], instantanea: InstantaneaContenidosCurso) -> None:
+        with self._candado:
+            self._entradas[clave] = instantanea
 
-    def __init__(self, sesion_http: Optional[requests.Session] = None): # Renombrado 'sesion' a 'sesion_http'
-        """
-        Inicializa el ClienteMoodle.
+    def invalidar(self, clave: Tuple[str, int]) -> None:
+        with self._candado:
+            self._entradas.pop(clave, None)
 
-        Args:
-            sesion_http: Opcional. Una instancia de requests.Session para reutilizar conexiones.
-                         Si no se provee, se crea una nueva sesión.
-        """
+
+_cache_contenidos_cursos_compartida = CacheContenidosCursos()
+
+
+class ClienteMoodleBase:
+    """
+    Parte común, independiente del transporte HTTP, de los clientes síncrono (`ClienteMoodle`) y asíncrono
+    (`ClienteMoodleAsincrono`): URL del endpoint REST, codificación de parámetros al formato de Moodle,
+    validación de las respuestas y traducción de los errores a `ErrorAPIMoodle`.
+    """
+
+    url_base_api: Optional[str] # URL completa al endpoint server.php de Moodle
+
+    def _inicializar_configuracion_moodle(self) -> None:
+        """Lee la configuración de Moodle y construye la URL del endpoint de Web Services."""
         self.config_moodle = configuracion_global.moodle # Acceso a la sub-configuración de Moodle
         if not self.config_moodle.url_moodle:
-            registrador.error("URL de Moodle (MOODLE_URL) no configurada. ClienteMoodle no será funcional.")
+            registrador.error(f"URL de Moodle (MOODLE_URL) no configurada. {type(self).__name__} no será funcional.")
             self.url_base_api = None
         else:
             # Asegurar que la URL base termine con una barra para unir correctamente con server.php
             url_instancia_moodle_limpia = self.config_moodle.url_moodle.rstrip("/") + "/"
             self.url_base_api = urljoin(url_instancia_moodle_limpia, "webservice/rest/server.php")
-
-        self.sesion_http = sesion_http or requests.Session()
-        if self.config_moodle.token_api_moodle:
-            # Configurar parámetros por defecto para todas las peticiones de esta sesión
-            self.sesion_http.params = { # type: ignore[attr-defined]
-                "wstoken": self.config_moodle.token_api_moodle,
-                "moodlewsrestformat": "json",
-            }
-        else:
+        self.host_moodle = urlsplit(self.url_base_api).netloc if self.url_base_api else ""
+        self.ejecutor_resiliente = obtener_ejecutor_resiliente_http() # Reintentos y cortacircuitos compartidos por host
+        if not self.config_moodle.token_api_moodle:
             registrador.warning("Token de API de Moodle (MOODLE_TOKEN) no configurado. El cliente solo podrá acceder a funciones públicas.")
 
-        if self.url_base_api:
-            registrador.info(f"ClienteMoodle inicializado. URL base API Moodle: {self.url_base_api}")
-        else:
-            registrador.warning("ClienteMoodle inicializado sin una URL base API válida (MOODLE_URL no configurada).")
+    @property
+    def parametros_autenticacion(self) -> Dict[str, str]:
+        """Parámetros de URL comunes a todas las peticiones (token y formato de respuesta)."""
+        if not self.config_moodle.token_api_moodle:
+            return {}
+        return {"wstoken": self.config_moodle.token_api_moodle, "moodlewsrestformat": "json"}
 
     @staticmethod
     def _procesar_datos_cursos_api(datos_cursos_api: Any) -> List[modelos_api.CursoMoodle]:
@@ -144,93 +234,172 @@ class ClienteMoodle:
 
         return dict_salida_plano
 
-    def _realizar_peticion_api(
-        self,
-        nombre_funcion_ws: str,
-        parametros_payload: Optional[Dict[str, Any]] = None,
-        metodo_http: str = "POST", # Moodle WS usualmente usa POST, pero GET es posible
-    ) -> Any:
+    @staticmethod
+    def _parametros_busqueda_cursos_por_ids(ids_cursos: List[int]) -> Dict[str, Any]:
+        """Parámetros de `core_course_get_courses_by_field`: campo 'id' para un curso, 'ids' separados por comas para varios."""
+        if len(ids_cursos) == 1:
+            return {"field": "id", "value": ids_cursos[0]}
+        return {"field": "ids", "value": ",".join(str(id_curso) for id_curso in ids_cursos)}
+
+    def _preparar_peticion_api(
+        self, nombre_funcion_ws: str, parametros_payload: Optional[Dict[str, Any]], metodo_http: str
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
         """
-        Realiza una petición genérica a la API de Web Services de Moodle.
-        Maneja la construcción de la URL, el formateo de parámetros y la gestión de errores.
+        Devuelve los parámetros de URL y el cuerpo (sólo en POST) de una petición a la función WS indicada.
+        El token y el formato de respuesta no se incluyen: cada transporte los añade a su sesión.
         """
         if not self.url_base_api:
             registrador.error("URL base de Moodle no configurada. No se puede realizar la petición.")
             raise ErrorAPIMoodle("URL base de Moodle no configurada.", nombre_funcion_ws=nombre_funcion_ws)
 
         # Parámetros base para la URL que identifican la función del WS.
-        # El token y el formato de respuesta ya están en self.sesion_http.params por defecto.
         params_url_funcion = {"wsfunction": nombre_funcion_ws}
-
         # Formatear el payload si existe (para POST va en 'data', para GET en 'params')
         payload_api_formateado = self._formatear_parametros_moodle(parametros_payload) if parametros_payload else {}
+        if metodo_http.upper() == "POST":
+            return params_url_funcion, payload_api_formateado
+        if metodo_http.upper() == "GET":
+            # Para GET, todos los parámetros (incluyendo los formateados del payload) van en la URL
+            return {**params_url_funcion, **payload_api_formateado}, None
+        registrador.error(f"Método HTTP no soportado: {metodo_http} para la función '{nombre_funcion_ws}'")
+        raise ErrorAPIMoodle(f"Método HTTP no soportado: {metodo_http}", nombre_funcion_ws=nombre_funcion_ws)
+
+    @staticmethod
+    def _validar_respuesta_moodle(datos_json: Any, nombre_funcion_ws: str) -> Any:
+        """Moodle puede devolver errores con 200 OK pero con una estructura de excepción en el JSON: se convierten en ErrorAPIMoodle."""
+        if isinstance(datos_json, dict) and "exception" in datos_json:
+            mensaje_error_moodle = datos_json.get("message", f"Error desconocido de Moodle en '{nombre_funcion_ws}'")
+            codigo_error_moodle = datos_json.get("errorcode", "SIN_CODIGO_ERROR")
+            registrador.error(
+                f"Error en respuesta de API Moodle (función '{nombre_funcion_ws}'): {codigo_error_moodle} - {mensaje_error_moodle}"
+            )
+            raise ErrorAPIMoodle(mensaje=mensaje_error_moodle, datos_respuesta=datos_json, nombre_funcion_ws=nombre_funcion_ws)
+        registrador.debug(f"Respuesta exitosa de la función Moodle '{nombre_funcion_ws}'.")
+        return datos_json
+
+    @staticmethod
+    def _es_funcion_ws_de_consulta(nombre_funcion_ws: str) -> bool:
+        """
+        Las funciones de consulta ('..._get_...', búsquedas) son idempotentes y pueden reintentarse; las que crean
+        o modifican contenido no, porque un timeout no garantiza que Moodle no llegara a aplicarlas.
+        """
+        return "_get_" in nombre_funcion_ws or "_search_" in nombre_funcion_ws
+
+    @staticmethod
+    def _crear_error_circuito_abierto(nombre_funcion_ws: str, segundos_hasta_reintento: float) -> ErrorAPIMoodle:
+        registrador.error(f"Petición a '{nombre_funcion_ws}' rechazada: el circuito de Moodle está abierto (próxima prueba en {segundos_hasta_reintento:.0f} s).")
+        return ErrorAPIMoodle(
+            f"Moodle no está disponible (circuito abierto tras fallos repetidos); reintente en {segundos_hasta_reintento:.0f} s.",
+            codigo_estado=503, nombre_funcion_ws=nombre_funcion_ws
+        )
+
+    @staticmethod
+    def _crear_error_http(nombre_funcion_ws: str, codigo_estado_error: Optional[int], texto_respuesta_error: str, error_original: Exception) -> ErrorAPIMoodle:
+        registrador.error(
+            f"Error HTTP {codigo_estado_error} para '{nombre_funcion_ws}': {error_original}. Respuesta: {texto_respuesta_error[:200]}..."
+        )
+        return ErrorAPIMoodle(
+            f"Error HTTP: {codigo_estado_error}", codigo_estado=codigo_estado_error, datos_respuesta=texto_respuesta_error, nombre_funcion_ws=nombre_funcion_ws
+        )
+
+    @staticmethod
+    def _crear_error_timeout(nombre_funcion_ws: str, error_original: Exception) -> ErrorAPIMoodle:
+        registrador.error(f"Timeout durante la petición a '{nombre_funcion_ws}': {error_original}")
+        return ErrorAPIMoodle(f"Timeout al conectar con Moodle para '{nombre_funcion_ws}'", nombre_funcion_ws=nombre_funcion_ws)
+
+    @staticmethod
+    def _crear_error_red(nombre_funcion_ws: str, error_original: Exception) -> ErrorAPIMoodle:
+        registrador.error(f"Excepción de red/petición para '{nombre_funcion_ws}': {error_original}")
+        return ErrorAPIMoodle(f"Error de red o petición para '{nombre_funcion_ws}': {error_original}", nombre_funcion_ws=nombre_funcion_ws)
+
+    @staticmethod
+    def _crear_error_json(nombre_funcion_ws: str, texto_respuesta_bruta: str, error_original: Exception) -> ErrorAPIMoodle:
+        registrador.error(
+            f"Error en decodificación JSON para '{nombre_funcion_ws}': {error_original}. Respuesta bruta: {texto_respuesta_bruta[:200]}..."
+        )
+        return ErrorAPIMoodle(
+            f"Falló la decodificación de la respuesta JSON para '{nombre_funcion_ws}'",
+            datos_respuesta=texto_respuesta_bruta, nombre_funcion_ws=nombre_funcion_ws
+        )
+
+
+class ClienteMoodle(ClienteMoodleBase):
+    """Cliente para interactuar con la API de Web Services de Moodle."""
+
+    def __init__(self, sesion_http: Optional[requests.Session] = None): # Renombrado 'sesion' a 'sesion_http'
+        """
+        Inicializa el ClienteMoodle.
+
+        Args:
+            sesion_http: Opcional. Una instancia de requests.Session para reutilizar conexiones.
+                         Si no se provee, se crea una nueva sesión.
+        """
+        self._inicializar_configuracion_moodle()
+        self.sesion_http = sesion_http or requests.Session()
+        # Instantáneas de contenidos de curso de esta operación (el cliente se crea por petición).
+        self._instantaneas_contenidos_por_curso: Dict[int, InstantaneaContenidosCurso] = {}
+        self.cache_contenidos_cursos = _cache_contenidos_cursos_compartida
+        self.almacen_blobs_descargas = obtener_almacen_blobs_descargas() # None si el almacén de descargas está deshabilitado
+        if self.parametros_autenticacion:
+            # Configurar parámetros por defecto para todas las peticiones de esta sesión
+            self.sesion_http.params = self.parametros_autenticacion # type: ignore[attr-defined]
+
+        if self.url_base_api:
+            registrador.info(f"ClienteMoodle inicializado. URL base API Moodle: {self.url_base_api}")
+        else:
+            registrador.warning("ClienteMoodle inicializado sin una URL base API válida (MOODLE_URL no configurada).")
 
+    def _realizar_peticion_api(
+        self,
+        nombre_funcion_ws: str,
+        parametros_payload: Optional[Dict[str, Any]] = None,
+        metodo_http: str = "POST", # Moodle WS usualmente usa POST, pero GET es posible
+    ) -> Any:
+        """
+        Realiza una petición genérica a la API de Web Services de Moodle.
+        Maneja la construcción de la URL, el formateo de parámetros y la gestión de errores.
+        """
+        params_url, cuerpo_peticion = self._preparar_peticion_api(nombre_funcion_ws, parametros_payload, metodo_http)
         respuesta_http: Optional[requests.Response] = None # Para asegurar que esté definida
 
         try:
             registrador.debug(
                 f"Llamando a función API Moodle '{nombre_funcion_ws}' con método {metodo_http.upper()}. "
-                f"URL base: {self.url_base_api}, Payload (antes de formatear para GET): {parametros_payload}"
+                f"URL base: {self.url_base_api}, Payload (antes de formatear): {parametros_payload}"
             )
-            if metodo_http.upper() == "POST":
-                respuesta_http = self.sesion_http.post(
-                    self.url_base_api,
-                    params=params_url_funcion, # Solo wsfunction aquí
-                    data=payload_api_formateado, # Payload formateado en el cuerpo
-                    timeout=configuracion_global.moodle.get("timeout_peticiones_moodle", 30), # Timeout desde config o default
-                )
-            elif metodo_http.upper() == "GET":
-                # Para GET, todos los parámetros (incluyendo los formateados del payload) van en la URL
-                params_get_completos = {**params_url_funcion, **payload_api_formateado}
-                respuesta_http = self.sesion_http.get(
-                    self.url_base_api,
-                    params=params_get_completos,
-                    timeout=configuracion_global.moodle.get("timeout_peticiones_moodle", 30)
-                )
-            else:
-                registrador.error(f"Método HTTP no soportado: {metodo_http} para la función '{nombre_funcion_ws}'")
-                raise ErrorAPIMoodle(f"Método HTTP no soportado: {metodo_http}", nombre_funcion_ws=nombre_funcion_ws)
-
-            respuesta_http.raise_for_status() # Lanza HTTPError para respuestas 4xx/5xx
 
-            datos_json = respuesta_http.json()
-
-            # Moodle puede devolver errores 200 OK pero con una estructura de excepción en el JSON
-            if isinstance(datos_json, dict) and "exception" in datos_json:
-                mensaje_error_moodle = datos_json.get("message", f"Error desconocido de Moodle en '{nombre_funcion_ws}'")
-                codigo_error_moodle = datos_json.get("errorcode", "SIN_CODIGO_ERROR")
-                registrador.error(
-                    f"Error en respuesta de API Moodle (función '{nombre_funcion_ws}'): {codigo_error_moodle} - {mensaje_error_moodle}"
+            def _enviar_peticion() -> requests.Response:
+                respuesta_enviada = self.sesion_http.request(
+                    metodo_http.upper(),
+                    self.url_base_api,
+                    params=params_url,
+                    data=cuerpo_peticion, # Payload formateado en el cuerpo (sólo POST)
+                    timeout=self.config_moodle.timeout_peticiones_moodle,
                 )
-                raise ErrorAPIMoodle(mensaje=mensaje_error_moodle, datos_respuesta=datos_json, nombre_funcion_ws=nombre_funcion_ws)
-
-            registrador.debug(f"Respuesta exitosa de la función Moodle '{nombre_funcion_ws}'.")
-            return datos_json
+                respuesta_enviada.raise_for_status() # Lanza HTTPError para respuestas 4xx/5xx
+                return respuesta_enviada
+
+            respuesta_http = self.ejecutor_resiliente.ejecutar(
+                self.host_moodle,
+                _enviar_peticion,
+                es_idempotente=self._es_funcion_ws_de_consulta(nombre_funcion_ws),
+                es_fallo_transitorio=es_fallo_transitorio_requests,
+                crear_error_circuito_abierto=lambda segundos_restantes: self._crear_error_circuito_abierto(nombre_funcion_ws, segundos_restantes),
+                descripcion=f"la función WS de Moodle '{nombre_funcion_ws}'",
+            )
+            return self._validar_respuesta_moodle(respuesta_http.json(), nombre_funcion_ws)
 
         except requests.exceptions.HTTPError as error_http:
             codigo_estado_error = error_http.response.status_code if error_http.response is not None else None
             texto_respuesta_error = error_http.response.text if error_http.response is not None else "Sin texto de respuesta."
-            registrador.error(
-                f"Error HTTP {codigo_estado_error} para '{nombre_funcion_ws}': {error_http}. Respuesta: {texto_respuesta_error[:200]}..."
-            )
-            raise ErrorAPIMoodle(
-                f"Error HTTP: {codigo_estado_error}", codigo_estado=codigo_estado_error, datos_respuesta=texto_respuesta_error, nombre_funcion_ws=nombre_funcion_ws
-            ) from error_http
+            raise self._crear_error_http(nombre_funcion_ws, codigo_estado_error, texto_respuesta_error, error_http) from error_http
         except requests.exceptions.Timeout as error_timeout:
-            registrador.error(f"Timeout durante la petición a '{nombre_funcion_ws}': {error_timeout}")
-            raise ErrorAPIMoodle(f"Timeout al conectar con Moodle para '{nombre_funcion_ws}'", nombre_funcion_ws=nombre_funcion_ws) from error_timeout
+            raise self._crear_error_timeout(nombre_funcion_ws, error_timeout) from error_timeout
         except requests.exceptions.RequestException as error_peticion:
-            registrador.error(f"Excepción de red/petición para '{nombre_funcion_ws}': {error_peticion}")
-            raise ErrorAPIMoodle(f"Error de red o petición para '{nombre_funcion_ws}': {error_peticion}", nombre_funcion_ws=nombre_funcion_ws) from error_peticion
+            raise self._crear_error_red(nombre_funcion_ws, error_peticion) from error_peticion
         except ValueError as error_json: # Error al decodificar JSON
             texto_respuesta_bruta = respuesta_http.text if respuesta_http is not None else "Sin respuesta HTTP."
-            registrador.error(
-                f"Error en decodificación JSON para '{nombre_funcion_ws}': {error_json}. Respuesta bruta: {texto_respuesta_bruta[:200]}..."
-            )
-            raise ErrorAPIMoodle(
-                f"Falló la decodificación de la respuesta JSON para '{nombre_funcion_ws}'",
-                datos_respuesta=texto_respuesta_bruta, nombre_funcion_ws=nombre_funcion_ws
-            ) from error_json
+            raise self._crear_error_json(nombre_funcion_ws, texto_respuesta_bruta, error_json) from error_json
 
     # --- Métodos de Obtención de Datos ---
     def obtener_cursos_de_usuario(self, id_usuario: int) -> List[modelos_api.CursoMoodle]:
@@ -270,6 +439,27 @@ class ClienteMoodle:
             registrador.exception(f"Error inesperado en obtener_todos_los_cursos_disponibles (WS: {nombre_funcion_ws}): {e_gen}")
             raise ErrorAPIMoodle("Error inesperado obteniendo todos los cursos", nombre_funcion_ws=nombre_funcion_ws) from e_gen
 
+    def obtener_cursos_por_ids(self, ids_cursos: List[int]) -> List[modelos_api.CursoMoodle]:
+        """
+        Recupera sólo los cursos indicados mediante `core_course_get_courses_by_field` (campo 'id' para uno,
+        'ids' separados por comas para varios), sin descargar el catálogo completo de la instancia.
+        Los IDs que no existen (o no son visibles para el token) simplemente no aparecen en el resultado.
+        """
+        nombre_funcion_ws = "core_course_get_courses_by_field"
+        if not ids_cursos:
+            return []
+        parametros_busqueda = self._parametros_busqueda_cursos_por_ids(ids_cursos)
+        registrador.info(f"Obteniendo {len(ids_cursos)} curso(s) por ID: {ids_cursos[:10]} (WS: {nombre_funcion_ws}).")
+        try:
+            datos_cursos_api = self._realizar_peticion_api(nombre_funcion_ws, parametros_busqueda)
+            return self._procesar_datos_cursos_api(datos_cursos_api)
+        except ErrorAPIMoodle as e:
+            registrador.error(f"Falló la obtención de cursos por ID {ids_cursos[:10]} (WS: {nombre_funcion_ws}): {e}")
+            raise
+        except Exception as e_gen:
+            registrador.exception(f"Error inesperado en obtener_cursos_por_ids (cursos {ids_cursos[:10]}, WS: {nombre_funcion_ws}): {e_gen}")
+            raise ErrorAPIMoodle(f"Error inesperado obteniendo los cursos {ids_cursos[:10]}", nombre_funcion_ws=nombre_funcion_ws) from e_gen
+
     def obtener_contenidos_de_curso(self, id_curso: int) -> List[Dict[str, Any]]:
         """
         Obtiene los contenidos de un curso (secciones y módulos).
@@ -291,23 +481,53 @@ class ClienteMoodle:
             registrador.exception(f"Error inesperado en obtener_contenidos_de_curso (curso {id_curso}, WS: {nombre_funcion_ws}): {e_gen}")
             raise ErrorAPIMoodle(f"Error inesperado obteniendo contenidos del curso {id_curso}", nombre_funcion_ws=nombre_funcion_ws) from e_gen
 
+    def obtener_instantanea_contenidos_curso(self, id_curso: int, forzar_actualizacion: bool = False) -> InstantaneaContenidosCurso:
+        """
+        Devuelve la instantánea indexada de los contenidos del curso. Se obtiene de Moodle una sola vez por
+        operación (el resultado queda memorizado en este cliente) y, si MOODLE_COURSE_CONTENTS_CACHE_TTL_SECONDS
+        es mayor que 0, se reutiliza entre peticiones mientras no caduque ni se invalide.
+
+        Raises:
+            ErrorAPIMoodle: Si falla la petición o la respuesta no es una lista de secciones.
+        """
+        if not forzar_actualizacion and id_curso in self._instantaneas_contenidos_por_curso:
+            return self._instantaneas_contenidos_por_curso[id_curso]
+
+        ttl_cache_segundos = self.config_moodle.ttl_cache_contenidos_curso_segundos
+        clave_cache = (self.url_base_api or "", id_curso)
+        instantanea = None
+        if ttl_cache_segundos > 0 and not forzar_actualizacion:
+            instantanea = self.cache_contenidos_cursos.obtener(clave_cache, ttl_cache_segundos)
+            if instantanea is not None:
+                registrador.debug(f"Contenidos del curso {id_curso} obtenidos de la caché (antigüedad: {time.monotonic() - instantanea.momento_obtencion:.1f} s).")
+
+        if instantanea is None:
+            contenidos_del_curso = self.obtener_contenidos_de_curso(id_curso)
+            if not isinstance(contenidos_del_curso, list):
+                mensaje_error = f"Se esperaba una lista de secciones para el curso {id_curso}, pero se obtuvo: {type(contenidos_del_curso)}."
+                registrador.error(mensaje_error)
+                raise ErrorAPIMoodle(mensaje_error, datos_respuesta=contenidos_del_curso, nombre_funcion_ws="core_course_get_contents")
+            instantanea = InstantaneaContenidosCurso(id_curso, contenidos_del_curso)
+            if ttl_cache_segundos > 0:
+                self.cache_contenidos_cursos.guardar(clave_cache, instantanea)
+
+        self._instantaneas_contenidos_por_curso[id_curso] = instantanea
+        return instantanea
+
+    def invalidar_contenidos_de_curso(self, id_curso: int) -> None:
+        """Descarta la instantánea de contenidos del curso (de esta operación y de la caché compartida) tras modificarlo."""
+        self._instantaneas_contenidos_por_curso.pop(id_curso, None)
+        self.cache_contenidos_cursos.invalidar((self.url_base_api or "", id_curso))
+        registrador.debug(f"Instantánea de contenidos del curso {id_curso} invalidada.")
 
     def obtener_seccion_por_nombre(self, id_curso: int, nombre_seccion_buscada: str) -> Optional[modelos_api.SeccionMoodle]:
         """Recupera una sección específica por su nombre dentro de un curso."""
         registrador.info(f"Buscando sección con nombre '{nombre_seccion_buscada}' en el curso ID: {id_curso}")
         try:
-            contenidos_del_curso = self.obtener_contenidos_de_curso(id_curso) # Lista de dicts de secciones
-            if not isinstance(contenidos_del_curso, list):
-                registrador.error(f"Se esperaba una lista de secciones para el curso {id_curso}, pero se obtuvo: {type(contenidos_del_curso)}. No se puede buscar la sección.")
-                return None
-
-            for datos_seccion_api in contenidos_del_curso:
-                if not isinstance(datos_seccion_api, dict):
-                    registrador.warning(f"Elemento de sección en contenidos del curso {id_curso} no es un diccionario: {datos_seccion_api}")
-                    continue
-                if datos_seccion_api.get("name") == nombre_seccion_buscada:
-                    registrador.info(f"Sección '{nombre_seccion_buscada}' encontrada con ID: {datos_seccion_api.get('id')} en curso {id_curso}.")
-                    return modelos_api.SeccionMoodle(**datos_seccion_api) # Validar y convertir
+            datos_seccion_api = self.obtener_instantanea_contenidos_curso(id_curso).obtener_seccion_por_nombre(nombre_seccion_buscada)
+            if datos_seccion_api is not None:
+                registrador.info(f"Sección '{nombre_seccion_buscada}' encontrada con ID: {datos_seccion_api.get('id')} en curso {id_curso}.")
+                return modelos_api.SeccionMoodle(**datos_seccion_api) # Validar y convertir
 
             registrador.info(f"Sección '{nombre_seccion_buscada}' no fue encontrada en el curso {id_curso}.")
             return None
@@ -329,39 +549,13 @@ class ClienteMoodle:
         )
         registrador.info(mensaje_busqueda_log)
         try:
-            contenidos_del_curso = self.obtener_contenidos_de_curso(id_curso) # Lista de dicts de secciones
-            if not isinstance(contenidos_del_curso, list):
-                registrador.error(f"Se esperaba una lista de contenidos para el curso {id_curso}, se obtuvo {type(contenidos_del_curso)}. No se puede buscar el módulo.")
-                return None
+            datos_modulo_api = self.obtener_instantanea_contenidos_curso(id_curso).obtener_modulo_por_nombre(id_seccion, nombre_modulo_buscado, tipo_modulo_deseado)
+            if datos_modulo_api is not None:
+                registrador.info(f"Módulo '{nombre_modulo_buscado}' (tipo: {datos_modulo_api.get('modname')}) encontrado con ID: {datos_modulo_api.get('id')} en sección {id_seccion}.")
+                return modelos_api.ModuloMoodle(**datos_modulo_api) # Validar y convertir
 
-            for datos_seccion_api in contenidos_del_curso:
-                if not isinstance(datos_seccion_api, dict):
-                    registrador.warning(f"Elemento de sección en contenidos del curso {id_curso} no es un diccionario: {datos_seccion_api}")
-                    continue
-                if datos_seccion_api.get("id") == id_seccion:
-                    modulos_en_seccion_api = datos_seccion_api.get("modules", [])
-                    if not isinstance(modulos_en_seccion_api, list):
-                        registrador.warning(f"Los módulos en la sección {id_seccion} (curso {id_curso}) no son una lista: {modulos_en_seccion_api}")
-                        return None # Sección encontrada pero sin módulos válidos
-                    for datos_modulo_api in modulos_en_seccion_api:
-                        if not isinstance(datos_modulo_api, dict):
-                            registrador.warning(f"Elemento de módulo en sección {id_seccion} no es un diccionario: {datos_modulo_api}")
-                            continue
-
-                        nombre_modulo_api = datos_modulo_api.get("name")
-                        tipo_modulo_api = datos_modulo_api.get("modname") # ej. 'folder', 'url', 'resource'
-
-                        nombre_coincide = nombre_modulo_api == nombre_modulo_buscado
-                        tipo_coincide = tipo_modulo_deseado is None or tipo_modulo_api == tipo_modulo_deseado
-
-                        if nombre_coincide and tipo_coincide:
-                            registrador.info(f"Módulo '{nombre_modulo_buscado}' (tipo: {tipo_modulo_api}) encontrado con ID: {datos_modulo_api.get('id')} en sección {id_seccion}.")
-                            return modelos_api.ModuloMoodle(**datos_modulo_api) # Validar y convertir
-                    registrador.info(f"Módulo '{nombre_modulo_buscado}' (tipo: {tipo_modulo_deseado or 'cualquiera'}) no encontrado en la sección {id_seccion} del curso {id_curso}.")
-                    return None # Módulo no encontrado en esta sección, terminar búsqueda
-
-            registrador.info(f"Sección con ID {id_seccion} no encontrada en el curso {id_curso} al buscar el módulo '{nombre_modulo_buscado}'.")
-            return None # Sección no encontrada
+            registrador.info(f"Módulo '{nombre_modulo_buscado}' (tipo: {tipo_modulo_deseado or 'cualquiera'}) no encontrado en la sección {id_seccion} del curso {id_curso}.")
+            return None
         except ErrorAPIMoodle as e_api:
             registrador.warning(f"Error API Moodle al buscar módulo '{nombre_modulo_buscado}': {e_api}")
             return None
@@ -405,21 +599,13 @@ class ClienteMoodle:
         buscándolo dentro de la estructura de contenidos del curso obtenida por `core_course_get_contents`.
         """
         try:
-            contenidos_del_curso = self.obtener_contenidos_de_curso(id_curso) # Lista de dicts de secciones
-            if not isinstance(contenidos_del_curso, list):
-                registrador.error(f"Contenidos del curso {id_curso} no son una lista, no se pueden buscar archivos de carpeta.")
-                return []
-
-            for seccion_api in contenidos_del_curso:
-                if not isinstance(seccion_api, dict) or "modules" not in seccion_api or not isinstance(seccion_api["modules"], list):
-                    continue # Saltar sección malformada o sin módulos
-                for modulo_api in seccion_api["modules"]:
-                    if isinstance(modulo_api, dict) and modulo_api.get("id") == id_modulo_curso_carpeta:
-                        # Encontramos el módulo de carpeta, ahora parseamos sus contenidos
-                        if modulo_api.get("modname") != "folder":
-                             registrador.warning(f"Módulo con ID de curso (cmid) {id_modulo_curso_carpeta} encontrado pero no es tipo 'folder', es '{modulo_api.get('modname')}'")
-                             return [] # No es una carpeta
-                        return self._parsear_contenidos_modulo_carpeta(modulo_api, id_modulo_curso_carpeta)
+            modulo_api = self.obtener_instantanea_contenidos_curso(id_curso).obtener_modulo_por_id(id_modulo_curso_carpeta)
+            if modulo_api is not None:
+                # Encontramos el módulo de carpeta, ahora parseamos sus contenidos
+                if modulo_api.get("modname") != "folder":
+                     registrador.warning(f"Módulo con ID de curso (cmid) {id_modulo_curso_carpeta} encontrado pero no es tipo 'folder', es '{modulo_api.get('modname')}'")
+                     return [] # No es una carpeta
+                return self._parsear_contenidos_modulo_carpeta(modulo_api, id_modulo_curso_carpeta)
 
             registrador.warning(f"Módulo de carpeta con ID (cmid) {id_modulo_curso_carpeta} no encontrado en el curso {id_curso}.")
             return []
@@ -441,7 +627,13 @@ class ClienteMoodle:
         nombre_funcion_ws_detalle_modulo = "core_course_get_course_module"
         registrador.info(f"Obteniendo archivos para el módulo de carpeta con ID de módulo de curso (cmid): {id_modulo_curso_carpeta} (WS: {nombre_funcion_ws_detalle_modulo})")
         try:
-            # Primero, obtenemos detalles del módulo para verificar que es una carpeta y obtener el ID del curso.
+            # Si la operación ya obtuvo los contenidos del curso de la carpeta (p. ej. al buscarla por nombre),
+            # los archivos se leen de esa instantánea sin consultar de nuevo a Moodle.
+            for id_curso_memorizado, instantanea in self._instantaneas_contenidos_por_curso.items():
+                if instantanea.obtener_modulo_por_id(id_modulo_curso_carpeta) is not None:
+                    return self._extraer_archivos_de_modulo_carpeta_en_curso(id_curso_memorizado, id_modulo_curso_carpeta)
+
+            # Si no, obtenemos detalles del módulo para verificar que es una carpeta y obtener el ID del curso.
             datos_modulo_api = self._realizar_peticion_api(nombre_funcion_ws_detalle_modulo, {"cmid": id_modulo_curso_carpeta})
 
             if not datos_modulo_api or "cm" not in datos_modulo_api or not isinstance(datos_modulo_api["cm"], dict):
@@ -551,6 +743,7 @@ class ClienteMoodle:
             }
             self._realizar_peticion_api(nombre_ws_actualizar_seccion, payload_actualizacion)
             registrador.info(f"Sección ID {id_nueva_seccion} actualizada con nombre '{nombre_seccion}' (WS: {nombre_ws_actualizar_seccion}).")
+            self.invalidar_contenidos_de_curso(id_curso) # La instantánea previa no incluye la sección nueva
 
             # Paso 3: Obtener la sección completamente actualizada para devolverla (y verificar).
             seccion_final_creada = self.obtener_seccion_por_nombre(id_curso, nombre_seccion)
@@ -612,6 +805,7 @@ class ClienteMoodle:
             }
 
             self._realizar_peticion_api(nombre_ws_actualizar_seccion_con_modulos, payload_api_actualizacion_seccion)
+            self.invalidar_contenidos_de_curso(id_curso) # La instantánea previa no incluye el módulo nuevo
             registrador.info(f"Petición para crear módulo '{nombre_modulo}' (tipo: {tipo_modulo}) en sección {id_seccion} enviada a {nombre_ws_actualizar_seccion_con_modulos}.")
 
             # Después de crear, volvemos a obtener el módulo para confirmar y obtener su ID de módulo de curso (cmid) y detalles completos.
@@ -676,6 +870,7 @@ class ClienteMoodle:
             }
             # Utiliza el mismo WS que para añadir módulos, pero aquí solo actualiza campos de la sección.
             self._realizar_peticion_api(nombre_ws_actualizar_seccion, payload_api_actualizacion)
+            self.invalidar_contenidos_de_curso(id_curso) # El sumario forma parte de los contenidos del curso
             registrador.info(f"Sumario de la sección {id_seccion} (curso {id_curso}) actualizado exitosamente.")
             return True
         except ErrorAPIMoodle as e_api:
@@ -687,10 +882,26 @@ class ClienteMoodle:
 
     # --- Descarga de Archivos ---
     def descargar_archivo_moodle(self, url_archivo_moodle_original: str, directorio_destino_descarga: Path, nombre_final_archivo: str) -> Path:
+        """
+        Descarga un archivo desde una URL de Moodle a un directorio local especificado.
+        Equivale a `descargar_archivo_moodle_con_huella` cuando sólo interesa la ruta local.
+
+        Returns:
+            La ruta (Path) completa al archivo descargado localmente.
+        """
+        return self.descargar_archivo_moodle_con_huella(url_archivo_moodle_original, directorio_destino_descarga, nombre_final_archivo).ruta_local
+
+    def descargar_archivo_moodle_con_huella(self, url_archivo_moodle_original: str, directorio_destino_descarga: Path, nombre_final_archivo: str) -> ArchivoDescargadoMoodle:
         """
         Descarga un archivo desde una URL de Moodle a un directorio local especificado.
         Asegura que el token de Moodle se añade a la URL si es necesario.
-        Maneja tanto archivos de texto como binarios.
+
+        Todos los tipos de contenido (texto o binario) se copian byte a byte del socket al disco, por bloques
+        sobre un único búfer reutilizado, sin cargar el cuerpo en memoria ni recodificarlo. El SHA-256 se calcula
+        durante la misma copia, de modo que la huella del contenido está disponible sin volver a leer el archivo.
+        Se escribe en un archivo temporal que se renombra al terminar: una descarga interrumpida no deja un
+        archivo truncado con el nombre final. Si el almacén de descargas está habilitado, el archivo se enlaza
+        además en él por su SHA-256.
 
         Args:
             url_archivo_moodle_original: URL del archivo en Moodle (puede o no tener token).
@@ -698,7 +909,7 @@ class ClienteMoodle:
             nombre_final_archivo: Nombre que tendrá el archivo guardado localmente.
 
         Returns:
-            La ruta (Path) completa al archivo descargado localmente.
+            ArchivoDescargadoMoodle con la ruta local, el SHA-256 (hex) y el tamaño en bytes del archivo.
 
         Raises:
             ErrorAPIMoodle: Si falla la descarga o hay un error de configuración.
@@ -711,6 +922,7 @@ class ClienteMoodle:
         # Asegurar que el directorio de descarga exista
         directorio_destino_descarga.mkdir(parents=True, exist_ok=True)
         ruta_archivo_local_completa = directorio_destino_descarga / nombre_final_archivo
+        ruta_archivo_temporal = ruta_archivo_local_completa.with_name(f"{nombre_final_archivo}.{os.getpid()}.{threading.get_ident()}.tmp")
 
         registrador.info(f"Iniciando descarga de archivo Moodle desde '{url_archivo_moodle_original}' a '{ruta_archivo_local_completa}'")
 
@@ -725,33 +937,47 @@ class ClienteMoodle:
             # Cabecera para evitar problemas con codificación de contenido por parte del servidor (ej. gzip)
             # y asegurar que se reciba el contenido tal cual.
             cabeceras_peticion_descarga = {"Accept-Encoding": "identity"}
-            timeout_descarga = configuracion_global.moodle.get("timeout_descargas_moodle", 120) # Timeout más largo para descargas
-
-            # Realizar la petición de descarga en streaming para manejar archivos grandes
-            with self.sesion_http.get(url_descarga_con_token, stream=True, headers=cabeceras_peticion_descarga, timeout=timeout_descarga) as respuesta_descarga:
-                respuesta_descarga.raise_for_status() # Lanza HTTPError para respuestas 4xx/5xx
-
-                # Determinar si es texto o binario basado en Content-Type (heurística)
-                tipo_contenido_respuesta = respuesta_descarga.headers.get("Content-Type", "").lower()
-                # Lista extendida de tipos MIME que se considerarán texto
-                subtipos_texto = ["text/", "/markdown", "/md", "/json", "/xml", "/html", "/xhtml", "/css", "/javascript", "/csv", "application/rtf", "application/x-subrip"]
-                es_archivo_texto = any(sub_tipo_texto in tipo_contenido_respuesta for sub_tipo_texto in subtipos_texto)
-
-                if es_archivo_texto:
-                    # Decodificar como UTF-8, reemplazando errores para evitar fallos en contenido mixto.
-                    contenido_texto_archivo = respuesta_descarga.content.decode("utf-8", errors="replace")
-                    with open(ruta_archivo_local_completa, "w", encoding="utf-8") as archivo_local:
-                        archivo_local.write(contenido_texto_archivo)
-                    registrador.debug(f"Archivo de texto '{nombre_final_archivo}' (tipo: {tipo_contenido_respuesta}) guardado con codificación UTF-8.")
-                else: # Tratar como archivo binario
-                    with open(ruta_archivo_local_completa, "wb") as archivo_local:
-                        for chunk_datos_binarios in respuesta_descarga.iter_content(chunk_size=8192): # Escribir en chunks
-                            if chunk_datos_binarios: # Filtrar keep-alive chunks vacíos si los hubiera
-                                archivo_local.write(chunk_datos_binarios)
-                    registrador.debug(f"Archivo binario '{nombre_final_archivo}' (tipo: {tipo_contenido_respuesta}) guardado.")
-
-            registrador.info(f"Archivo '{nombre_final_archivo}' descargado exitosamente a {ruta_archivo_local_completa}.")
-            return ruta_archivo_local_completa
+            timeout_descarga = self.config_moodle.timeout_descargas_moodle # Timeout más largo para descargas
+            bufer_descarga = bytearray(max(64, self.config_moodle.tamano_bufer_descargas_kb) * 1024)
+            vista_bufer_descarga = memoryview(bufer_descarga)
+
+            def _descargar_a_archivo_temporal() -> Tuple[str, int, str]:
+                # Cada intento reescribe el temporal y recalcula el hash desde cero (un corte a mitad de la
+                # transferencia es un fallo transitorio que se reintenta completo).
+                resumen_sha256 = hashlib.sha256()
+                tamano_descargado_bytes = 0
+                # Realizar la petición de descarga en streaming para manejar archivos grandes
+                with self.sesion_http.get(url_descarga_con_token, stream=True, headers=cabeceras_peticion_descarga, timeout=timeout_descarga) as respuesta_descarga:
+                    respuesta_descarga.raise_for_status() # Lanza HTTPError para respuestas 4xx/5xx
+                    tipo_contenido = respuesta_descarga.headers.get("Content-Type", "").lower()
+                    respuesta_descarga.raw.decode_content = True # Si el servidor ignora 'identity', se descomprime igualmente
+
+                    with open(ruta_archivo_temporal, "wb") as archivo_local:
+                        # readinto() rellena el búfer preasignado: sin un objeto 'bytes' nuevo por bloque.
+                        while True:
+                            bytes_leidos = respuesta_descarga.raw.readinto(bufer_descarga)
+                            if not bytes_leidos:
+                                break
+                            bloque_leido = vista_bufer_descarga[:bytes_leidos]
+                            resumen_sha256.update(bloque_leido)
+                            archivo_local.write(bloque_leido)
+                            tamano_descargado_bytes += bytes_leidos
+                return resumen_sha256.hexdigest(), tamano_descargado_bytes, tipo_contenido
+
+            huella_sha256_descarga, tamano_descargado_bytes, tipo_contenido_respuesta = self.ejecutor_resiliente.ejecutar(
+                self.host_moodle,
+                _descargar_a_archivo_temporal,
+                es_idempotente=True,
+                es_fallo_transitorio=es_fallo_transitorio_requests,
+                crear_error_circuito_abierto=lambda segundos_restantes: self._crear_error_circuito_abierto(f"descarga de '{nombre_final_archivo}'", segundos_restantes),
+                descripcion=f"la descarga de '{nombre_final_archivo}'",
+            )
+            os.replace(ruta_archivo_temporal, ruta_archivo_local_completa)
+            if self.almacen_blobs_descargas is not None: # Conservar el contenido para reprocesarlo sin volver a descargarlo
+                self.almacen_blobs_descargas.guardar_archivo(ruta_archivo_local_completa, huella_sha256_descarga)
+
+            registrador.info(f"Archivo '{nombre_final_archivo}' (tipo: {tipo_contenido_respuesta or 'desconocido'}, {tamano_descargado_bytes} bytes) descargado exitosamente a {ruta_archivo_local_completa}.")
+            return ArchivoDescargadoMoodle(ruta_archivo_local_completa, huella_sha256_descarga, tamano_descargado_bytes)
 
         except requests.exceptions.HTTPError as e_http:
             registrador.error(f"Error HTTP {e_http.response.status_code} descargando '{nombre_final_archivo}': {e_http} (URL original: {url_archivo_moodle_original})")
@@ -760,11 +986,15 @@ class ClienteMoodle:
         except requests.exceptions.Timeout as e_timeout:
             registrador.error(f"Timeout descargando '{nombre_final_archivo}' desde {url_archivo_moodle_original}: {e_timeout}")
             raise ErrorAPIMoodle(f"Timeout durante la descarga del archivo '{nombre_final_archivo}'") from e_timeout
+        except ErrorAPIMoodle: # Circuito abierto: ya registrado
+            raise
         except IOError as e_io: # Errores al escribir el archivo local
             registrador.error(f"Error de E/S al guardar el archivo descargado '{nombre_final_archivo}' en '{ruta_archivo_local_completa}': {e_io}")
             raise # Re-lanzar IOError para que sea manejada por el llamador
         except Exception as e_general: # Otros errores (ej. problemas de red no HTTP, etc.)
             registrador.exception(f"Error general descargando archivo '{nombre_final_archivo}' desde {url_archivo_moodle_original}: {e_general}")
             raise ErrorAPIMoodle(f"Error inesperado durante la descarga del archivo '{nombre_final_archivo}': {e_general}") from e_general
+        finally:
+            ruta_archivo_temporal.unlink(missing_ok=True) # Sólo existe si la descarga no llegó a completarse
 
 [end of entrenai_refactor/nucleo/clientes/cliente_moodle.py]
@@ -0,0 +1,191 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from entrenai_refactor.api import modelos as modelos_api
+from entrenai_refactor.config.configuracion import configuracion_global
+from entrenai_refactor.config.registrador import obtener_registrador
+from entrenai_refactor.nucleo.clientes.cliente_moodle import ClienteMoodleBase, ErrorAPIMoodle
+from entrenai_refactor.nucleo.clientes.resiliencia_http import CODIGOS_HTTP_TRANSITORIOS
+
+registrador = obtener_registrador(__name__)
+
+try:
+    import httpx
+except ImportError: # pragma: no cover - dependencia opcional
+    httpx = None # type: ignore[assignment]
+    registrador.warning("La biblioteca 'httpx' no está instalada. El cliente asíncrono de Moodle no estará disponible.")
+
+try:
+    import h2 # noqa: F401 - sólo se comprueba su presencia: httpx lo necesita para negociar HTTP/2
+    _H2_DISPONIBLE = True
+except ImportError: # pragma: no cover - dependencia opcional
+    _H2_DISPONIBLE = False
+
+
+def es_fallo_transitorio_httpx(error: Exception) -> bool:
+    """Equivalente para `httpx` de `es_fallo_transitorio_requests`."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in CODIGOS_HTTP_TRANSITORIOS
+    return isinstance(error, (httpx.TimeoutException, httpx.TransportError))
+
+
+class PoolHttpMoodle:
+    """
+    Pool de conexiones compartido por todos los `ClienteMoodleAsincrono` del proceso: un único
+    `httpx.AsyncClient` (conexiones keep-alive reutilizadas entre peticiones y HTTP/2 cuando el servidor lo
+    negocia por ALPN sobre HTTPS) y un semáforo por host de Moodle que acota las peticiones simultáneas.
+    Se crea y se cierra en el ciclo de vida de la aplicación FastAPI.
+    """
+
+    def __init__(self, http2_habilitado: bool, maximo_peticiones_por_host: int, timeout_segundos: float):
+        if httpx is None:
+            raise ErrorAPIMoodle("El cliente asíncrono de Moodle requiere la biblioteca 'httpx'.")
+        if http2_habilitado and not _H2_DISPONIBLE:
+            registrador.warning("HTTP/2 habilitado para Moodle, pero el paquete 'h2' no está instalado (httpx[http2]). Se usará HTTP/1.1.")
+        self.http2_habilitado = http2_habilitado and _H2_DISPONIBLE
+        self.maximo_peticiones_por_host = max(1, maximo_peticiones_por_host)
+        # El límite efectivo por host lo imponen los semáforos; el pool conserva abiertas hasta ese número de conexiones.
+        self.cliente_http = httpx.AsyncClient(
+            http2=self.http2_habilitado,
+            limits=httpx.Limits(max_connections=None, max_keepalive_connections=self.maximo_peticiones_por_host),
+            timeout=httpx.Timeout(timeout_segundos),
+        )
+        self._semaforos_por_host: Dict[str, asyncio.Semaphore] = {}
+        registrador.info(
+            f"Pool HTTP asíncrono de Moodle creado (HTTP/2: {'sí' if self.http2_habilitado else 'no'}, "
+            f"máximo {self.maximo_peticiones_por_host} peticiones simultáneas por host)."
+        )
+
+    def semaforo_para_host(self, host: str) -> asyncio.Semaphore:
+        """Devuelve el semáforo que acota las peticiones simultáneas al host indicado."""
+        semaforo_host = self._semaforos_por_host.get(host)
+        if semaforo_host is None: # Sin 'await' entre la consulta y la asignación: no hay carrera en el bucle de eventos
+            semaforo_host = asyncio.Semaphore(self.maximo_peticiones_por_host)
+            self._semaforos_por_host[host] = semaforo_host
+        return semaforo_host
+
+    async def cerrar(self) -> None:
+        await self.cliente_http.aclose()
+        registrador.info("Pool HTTP asíncrono de Moodle cerrado.")
+
+
+_pool_http_moodle: Optional[PoolHttpMoodle] = None
+
+
+async def iniciar_pool_http_moodle() -> Optional[PoolHttpMoodle]:
+    """Crea el pool HTTP asíncrono compartido de Moodle (en el arranque de la API). Devuelve None si no es posible."""
+    global _pool_http_moodle
+    if _pool_http_moodle is None:
+        try:
+            _pool_http_moodle = PoolHttpMoodle(
+                configuracion_global.moodle.http2_habilitado,
+                configuracion_global.moodle.maximo_peticiones_concurrentes_por_host,
+                configuracion_global.moodle.timeout_peticiones_moodle,
+            )
+        except ErrorAPIMoodle as e_pool:
+            registrador.warning(f"No se pudo crear el pool HTTP asíncrono de Moodle: {e_pool}")
+    return _pool_http_moodle
+
+
+async def cerrar_pool_http_moodle() -> None:
+    """Cierra el pool HTTP asíncrono compartido de Moodle (al detener la API)."""
+    global _pool_http_moodle
+    if _pool_http_moodle is not None:
+        await _pool_http_moodle.cerrar()
+        _pool_http_moodle = None
+
+
+class ClienteMoodleAsincrono(ClienteMoodleBase):
+    """
+    Variante asíncrona de `ClienteMoodle` para usar desde los manejadores `async` de FastAPI sin bloquear
+    el bucle de eventos. Comparte con el cliente síncrono la codificación de parámetros y la traducción de
+    errores a `ErrorAPIMoodle`, y usa el pool de conexiones compartido creado en el arranque de la API.
+    Ofrece las operaciones de consulta; las de creación/modificación siguen en `ClienteMoodle`.
+    """
+
+    def __init__(self, pool_http: Optional[PoolHttpMoodle] = None):
+        """
+        Args:
+            pool_http: Opcional. Pool HTTP a utilizar; por defecto, el compartido creado en el arranque de la API.
+
+        Raises:
+            ErrorAPIMoodle: Si no hay pool HTTP disponible (httpx no instalado o API no iniciada).
+        """
+        self._inicializar_configuracion_moodle()
+        self.pool_http = pool_http or _pool_http_moodle
+        if self.pool_http is None:
+            raise ErrorAPIMoodle("El pool HTTP asíncrono de Moodle no está disponible (se crea en el arranque de la API y requiere 'httpx').")
+
+    async def _realizar_peticion_api(
+        self,
+        nombre_funcion_ws: str,
+        parametros_payload: Optional[Dict[str, Any]] = None,
+        metodo_http: str = "POST",
+    ) -> Any:
+        """Versión asíncrona de `ClienteMoodle._realizar_peticion_api`, con los mismos errores."""
+        params_url, cuerpo_peticion = self._preparar_peticion_api(nombre_funcion_ws, parametros_payload, metodo_http)
+        respuesta_http: Optional["httpx.Response"] = None
+
+        async def _enviar_peticion() -> "httpx.Response":
+            async with self.pool_http.semaforo_para_host(self.host_moodle):
+                respuesta_enviada = await self.pool_http.cliente_http.request(
+                    metodo_http.upper(),
+                    self.url_base_api,
+                    params={**self.parametros_autenticacion, **params_url},
+                    data=cuerpo_peticion,
+                )
+            respuesta_enviada.raise_for_status()
+            return respuesta_enviada
+
+        try:
+            registrador.debug(f"Llamando (asíncrono) a función API Moodle '{nombre_funcion_ws}' con método {metodo_http.upper()}.")
+            # Mismo cortacircuitos por host que el cliente síncrono: un corte de Moodle se detecta una sola vez.
+            respuesta_http = await self.ejecutor_resiliente.ejecutar_asincrono(
+                self.host_moodle,
+                _enviar_peticion,
+                es_idempotente=self._es_funcion_ws_de_consulta(nombre_funcion_ws),
+                es_fallo_transitorio=es_fallo_transitorio_httpx,
+                crear_error_circuito_abierto=lambda segundos_restantes: self._crear_error_circuito_abierto(nombre_funcion_ws, segundos_restantes),
+                descripcion=f"la función WS de Moodle '{nombre_funcion_ws}'",
+            )
+            return self._validar_respuesta_moodle(respuesta_http.json(), nombre_funcion_ws)
+
+        except httpx.HTTPStatusError as error_http:
+            raise self._crear_error_http(nombre_funcion_ws, error_http.response.status_code, error_http.response.text, error_http) from error_http
+        except httpx.TimeoutException as error_timeout:
+            raise self._crear_error_timeout(nombre_funcion_ws, error_timeout) from error_timeout
+        except httpx.RequestError as error_peticion:
+            raise self._crear_error_red(nombre_funcion_ws, error_peticion) from error_peticion
+        except ValueError as error_json: # Error al decodificar JSON
+            texto_respuesta_bruta = respuesta_http.text if respuesta_http is not None else "Sin respuesta HTTP."
+            raise self._crear_error_json(nombre_funcion_ws, texto_respuesta_bruta, error_json) from error_json
+
+    async def obtener_cursos_de_usuario(self, id_usuario: int) -> List[modelos_api.CursoMoodle]:
+        """Obtiene los cursos en los que un usuario específico está inscrito."""
+        if not isinstance(id_usuario, int) or id_usuario <= 0:
+            registrador.error(f"ID de usuario inválido proporcionado: {id_usuario}")
+            raise ValueError("El ID de usuario debe ser un entero positivo.")
+        datos_cursos_api = await self._realizar_peticion_api("core_enrol_get_users_courses", {"userid": id_usuario})
+        cursos = self._procesar_datos_cursos_api(datos_cursos_api)
+        registrador.info(f"Se encontraron {len(cursos)} cursos para el usuario {id_usuario}.")
+        return cursos
+
+    async def obtener_todos_los_cursos_disponibles(self) -> List[modelos_api.CursoMoodle]:
+        """Recupera todos los cursos disponibles en la instancia de Moodle."""
+        cursos = self._procesar_datos_cursos_api(await self._realizar_peticion_api("core_course_get_courses"))
+        registrador.info(f"Se encontraron {len(cursos)} cursos en total en la instancia de Moodle.")
+        return cursos
+
+    async def obtener_cursos_por_ids(self, ids_cursos: List[int]) -> List[modelos_api.CursoMoodle]:
+        """Recupera sólo los cursos indicados (ver `ClienteMoodle.obtener_cursos_por_ids`)."""
+        if not ids_cursos:
+            return []
+        parametros_busqueda = self._parametros_busqueda_cursos_por_ids(ids_cursos)
+        return self._procesar_datos_cursos_api(await self._realizar_peticion_api("core_course_get_courses_by_field", parametros_busqueda))
+
+    async def obtener_contenidos_de_curso(self, id_curso: int) -> List[Dict[str, Any]]:
+        """Obtiene los contenidos (secciones y módulos) de un curso, con la estructura cruda de la API."""
+        contenidos_curso_api = await self._realizar_peticion_api("core_course_get_contents", {"courseid": id_curso})
+        if not isinstance(contenidos_curso_api, list):
+            registrador.warning(f"Respuesta inesperada para contenidos del curso {id_curso}, se esperaba lista pero fue {type(contenidos_curso_api)}.")
+        return contenidos_curso_api
@@ -1,7 +1,7 @@
 import json
 from pathlib import Path
 from typing import List, Optional, Dict, Any
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlsplit
 import uuid # Para generar IDs únicos para webhooks
 
 import requests
@@ -9,6 +9,7 @@ import requests
 from entrenai_refactor.api import modelos as modelos_api # Modelos Pydantic para la API
 from entrenai_refactor.config.configuracion import configuracion_global, _ConfiguracionAnidadaOllama, _ConfiguracionAnidadaGemini # Tipos de config anidados
 from entrenai_refactor.config.registrador import obtener_registrador
+from entrenai_refactor.nucleo.clientes.resiliencia_http import es_fallo_transitorio_requests, obtener_ejecutor_resiliente_http
 
 registrador = obtener_registrador(__name__)
 
@@ -61,6 +62,8 @@ class ClienteN8N:
                 self.url_base_api = url_instancia_n8n_limpia + "/api/v1/"
             registrador.info(f"ClienteN8N inicializado. URL base API N8N: {self.url_base_api}")
 
+        self.host_n8n = urlsplit(self.url_base_api).netloc if self.url_base_api else ""
+        self.ejecutor_resiliente = obtener_ejecutor_resiliente_http() # Reintentos y cortacircuitos compartidos por host
         self.sesion_http = sesion_http_externa or requests.Session()
         if self.config_n8n.clave_api_n8n:
             self.sesion_http.headers.update({"X-N8N-API-KEY": self.config_n8n.clave_api_n8n})
@@ -89,22 +92,37 @@ class ClienteN8N:
         respuesta_http: Optional[requests.Response] = None
 
         registrador.debug(f"Realizando petición {metodo_http.upper()} a N8N: {url_completa_destino}, Params: {parametros_url}, JSON: {datos_json_cuerpo is not None}")
-        try:
+        if metodo_http.upper() not in ("GET", "POST", "PUT", "PATCH", "DELETE"):
+            registrador.error(f"Método HTTP '{metodo_http}' no soportado por _realizar_peticion_api para N8N.")
+            raise ErrorClienteN8N(f"Método HTTP no soportado: {metodo_http}", endpoint_solicitado=endpoint_api)
+
+        def _enviar_peticion() -> requests.Response:
             if metodo_http.upper() == "GET":
-                respuesta_http = self.sesion_http.get(url_completa_destino, params=parametros_url, timeout=10)
+                respuesta_enviada = self.sesion_http.get(url_completa_destino, params=parametros_url, timeout=10)
             elif metodo_http.upper() == "POST":
-                respuesta_http = self.sesion_http.post(url_completa_destino, params=parametros_url, json=datos_json_cuerpo, timeout=15)
+                respuesta_enviada = self.sesion_http.post(url_completa_destino, params=parametros_url, json=datos_json_cuerpo, timeout=15)
             elif metodo_http.upper() == "PUT":
-                respuesta_http = self.sesion_http.put(url_completa_destino, params=parametros_url, json=datos_json_cuerpo, timeout=15)
+                respuesta_enviada = self.sesion_http.put(url_completa_destino, params=parametros_url, json=datos_json_cuerpo, timeout=15)
             elif metodo_http.upper() == "PATCH": # PATCH usualmente no usa params en URL, van en cuerpo si es necesario
-                respuesta_http = self.sesion_http.patch(url_completa_destino, json=datos_json_cuerpo, timeout=10)
-            elif metodo_http.upper() == "DELETE":
-                respuesta_http = self.sesion_http.delete(url_completa_destino, params=parametros_url, timeout=10)
-            else:
-                registrador.error(f"Método HTTP '{metodo_http}' no soportado por _realizar_peticion_api para N8N.")
-                raise ErrorClienteN8N(f"Método HTTP no soportado: {metodo_http}", endpoint_solicitado=endpoint_api)
+                respuesta_enviada = self.sesion_http.patch(url_completa_destino, json=datos_json_cuerpo, timeout=10)
+            else: # DELETE
+                respuesta_enviada = self.sesion_http.delete(url_completa_destino, params=parametros_url, timeout=10)
+            respuesta_enviada.raise_for_status() # Lanza HTTPError para respuestas 4xx/5xx
+            return respuesta_enviada
 
-            respuesta_http.raise_for_status() # Lanza HTTPError para respuestas 4xx/5xx
+        try:
+            # GET, PUT y DELETE son idempotentes y se reintentan ante fallos transitorios; POST y PATCH no.
+            respuesta_http = self.ejecutor_resiliente.ejecutar(
+                self.host_n8n,
+                _enviar_peticion,
+                es_idempotente=metodo_http.upper() in ("GET", "PUT", "DELETE"),
+                es_fallo_transitorio=es_fallo_transitorio_requests,
+                crear_error_circuito_abierto=lambda segundos_restantes: ErrorClienteN8N(
+                    f"N8N no está disponible (circuito abierto tras fallos repetidos); reintente en {segundos_restantes:.0f} s.",
+                    codigo_estado=503, endpoint_solicitado=endpoint_api
+                ),
+                descripcion=f"la petición {metodo_http.upper()} a N8N '{endpoint_api}'",
+            )
 
             if respuesta_http.status_code == 204: # Sin Contenido (ej. algunas operaciones PATCH, DELETE o POST sin retorno)
                 registrador.debug(f"Respuesta 204 (Sin Contenido) de N8N para endpoint '{endpoint_api}'.")
@@ -114,8 +132,8 @@ class ClienteN8N:
             return respuesta_http.json()
 
         except requests.exceptions.HTTPError as error_http:
-            codigo_estado_error = respuesta_http.status_code if respuesta_http is not None else None
-            texto_respuesta_error = respuesta_http.text if respuesta_http is not None else "Sin texto de respuesta."
+            codigo_estado_error = error_http.response.status_code if error_http.response is not None else None
+            texto_respuesta_error = error_http.response.text if error_http.response is not None else "Sin texto de respuesta."
             registrador.error(f"Error HTTP {codigo_estado_error} llamando a N8N endpoint '{endpoint_api}': {error_http}. Respuesta: {texto_respuesta_error[:200]}...")
             raise ErrorClienteN8N(f"Error HTTP de N8N: {codigo_estado_error}", codigo_estado=codigo_estado_error, datos_respuesta=texto_respuesta_error, endpoint_solicitado=endpoint_api) from error_http
         except requests.exceptions.RequestException as error_peticion: # Errores de red, DNS, etc.
@@ -0,0 +1,146 @@
+import shutil
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+from entrenai_refactor.api import modelos as modelos_api
+from entrenai_refactor.config.registrador import obtener_registrador
+from entrenai_refactor.nucleo.clientes.almacen_blobs_descargas import AlmacenBlobsDescargas
+from entrenai_refactor.nucleo.clientes.cliente_moodle import ArchivoDescargadoMoodle, ClienteMoodle
+
+registrador = obtener_registrador(__name__)
+
+# (archivo de Moodle, archivo descargado -ruta, SHA-256 y tamaño- o None, error de la descarga o None)
+ResultadoDescarga = Tuple[modelos_api.ArchivoMoodle, Optional[ArchivoDescargadoMoodle], Optional[Exception]]
+
+
+class ErrorEspacioDescargasInsuficiente(OSError):
+    """El disco del directorio de descargas no tiene espacio libre suficiente para descargar un archivo."""
+
+
+class DescargadorAnticipado:
+    """
+    Descarga los archivos de Moodle por adelantado en un pequeño pool de hilos mientras el llamador procesa
+    (extrae, fragmenta y vectoriza) el archivo actual, de modo que el tiempo total se aproxima al máximo, y
+    no a la suma, de descargas y procesamiento.
+
+    Como mucho hay `profundidad_precarga` archivos descargados o descargándose por delante del actual. Antes de
+    lanzar cada descarga se comprueba que, descontando los archivos aún en disco o en curso, quede en el
+    directorio de descargas al menos `espacio_libre_minimo_bytes` libre; si no, se espera a que el llamador
+    consuma (y borre) los anteriores. Cada hilo usa su propio `ClienteMoodle` (las sesiones de `requests`
+    no son seguras entre hilos).
+
+    Con un `almacen_blobs`, los archivos cuyo SHA-256 indica el llamador (contenido que no ha cambiado desde
+    que se procesó) se toman del almacén local sin contactar con Moodle; si ya no están, se descargan.
+    """
+
+    def __init__(
+        self,
+        fabrica_cliente_moodle: Callable[[], ClienteMoodle],
+        directorio_descargas: Path,
+        profundidad_precarga: int = 2,
+        trabajadores_descarga: int = 2,
+        espacio_libre_minimo_bytes: int = 0,
+        almacen_blobs: Optional[AlmacenBlobsDescargas] = None,
+    ):
+        self.fabrica_cliente_moodle = fabrica_cliente_moodle
+        self.directorio_descargas = Path(directorio_descargas)
+        self.profundidad_precarga = max(0, profundidad_precarga)
+        self.trabajadores_descarga = max(1, trabajadores_descarga)
+        self.espacio_libre_minimo_bytes = max(0, espacio_libre_minimo_bytes)
+        self.almacen_blobs = almacen_blobs
+        self.archivos_obtenidos_del_almacen = 0
+        self._clientes_por_hilo = threading.local()
+        self._candado = threading.Lock()
+
+    def _descargar(self, archivo_moodle: modelos_api.ArchivoMoodle, huella_conocida: Optional[str] = None) -> ArchivoDescargadoMoodle:
+        if self.almacen_blobs is not None and huella_conocida:
+            ruta_destino = self.directorio_descargas / archivo_moodle.nombre_original_archivo
+            if self.almacen_blobs.materializar_archivo(huella_conocida, ruta_destino):
+                with self._candado:
+                    self.archivos_obtenidos_del_almacen += 1
+                registrador.info(f"Archivo '{archivo_moodle.nombre_original_archivo}' tomado del almacén local de descargas; no se descarga de Moodle.")
+                return ArchivoDescargadoMoodle(ruta_destino, huella_conocida, ruta_destino.stat().st_size)
+        cliente_moodle = getattr(self._clientes_por_hilo, "cliente_moodle", None)
+        if cliente_moodle is None:
+            cliente_moodle = self._clientes_por_hilo.cliente_moodle = self.fabrica_cliente_moodle()
+        return cliente_moodle.descargar_archivo_moodle_con_huella(
+            url_archivo_moodle_original=str(archivo_moodle.url_descarga_directa_archivo),
+            directorio_destino_descarga=self.directorio_descargas,
+            nombre_final_archivo=archivo_moodle.nombre_original_archivo,
+        )
+
+    def _hay_espacio_para(self, tamano_archivo_bytes: int, bytes_reservados: int) -> bool:
+        """Comprueba si cabe el archivo sin bajar del espacio libre mínimo, contando lo ya reservado por otras descargas."""
+        if self.espacio_libre_minimo_bytes <= 0:
+            return True
+        self.directorio_descargas.mkdir(parents=True, exist_ok=True)
+        espacio_libre_bytes = shutil.disk_usage(self.directorio_descargas).free
+        return espacio_libre_bytes - bytes_reservados - tamano_archivo_bytes >= self.espacio_libre_minimo_bytes
+
+    def iterar_descargas(
+        self, archivos_moodle: List[modelos_api.ArchivoMoodle], huellas_conocidas: Optional[Dict[str, str]] = None
+    ) -> Iterator[ResultadoDescarga]:
+        """
+        Devuelve, en el orden de entrada, cada archivo con su descarga (ruta local y huella) o el error que la impidió.
+        El llamador es responsable de borrar cada archivo entregado. Si la iteración se interrumpe, las descargas
+        pendientes se cancelan y los archivos ya descargados y no entregados se eliminan.
+
+        `huellas_conocidas` asocia nombres de archivo con el SHA-256 de un contenido que se sabe vigente, para
+        tomarlo del almacén local en lugar de descargarlo.
+        """
+        huellas_conocidas = huellas_conocidas or {}
+        en_curso: Deque[Tuple[modelos_api.ArchivoMoodle, "Future[ArchivoDescargadoMoodle]"]] = deque()
+        nombres_en_curso: Set[str] = set()
+        siguiente_indice = 0
+
+        def _bytes_reservados() -> int:
+            return sum(archivo.tamano_archivo_en_bytes for archivo, _ in en_curso)
+
+        with ThreadPoolExecutor(max_workers=self.trabajadores_descarga, thread_name_prefix="descarga-moodle") as ejecutor_descargas:
+            try:
+                while siguiente_indice < len(archivos_moodle) or en_curso:
+                    # Encolar descargas mientras haya hueco en la ventana de precarga (el actual + la profundidad).
+                    while siguiente_indice < len(archivos_moodle) and len(en_curso) <= self.profundidad_precarga:
+                        archivo_siguiente = archivos_moodle[siguiente_indice]
+                        if en_curso and (
+                            archivo_siguiente.nombre_original_archivo in nombres_en_curso # Mismo nombre local: esperar al anterior
+                            or not self._hay_espacio_para(archivo_siguiente.tamano_archivo_en_bytes, _bytes_reservados())
+                        ):
+                            break
+                        siguiente_indice += 1
+                        if not en_curso and not self._hay_espacio_para(archivo_siguiente.tamano_archivo_en_bytes, 0):
+                            mensaje_error = (
+                                f"Espacio libre insuficiente en '{self.directorio_descargas}' para descargar "
+                                f"'{archivo_siguiente.nombre_original_archivo}' ({archivo_siguiente.tamano_archivo_en_bytes} bytes) "
+                                f"manteniendo {self.espacio_libre_minimo_bytes} bytes libres."
+                            )
+                            registrador.error(mensaje_error)
+                            yield archivo_siguiente, None, ErrorEspacioDescargasInsuficiente(mensaje_error)
+                            continue
+                        huella_conocida = huellas_conocidas.get(archivo_siguiente.nombre_original_archivo)
+                        en_curso.append((archivo_siguiente, ejecutor_descargas.submit(self._descargar, archivo_siguiente, huella_conocida)))
+                        nombres_en_curso.add(archivo_siguiente.nombre_original_archivo)
+
+                    if not en_curso:
+                        continue
+                    archivo_actual, futuro_descarga = en_curso.popleft()
+                    nombres_en_curso.discard(archivo_actual.nombre_original_archivo)
+                    try:
+                        archivo_descargado = futuro_descarga.result()
+                    except Exception as e_descarga:
+                        yield archivo_actual, None, e_descarga
+                    else:
+                        yield archivo_actual, archivo_descargado, None
+            finally:
+                # Iteración interrumpida (error o 'break' del llamador): no dejar descargas huérfanas en disco.
+                for archivo_pendiente, futuro_pendiente in en_curso:
+                    if futuro_pendiente.cancel():
+                        continue
+                    try:
+                        futuro_pendiente.result().ruta_local.unlink(missing_ok=True)
+                    except Exception:
+                        pass
+                    registrador.debug(f"Descarga anticipada de '{archivo_pendiente.nombre_original_archivo}' descartada.")
@@ -0,0 +1,175 @@
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from entrenai_refactor.api import modelos as modelos_api
+from entrenai_refactor.config.configuracion import configuracion_global
+from entrenai_refactor.config.registrador import obtener_registrador
+from entrenai_refactor.nucleo.clientes.cliente_moodle import ClienteMoodle, ErrorAPIMoodle
+
+registrador = obtener_registrador(__name__)
+
+# Máximo de IDs por petición a core_course_get_courses_by_field al refrescar en segundo plano.
+TAMANO_LOTE_REFRESCO_CURSOS = 100
+
+
+def nombre_de_curso_moodle(curso: modelos_api.CursoMoodle) -> str:
+    """Nombre con el que se identifica un curso en las tablas vectoriales y flujos de N8N."""
+    return curso.nombre_a_mostrar or curso.nombre_completo
+
+
+class IndiceNombresCursos:
+    """
+    Índice persistente ID de curso -> nombre, para no recorrer los cursos del profesor (y, si falla, todos
+    los cursos de la instancia con `core_course_get_courses`) cada vez que se necesita el nombre de un curso.
+
+    - Un ID desconocido se resuelve con una consulta dirigida (`core_course_get_courses_by_field`).
+    - Una entrada caducada (más antigua que el TTL) se sigue devolviendo, y se refresca en un hilo en
+      segundo plano junto con las demás entradas caducadas, en lotes por ID.
+    - El índice se guarda en disco (escritura atómica) para que los reinicios no empiecen en frío. Si el
+      archivo corresponde a otra instancia de Moodle, se descarta.
+    """
+
+    def __init__(self, ruta_archivo_indice: Path, ttl_segundos: int, url_moodle: Optional[str]):
+        self.ruta_archivo_indice = Path(ruta_archivo_indice)
+        self.ttl_segundos = max(0, ttl_segundos)
+        self.url_moodle = url_moodle or ""
+        self._entradas: Dict[int, Dict[str, object]] = {} # id_curso -> {"nombre": str, "actualizado": epoch}
+        self._candado = threading.Lock()
+        self._refresco_en_curso = False
+        self._cargar_desde_disco()
+
+    def _cargar_desde_disco(self) -> None:
+        try:
+            datos_indice = json.loads(self.ruta_archivo_indice.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e_lectura:
+            registrador.warning(f"No se pudo leer el índice de nombres de cursos '{self.ruta_archivo_indice}': {e_lectura}. Se empieza vacío.")
+            return
+        if not isinstance(datos_indice, dict) or datos_indice.get("url_moodle") != self.url_moodle:
+            registrador.info(f"El índice de nombres de cursos '{self.ruta_archivo_indice}' pertenece a otra instancia de Moodle; se descarta.")
+            return
+        for id_curso_str, entrada in (datos_indice.get("cursos") or {}).items():
+            if id_curso_str.isdigit() and isinstance(entrada, dict) and entrada.get("nombre"):
+                self._entradas[int(id_curso_str)] = {"nombre": str(entrada["nombre"]), "actualizado": float(entrada.get("actualizado", 0))}
+        registrador.info(f"Índice de nombres de cursos cargado desde '{self.ruta_archivo_indice}' ({len(self._entradas)} cursos).")
+
+    def _guardar_en_disco(self) -> None:
+        """Escribe el índice completo de forma atómica. Los errores de escritura sólo se registran."""
+        with self._candado:
+            datos_indice = {
+                "url_moodle": self.url_moodle,
+                "cursos": {str(id_curso): dict(entrada) for id_curso, entrada in self._entradas.items()},
+            }
+        ruta_temporal = self.ruta_archivo_indice.with_name(f"{self.ruta_archivo_indice.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self.ruta_archivo_indice.parent.mkdir(parents=True, exist_ok=True)
+            ruta_temporal.write_text(json.dumps(datos_indice, ensure_ascii=False), encoding="utf-8")
+            os.replace(ruta_temporal, self.ruta_archivo_indice)
+        except OSError as e_escritura:
+            registrador.warning(f"No se pudo guardar el índice de nombres de cursos en '{self.ruta_archivo_indice}': {e_escritura}")
+            ruta_temporal.unlink(missing_ok=True)
+
+    def registrar_cursos(self, cursos: Iterable[modelos_api.CursoMoodle], guardar: bool = True) -> int:
+        """
+        Añade o actualiza en el índice los cursos ya obtenidos por otra vía (p. ej. el listado de cursos
+        del profesor), sin peticiones adicionales. Devuelve el número de cursos registrados.
+        """
+        momento_actual = time.time()
+        numero_registrados = 0
+        with self._candado:
+            for curso in cursos:
+                self._entradas[curso.id] = {"nombre": nombre_de_curso_moodle(curso), "actualizado": momento_actual}
+                numero_registrados += 1
+        if numero_registrados and guardar:
+            self._guardar_en_disco()
+        return numero_registrados
+
+    def obtener_nombre_curso(self, id_curso: int, cliente_moodle: ClienteMoodle) -> Optional[str]:
+        """
+        Devuelve el nombre del curso, o None si Moodle no lo conoce.
+
+        Raises:
+            ErrorAPIMoodle: Si el curso no está en el índice y no se pudo consultar a Moodle.
+        """
+        with self._candado:
+            entrada = self._entradas.get(id_curso)
+        if entrada is not None:
+            if time.time() - float(entrada["actualizado"]) > self.ttl_segundos:
+                self._programar_refresco_en_segundo_plano()
+            return str(entrada["nombre"])
+
+        try:
+            cursos_encontrados = cliente_moodle.obtener_cursos_por_ids([id_curso])
+        except ErrorAPIMoodle as e_consulta_dirigida:
+            # p. ej. 'core_course_get_courses_by_field' no está habilitada en el servicio web del token:
+            # se recurre al listado completo, que al menos deja indexados todos los cursos de la instancia.
+            registrador.warning(f"Consulta dirigida del curso {id_curso} fallida ({e_consulta_dirigida}). Se indexará el listado completo de cursos.")
+            cursos_encontrados = cliente_moodle.obtener_todos_los_cursos_disponibles()
+        self.registrar_cursos(cursos_encontrados)
+
+        with self._candado:
+            entrada = self._entradas.get(id_curso)
+        return str(entrada["nombre"]) if entrada is not None else None
+
+    def obtener_nombre_curso_para_tabla(self, id_curso: int, cliente_moodle: ClienteMoodle) -> str:
+        """
+        Nombre con el que se identifica la tabla vectorial del curso, igual en la ingesta y en el chat. Si
+        Moodle no conoce el curso o no responde, se usa el nombre genérico 'curso_<id>'; nunca lanza.
+        """
+        try:
+            nombre_curso = self.obtener_nombre_curso(id_curso, cliente_moodle)
+            if nombre_curso:
+                return nombre_curso
+            registrador.warning(f"No se pudo obtener el nombre del curso {id_curso} desde Moodle. Se usará el nombre genérico 'curso_{id_curso}' para su tabla vectorial.")
+        except ErrorAPIMoodle as e_moodle_nombre:
+            registrador.error(f"Error de API Moodle al obtener el nombre del curso {id_curso}: {e_moodle_nombre}. Se usará el nombre genérico 'curso_{id_curso}' para su tabla vectorial.")
+        return f"curso_{id_curso}"
+
+    def _programar_refresco_en_segundo_plano(self) -> None:
+        """Lanza (si no hay otro en curso) un hilo que refresca todas las entradas caducadas."""
+        with self._candado:
+            if self._refresco_en_curso:
+                return
+            self._refresco_en_curso = True
+        threading.Thread(target=self._refrescar_entradas_caducadas, name="refresco-indice-nombres-cursos", daemon=True).start()
+
+    def _refrescar_entradas_caducadas(self) -> None:
+        try:
+            momento_limite = time.time() - self.ttl_segundos
+            with self._candado:
+                ids_caducados: List[int] = [id_curso for id_curso, entrada in self._entradas.items() if float(entrada["actualizado"]) < momento_limite]
+            # Cliente propio: el de la petición que detectó la caducidad puede haberse liberado ya.
+            cliente_moodle = ClienteMoodle()
+            numero_refrescados = 0
+            for posicion_lote in range(0, len(ids_caducados), TAMANO_LOTE_REFRESCO_CURSOS):
+                lote_ids = ids_caducados[posicion_lote:posicion_lote + TAMANO_LOTE_REFRESCO_CURSOS]
+                numero_refrescados += self.registrar_cursos(cliente_moodle.obtener_cursos_por_ids(lote_ids), guardar=False)
+            # Los cursos caducados que Moodle ya no devuelve (eliminados u ocultos) se conservan con su nombre:
+            # la tabla vectorial se creó con él. Se marcan como actualizados para no consultarlos en cada petición.
+            with self._candado:
+                for id_curso in ids_caducados:
+                    if id_curso in self._entradas and float(self._entradas[id_curso]["actualizado"]) < momento_limite:
+                        self._entradas[id_curso]["actualizado"] = time.time()
+            self._guardar_en_disco()
+            registrador.info(f"Índice de nombres de cursos refrescado en segundo plano: {numero_refrescados} de {len(ids_caducados)} cursos caducados.")
+        except Exception as e_refresco: # El refresco es oportunista: nunca debe propagar errores
+            registrador.warning(f"Falló el refresco en segundo plano del índice de nombres de cursos: {e_refresco}")
+        finally:
+            with self._candado:
+                self._refresco_en_curso = False
+
+
+@lru_cache(maxsize=1)
+def obtener_indice_nombres_cursos() -> IndiceNombresCursos:
+    """Devuelve el índice de nombres de cursos compartido por todo el proceso."""
+    return IndiceNombresCursos(
+        configuracion_global.ruta_absoluta_directorio_datos / "indice_nombres_cursos.json",
+        configuracion_global.moodle.ttl_indice_nombres_cursos_segundos,
+        configuracion_global.moodle.url_moodle,
+    )
@@ -0,0 +1,260 @@
+import asyncio
+import random
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import requests
+
+from entrenai_refactor.config.configuracion import configuracion_global
+from entrenai_refactor.config.registrador import obtener_registrador
+
+registrador = obtener_registrador(__name__)
+
+T = TypeVar("T")
+
+# Códigos HTTP que indican un fallo pasajero del servidor o de un proxy intermedio: merece la pena reintentar.
+CODIGOS_HTTP_TRANSITORIOS = frozenset({429, 502, 503, 504})
+
+
+def es_fallo_transitorio_requests(error: Exception) -> bool:
+    """Clasifica una excepción de `requests`: timeouts, errores de conexión y respuestas 429/502/503/504 son transitorios."""
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and error.response.status_code in CODIGOS_HTTP_TRANSITORIOS
+    return isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError))
+
+
+class CortacircuitosHost:
+    """
+    Cortacircuitos de un host: tras `umbral_fallos` fallos transitorios consecutivos se abre y las peticiones
+    fallan al instante durante `segundos_apertura`. Pasado ese tiempo deja pasar una única petición de prueba
+    (semiabierto): si tiene éxito se cierra; si falla, vuelve a abrirse.
+    """
+
+    CERRADO = "cerrado"
+    ABIERTO = "abierto"
+    SEMIABIERTO = "semiabierto"
+
+    def __init__(self, host: str, umbral_fallos: int, segundos_apertura: float):
+        self.host = host
+        self.umbral_fallos = max(1, umbral_fallos)
+        self.segundos_apertura = max(0.0, segundos_apertura)
+        self.estado = self.CERRADO
+        self._fallos_consecutivos = 0
+        self._momento_apertura = 0.0
+        self._prueba_en_curso = False
+        self._candado = threading.Lock()
+
+    def segundos_hasta_reintento(self) -> float:
+        """Segundos que faltan para que el circuito admita una petición de prueba (0 si ya la admite)."""
+        with self._candado:
+            if self.estado != self.ABIERTO:
+                return 0.0
+            return max(0.0, self._momento_apertura + self.segundos_apertura - time.monotonic())
+
+    def permitir_peticion(self) -> bool:
+        """Indica si puede enviarse una petición al host ahora mismo."""
+        with self._candado:
+            if self.estado == self.CERRADO:
+                return True
+            if self.estado == self.ABIERTO and time.monotonic() - self._momento_apertura >= self.segundos_apertura:
+                self.estado = self.SEMIABIERTO
+                self._prueba_en_curso = False
+            if self.estado == self.SEMIABIERTO and not self._prueba_en_curso:
+                self._prueba_en_curso = True
+                return True
+            return False
+
+    def registrar_exito(self) -> None:
+        with self._candado:
+            if self.estado != self.CERRADO:
+                registrador.info(f"Circuito HTTP del host '{self.host}' cerrado: el servicio vuelve a responder.")
+            self.estado = self.CERRADO
+            self._fallos_consecutivos = 0
+            self._prueba_en_curso = False
+
+    def liberar_prueba(self) -> None:
+        """
+        Anula la petición de prueba en curso sin contarla como éxito ni como fallo (p. ej. si se canceló la
+        tarea que la esperaba), para que la siguiente petición pueda hacer de prueba.
+        """
+        with self._candado:
+            self._prueba_en_curso = False
+
+    def registrar_fallo(self) -> bool:
+        """Anota un fallo transitorio. Devuelve True si este fallo ha abierto el circuito."""
+        with self._candado:
+            self._fallos_consecutivos += 1
+            self._prueba_en_curso = False
+            if self.estado == self.SEMIABIERTO or (self.estado == self.CERRADO and self._fallos_consecutivos >= self.umbral_fallos):
+                self.estado = self.ABIERTO
+                self._momento_apertura = time.monotonic()
+                registrador.warning(
+                    f"Circuito HTTP del host '{self.host}' abierto tras {self._fallos_consecutivos} fallos consecutivos: "
+                    f"las peticiones fallarán de inmediato durante {self.segundos_apertura:.0f} s."
+                )
+                return True
+            return False
+
+
+class EjecutorResilienteHttp:
+    """
+    Capa de resiliencia compartida por los clientes HTTP (Moodle, N8N): reintento con espera exponencial y
+    jitter completo para las peticiones idempotentes, un cortacircuitos por host que hace fallar al instante
+    mientras el servicio está caído, y métricas acumuladas de reintentos y cortes.
+
+    El ejecutor no depende de la biblioteca HTTP: cada cliente indica qué excepciones son transitorias (para
+    `requests`, `es_fallo_transitorio_requests`) y cómo
+    construir su propio error cuando el circuito está abierto, de modo que los llamadores siguen recibiendo
+    `ErrorAPIMoodle` / `ErrorClienteN8N` como hasta ahora.
+    """
+
+    def __init__(
+        self,
+        intentos_maximos: int,
+        espera_base_segundos: float,
+        espera_maxima_segundos: float,
+        umbral_fallos_cortacircuitos: int,
+        segundos_apertura_cortacircuitos: float,
+    ):
+        self.intentos_maximos = max(1, intentos_maximos)
+        self.espera_base_segundos = max(0.0, espera_base_segundos)
+        self.espera_maxima_segundos = max(self.espera_base_segundos, espera_maxima_segundos)
+        self.umbral_fallos_cortacircuitos = umbral_fallos_cortacircuitos
+        self.segundos_apertura_cortacircuitos = segundos_apertura_cortacircuitos
+        self._cortacircuitos_por_host: Dict[str, CortacircuitosHost] = {}
+        self._metricas_por_host: Dict[str, Dict[str, int]] = {}
+        self._candado = threading.Lock()
+
+    def obtener_cortacircuitos(self, host: str) -> CortacircuitosHost:
+        with self._candado:
+            cortacircuitos = self._cortacircuitos_por_host.get(host)
+            if cortacircuitos is None:
+                cortacircuitos = CortacircuitosHost(host, self.umbral_fallos_cortacircuitos, self.segundos_apertura_cortacircuitos)
+                self._cortacircuitos_por_host[host] = cortacircuitos
+            return cortacircuitos
+
+    def _incrementar_metrica(self, host: str, nombre_metrica: str) -> None:
+        with self._candado:
+            metricas_host = self._metricas_por_host.setdefault(
+                host, {"peticiones": 0, "reintentos": 0, "fallos_transitorios": 0, "rechazos_circuito_abierto": 0, "aperturas_circuito": 0}
+            )
+            metricas_host[nombre_metrica] += 1
+
+    def calcular_espera(self, numero_reintento: int) -> float:
+        """Espera antes del reintento N (desde 1): aleatoria entre 0 y base * 2^(N-1), acotada por el máximo ("full jitter")."""
+        return random.uniform(0.0, min(self.espera_maxima_segundos, self.espera_base_segundos * (2 ** (numero_reintento - 1))))
+
+    def _antes_de_intento(self, host: str, crear_error_circuito_abierto: Callable[[float], Exception]) -> CortacircuitosHost:
+        cortacircuitos = self.obtener_cortacircuitos(host)
+        if not cortacircuitos.permitir_peticion():
+            self._incrementar_metrica(host, "rechazos_circuito_abierto")
+            raise crear_error_circuito_abierto(cortacircuitos.segundos_hasta_reintento())
+        self._incrementar_metrica(host, "peticiones")
+        return cortacircuitos
+
+    def _tras_fallo(
+        self, host: str, cortacircuitos: CortacircuitosHost, error: Exception,
+        es_fallo_transitorio: Callable[[Exception], bool], es_idempotente: bool, numero_intento: int, descripcion: str,
+    ) -> Optional[float]:
+        """Registra el fallo y devuelve la espera antes de reintentar, o None si el error debe propagarse."""
+        if not es_fallo_transitorio(error):
+            cortacircuitos.registrar_exito() # El host respondió (p. ej. 4xx o error de la aplicación): está vivo
+            return None
+        self._incrementar_metrica(host, "fallos_transitorios")
+        if cortacircuitos.registrar_fallo():
+            self._incrementar_metrica(host, "aperturas_circuito")
+        if not es_idempotente or numero_intento >= self.intentos_maximos or cortacircuitos.estado == CortacircuitosHost.ABIERTO:
+            return None
+        espera_segundos = self.calcular_espera(numero_intento)
+        self._incrementar_metrica(host, "reintentos")
+        registrador.warning(
+            f"Fallo transitorio en {descripcion} (host '{host}', intento {numero_intento}/{self.intentos_maximos}): {error}. "
+            f"Reintentando en {espera_segundos:.2f} s."
+        )
+        return espera_segundos
+
+    def ejecutar(
+        self,
+        host: str,
+        operacion: Callable[[], T],
+        es_idempotente: bool,
+        es_fallo_transitorio: Callable[[Exception], bool],
+        crear_error_circuito_abierto: Callable[[float], Exception],
+        descripcion: str = "petición HTTP",
+    ) -> T:
+        """
+        Ejecuta `operacion` (que envía la petición y lanza la excepción de la biblioteca HTTP si falla) aplicando
+        el cortacircuitos del host y, si `es_idempotente`, reintentos ante fallos transitorios.
+
+        Raises:
+            La última excepción de `operacion`, o la devuelta por `crear_error_circuito_abierto` si el circuito está abierto.
+        """
+        numero_intento = 0
+        while True:
+            numero_intento += 1
+            cortacircuitos = self._antes_de_intento(host, crear_error_circuito_abierto)
+            try:
+                resultado = operacion()
+            except Exception as error_operacion:
+                espera_segundos = self._tras_fallo(host, cortacircuitos, error_operacion, es_fallo_transitorio, es_idempotente, numero_intento, descripcion)
+                if espera_segundos is None:
+                    raise
+                time.sleep(espera_segundos)
+                continue
+            except BaseException: # Cancelación (asyncio.CancelledError), KeyboardInterrupt...: no hay veredicto sobre el host
+                cortacircuitos.liberar_prueba()
+                raise
+            cortacircuitos.registrar_exito()
+            return resultado
+
+    async def ejecutar_asincrono(
+        self,
+        host: str,
+        operacion: Callable[[], Awaitable[T]],
+        es_idempotente: bool,
+        es_fallo_transitorio: Callable[[Exception], bool],
+        crear_error_circuito_abierto: Callable[[float], Exception],
+        descripcion: str = "petición HTTP",
+    ) -> T:
+        """Variante de `ejecutar` para operaciones asíncronas (espera con `asyncio.sleep`)."""
+        numero_intento = 0
+        while True:
+            numero_intento += 1
+            cortacircuitos = self._antes_de_intento(host, crear_error_circuito_abierto)
+            try:
+                resultado = await operacion()
+            except Exception as error_operacion:
+                espera_segundos = self._tras_fallo(host, cortacircuitos, error_operacion, es_fallo_transitorio, es_idempotente, numero_intento, descripcion)
+                if espera_segundos is None:
+                    raise
+                await asyncio.sleep(espera_segundos)
+                continue
+            except BaseException: # Cancelación (asyncio.CancelledError), KeyboardInterrupt...: no hay veredicto sobre el host
+                cortacircuitos.liberar_prueba()
+                raise
+            cortacircuitos.registrar_exito()
+            return resultado
+
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        """Métricas acumuladas por host, con el estado actual de su circuito."""
+        with self._candado:
+            estadisticas_por_host = {host: dict(metricas) for host, metricas in self._metricas_por_host.items()}
+            cortacircuitos_por_host = dict(self._cortacircuitos_por_host)
+        for host, estadisticas_host in estadisticas_por_host.items():
+            estadisticas_host["estado_circuito"] = cortacircuitos_por_host[host].estado if host in cortacircuitos_por_host else CortacircuitosHost.CERRADO
+        return estadisticas_por_host
+
+
+@lru_cache(maxsize=1)
+def obtener_ejecutor_resiliente_http() -> EjecutorResilienteHttp:
+    """Devuelve el ejecutor compartido por todos los clientes HTTP del proceso (un cortacircuitos por host)."""
+    config_resiliencia = configuracion_global.resiliencia_http
+    return EjecutorResilienteHttp(
+        intentos_maximos=config_resiliencia.intentos_maximos,
+        espera_base_segundos=config_resiliencia.espera_base_reintento_ms / 1000,
+        espera_maxima_segundos=config_resiliencia.espera_maxima_reintento_ms / 1000,
+        umbral_fallos_cortacircuitos=config_resiliencia.umbral_fallos_cortacircuitos,
+        segundos_apertura_cortacircuitos=config_resiliencia.segundos_apertura_cortacircuitos,
+    )
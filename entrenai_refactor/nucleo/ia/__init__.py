@@ -11,11 +11,27 @@ from .envoltorio_gemini import EnvoltorioGemini, ErrorEnvoltorioGemini
 from .envoltorio_ollama import EnvoltorioOllama, ErrorEnvoltorioOllama
 
 # Importar el gestor de embeddings
-from .gestor_embeddings import GestorEmbeddings, ErrorGestorEmbeddings
+from .gestor_embeddings import (
+    GestorEmbeddings, ErrorGestorEmbeddings,
+    ESTRATEGIA_FRAGMENTACION_VENTANA_FIJA, ESTRATEGIA_FRAGMENTACION_ESTRUCTURAL, ESTRATEGIA_FRAGMENTACION_SEMANTICA,
+    ESTRATEGIAS_FRAGMENTACION_DISPONIBLES, CacheEmbeddingsEnMemoria,
+)
+
+# Importar el fragmentador estructural (encabezados > párrafos > oraciones)
+from .fragmentador_estructural import dividir_markdown_en_fragmentos_estructurales
+
+# Importar el fragmentador semántico (cortes en valles de similitud entre oraciones)
+from .fragmentador_semantico import dividir_texto_en_fragmentos_semanticos, fragmentacion_semantica_disponible
+
+# Importar el conteo de tokens con el tokenizador local del modelo de embedding
+from .tokenizador_embeddings import ContadorTokensEmbedding, obtener_contador_tokens_para_modelo, obtener_contador_tokens_configurado, MODELOS_EMBEDDING_CONOCIDOS
 
 # Importar el proveedor de inteligencia unificado
 from .proveedor_inteligencia import ProveedorInteligencia, ErrorProveedorInteligencia
 
+# Importar la caché de conversiones a Markdown
+from .cache_conversiones_markdown import CacheConversionesMarkdown, VERSION_PROMPT_FORMATEO_MARKDOWN, obtener_cache_conversiones_markdown
+
 # Importar funciones de utilidad comunes
 from .utilidades_comunes_ia import (
     postprocesar_contenido_markdown,
@@ -23,6 +39,9 @@ from .utilidades_comunes_ia import (
     guardar_markdown_en_archivo,
     extraer_bloque_markdown_de_respuesta,
     es_contenido_markdown_valido_basico,
+    texto_parece_markdown_bien_formado,
+    dividir_texto_en_secciones_estructurales,
+    unir_secciones_markdown,
 )
 
 # Define la interfaz pública del paquete 'ia' mediante la lista __all__.
@@ -37,15 +56,35 @@ __all__ = [
     # Gestor de Embeddings y su Error
     "GestorEmbeddings",
     "ErrorGestorEmbeddings",
+    "ESTRATEGIA_FRAGMENTACION_VENTANA_FIJA",
+    "ESTRATEGIA_FRAGMENTACION_ESTRUCTURAL",
+    "ESTRATEGIA_FRAGMENTACION_SEMANTICA",
+    "ESTRATEGIAS_FRAGMENTACION_DISPONIBLES",
+    "CacheEmbeddingsEnMemoria",
+    "dividir_markdown_en_fragmentos_estructurales",
+    "dividir_texto_en_fragmentos_semanticos",
+    "fragmentacion_semantica_disponible",
+    "ContadorTokensEmbedding",
+    "obtener_contador_tokens_para_modelo",
+    "obtener_contador_tokens_configurado",
+    "MODELOS_EMBEDDING_CONOCIDOS",
 
     # Proveedor de Inteligencia Unificado y su Error
     "ProveedorInteligencia",
     "ErrorProveedorInteligencia",
 
+    # Caché de Conversiones a Markdown
+    "CacheConversionesMarkdown",
+    "VERSION_PROMPT_FORMATEO_MARKDOWN",
+    "obtener_cache_conversiones_markdown",
+
     # Funciones de Utilidad Comunes para IA
     "postprocesar_contenido_markdown",
     "preprocesar_contenido_texto", # Nombre actualizado
     "guardar_markdown_en_archivo",
     "extraer_bloque_markdown_de_respuesta",
     "es_contenido_markdown_valido_basico",
+    "texto_parece_markdown_bien_formado",
+    "dividir_texto_en_secciones_estructurales",
+    "unir_secciones_markdown",
 ]
\ No newline at end of file
@@ -0,0 +1,57 @@
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from entrenai_refactor.config.configuracion import configuracion_global
+from entrenai_refactor.config.registrador import obtener_registrador
+from entrenai_refactor.nucleo.cache_disco import CacheDiscoDireccionadaPorContenido
+
+registrador = obtener_registrador(__name__)
+
+# Versión de los prompts de formateo a Markdown de los envoltorios (Ollama y Gemini).
+# Forma parte de la clave de la caché: debe incrementarse cada vez que se modifique
+# el prompt de `convertir_texto_a_markdown`, para que no se reutilicen conversiones obsoletas.
+VERSION_PROMPT_FORMATEO_MARKDOWN = "1"
+
+
+class CacheConversionesMarkdown(CacheDiscoDireccionadaPorContenido):
+    """
+    Caché persistente en disco, direccionada por contenido, de las conversiones de texto a Markdown
+    realizadas por el LLM. La clave es el SHA-256 del texto crudo extraído junto con el proveedor,
+    el modelo, el modo de formateo y la versión del prompt, de modo que el mismo documento
+    (reprocesado, resubido con otro timestamp o compartido entre cursos) no vuelve a pasar por el LLM.
+    """
+
+    def __init__(self, directorio_cache: Path, tamano_maximo_bytes: int):
+        super().__init__(directorio_cache, tamano_maximo_bytes, extension_entradas=".md", descripcion_cache="conversiones Markdown")
+
+    @staticmethod
+    def calcular_clave(texto_original: str, nombre_proveedor: str, nombre_modelo: str, modo_formateo: str) -> str:
+        """Calcula la clave de caché (hex SHA-256) para un texto y los parámetros que afectan a su conversión."""
+        resumen_hash = hashlib.sha256()
+        for componente_clave in (VERSION_PROMPT_FORMATEO_MARKDOWN, nombre_proveedor, nombre_modelo, modo_formateo):
+            resumen_hash.update(componente_clave.encode("utf-8"))
+            resumen_hash.update(b"\0")
+        resumen_hash.update(texto_original.encode("utf-8", errors="surrogatepass"))
+        return resumen_hash.hexdigest()
+
+
+@lru_cache(maxsize=1)
+def obtener_cache_conversiones_markdown() -> Optional[CacheConversionesMarkdown]:
+    """
+    Devuelve la caché de conversiones Markdown del proceso, o None si está deshabilitada o no se pudo crear.
+    Se comparte entre los `ProveedorInteligencia` (uno por petición) para no recorrer el directorio de la
+    caché en cada petición y para que la contabilidad de tamaño sea única.
+    """
+    config_procesamiento = configuracion_global.procesamiento
+    if not config_procesamiento.cache_conversiones_markdown_habilitada:
+        return None
+    try:
+        return CacheConversionesMarkdown(
+            directorio_cache=configuracion_global.ruta_absoluta_directorio_datos / "cache_markdown",
+            tamano_maximo_bytes=config_procesamiento.tamano_maximo_cache_markdown_mb * 1024 * 1024,
+        )
+    except OSError as e_cache:
+        registrador.warning(f"No se pudo inicializar la caché de conversiones Markdown; se continuará sin caché: {e_cache}")
+        return None
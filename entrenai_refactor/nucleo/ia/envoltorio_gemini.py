@@ -1,6 +1,6 @@
 import json # Añadido para el registro de la petición a la API
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator
 
 from google import genai
 from google.generativeai import types as tipos_google_genai
@@ -97,6 +97,58 @@ class EnvoltorioGemini:
             registrador.error(f"Error al generar embedding con modelo Gemini '{modelo_seleccionado}': {e_embedding}")
             raise ErrorEnvoltorioGemini(f"Falló la generación del embedding con Gemini: {e_embedding}", e_embedding)
 
+    def generar_embeddings_de_textos(self, textos_entrada: List[str], nombre_modelo_embedding: Optional[str] = None) -> List[List[float]]:
+        """Genera los embeddings de varios textos en una sola petición ('embed_content' acepta una lista de contenidos)."""
+        if not textos_entrada:
+            return []
+        modelo_seleccionado = nombre_modelo_embedding or self.configuracion_gemini.modelo_embedding_gemini
+        if not modelo_seleccionado:
+            registrador.error("No se ha especificado un modelo de embedding de Gemini para usar.")
+            raise ErrorEnvoltorioGemini("Modelo de embedding de Gemini no especificado.")
+
+        registrador.debug(f"Generando {len(textos_entrada)} embeddings en lote con modelo Gemini '{modelo_seleccionado}'.")
+        try:
+            textos_preprocesados = [preprocesar_contenido_texto(texto) for texto in textos_entrada]
+            respuesta_embeddings = genai.embed_content(model=modelo_seleccionado, content=textos_preprocesados)
+            lista_embeddings = respuesta_embeddings["embedding"]
+            if not isinstance(lista_embeddings, list) or len(lista_embeddings) != len(textos_entrada):
+                raise ErrorEnvoltorioGemini(f"La respuesta de embeddings en lote de Gemini no contiene un vector por texto ({len(textos_entrada)} textos).")
+            return [list(embedding) for embedding in lista_embeddings]
+        except ErrorEnvoltorioGemini:
+            raise
+        except Exception as e_embedding:
+            registrador.error(f"Error al generar embeddings en lote con modelo Gemini '{modelo_seleccionado}': {e_embedding}")
+            raise ErrorEnvoltorioGemini(f"Falló la generación de embeddings en lote con Gemini: {e_embedding}", e_embedding)
+
+    @staticmethod
+    def _construir_contenido_peticion_chat(
+        prompt_usuario: str,
+        historial_chat_previo: Optional[List[Dict[str, str]]] = None,
+        fragmentos_de_contexto: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Construye la lista 'contents' para la API de Gemini (historial + contexto + pregunta).
+        Compartido por la generación completa y la generación en flujo (streaming).
+        Referencia: https://ai.google.dev/docs/gemini_api_overview#chat_conversations
+        """
+        contenido_peticion_api: List[Dict[str, Any]] = []
+        if historial_chat_previo:
+            for item_historial in historial_chat_previo:
+                # Asegurar que el formato sea correcto para la API de Gemini
+                if "role" in item_historial and "parts" in item_historial:
+                     contenido_peticion_api.append(item_historial)
+                else:
+                    registrador.warning(f"Item de historial de chat malformado omitido: {item_historial}")
+
+        # Añadir el contexto y el prompt actual del usuario
+        prompt_final_con_contexto = prompt_usuario
+        if fragmentos_de_contexto:
+            contexto_como_string = "\n\n".join(fragmentos_de_contexto)
+            prompt_final_con_contexto = f"Contexto relevante:\n{contexto_como_string}\n\nPregunta del usuario: {prompt_usuario}"
+
+        contenido_peticion_api.append({"role": "user", "parts": [prompt_final_con_contexto]})
+        return contenido_peticion_api
+
     def generar_respuesta_de_chat(
         self,
         prompt_usuario: str,
@@ -104,7 +156,7 @@ class EnvoltorioGemini:
         mensaje_de_sistema: Optional[str] = None,
         historial_chat_previo: Optional[List[Dict[str, str]]] = None, # Formato: [{"role": "user/model", "parts": ["texto"]}]
         fragmentos_de_contexto: Optional[List[str]] = None,
-        # transmitir: bool = False # El streaming (transmitir) aún no está implementado en este envoltorio
+        # El streaming se ofrece por separado en 'generar_respuesta_de_chat_en_flujo'.
     ) -> str:
         """
         Genera una respuesta de chat utilizando un modelo de Gemini,
@@ -117,24 +169,9 @@ class EnvoltorioGemini:
 
         registrador.debug(f"Generando respuesta de chat con modelo Gemini '{modelo_seleccionado}'.")
         try:
-            # Construir el historial de 'contents' para la API de Gemini
-            # Referencia: https://ai.google.dev/docs/gemini_api_overview#chat_conversations
-            contenido_peticion_api = []
-            if historial_chat_previo:
-                for item_historial in historial_chat_previo:
-                    # Asegurar que el formato sea correcto para la API de Gemini
-                    if "role" in item_historial and "parts" in item_historial:
-                         contenido_peticion_api.append(item_historial)
-                    else:
-                        registrador.warning(f"Item de historial de chat malformado omitido: {item_historial}")
-
-            # Añadir el contexto y el prompt actual del usuario
-            prompt_final_con_contexto = prompt_usuario
-            if fragmentos_de_contexto:
-                contexto_como_string = "\n\n".join(fragmentos_de_contexto)
-                prompt_final_con_contexto = f"Contexto relevante:\n{contexto_como_string}\n\nPregunta del usuario: {prompt_usuario}"
-
-            contenido_peticion_api.append({"role": "user", "parts": [prompt_final_con_contexto]})
+            contenido_peticion_api = self._construir_contenido_peticion_chat(
+                prompt_usuario, historial_chat_previo, fragmentos_de_contexto
+            )
 
             opciones_config_generacion = tipos_google_genai.GenerationConfig(candidate_count=1) # Solicitar una sola respuesta candidata
             configuracion_seguridad_api = self._obtener_configuracion_de_seguridad()
@@ -151,7 +188,6 @@ class EnvoltorioGemini:
             respuesta_gemini = modelo_generativo_gemini.generate_content(
                 contents=contenido_peticion_api,
                 generation_config=opciones_config_generacion,
-                # stream=transmitir # El streaming requeriría un manejo diferente del iterador de respuesta
             )
 
             # Extraer el contenido de texto de la respuesta
@@ -193,11 +229,57 @@ class EnvoltorioGemini:
             registrador.exception(f"Error al generar respuesta de chat con modelo Gemini '{modelo_seleccionado}': {e_chat}")
             raise ErrorEnvoltorioGemini(f"Falló la generación de respuesta de chat con Gemini: {e_chat}", e_chat)
 
+    def generar_respuesta_de_chat_en_flujo(
+        self,
+        prompt_usuario: str,
+        nombre_modelo_chat: Optional[str] = None,
+        mensaje_de_sistema: Optional[str] = None,
+        historial_chat_previo: Optional[List[Dict[str, str]]] = None,
+        fragmentos_de_contexto: Optional[List[str]] = None,
+    ) -> Iterator[str]:
+        """
+        Genera una respuesta de chat con Gemini en modo flujo (stream=True),
+        devolviendo los fragmentos de texto a medida que la API los entrega.
+        """
+        modelo_seleccionado = nombre_modelo_chat or self.configuracion_gemini.modelo_texto_gemini
+        if not modelo_seleccionado:
+            registrador.error("No se ha especificado un modelo de texto/chat de Gemini para usar.")
+            raise ErrorEnvoltorioGemini("Modelo de texto/chat de Gemini no especificado.")
+
+        registrador.debug(f"Iniciando chat en flujo con modelo Gemini '{modelo_seleccionado}'.")
+        try:
+            contenido_peticion_api = self._construir_contenido_peticion_chat(
+                prompt_usuario, historial_chat_previo, fragmentos_de_contexto
+            )
+            modelo_generativo_gemini = genai.GenerativeModel(
+                model_name=modelo_seleccionado,
+                safety_settings=self._obtener_configuracion_de_seguridad(),
+                system_instruction=mensaje_de_sistema if mensaje_de_sistema else None
+            )
+            flujo_respuesta_gemini = modelo_generativo_gemini.generate_content(
+                contents=contenido_peticion_api,
+                generation_config=tipos_google_genai.GenerationConfig(candidate_count=1),
+                stream=True,
+            )
+            for trozo_respuesta in flujo_respuesta_gemini:
+                # Cada trozo puede venir sin 'parts' (ej. el último, que sólo trae finish_reason).
+                texto_trozo = "".join(part.text for part in (trozo_respuesta.parts or []) if hasattr(part, "text"))
+                if texto_trozo:
+                    yield texto_trozo
+            registrador.info(f"Respuesta de chat en flujo completada con modelo Gemini '{modelo_seleccionado}'.")
+        except tipos_google_genai.BlockedPromptException as e_prompt_bloqueado:
+            registrador.error(f"El prompt enviado a Gemini en flujo (modelo '{modelo_seleccionado}') fue bloqueado: {e_prompt_bloqueado}")
+            raise ErrorEnvoltorioGemini(f"El prompt fue bloqueado por Gemini: {e_prompt_bloqueado}", e_prompt_bloqueado)
+        except Exception as e_chat:
+            registrador.exception(f"Error durante chat en flujo con modelo Gemini '{modelo_seleccionado}': {e_chat}")
+            raise ErrorEnvoltorioGemini(f"Falló la generación de respuesta de chat en flujo con Gemini: {e_chat}", e_chat)
+
     def convertir_texto_a_markdown(
         self,
         texto_original: str,
         nombre_modelo_formateo: Optional[str] = None,
-        ruta_archivo_guardado: Optional[Path] = None
+        ruta_archivo_guardado: Optional[Path] = None,
+        indicacion_contexto_seccion: Optional[str] = None, # Indicación extra cuando el texto es una sección de un documento mayor
     ) -> str:
         """Formatea un texto crudo a formato Markdown utilizando un modelo de Gemini."""
         modelo_seleccionado = nombre_modelo_formateo or self.configuracion_gemini.modelo_texto_gemini
@@ -208,6 +290,7 @@ class EnvoltorioGemini:
         texto_limpio_para_formateo = preprocesar_contenido_texto(texto_original)
         registrador.info(f"Formateando texto a Markdown con modelo Gemini '{modelo_seleccionado}'. Longitud original: {len(texto_original)}, preprocesado: {len(texto_limpio_para_formateo)}.")
 
+        bloque_indicacion_seccion = f"{indicacion_contexto_seccion}\n\n" if indicacion_contexto_seccion else ""
         prompt_instruccion_formateo = (
             "Eres un experto formateador de texto especializado en convertir texto crudo a Markdown limpio y bien estructurado.\n"
             "Tu tarea es transformar el siguiente contenido proporcionado a un formato Markdown. Sigue estas reglas estrictamente:\n"
@@ -219,6 +302,7 @@ class EnvoltorioGemini:
             "6. NO incluyas ningún meta-comentario, notas sobre el proceso de formateo, o disculpas.\n"
             "7. SOLO devuelve el contenido Markdown formateado correctamente. Nada antes, nada después.\n\n"
             "El objetivo es un Markdown limpio que represente con precisión el contenido original, listo para ser usado directamente.\n\n"
+            f"{bloque_indicacion_seccion}"
             "Texto a convertir:\n"
             f"\"\"\"\n{texto_limpio_para_formateo}\n\"\"\""
         )
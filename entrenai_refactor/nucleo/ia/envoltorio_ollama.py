@@ -1,5 +1,5 @@
 import json # Para registrar los mensajes enviados a la API
-from typing import List, Optional, Any, Dict
+from typing import List, Optional, Any, Dict, Iterator
 from pathlib import Path
 import ollama # Cliente oficial de Ollama para Python
 
@@ -155,31 +155,50 @@ class EnvoltorioOllama:
             registrador.error(f"Error inesperado al generar embedding con modelo Ollama '{modelo_seleccionado}': {e_embedding}")
             raise ErrorEnvoltorioOllama(f"Falló la generación del embedding con Ollama: {e_embedding}", e_embedding)
 
-    def generar_respuesta_de_chat(
-        self,
-        prompt_usuario: str,
-        nombre_modelo_chat: Optional[str] = None,
-        mensaje_de_sistema: Optional[str] = None,
-        historial_chat_previo: Optional[List[Dict[str, str]]] = None, # Formato: [{"role": "user/assistant", "content": "texto"}]
-        fragmentos_de_contexto: Optional[List[str]] = None,
-        # transmitir: bool = False # El streaming (transmitir) aún no está implementado en este envoltorio
-    ) -> str:
+    def generar_embeddings_de_textos(self, textos_entrada: List[str], nombre_modelo_embedding: Optional[str] = None) -> List[List[float]]:
         """
-        Genera una respuesta de chat utilizando un modelo de Ollama,
-        opcionalmente con un mensaje de sistema, historial de chat y contexto adicional.
+        Genera los embeddings de varios textos en una sola petición ('/api/embed' acepta una lista de entradas).
+        Con versiones del cliente sin `embed`, se generan de uno en uno.
         """
         if not self.cliente_ollama:
-            registrador.error(f"{MENSAJE_CLIENTE_OLLAMA_NO_INICIALIZADO} No se puede generar la respuesta de chat.")
+            registrador.error(f"{MENSAJE_CLIENTE_OLLAMA_NO_INICIALIZADO} No se pueden generar los embeddings.")
             raise ErrorEnvoltorioOllama(MENSAJE_CLIENTE_OLLAMA_NO_INICIALIZADO)
+        if not textos_entrada:
+            return []
+        if not hasattr(self.cliente_ollama, "embed"):
+            return [self.generar_embedding_de_texto(texto, nombre_modelo_embedding) for texto in textos_entrada]
 
-        modelo_seleccionado = nombre_modelo_chat or self.configuracion_ollama.modelo_qa_ollama # Usar modelo_qa para chat
-        if not modelo_seleccionado:
-            registrador.error("Nombre del modelo de QA/chat de Ollama no configurado.")
-            raise ErrorEnvoltorioOllama("Nombre del modelo de QA/chat de Ollama no configurado.")
-
-        registrador.debug(f"Generando respuesta de chat con modelo Ollama '{modelo_seleccionado}'.")
+        modelo_seleccionado = nombre_modelo_embedding or self.configuracion_ollama.modelo_embedding_ollama
+        registrador.debug(f"Generando {len(textos_entrada)} embeddings en lote con modelo Ollama '{modelo_seleccionado}'.")
+        try:
+            textos_preprocesados = [preprocesar_contenido_texto(texto) for texto in textos_entrada]
+            respuesta_embeddings = self.cliente_ollama.embed(model=modelo_seleccionado, input=textos_preprocesados)
+            lista_embeddings = respuesta_embeddings["embeddings"]
+            if not isinstance(lista_embeddings, list) or len(lista_embeddings) != len(textos_entrada):
+                raise ErrorEnvoltorioOllama(f"La respuesta de embeddings en lote de Ollama contiene {len(lista_embeddings) if isinstance(lista_embeddings, list) else 'un formato inesperado'} vectores para {len(textos_entrada)} textos.")
+            return [list(embedding) for embedding in lista_embeddings]
+        except ErrorEnvoltorioOllama:
+            raise
+        except ollama.ResponseError as e_respuesta_ollama:
+            registrador.error(f"Error de respuesta del servidor Ollama ({e_respuesta_ollama.status_code}) al generar embeddings en lote con '{modelo_seleccionado}': {e_respuesta_ollama.error}")
+            raise ErrorEnvoltorioOllama(f"Error del servidor Ollama al generar embeddings en lote: {e_respuesta_ollama.error}", e_respuesta_ollama)
+        except Exception as e_embedding:
+            registrador.error(f"Error inesperado al generar embeddings en lote con modelo Ollama '{modelo_seleccionado}': {e_embedding}")
+            raise ErrorEnvoltorioOllama(f"Falló la generación de embeddings en lote con Ollama: {e_embedding}", e_embedding)
 
-        mensajes_para_api = []
+    @staticmethod
+    def _construir_mensajes_para_chat(
+        prompt_usuario: str,
+        mensaje_de_sistema: Optional[str] = None,
+        historial_chat_previo: Optional[List[Dict[str, str]]] = None,
+        fragmentos_de_contexto: Optional[List[str]] = None,
+    ) -> List[Dict[str, str]]:
+        """
+        Construye la lista de mensajes para la API de chat de Ollama.
+        Compartido por la generación completa y la generación en flujo (streaming),
+        para que ambos caminos envíen exactamente el mismo prompt al modelo.
+        """
+        mensajes_para_api: List[Dict[str, str]] = []
         if mensaje_de_sistema:
             mensajes_para_api.append({"role": "system", "content": mensaje_de_sistema})
 
@@ -198,18 +217,40 @@ class EnvoltorioOllama:
                 f"{contexto_como_string}\n--- Fin del Contexto ---\n\nPregunta del usuario: {prompt_usuario}"
             )
         mensajes_para_api.append({"role": "user", "content": prompt_final_con_contexto})
+        return mensajes_para_api
+
+    def generar_respuesta_de_chat(
+        self,
+        prompt_usuario: str,
+        nombre_modelo_chat: Optional[str] = None,
+        mensaje_de_sistema: Optional[str] = None,
+        historial_chat_previo: Optional[List[Dict[str, str]]] = None, # Formato: [{"role": "user/assistant", "content": "texto"}]
+        fragmentos_de_contexto: Optional[List[str]] = None,
+        # El streaming se ofrece por separado en 'generar_respuesta_de_chat_en_flujo'.
+    ) -> str:
+        """
+        Genera una respuesta de chat utilizando un modelo de Ollama,
+        opcionalmente con un mensaje de sistema, historial de chat y contexto adicional.
+        """
+        if not self.cliente_ollama:
+            registrador.error(f"{MENSAJE_CLIENTE_OLLAMA_NO_INICIALIZADO} No se puede generar la respuesta de chat.")
+            raise ErrorEnvoltorioOllama(MENSAJE_CLIENTE_OLLAMA_NO_INICIALIZADO)
+
+        modelo_seleccionado = nombre_modelo_chat or self.configuracion_ollama.modelo_qa_ollama # Usar modelo_qa para chat
+        if not modelo_seleccionado:
+            registrador.error("Nombre del modelo de QA/chat de Ollama no configurado.")
+            raise ErrorEnvoltorioOllama("Nombre del modelo de QA/chat de Ollama no configurado.")
+
+        registrador.debug(f"Generando respuesta de chat con modelo Ollama '{modelo_seleccionado}'.")
+
+        mensajes_para_api = self._construir_mensajes_para_chat(
+            prompt_usuario, mensaje_de_sistema, historial_chat_previo, fragmentos_de_contexto
+        )
 
         registrador.debug(f"Enviando a Ollama (modelo {modelo_seleccionado}): Mensajes: {json.dumps(mensajes_para_api, indent=2, ensure_ascii=False)}")
 
         try:
-            # if transmitir:
-            #    registrador.warning("El streaming no está implementado aún para Ollama en este envoltorio. Se devolverá la respuesta completa.")
-            #    # El manejo de streaming sería:
-            #    # respuesta_ollama_stream = self.cliente_ollama.chat(model=modelo_seleccionado, messages=mensajes_para_api, stream=True)
-            #    # for chunk in respuesta_ollama_stream:
-            #    #     # procesar chunk['message']['content']
-            #    # return respuesta_completa_concatenada
-
+            # Para streaming ver 'generar_respuesta_de_chat_en_flujo'.
             respuesta_ollama = self.cliente_ollama.chat(model=modelo_seleccionado, messages=mensajes_para_api, stream=False)
 
             contenido_texto_respuesta = ""
@@ -235,11 +276,55 @@ class EnvoltorioOllama:
             registrador.error(f"Error inesperado al generar respuesta de chat con modelo Ollama '{modelo_seleccionado}': {e_chat}")
             raise ErrorEnvoltorioOllama(f"Falló la generación de la respuesta de chat con Ollama: {e_chat}", e_chat)
 
+    def generar_respuesta_de_chat_en_flujo(
+        self,
+        prompt_usuario: str,
+        nombre_modelo_chat: Optional[str] = None,
+        mensaje_de_sistema: Optional[str] = None,
+        historial_chat_previo: Optional[List[Dict[str, str]]] = None,
+        fragmentos_de_contexto: Optional[List[str]] = None,
+    ) -> Iterator[str]:
+        """
+        Genera una respuesta de chat con Ollama en modo flujo (stream=True),
+        devolviendo los fragmentos de texto a medida que el modelo los produce.
+        Permite que la API empiece a responder al usuario antes de que termine la generación.
+        """
+        if not self.cliente_ollama:
+            registrador.error(f"{MENSAJE_CLIENTE_OLLAMA_NO_INICIALIZADO} No se puede generar la respuesta de chat en flujo.")
+            raise ErrorEnvoltorioOllama(MENSAJE_CLIENTE_OLLAMA_NO_INICIALIZADO)
+
+        modelo_seleccionado = nombre_modelo_chat or self.configuracion_ollama.modelo_qa_ollama
+        if not modelo_seleccionado:
+            registrador.error("Nombre del modelo de QA/chat de Ollama no configurado.")
+            raise ErrorEnvoltorioOllama("Nombre del modelo de QA/chat de Ollama no configurado.")
+
+        mensajes_para_api = self._construir_mensajes_para_chat(
+            prompt_usuario, mensaje_de_sistema, historial_chat_previo, fragmentos_de_contexto
+        )
+        registrador.debug(f"Iniciando chat en flujo con modelo Ollama '{modelo_seleccionado}' ({len(mensajes_para_api)} mensajes).")
+
+        try:
+            flujo_respuesta_ollama = self.cliente_ollama.chat(model=modelo_seleccionado, messages=mensajes_para_api, stream=True)
+            for trozo_respuesta in flujo_respuesta_ollama:
+                # El cliente devuelve objetos ChatResponse (no dict); admiten `.get` y subíndices igual que un dict.
+                mensaje_trozo = trozo_respuesta.get("message")
+                contenido_trozo = mensaje_trozo.get("content") if mensaje_trozo is not None else None
+                if contenido_trozo:
+                    yield str(contenido_trozo)
+            registrador.info(f"Respuesta de chat en flujo completada con modelo Ollama '{modelo_seleccionado}'.")
+        except ollama.ResponseError as e_respuesta_ollama:
+            registrador.error(f"Error de respuesta del servidor Ollama ({e_respuesta_ollama.status_code}) durante chat en flujo con '{modelo_seleccionado}': {e_respuesta_ollama.error}")
+            raise ErrorEnvoltorioOllama(f"Error del servidor Ollama durante chat en flujo: {e_respuesta_ollama.error}", e_respuesta_ollama)
+        except Exception as e_chat:
+            registrador.error(f"Error inesperado durante chat en flujo con modelo Ollama '{modelo_seleccionado}': {e_chat}")
+            raise ErrorEnvoltorioOllama(f"Falló la generación de la respuesta de chat en flujo con Ollama: {e_chat}", e_chat)
+
     def convertir_texto_a_markdown(
         self,
         texto_original: str,
         nombre_modelo_formateo: Optional[str] = None,
-        ruta_archivo_guardado: Optional[Path] = None
+        ruta_archivo_guardado: Optional[Path] = None,
+        indicacion_contexto_seccion: Optional[str] = None, # Indicación extra cuando el texto es una sección de un documento mayor
     ) -> str:
         """Formatea un texto crudo a formato Markdown utilizando un modelo de Ollama."""
         if not self.cliente_ollama:
@@ -266,6 +351,8 @@ class EnvoltorioOllama:
             "7. SOLO devuelve el contenido Markdown formateado correctamente. Nada antes, nada después.\n\n"
             "El objetivo es un Markdown limpio que represente con precisión el contenido original, listo para ser usado directamente."
         )
+        if indicacion_contexto_seccion:
+            prompt_instruccion_sistema += f"\n\n{indicacion_contexto_seccion}"
         mensajes_para_api_formateo = [
             {"role": "system", "content": prompt_instruccion_sistema},
             {"role": "user", "content": texto_limpio_para_formateo}
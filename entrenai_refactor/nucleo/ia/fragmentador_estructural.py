@@ -0,0 +1,209 @@
+import re
+from typing import Any, Dict, Iterator, List, Match, Optional, Tuple
+
+from entrenai_refactor.config.registrador import obtener_registrador
+
+registrador = obtener_registrador(__name__)
+
+# Encabezado ATX de Markdown ('## Título', admite los '#' de cierre opcionales).
+_PATRON_ENCABEZADO_ATX = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+# Delimitador de un bloque de código cercado: tres o más '`' o '~', con hasta tres espacios de sangría.
+_PATRON_DELIMITADOR_CODIGO = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+# Límite de oración: signo de cierre (opcionalmente seguido de comillas o paréntesis) y espacio.
+_PATRON_FIN_ORACION = re.compile(r"(?<=[.!?…])\s+|(?<=[.!?…][\"”»')\]])\s+")
+# Bloques cuyo contenido se organiza por líneas (tablas, listas, código): se parten por líneas, no por oraciones.
+_PATRON_LINEA_ESTRUCTURADA = re.compile(r"^\s*(\||[-*+]\s|\d+[.)]\s|```|~~~|    )")
+
+# Unidad mínima de empaquetado: (texto, separador con la unidad anterior dentro del mismo fragmento).
+_UnidadTexto = Tuple[str, str]
+
+
+def actualizar_delimitador_bloque_codigo(linea_texto: str, delimitador_abierto: Optional[str]) -> Optional[str]:
+    """
+    Devuelve el delimitador del bloque de código cercado que queda abierto tras `linea_texto`, o None si
+    queda fuera de todo bloque. Un bloque abierto con '```' sólo lo cierra una línea con al menos tantos
+    '`' y nada detrás (igual con '~'): un '~~~' dentro de un bloque '```' es contenido del bloque.
+    """
+    coincidencia_delimitador = _PATRON_DELIMITADOR_CODIGO.match(linea_texto)
+    if coincidencia_delimitador is None:
+        return delimitador_abierto
+    delimitador_linea = coincidencia_delimitador.group(1)
+    if delimitador_abierto is None:
+        return delimitador_linea
+    cierra_bloque = (
+        delimitador_linea[0] == delimitador_abierto[0]
+        and len(delimitador_linea) >= len(delimitador_abierto)
+        and not linea_texto[coincidencia_delimitador.end():].strip()
+    )
+    return None if cierra_bloque else delimitador_abierto
+
+
+def iterar_lineas_con_encabezados_markdown(texto_markdown: str) -> Iterator[Tuple[str, Optional[Match[str]]]]:
+    """
+    Recorre las líneas del Markdown devolviendo cada una con su coincidencia de encabezado ATX (grupo 1:
+    los '#', grupo 2: el título), o None si no es un encabezado o está dentro de un bloque de código cercado
+    (un comentario '# ...' de Python o Bash no es un encabezado). Es el único analizador de encabezados:
+    lo usan tanto este fragmentador como la unión de secciones Markdown de `utilidades_comunes_ia`.
+    """
+    delimitador_abierto: Optional[str] = None
+    for linea_texto in texto_markdown.split("\n"):
+        dentro_bloque_codigo = delimitador_abierto is not None
+        delimitador_abierto = actualizar_delimitador_bloque_codigo(linea_texto, delimitador_abierto)
+        yield linea_texto, (None if dentro_bloque_codigo else _PATRON_ENCABEZADO_ATX.match(linea_texto))
+
+
+def _dividir_en_secciones_por_encabezados(texto_markdown: str) -> List[Tuple[List[str], str]]:
+    """
+    Divide el Markdown en secciones delimitadas por encabezados ATX, ignorando los que aparecen dentro de
+    bloques de código. Cada sección se devuelve con su ruta de encabezados (del nivel más alto al más bajo).
+    Un encabezado sin contenido propio (seguido directamente de otro encabezado) se adjunta a la sección siguiente.
+    """
+    secciones: List[Tuple[List[str], str]] = []
+    ruta_encabezados_actual: List[Tuple[int, str]] = []
+    ruta_seccion_actual: List[str] = []
+    lineas_seccion_actual: List[str] = []
+    seccion_tiene_cuerpo = False
+
+    for linea_texto, coincidencia_encabezado in iterar_lineas_con_encabezados_markdown(texto_markdown):
+        if coincidencia_encabezado:
+            if seccion_tiene_cuerpo:
+                secciones.append((ruta_seccion_actual, "\n".join(lineas_seccion_actual).strip()))
+                lineas_seccion_actual = []
+            nivel_encabezado = len(coincidencia_encabezado.group(1))
+            ruta_encabezados_actual = [(nivel, titulo) for nivel, titulo in ruta_encabezados_actual if nivel < nivel_encabezado]
+            ruta_encabezados_actual.append((nivel_encabezado, coincidencia_encabezado.group(2).strip()))
+            ruta_seccion_actual = [titulo for _, titulo in ruta_encabezados_actual]
+            lineas_seccion_actual.append(linea_texto)
+            seccion_tiene_cuerpo = False
+        else:
+            lineas_seccion_actual.append(linea_texto)
+            seccion_tiene_cuerpo = seccion_tiene_cuerpo or bool(linea_texto.strip())
+
+    if any(linea.strip() for linea in lineas_seccion_actual):
+        secciones.append((ruta_seccion_actual, "\n".join(lineas_seccion_actual).strip()))
+    return secciones
+
+
+def _partir_por_palabras(texto: str, tamano_objetivo: int, separador_inicial: str) -> List[_UnidadTexto]:
+    """Parte un texto sin límites de oración utilizables en trozos de palabras completas de hasta `tamano_objetivo`."""
+    unidades: List[_UnidadTexto] = []
+    trozo_actual = ""
+    for palabra in texto.split():
+        while len(palabra) > tamano_objetivo: # Palabra (o token sin espacios) más larga que un fragmento
+            if trozo_actual:
+                unidades.append((trozo_actual, " " if unidades else separador_inicial))
+                trozo_actual = ""
+            unidades.append((palabra[:tamano_objetivo], " " if unidades else separador_inicial))
+            palabra = palabra[tamano_objetivo:]
+        if trozo_actual and len(trozo_actual) + 1 + len(palabra) > tamano_objetivo:
+            unidades.append((trozo_actual, " " if unidades else separador_inicial))
+            trozo_actual = palabra
+        else:
+            trozo_actual = f"{trozo_actual} {palabra}" if trozo_actual else palabra
+    if trozo_actual:
+        unidades.append((trozo_actual, " " if unidades else separador_inicial))
+    return unidades
+
+
+def _unidades_de_parrafo(parrafo: str, tamano_objetivo: int, separador_inicial: str, forzar_division: bool = False) -> List[_UnidadTexto]:
+    """
+    Descompone un párrafo en unidades de hasta `tamano_objetivo` caracteres: el párrafo completo si cabe
+    (salvo que se fuerce la división); si no, sus líneas (tablas, listas, código) o sus oraciones; y, como
+    último recurso, grupos de palabras.
+    """
+    if len(parrafo) <= tamano_objetivo and not forzar_division:
+        return [(parrafo, separador_inicial)]
+
+    primera_linea = parrafo.split("\n", 1)[0]
+    if _PATRON_LINEA_ESTRUCTURADA.match(primera_linea):
+        piezas, separador_piezas = parrafo.split("\n"), "\n"
+    else:
+        piezas, separador_piezas = [oracion for oracion in _PATRON_FIN_ORACION.split(parrafo) if oracion], " "
+
+    unidades: List[_UnidadTexto] = []
+    for pieza in piezas:
+        separador_pieza = separador_piezas if unidades else separador_inicial
+        if len(pieza) <= tamano_objetivo:
+            unidades.append((pieza, separador_pieza))
+        else:
+            unidades.extend(_partir_por_palabras(pieza, tamano_objetivo, separador_pieza))
+    return unidades
+
+
+def _prefijo_comun_rutas(rutas: List[List[str]]) -> List[str]:
+    """Devuelve la parte común inicial de varias rutas de encabezados."""
+    prefijo_comun = list(rutas[0]) if rutas else []
+    for ruta in rutas[1:]:
+        longitud_comun = 0
+        while longitud_comun < min(len(prefijo_comun), len(ruta)) and prefijo_comun[longitud_comun] == ruta[longitud_comun]:
+            longitud_comun += 1
+        prefijo_comun = prefijo_comun[:longitud_comun]
+    return prefijo_comun
+
+
+def dividir_markdown_en_fragmentos_estructurales(
+    texto_markdown: str,
+    tamano_objetivo: int,
+    tamano_minimo: Optional[int] = None,
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Divide un documento Markdown en fragmentos que respetan su estructura: primero por la jerarquía de
+    encabezados, luego por párrafos y, sólo si un párrafo no cabe, por oraciones (o por líneas en tablas,
+    listas y código). Las unidades se empaquetan de forma voraz hasta `tamano_objetivo` caracteres, sin
+    solapamiento y sin cortar palabras.
+
+    Un fragmento no cruza el límite de una sección salvo que aún no alcance `tamano_minimo` caracteres
+    (por defecto, un cuarto del objetivo), para no generar fragmentos diminutos con secciones cortas.
+
+    Args:
+        texto_markdown: Documento (Markdown o texto plano; sin encabezados se fragmenta por párrafos y oraciones).
+        tamano_objetivo: Tamaño máximo de cada fragmento, en caracteres.
+        tamano_minimo: Opcional. Tamaño por debajo del cual un fragmento continúa en la sección siguiente.
+
+    Returns:
+        Lista de tuplas (texto del fragmento, metadatos), donde los metadatos incluyen la 'ruta_encabezados'
+        ("Título > Sección > Subsección") común a todo el contenido del fragmento.
+    """
+    if tamano_objetivo <= 0:
+        raise ValueError("El tamaño objetivo del fragmento debe ser un entero positivo.")
+    if not texto_markdown or not texto_markdown.strip():
+        return []
+    tamano_minimo_fragmento = tamano_minimo if tamano_minimo is not None else tamano_objetivo // 4
+
+    fragmentos_resultado: List[Tuple[str, Dict[str, Any]]] = []
+    partes_fragmento_actual: List[str] = []
+    longitud_fragmento_actual = 0
+    rutas_fragmento_actual: List[List[str]] = []
+
+    def _cerrar_fragmento_actual() -> None:
+        nonlocal partes_fragmento_actual, longitud_fragmento_actual, rutas_fragmento_actual
+        if partes_fragmento_actual:
+            fragmentos_resultado.append((
+                "".join(partes_fragmento_actual),
+                {"ruta_encabezados": " > ".join(_prefijo_comun_rutas(rutas_fragmento_actual))},
+            ))
+        partes_fragmento_actual, longitud_fragmento_actual, rutas_fragmento_actual = [], 0, []
+
+    for ruta_seccion, texto_seccion in _dividir_en_secciones_por_encabezados(texto_markdown):
+        if partes_fragmento_actual and longitud_fragmento_actual >= tamano_minimo_fragmento:
+            _cerrar_fragmento_actual() # Límite de sección: se corta si el fragmento ya tiene un tamaño razonable
+        parrafos_seccion = [parrafo.strip("\n") for parrafo in re.split(r"\n\s*\n", texto_seccion) if parrafo.strip()]
+        for parrafo in parrafos_seccion:
+            unidades_parrafo = _unidades_de_parrafo(parrafo, tamano_objetivo, "\n\n")
+            espacio_libre = tamano_objetivo - longitud_fragmento_actual - 2
+            if partes_fragmento_actual and len(unidades_parrafo) == 1 and len(parrafo) > espacio_libre >= tamano_minimo_fragmento:
+                # El párrafo no cabe entero pero queda bastante espacio: se completa el fragmento con sus primeras oraciones.
+                unidades_parrafo = _unidades_de_parrafo(parrafo, tamano_objetivo, "\n\n", forzar_division=True)
+            for texto_unidad, separador_unidad in unidades_parrafo:
+                if partes_fragmento_actual and longitud_fragmento_actual + len(separador_unidad) + len(texto_unidad) > tamano_objetivo:
+                    _cerrar_fragmento_actual()
+                if partes_fragmento_actual:
+                    partes_fragmento_actual.append(separador_unidad)
+                    longitud_fragmento_actual += len(separador_unidad)
+                partes_fragmento_actual.append(texto_unidad)
+                longitud_fragmento_actual += len(texto_unidad)
+                rutas_fragmento_actual.append(ruta_seccion)
+    _cerrar_fragmento_actual()
+
+    registrador.debug(f"Markdown de {len(texto_markdown)} caracteres dividido en {len(fragmentos_resultado)} fragmentos estructurales (objetivo {tamano_objetivo}).")
+    return fragmentos_resultado
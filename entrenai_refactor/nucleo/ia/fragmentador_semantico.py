@@ -0,0 +1,164 @@
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from entrenai_refactor.config.registrador import obtener_registrador
+
+registrador = obtener_registrador(__name__)
+
+try:
+    import numpy as np
+except ImportError: # pragma: no cover - dependencia opcional
+    np = None # type: ignore[assignment]
+    registrador.warning("La biblioteca 'numpy' no está instalada. La fragmentación semántica no estará disponible.")
+
+# Límite de oración en transcripciones y diapositivas: fin de oración seguido de espacio, o salto(s) de línea
+# (las viñetas y líneas de diapositiva no suelen terminar en punto).
+_PATRON_LIMITE_ORACION = re.compile(r"(?<=[.!?…])\s+|\s*\n\s*")
+
+# Función que recibe una lista de textos y devuelve sus embeddings (None si alguno no pudo generarse).
+FuncionEmbeddingsEnLote = Callable[[List[str]], Sequence[Optional[Sequence[float]]]]
+
+
+def fragmentacion_semantica_disponible() -> bool:
+    """Indica si las dependencias de la fragmentación semántica (NumPy) están instaladas."""
+    return np is not None
+
+
+def _segmentar_oraciones(texto: str, tamano_maximo: int) -> List[Tuple[int, int]]:
+    """
+    Devuelve los tramos (inicio, fin) de las oraciones del texto, sin los espacios que las separan.
+    Las oraciones más largas que `tamano_maximo` se parten en trozos de palabras completas.
+    """
+    tramos_oraciones: List[Tuple[int, int]] = []
+    inicio_oracion = 0
+    for coincidencia_limite in _PATRON_LIMITE_ORACION.finditer(texto):
+        if coincidencia_limite.start() > inicio_oracion:
+            tramos_oraciones.append((inicio_oracion, coincidencia_limite.start()))
+        inicio_oracion = coincidencia_limite.end()
+    if inicio_oracion < len(texto) and not texto[inicio_oracion:].isspace():
+        tramos_oraciones.append((inicio_oracion, len(texto.rstrip())))
+
+    tramos_acotados: List[Tuple[int, int]] = []
+    for inicio_tramo, fin_tramo in tramos_oraciones:
+        while fin_tramo - inicio_tramo > tamano_maximo:
+            corte = texto.rfind(" ", inicio_tramo + 1, inicio_tramo + tamano_maximo + 1)
+            corte = corte if corte > inicio_tramo else inicio_tramo + tamano_maximo # Sin espacios: corte duro
+            tramos_acotados.append((inicio_tramo, corte))
+            inicio_tramo = corte + 1 if texto[corte:corte + 1] == " " else corte
+        if fin_tramo > inicio_tramo:
+            tramos_acotados.append((inicio_tramo, fin_tramo))
+    return tramos_acotados
+
+
+def _calcular_similitudes_adyacentes(embeddings: Sequence[Optional[Sequence[float]]]) -> "np.ndarray":
+    """
+    Similitud coseno entre cada par de embeddings consecutivos (longitud n-1). Los pares en los que falta
+    algún embedding reciben similitud 1.0, para que nunca se elijan como punto de corte.
+    """
+    dimension = next((len(embedding) for embedding in embeddings if embedding), 0)
+    matriz = np.zeros((len(embeddings), max(1, dimension)), dtype=np.float32)
+    validos = np.zeros(len(embeddings), dtype=bool)
+    for indice, embedding in enumerate(embeddings):
+        if embedding and len(embedding) == dimension:
+            matriz[indice] = embedding
+            validos[indice] = True
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    matriz /= np.where(normas > 0, normas, 1.0)
+    similitudes = np.einsum("ij,ij->i", matriz[:-1], matriz[1:])
+    similitudes[~(validos[:-1] & validos[1:])] = 1.0
+    return similitudes
+
+
+def dividir_texto_en_fragmentos_semanticos(
+    texto: str,
+    generar_embeddings_en_lote: FuncionEmbeddingsEnLote,
+    tamano_maximo: int,
+    tamano_minimo: Optional[int] = None,
+    percentil_corte: float = 25.0,
+    oraciones_contexto: int = 1,
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Divide un texto sin estructura (transcripciones, diapositivas) en fragmentos temáticamente coherentes:
+    calcula el embedding de cada oración (junto con `oraciones_contexto` oraciones vecinas a cada lado, para
+    suavizar el ruido de las oraciones cortas), la similitud coseno entre oraciones consecutivas y corta en
+    los valles de similitud, es decir, donde cambia el tema.
+
+    Cada fragmento se extiende como máximo hasta `tamano_maximo` caracteres. Dentro de ese margen, y una vez
+    alcanzado `tamano_minimo` (por defecto, un cuarto del máximo), se corta en el primer valle cuya similitud
+    esté por debajo del percentil `percentil_corte` de todas las similitudes del documento; si no lo hay, en
+    el límite de oración de menor similitud.
+
+    Args:
+        texto: Texto a dividir.
+        generar_embeddings_en_lote: Función que devuelve los embeddings de una lista de textos.
+        tamano_maximo: Tamaño máximo de cada fragmento, en caracteres.
+        tamano_minimo: Opcional. Tamaño a partir del cual un fragmento puede cortarse en un valle.
+        percentil_corte: Percentil de similitud por debajo del cual un valle se considera cambio de tema.
+        oraciones_contexto: Oraciones vecinas (a cada lado) incluidas en el texto de cada embedding.
+
+    Returns:
+        Lista de tuplas (texto del fragmento, metadatos), con la 'similitud_corte' (similitud entre la
+        última oración del fragmento y la primera del siguiente; None en el último fragmento).
+
+    Raises:
+        RuntimeError: Si NumPy no está instalado.
+        ValueError: Si los tamaños son inválidos.
+    """
+    if np is None:
+        raise RuntimeError("La fragmentación semántica requiere la biblioteca 'numpy'.")
+    if tamano_maximo <= 0:
+        raise ValueError("El tamaño máximo del fragmento debe ser un entero positivo.")
+    if not texto or texto.isspace():
+        return []
+    tamano_minimo_fragmento = tamano_minimo if tamano_minimo is not None else tamano_maximo // 4
+
+    tramos_oraciones = _segmentar_oraciones(texto, tamano_maximo)
+    numero_oraciones = len(tramos_oraciones)
+    if numero_oraciones == 1 or tramos_oraciones[-1][1] - tramos_oraciones[0][0] <= tamano_maximo:
+        return [(texto[tramos_oraciones[0][0]:tramos_oraciones[-1][1]], {"similitud_corte": None})]
+
+    textos_para_embedding = [
+        texto[tramos_oraciones[max(0, indice - oraciones_contexto)][0]:tramos_oraciones[min(numero_oraciones - 1, indice + oraciones_contexto)][1]]
+        for indice in range(numero_oraciones)
+    ]
+    similitudes = _calcular_similitudes_adyacentes(generar_embeddings_en_lote(textos_para_embedding))
+    # Valle: similitud menor o igual que la de sus límites vecinos y por debajo del percentil del documento.
+    umbral_corte = float(np.percentile(similitudes, percentil_corte))
+    similitudes_extendidas = np.concatenate(([np.inf], similitudes, [np.inf]))
+    es_valle = (
+        (similitudes <= similitudes_extendidas[:-2]) & (similitudes <= similitudes_extendidas[2:]) & (similitudes <= umbral_corte)
+    )
+
+    # inicios[k]: inicio de la oración k; inicios[n]: fin del texto. Un fragmento con las oraciones [a, b)
+    # abarca texto[inicios[a]:fin de la oración b-1]; su longitud se acota por inicios[b] - inicios[a].
+    inicios = np.array([inicio for inicio, _ in tramos_oraciones] + [tramos_oraciones[-1][1]], dtype=np.int64)
+    fragmentos_resultado: List[Tuple[str, Dict[str, Any]]] = []
+    oracion_inicial = 0
+    while oracion_inicial < numero_oraciones:
+        # Mayor b tal que el fragmento [oracion_inicial, b) no exceda el máximo (al menos una oración).
+        oracion_fin_maxima = int(np.searchsorted(inicios, inicios[oracion_inicial] + tamano_maximo, side="right")) - 1
+        oracion_fin_maxima = min(numero_oraciones, max(oracion_inicial + 1, oracion_fin_maxima))
+        if oracion_fin_maxima < numero_oraciones and tramos_oraciones[oracion_fin_maxima][1] - tramos_oraciones[oracion_inicial][0] <= tamano_maximo:
+            oracion_fin_maxima += 1 # El margen de separación no cuenta: la oración siguiente cabe sin él
+        if oracion_fin_maxima >= numero_oraciones:
+            oracion_fin = numero_oraciones
+        else:
+            # Límites candidatos: entre las oraciones b-1 y b, con b en (inicial, fin_máxima], respetando el mínimo.
+            candidatos = np.arange(oracion_inicial + 1, oracion_fin_maxima + 1)
+            candidatos = candidatos[inicios[candidatos] - inicios[oracion_inicial] >= tamano_minimo_fragmento]
+            if candidatos.size == 0:
+                oracion_fin = oracion_fin_maxima
+            else:
+                valles_candidatos = candidatos[es_valle[candidatos - 1]]
+                oracion_fin = int(valles_candidatos[0]) if valles_candidatos.size else int(candidatos[np.argmin(similitudes[candidatos - 1])])
+
+        texto_fragmento = texto[tramos_oraciones[oracion_inicial][0]:tramos_oraciones[oracion_fin - 1][1]]
+        similitud_corte = float(similitudes[oracion_fin - 1]) if oracion_fin < numero_oraciones else None
+        fragmentos_resultado.append((texto_fragmento, {"similitud_corte": similitud_corte}))
+        oracion_inicial = oracion_fin
+
+    registrador.debug(
+        f"Texto de {len(texto)} caracteres ({numero_oraciones} oraciones) dividido en {len(fragmentos_resultado)} "
+        f"fragmentos semánticos (umbral de similitud {umbral_corte:.3f})."
+    )
+    return fragmentos_resultado
@@ -1,11 +1,70 @@
-from typing import List, Optional, Dict, Any
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import List, Optional, Dict, Any, Iterable, Iterator, Tuple
 
 from entrenai_refactor.api import modelos as modelos_api # Modelos Pydantic para la API
 from entrenai_refactor.config.registrador import obtener_registrador
 from entrenai_refactor.nucleo.ia.proveedor_inteligencia import ProveedorInteligencia, ErrorProveedorInteligencia
+from entrenai_refactor.nucleo.ia.fragmentador_estructural import dividir_markdown_en_fragmentos_estructurales
+from entrenai_refactor.nucleo.ia.tokenizador_embeddings import ContadorTokensEmbedding
+from entrenai_refactor.nucleo.ia.fragmentador_semantico import dividir_texto_en_fragmentos_semanticos, fragmentacion_semantica_disponible
 
 registrador = obtener_registrador(__name__)
 
+# Estrategias de fragmentación disponibles (seleccionables por curso, ver CHUNKING_STRATEGY_BY_COURSE).
+ESTRATEGIA_FRAGMENTACION_VENTANA_FIJA = "ventana_fija" # Ventanas de tamaño fijo con solapamiento
+ESTRATEGIA_FRAGMENTACION_ESTRUCTURAL = "estructural" # Encabezados > párrafos > oraciones, sin solapamiento
+ESTRATEGIA_FRAGMENTACION_SEMANTICA = "semantico" # Cortes en los valles de similitud entre oraciones consecutivas
+ESTRATEGIAS_FRAGMENTACION_DISPONIBLES = (ESTRATEGIA_FRAGMENTACION_VENTANA_FIJA, ESTRATEGIA_FRAGMENTACION_ESTRUCTURAL, ESTRATEGIA_FRAGMENTACION_SEMANTICA)
+
+# Tokens que se reservan del máximo del modelo para el prefijo contextual (archivo y título) que
+# `_contextualizar_texto_fragmento` añade a cada fragmento antes de generar su embedding.
+RESERVA_TOKENS_CONTEXTO = 48
+
+# Número de embeddings recientes que se conservan en memoria (compartidos por todo el proceso) para no
+# volver a pedir al proveedor los de textos repetidos, p. ej. encabezados y pies de diapositivas.
+CAPACIDAD_CACHE_EMBEDDINGS = 8192
+
+
+class CacheEmbeddingsEnMemoria:
+    """
+    Caché LRU en memoria, segura entre hilos, de embeddings por (proveedor y modelo, texto). La clave
+    guarda un resumen BLAKE2 del texto en lugar del texto completo.
+    """
+
+    def __init__(self, capacidad_maxima: int):
+        self.capacidad_maxima = capacidad_maxima
+        self._entradas: "OrderedDict[Tuple[str, bytes], List[float]]" = OrderedDict()
+        self._candado = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    @staticmethod
+    def calcular_clave(identificador_modelo: str, texto: str) -> Tuple[str, bytes]:
+        return identificador_modelo, hashlib.blake2b(texto.encode("utf-8", errors="surrogatepass"), digest_size=16).digest()
+
+    def obtener(self, clave: Tuple[str, bytes]) -> Optional[List[float]]:
+        with self._candado:
+            embedding = self._entradas.get(clave)
+            if embedding is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return embedding
+
+    def guardar(self, clave: Tuple[str, bytes], embedding: List[float]) -> None:
+        with self._candado:
+            self._entradas[clave] = embedding
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.capacidad_maxima:
+                self._entradas.popitem(last=False)
+
+
+_cache_embeddings_compartida = CacheEmbeddingsEnMemoria(CAPACIDAD_CACHE_EMBEDDINGS)
+
 class ErrorGestorEmbeddings(Exception):
     """Excepción personalizada para errores originados en el GestorEmbeddings."""
     def __init__(self, mensaje: str, error_original: Optional[Exception] = None):
@@ -31,6 +90,10 @@ class GestorEmbeddings:
         proveedor_ia: ProveedorInteligencia,
         tamano_fragmento_predeterminado: int = 1000,  # En número de caracteres
         solapamiento_fragmento_predeterminado: int = 150,  # En número de caracteres
+        contador_tokens: Optional[ContadorTokensEmbedding] = None,
+        maximo_tokens_fragmento: Optional[int] = None,
+        tamano_lote_embeddings: int = 32,
+        percentil_corte_semantico: float = 25.0,
     ):
         """
         Inicializa el GestorEmbeddings.
@@ -39,15 +102,117 @@ class GestorEmbeddings:
             proveedor_ia: Instancia del ProveedorInteligencia ya inicializado.
             tamano_fragmento_predeterminado: Tamaño por defecto para dividir el texto en caracteres.
             solapamiento_fragmento_predeterminado: Solapamiento por defecto entre fragmentos en caracteres.
+            contador_tokens: Opcional. Contador de tokens del modelo de embedding. Junto con
+                             `maximo_tokens_fragmento`, activa el dimensionado de fragmentos en tokens.
+            maximo_tokens_fragmento: Opcional. Máximo de tokens por fragmento (se limita al máximo de
+                                     entrada del modelo, descontando `RESERVA_TOKENS_CONTEXTO`).
+            tamano_lote_embeddings: Textos por petición en `generar_embeddings_en_lotes`.
+            percentil_corte_semantico: Percentil de similitud por debajo del cual la fragmentación
+                                       semántica considera un valle como cambio de tema.
         """
         self.proveedor_ia = proveedor_ia
         self.tamano_fragmento_predeterminado = tamano_fragmento_predeterminado
         self.solapamiento_fragmento_predeterminado = solapamiento_fragmento_predeterminado
+        self.tamano_lote_embeddings = max(1, tamano_lote_embeddings)
+        self.percentil_corte_semantico = percentil_corte_semantico
+        self.cache_embeddings = _cache_embeddings_compartida
+        self.contador_tokens = contador_tokens if maximo_tokens_fragmento else None
+        self.maximo_tokens_fragmento: Optional[int] = None
+        if self.contador_tokens is not None and maximo_tokens_fragmento:
+            self.maximo_tokens_fragmento = max(1, min(maximo_tokens_fragmento, self.contador_tokens.maximo_tokens_modelo) - RESERVA_TOKENS_CONTEXTO)
         registrador.info(
             f"GestorEmbeddings inicializado. Tamaño de fragmento predeterminado: {tamano_fragmento_predeterminado} caracteres, "
             f"Solapamiento predeterminado: {solapamiento_fragmento_predeterminado} caracteres."
+            + (
+                f" Fragmentación por tokens: máximo {self.maximo_tokens_fragmento} tokens por fragmento "
+                f"({'tokenizador ' + str(self.contador_tokens.identificador_tokenizador) if self.contador_tokens.es_exacto else 'estimación aproximada'})."
+                if self.contador_tokens is not None else ""
+            )
         )
 
+    @property
+    def fragmenta_por_tokens(self) -> bool:
+        """Indica si los fragmentos se dimensionan en tokens del modelo de embedding (en lugar de caracteres)."""
+        return self.contador_tokens is not None and self.maximo_tokens_fragmento is not None
+
+    def _resolver_parametros_ventana(
+        self,
+        tamano_max_fragmento: Optional[int],
+        solapamiento_entre_fragmentos: Optional[int],
+    ) -> Tuple[int, int]:
+        """
+        Resuelve (con los valores predeterminados del gestor) y valida el tamaño y el solapamiento de la ventana fija.
+
+        Raises:
+            ValueError: Si el solapamiento es mayor o igual al tamaño del fragmento, o si los tamaños son inválidos.
+        """
+        tam_fragmento_actual = tamano_max_fragmento if tamano_max_fragmento is not None else self.tamano_fragmento_predeterminado
+        solap_fragmento_actual = solapamiento_entre_fragmentos if solapamiento_entre_fragmentos is not None else self.solapamiento_fragmento_predeterminado
+        if tam_fragmento_actual <= 0:
+            raise ValueError("El tamaño del fragmento debe ser un entero positivo.")
+        if solap_fragmento_actual < 0:
+            raise ValueError("El solapamiento del fragmento no puede ser negativo.")
+        if solap_fragmento_actual >= tam_fragmento_actual:
+            mensaje_error_solapamiento = (
+                f"El solapamiento ({solap_fragmento_actual}) debe ser menor que el tamaño del fragmento ({tam_fragmento_actual})."
+            )
+            registrador.error(mensaje_error_solapamiento)
+            raise ValueError(mensaje_error_solapamiento)
+        return tam_fragmento_actual, solap_fragmento_actual
+
+    def iterar_tramos_de_fragmentos(
+        self,
+        texto_completo: str,
+        tamano_max_fragmento: Optional[int] = None,
+        solapamiento_entre_fragmentos: Optional[int] = None,
+    ) -> Iterator[Tuple[int, int]]:
+        """
+        Calcula la división en ventanas fijas de `dividir_texto_en_fragmentos` sin copiar el texto:
+        devuelve un iterador de tramos (desplazamiento, longitud) sobre `texto_completo`. El coste es
+        lineal en el número de fragmentos y no depende de su tamaño; el texto de cada fragmento sólo
+        se materializa si el consumidor lo corta (`texto_completo[desplazamiento:desplazamiento + longitud]`).
+
+        Los parámetros se validan al llamar al método (no al consumir el iterador).
+
+        Raises:
+            ValueError: Si el solapamiento es mayor o igual al tamaño del fragmento, o si los tamaños son inválidos.
+            TypeError: Si el texto_completo no es un string.
+        """
+        if not isinstance(texto_completo, str):
+            registrador.error(f"Se esperaba un string para dividir, pero se recibió {type(texto_completo)}.")
+            raise TypeError("El texto_completo debe ser un string.")
+        tam_fragmento_actual, solap_fragmento_actual = self._resolver_parametros_ventana(tamano_max_fragmento, solapamiento_entre_fragmentos)
+        longitud_total_texto = len(texto_completo)
+        # 'isspace' no copia el texto (a diferencia de 'strip'), lo que importa con documentos de varios MB.
+        texto_vacio = not texto_completo or texto_completo.isspace()
+
+        def _generar_tramos() -> Iterator[Tuple[int, int]]:
+            if texto_vacio:
+                return
+            paso_siguiente_fragmento = tam_fragmento_actual - solap_fragmento_actual
+            indice_inicio_actual = 0
+            while True:
+                indice_fin_actual = min(indice_inicio_actual + tam_fragmento_actual, longitud_total_texto)
+                yield indice_inicio_actual, indice_fin_actual - indice_inicio_actual
+                if indice_fin_actual == longitud_total_texto:
+                    return
+                indice_inicio_actual += paso_siguiente_fragmento
+
+        return _generar_tramos()
+
+    def iterar_fragmentos_de_texto(
+        self,
+        texto_completo: str,
+        tamano_max_fragmento: Optional[int] = None,
+        solapamiento_entre_fragmentos: Optional[int] = None,
+    ) -> Iterator[str]:
+        """
+        Versión perezosa de `dividir_texto_en_fragmentos`: materializa cada fragmento sólo cuando el
+        consumidor lo pide, de modo que en memoria sólo conviven los fragmentos que aún se están usando.
+        """
+        tramos_fragmentos = self.iterar_tramos_de_fragmentos(texto_completo, tamano_max_fragmento, solapamiento_entre_fragmentos)
+        return (texto_completo[desplazamiento:desplazamiento + longitud] for desplazamiento, longitud in tramos_fragmentos)
+
     def dividir_texto_en_fragmentos(
         self,
         texto_completo: str,
@@ -56,7 +221,8 @@ class GestorEmbeddings:
     ) -> List[str]:
         """
         Divide un texto largo en fragmentos (chunks) más pequeños y manejables.
-        Esta implementación utiliza una división simple basada en caracteres.
+        Esta implementación utiliza una división simple basada en caracteres
+        (ver `iterar_tramos_de_fragmentos` para la versión sin copias).
 
         Args:
             texto_completo: El texto a dividir.
@@ -73,56 +239,312 @@ class GestorEmbeddings:
                         o si los tamaños son inválidos.
             TypeError: Si el texto_completo no es un string.
         """
-        tam_fragmento_actual = tamano_max_fragmento if tamano_max_fragmento is not None else self.tamano_fragmento_predeterminado
-        solap_fragmento_actual = solapamiento_entre_fragmentos if solapamiento_entre_fragmentos is not None else self.solapamiento_fragmento_predeterminado
+        tramos_fragmentos = list(self.iterar_tramos_de_fragmentos(texto_completo, tamano_max_fragmento, solapamiento_entre_fragmentos))
+        lista_fragmentos = [texto_completo[desplazamiento:desplazamiento + longitud] for desplazamiento, longitud in tramos_fragmentos]
+        if not lista_fragmentos:
+            registrador.info("El texto de entrada está vacío o solo contiene espacios. No se generarán fragmentos.")
+            return []
 
-        if not isinstance(texto_completo, str):
-            registrador.error(f"Se esperaba un string para dividir, pero se recibió {type(texto_completo)}.")
-            raise TypeError("El texto_completo debe ser un string.")
+        if registrador.isEnabledFor(logging.DEBUG): # Sin DEBUG no se formatea ninguna vista previa por fragmento
+            for (desplazamiento, longitud), fragmento_actual in zip(tramos_fragmentos, lista_fragmentos):
+                vista_previa_fragmento = fragmento_actual[:50].replace("\n", " ")
+                registrador.debug(f"Fragmento generado (índices {desplazamiento}-{desplazamiento + longitud}): '{vista_previa_fragmento}...'")
+        registrador.info(f"Texto de longitud {len(texto_completo)} caracteres dividido en {len(lista_fragmentos)} fragmentos.")
+        return lista_fragmentos
 
-        if tam_fragmento_actual <= 0:
-            raise ValueError("El tamaño del fragmento debe ser un entero positivo.")
-        if solap_fragmento_actual < 0:
-            raise ValueError("El solapamiento del fragmento no puede ser negativo.")
+    def dividir_texto_en_fragmentos_por_tokens(
+        self,
+        texto_completo: str,
+        maximo_tokens: Optional[int] = None,
+        solapamiento_tokens: Optional[int] = None,
+    ) -> List[str]:
+        """
+        Divide un texto en ventanas de hasta `maximo_tokens` tokens del modelo de embedding, con
+        solapamiento, de modo que ningún fragmento sea truncado por el modelo ni desaproveche su capacidad.
+        El texto se tokeniza una sola vez y se corta en los desplazamientos de los tokens, retrocediendo
+        (dentro de un margen) hasta el inicio de una palabra para no partir palabras entre fragmentos.
 
-        if solap_fragmento_actual >= tam_fragmento_actual:
-            mensaje_error_solapamiento = (
-                f"El solapamiento ({solap_fragmento_actual}) debe ser menor que el tamaño del fragmento ({tam_fragmento_actual})."
-            )
-            registrador.error(mensaje_error_solapamiento)
-            raise ValueError(mensaje_error_solapamiento)
+        Args:
+            texto_completo: El texto a dividir.
+            maximo_tokens: Opcional. Máximo de tokens por fragmento; por defecto, el configurado en el gestor.
+            solapamiento_tokens: Opcional. Tokens de solapamiento; por defecto, la misma proporción que el
+                                 solapamiento en caracteres respecto del tamaño de fragmento predeterminado.
 
-        registrador.info(
-            f"Dividiendo texto de longitud {len(texto_completo)} caracteres. "
-            f"Configuración de fragmentación: Tamaño={tam_fragmento_actual}, Solapamiento={solap_fragmento_actual}."
+        Raises:
+            ValueError: Si el gestor no tiene contador de tokens, o si los tamaños son inválidos.
+        """
+        return [texto_fragmento for texto_fragmento, _ in self._dividir_texto_en_fragmentos_con_conteo_de_tokens(texto_completo, maximo_tokens, solapamiento_tokens)]
+
+    def _dividir_texto_en_fragmentos_con_conteo_de_tokens(
+        self,
+        texto_completo: str,
+        maximo_tokens: Optional[int] = None,
+        solapamiento_tokens: Optional[int] = None,
+    ) -> List[Tuple[str, int]]:
+        """
+        Implementación de `dividir_texto_en_fragmentos_por_tokens` que devuelve, junto a cada fragmento, su
+        número de tokens (los de la tokenización del texto completo), para no volver a tokenizar los fragmentos.
+        """
+        if self.contador_tokens is None:
+            raise ValueError("El GestorEmbeddings no tiene un contador de tokens configurado para fragmentar por tokens.")
+        max_tokens_actual = maximo_tokens if maximo_tokens is not None else self.maximo_tokens_fragmento
+        if not max_tokens_actual or max_tokens_actual <= 0:
+            raise ValueError("El máximo de tokens por fragmento debe ser un entero positivo.")
+        solap_tokens_actual = (
+            solapamiento_tokens if solapamiento_tokens is not None
+            else (max_tokens_actual * self.solapamiento_fragmento_predeterminado) // max(1, self.tamano_fragmento_predeterminado)
         )
+        if solap_tokens_actual < 0 or solap_tokens_actual >= max_tokens_actual:
+            raise ValueError(f"El solapamiento ({solap_tokens_actual} tokens) debe ser no negativo y menor que el máximo de tokens ({max_tokens_actual}).")
 
         if not texto_completo.strip():
-            registrador.info("El texto de entrada está vacío o solo contiene espacios. No se generarán fragmentos.")
             return []
+        desplazamientos_tokens = self.contador_tokens.obtener_desplazamientos_tokens(texto_completo)
+        total_tokens = len(desplazamientos_tokens)
+        if total_tokens <= max_tokens_actual:
+            return [(texto_completo, total_tokens)]
+
+        def _es_inicio_de_palabra(indice_token: int) -> bool:
+            inicio_caracter = desplazamientos_tokens[indice_token][0]
+            return inicio_caracter == 0 or texto_completo[inicio_caracter - 1].isspace()
+
+        margen_retroceso = max(1, max_tokens_actual // 8) # Cuánto se puede acortar un fragmento para no partir una palabra
+        lista_fragmentos: List[Tuple[str, int]] = []
+        indice_token_inicio = 0
+        inicio_caracter_fragmento = 0 # El primer fragmento incluye el texto previo al primer token
+        while True:
+            indice_token_fin = indice_token_inicio + max_tokens_actual # Exclusivo
+            if indice_token_fin >= total_tokens:
+                lista_fragmentos.append((texto_completo[inicio_caracter_fragmento:], total_tokens - indice_token_inicio))
+                break
+            corte_en_palabra = next(
+                (indice for indice in range(indice_token_fin, max(indice_token_inicio + 1, indice_token_fin - margen_retroceso) - 1, -1) if _es_inicio_de_palabra(indice)),
+                indice_token_fin,
+            )
+            indice_token_fin = corte_en_palabra
+            lista_fragmentos.append((texto_completo[inicio_caracter_fragmento:desplazamientos_tokens[indice_token_fin][0]], indice_token_fin - indice_token_inicio))
 
-        if len(texto_completo) <= tam_fragmento_actual:
-            registrador.info("El texto completo es más corto o igual al tamaño del fragmento. Se devuelve como un solo fragmento.")
-            return [texto_completo]
+            siguiente_inicio = max(indice_token_inicio + 1, indice_token_fin - solap_tokens_actual)
+            while siguiente_inicio < indice_token_fin and not _es_inicio_de_palabra(siguiente_inicio):
+                siguiente_inicio += 1
+            indice_token_inicio = siguiente_inicio
+            inicio_caracter_fragmento = desplazamientos_tokens[indice_token_inicio][0]
 
-        lista_fragmentos: List[str] = []
-        indice_inicio_actual = 0
-        longitud_total_texto = len(texto_completo)
+        registrador.info(f"Texto de {total_tokens} tokens dividido en {len(lista_fragmentos)} fragmentos de hasta {max_tokens_actual} tokens (solapamiento {solap_tokens_actual}).")
+        return lista_fragmentos
+
+    def fragmentar_texto_segun_estrategia(
+        self,
+        texto_completo: str,
+        estrategia_fragmentacion: Optional[str] = None,
+    ) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """
+        Divide el texto en fragmentos con la estrategia indicada y devuelve, junto a los fragmentos,
+        sus metadatos (listos para `construir_objetos_fragmento_para_bd`).
 
-        while indice_inicio_actual < longitud_total_texto:
-            indice_fin_actual = min(indice_inicio_actual + tam_fragmento_actual, longitud_total_texto)
-            fragmento_actual = texto_completo[indice_inicio_actual:indice_fin_actual]
-            lista_fragmentos.append(fragmento_actual)
-            registrador.debug(f"Fragmento generado (índices {indice_inicio_actual}-{indice_fin_actual}): '{fragmento_actual[:50].replace('\n', ' ')}...'")
+        - 'ventana_fija': `dividir_texto_en_fragmentos` (tamaño y solapamiento predeterminados del gestor).
+        - 'estructural': `dividir_markdown_en_fragmentos_estructurales`, con el tamaño predeterminado del
+          gestor como objetivo; añade la ruta de encabezados de cada fragmento a sus metadatos.
+        - 'semantico': `dividir_texto_en_fragmentos_semanticos`, con los embeddings de las oraciones generados
+          por `generar_embeddings_en_lotes`; añade la similitud en el punto de corte a los metadatos. Si no hay
+          proveedor de IA, NumPy o embeddings utilizables, se usa 'ventana_fija'.
 
-            if indice_fin_actual == longitud_total_texto:
-                break
+        Una estrategia desconocida se registra como advertencia y se usa 'ventana_fija'.
 
-            paso_siguiente_fragmento = tam_fragmento_actual - solap_fragmento_actual
-            indice_inicio_actual += paso_siguiente_fragmento
+        Si el gestor fragmenta por tokens, 'ventana_fija' usa `dividir_texto_en_fragmentos_por_tokens`, y
+        'estructural' y 'semantico' traducen el máximo de tokens a caracteres según la densidad de tokens del
+        propio texto y vuelven a partir por tokens los fragmentos que aun así lo excedan. En ese modo, los
+        metadatos de cada fragmento incluyen su 'numero_tokens', obtenido de la misma tokenización que decidió los cortes.
 
-        registrador.info(f"El texto fue dividido en {len(lista_fragmentos)} fragmentos.")
-        return lista_fragmentos
+        Returns:
+            Una tupla (lista de fragmentos, lista de metadatos por fragmento).
+        """
+        estrategia_aplicada = estrategia_fragmentacion or ESTRATEGIA_FRAGMENTACION_VENTANA_FIJA
+        if estrategia_aplicada not in ESTRATEGIAS_FRAGMENTACION_DISPONIBLES:
+            registrador.warning(f"Estrategia de fragmentación desconocida '{estrategia_aplicada}'; se usará '{ESTRATEGIA_FRAGMENTACION_VENTANA_FIJA}'. Disponibles: {', '.join(ESTRATEGIAS_FRAGMENTACION_DISPONIBLES)}.")
+            estrategia_aplicada = ESTRATEGIA_FRAGMENTACION_VENTANA_FIJA
+
+        fragmentos_con_metadatos: Optional[List[Tuple[str, Dict[str, Any]]]] = None
+        conteos_tokens: List[int] = []
+        if estrategia_aplicada == ESTRATEGIA_FRAGMENTACION_SEMANTICA:
+            fragmentos_con_metadatos = self._fragmentar_semanticamente(texto_completo)
+            if fragmentos_con_metadatos is None:
+                estrategia_aplicada = ESTRATEGIA_FRAGMENTACION_VENTANA_FIJA
+        elif estrategia_aplicada == ESTRATEGIA_FRAGMENTACION_ESTRUCTURAL:
+            fragmentos_con_metadatos = dividir_markdown_en_fragmentos_estructurales(texto_completo, self._tamano_objetivo_en_caracteres(texto_completo))
+
+        if fragmentos_con_metadatos is not None:
+            lista_fragmentos = [texto_fragmento for texto_fragmento, _ in fragmentos_con_metadatos]
+            lista_metadatos = [{**metadatos_fragmento, "estrategia_fragmentacion": estrategia_aplicada} for _, metadatos_fragmento in fragmentos_con_metadatos]
+            if self.fragmenta_por_tokens:
+                lista_fragmentos, lista_metadatos, conteos_tokens = self._ajustar_fragmentos_al_maximo_de_tokens(lista_fragmentos, lista_metadatos)
+            registrador.info(f"Texto de {len(texto_completo)} caracteres dividido en {len(lista_fragmentos)} fragmentos ({estrategia_aplicada}).")
+        elif self.fragmenta_por_tokens:
+            fragmentos_con_conteo = self._dividir_texto_en_fragmentos_con_conteo_de_tokens(texto_completo)
+            lista_fragmentos = [texto_fragmento for texto_fragmento, _ in fragmentos_con_conteo]
+            conteos_tokens = [numero_tokens for _, numero_tokens in fragmentos_con_conteo]
+            lista_metadatos = [{"estrategia_fragmentacion": estrategia_aplicada} for _ in lista_fragmentos]
+        else:
+            lista_fragmentos = self.dividir_texto_en_fragmentos(texto_completo)
+            lista_metadatos = [{"estrategia_fragmentacion": estrategia_aplicada} for _ in lista_fragmentos]
+
+        for metadatos_fragmento, numero_tokens in zip(lista_metadatos, conteos_tokens):
+            metadatos_fragmento["numero_tokens"] = numero_tokens
+        return lista_fragmentos, lista_metadatos
+
+    def _tamano_objetivo_en_caracteres(self, texto_completo: str) -> int:
+        """
+        Tamaño objetivo, en caracteres, de las estrategias que fragmentan por caracteres. Si el gestor fragmenta
+        por tokens, traduce el máximo de tokens a caracteres con los caracteres por token del propio documento
+        (el español acentuado o el código tienen densidades muy distintas), con un margen del 10 %.
+        """
+        if not self.fragmenta_por_tokens or not texto_completo or texto_completo.isspace():
+            return self.tamano_fragmento_predeterminado
+        caracteres_por_token = len(texto_completo) / max(1, self.contador_tokens.contar_tokens(texto_completo)) # type: ignore[union-attr]
+        return max(1, int(self.maximo_tokens_fragmento * caracteres_por_token * 0.9)) # type: ignore[operator]
+
+    def _fragmentar_semanticamente(self, texto_completo: str) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+        """
+        Aplica `dividir_texto_en_fragmentos_semanticos` con los embeddings en lote del proveedor.
+        Devuelve None (para recurrir a la ventana fija) si no es posible fragmentar semánticamente.
+        """
+        if self.proveedor_ia is None or not fragmentacion_semantica_disponible():
+            registrador.warning("Fragmentación semántica no disponible (sin proveedor de IA o sin NumPy); se usará la ventana fija.")
+            return None
+
+        embeddings_validos = 0
+        def _generar_embeddings_oraciones(textos_oraciones: List[str]) -> List[Optional[List[float]]]:
+            nonlocal embeddings_validos
+            embeddings_oraciones = self.generar_embeddings_en_lotes(textos_oraciones)
+            embeddings_validos = sum(1 for embedding in embeddings_oraciones if embedding)
+            return embeddings_oraciones
+
+        fragmentos_con_metadatos = dividir_texto_en_fragmentos_semanticos(
+            texto_completo,
+            _generar_embeddings_oraciones,
+            self._tamano_objetivo_en_caracteres(texto_completo),
+            percentil_corte=self.percentil_corte_semantico,
+        )
+        if len(fragmentos_con_metadatos) > 1 and embeddings_validos == 0:
+            registrador.warning("No se obtuvo ningún embedding de oraciones para la fragmentación semántica; se usará la ventana fija.")
+            return None
+        return fragmentos_con_metadatos
+
+    def _ajustar_fragmentos_al_maximo_de_tokens(
+        self,
+        lista_fragmentos: List[str],
+        lista_metadatos: List[Dict[str, Any]],
+    ) -> Tuple[List[str], List[Dict[str, Any]], List[int]]:
+        """
+        Cuenta los tokens de todos los fragmentos en un único lote y vuelve a partir por tokens (sin
+        solapamiento) los que excedan el máximo, conservando sus metadatos en cada trozo resultante.
+        Devuelve también el número de tokens de cada fragmento resultante, sin volver a contarlos.
+        """
+        conteos_tokens = self.contador_tokens.contar_tokens_en_lote(lista_fragmentos) # type: ignore[union-attr]
+        if all(numero_tokens <= self.maximo_tokens_fragmento for numero_tokens in conteos_tokens): # type: ignore[operator]
+            return lista_fragmentos, lista_metadatos, conteos_tokens
+
+        fragmentos_ajustados: List[str] = []
+        metadatos_ajustados: List[Dict[str, Any]] = []
+        conteos_ajustados: List[int] = []
+        for texto_fragmento, metadatos_fragmento, numero_tokens in zip(lista_fragmentos, lista_metadatos, conteos_tokens):
+            trozos_fragmento = (
+                [(texto_fragmento, numero_tokens)] if numero_tokens <= self.maximo_tokens_fragmento # type: ignore[operator]
+                else self._dividir_texto_en_fragmentos_con_conteo_de_tokens(texto_fragmento, solapamiento_tokens=0)
+            )
+            for texto_trozo, numero_tokens_trozo in trozos_fragmento:
+                fragmentos_ajustados.append(texto_trozo)
+                metadatos_ajustados.append(dict(metadatos_fragmento))
+                conteos_ajustados.append(numero_tokens_trozo)
+        registrador.debug(f"{len(fragmentos_ajustados) - len(lista_fragmentos)} fragmentos adicionales tras ajustar al máximo de {self.maximo_tokens_fragmento} tokens.")
+        return fragmentos_ajustados, metadatos_ajustados, conteos_ajustados
+
+    def dividir_bloques_en_fragmentos_en_flujo(
+        self,
+        bloques_texto: Iterable[Any],
+        tamano_max_fragmento: Optional[int] = None,
+        solapamiento_entre_fragmentos: Optional[int] = None,
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Versión en flujo de `dividir_texto_en_fragmentos`: consume bloques de texto (p. ej. los
+        `BloqueTextoExtraido` de `GestorMaestroDeProcesadoresArchivos.iterar_bloques_de_archivo_segun_tipo`,
+        o cualquier objeto con atributos `texto`, `tipo_bloque` y `posicion`) y produce los fragmentos a
+        medida que se completan, manteniendo en memoria sólo el texto aún no fragmentado.
+
+        Los fragmentos son idénticos a los que produciría `dividir_texto_en_fragmentos` sobre los bloques
+        unidos con doble salto de línea. Cada fragmento va acompañado de metadatos posicionales: el tipo de
+        bloque de origen y la posición (página, diapositiva, párrafo...) inicial y final que abarca.
+
+        Raises:
+            ValueError: Si el solapamiento es mayor o igual al tamaño del fragmento, o si los tamaños son inválidos.
+        """
+        tam_fragmento_actual, solap_fragmento_actual = self._resolver_parametros_ventana(tamano_max_fragmento, solapamiento_entre_fragmentos)
+        paso_siguiente_fragmento = tam_fragmento_actual - solap_fragmento_actual
+
+        texto_pendiente = "" # Texto aún no fragmentado por completo
+        inicio_absoluto_pendiente = 0 # Posición (en el texto unido) del primer carácter de texto_pendiente
+        longitud_total_unida = 0
+        # Tramos (inicio, fin, tipo_bloque, posicion) de los bloques que solapan con el texto pendiente.
+        tramos_bloques: deque = deque()
+        numero_fragmentos_generados = 0
+
+        def _metadatos_posicionales(inicio_absoluto: int, fin_absoluto: int) -> Dict[str, Any]:
+            tramos_solapados = [tramo for tramo in tramos_bloques if tramo[0] < fin_absoluto and tramo[1] > inicio_absoluto]
+            if not tramos_solapados: # Sólo el separador entre bloques: usar el bloque anterior
+                tramos_solapados = [tramos_bloques[0]]
+            return {
+                "tipo_bloque_origen": tramos_solapados[0][2],
+                "posicion_inicial": tramos_solapados[0][3],
+                "posicion_final": tramos_solapados[-1][3],
+            }
+
+        for bloque_texto in bloques_texto:
+            texto_bloque = bloque_texto.texto
+            if not texto_bloque or not texto_bloque.strip():
+                continue
+            if longitud_total_unida > 0:
+                texto_pendiente += "\n\n"
+                longitud_total_unida += 2
+            tramos_bloques.append((longitud_total_unida, longitud_total_unida + len(texto_bloque), bloque_texto.tipo_bloque, bloque_texto.posicion))
+            texto_pendiente += texto_bloque
+            longitud_total_unida += len(texto_bloque)
+
+            # Sólo se emite un fragmento si queda texto después de él; el último se emite al final.
+            cursor_pendiente = 0
+            while len(texto_pendiente) - cursor_pendiente > tam_fragmento_actual:
+                inicio_absoluto_fragmento = inicio_absoluto_pendiente + cursor_pendiente
+                yield (
+                    texto_pendiente[cursor_pendiente:cursor_pendiente + tam_fragmento_actual],
+                    _metadatos_posicionales(inicio_absoluto_fragmento, inicio_absoluto_fragmento + tam_fragmento_actual),
+                )
+                numero_fragmentos_generados += 1
+                cursor_pendiente += paso_siguiente_fragmento
+            if cursor_pendiente:
+                texto_pendiente = texto_pendiente[cursor_pendiente:]
+                inicio_absoluto_pendiente += cursor_pendiente
+                while len(tramos_bloques) > 1 and tramos_bloques[0][1] <= inicio_absoluto_pendiente:
+                    tramos_bloques.popleft()
+
+        if texto_pendiente:
+            yield texto_pendiente, _metadatos_posicionales(inicio_absoluto_pendiente, longitud_total_unida)
+            numero_fragmentos_generados += 1
+        registrador.info(f"Fragmentación en flujo completada: {longitud_total_unida} caracteres divididos en {numero_fragmentos_generados} fragmentos.")
+
+    @staticmethod
+    def _construir_prefijo_contextual(nombre_archivo: Optional[str] = None, titulo_documento: Optional[str] = None) -> str:
+        """
+        Construye el prefijo contextual (nombre de archivo, título del documento) que precede a cada
+        fragmento de un documento al generar su embedding. Es idéntico para todos los fragmentos del
+        mismo documento, por lo que se construye una sola vez por documento. Devuelve "" si no hay contexto.
+        """
+        elementos_contexto = []
+        if nombre_archivo:
+            elementos_contexto.append(f"Fuente del archivo: {nombre_archivo}.")
+        if titulo_documento:
+            elementos_contexto.append(f"Título del documento: {titulo_documento}.")
+        if not elementos_contexto:
+            return ""
+        return f"{' '.join(elementos_contexto)}\n\nContenido del fragmento:\n"
 
     @staticmethod
     def _contextualizar_texto_fragmento(
@@ -144,19 +566,23 @@ class GestorEmbeddings:
             El texto del fragmento con la información contextual prependiada, si se proporcionó.
             Si no se proporciona contexto, devuelve el texto del fragmento original.
         """
-        elementos_contexto = []
-        if nombre_archivo:
-            elementos_contexto.append(f"Fuente del archivo: {nombre_archivo}.")
-        if titulo_documento:
-            elementos_contexto.append(f"Título del documento: {titulo_documento}.")
+        prefijo_contextual = GestorEmbeddings._construir_prefijo_contextual(nombre_archivo, titulo_documento)
+        return prefijo_contextual + texto_fragmento if prefijo_contextual else texto_fragmento
 
-        if not elementos_contexto:
-            return texto_fragmento
-
-        prefijo_contextual = " ".join(elementos_contexto)
-        texto_contextualizado = f"{prefijo_contextual}\n\nContenido del fragmento:\n{texto_fragmento}"
-        registrador.debug(f"Contexto añadido al fragmento: '{prefijo_contextual}'")
-        return texto_contextualizado
+    @staticmethod
+    def iterar_textos_contextualizados(
+        textos_fragmentos: Iterable[str],
+        nombre_archivo: Optional[str] = None,
+        titulo_documento: Optional[str] = None,
+    ) -> Iterator[str]:
+        """
+        Contextualiza perezosamente los fragmentos de un mismo documento: el prefijo contextual se
+        construye una única vez y cada texto contextualizado se materializa sólo al consumirlo.
+        """
+        prefijo_contextual = GestorEmbeddings._construir_prefijo_contextual(nombre_archivo, titulo_documento)
+        if not prefijo_contextual:
+            return iter(textos_fragmentos)
+        return (prefijo_contextual + texto_fragmento for texto_fragmento in textos_fragmentos)
 
     def generar_embeddings_para_lista_de_textos(
         self,
@@ -187,25 +613,20 @@ class GestorEmbeddings:
 
         registrador.info(f"Iniciando generación de embeddings para {len(lista_de_textos)} textos. Contexto global: Archivo='{nombre_archivo_origen}', Título='{titulo_documento_origen}'.")
         embeddings_generados: List[Optional[List[float]]] = []
-
-        for indice, texto_original_fragmento in enumerate(lista_de_textos):
-            registrador.debug(
-                f"Procesando texto {indice + 1}/{len(lista_de_textos)} "
-                f"(longitud original: {len(texto_original_fragmento)} caracteres) para embedding."
-            )
-            if not texto_original_fragmento.strip():
+        depuracion_habilitada = registrador.isEnabledFor(logging.DEBUG) # Evita formatear mensajes de depuración por fragmento
+        textos_contextualizados = self.iterar_textos_contextualizados(lista_de_textos, nombre_archivo_origen, titulo_documento_origen)
+
+        for indice, (texto_original_fragmento, texto_a_embeder) in enumerate(zip(lista_de_textos, textos_contextualizados)):
+            if depuracion_habilitada:
+                registrador.debug(
+                    f"Procesando texto {indice + 1}/{len(lista_de_textos)} "
+                    f"(longitud original: {len(texto_original_fragmento)} caracteres, contextualizado: {len(texto_a_embeder)}) para embedding."
+                )
+            if not texto_original_fragmento or texto_original_fragmento.isspace():
                 registrador.warning(f"Texto {indice + 1} está vacío o solo contiene espacios. Se omitirá y se guardará None para su embedding.")
                 embeddings_generados.append(None)
                 continue
 
-            texto_a_embeder = self._contextualizar_texto_fragmento(
-                texto_fragmento=texto_original_fragmento,
-                nombre_archivo=nombre_archivo_origen,
-                titulo_documento=titulo_documento_origen
-            )
-            if texto_a_embeder != texto_original_fragmento:
-                 registrador.debug(f"Texto {indice + 1} contextualizado. Longitud nueva: {len(texto_a_embeder)}.")
-
             try:
                 embedding_actual = self.proveedor_ia.generar_embedding(
                     texto_entrada=texto_a_embeder, # Usar el texto contextualizado
@@ -213,7 +634,8 @@ class GestorEmbeddings:
                 )
                 if embedding_actual:
                     embeddings_generados.append(embedding_actual)
-                    registrador.debug(f"Embedding generado para texto {indice + 1} (dimensión: {len(embedding_actual)}).")
+                    if depuracion_habilitada:
+                        registrador.debug(f"Embedding generado para texto {indice + 1} (dimensión: {len(embedding_actual)}).")
                 else:
                     registrador.warning(f"El proveedor de IA devolvió un embedding vacío/None para el texto contextualizado {indice + 1}. Se guardará None.")
                     embeddings_generados.append(None)
@@ -231,6 +653,73 @@ class GestorEmbeddings:
         registrador.info(f"Generación de embeddings completada. Éxito para {num_embeddings_exitosos} de {len(lista_de_textos)} textos.")
         return embeddings_generados
 
+    def generar_embeddings_en_lotes(
+        self,
+        lista_de_textos: List[str],
+        nombre_modelo_embedding: Optional[str] = None,
+        tamano_lote: Optional[int] = None,
+    ) -> List[Optional[List[float]]]:
+        """
+        Genera los embeddings de una lista de textos (sin contextualizar) con peticiones en lote de
+        `tamano_lote` textos (por defecto, `tamano_lote_embeddings`). Reutiliza los embeddings guardados en la caché en memoria del
+        proceso y pide al proveedor una sola vez cada texto distinto. Si un lote falla, sus textos
+        quedan con None (no se reintenta texto a texto).
+        """
+        identificador_modelo = f"{getattr(self.proveedor_ia, 'nombre_proveedor_ia_configurado', '')}:{nombre_modelo_embedding or ''}"
+        claves_textos = [CacheEmbeddingsEnMemoria.calcular_clave(identificador_modelo, texto) for texto in lista_de_textos]
+        embeddings_por_clave: Dict[Tuple[str, bytes], Optional[List[float]]] = {}
+        textos_pendientes: Dict[Tuple[str, bytes], str] = {}
+        for clave_texto, texto in zip(claves_textos, lista_de_textos):
+            if clave_texto in embeddings_por_clave or clave_texto in textos_pendientes:
+                continue
+            embedding_cacheado = self.cache_embeddings.obtener(clave_texto)
+            if embedding_cacheado is not None:
+                embeddings_por_clave[clave_texto] = embedding_cacheado
+            else:
+                textos_pendientes[clave_texto] = texto
+
+        tamano_lote = max(1, tamano_lote or self.tamano_lote_embeddings)
+        claves_pendientes = list(textos_pendientes)
+        for inicio_lote in range(0, len(claves_pendientes), tamano_lote):
+            claves_lote = claves_pendientes[inicio_lote:inicio_lote + tamano_lote]
+            try:
+                embeddings_lote = self.proveedor_ia.generar_embeddings_en_lote([textos_pendientes[clave] for clave in claves_lote], nombre_modelo_embedding)
+            except ErrorProveedorInteligencia as e_proveedor:
+                registrador.error(f"Error del proveedor de IA al generar un lote de {len(claves_lote)} embeddings: {e_proveedor}. Se guardará None para esos textos.")
+                continue
+            for clave_texto, embedding in zip(claves_lote, embeddings_lote):
+                if embedding:
+                    embeddings_por_clave[clave_texto] = embedding
+                    self.cache_embeddings.guardar(clave_texto, embedding)
+
+        registrador.info(
+            f"Embeddings en lote: {len(lista_de_textos)} textos, {len(claves_pendientes)} pedidos al proveedor "
+            f"en lotes de {tamano_lote}, {len(lista_de_textos) - len(claves_pendientes)} reutilizados."
+        )
+        return [embeddings_por_clave.get(clave_texto) for clave_texto in claves_textos]
+
+    def generar_embeddings_de_fragmentos_almacenados(
+        self,
+        filas_fragmentos: List[Dict[str, Any]],
+        nombre_modelo_embedding: Optional[str] = None,
+        tamano_lote: Optional[int] = None,
+    ) -> List[Optional[List[float]]]:
+        """
+        Vuelve a generar los embeddings de fragmentos ya guardados en la base de datos (filas con 'texto' y
+        'metadatos'), sin extraer ni fragmentar de nuevo los documentos. Cada texto se contextualiza como en la
+        ingesta, con el nombre de archivo y el título guardados en sus metadatos, para que los vectores
+        sean equivalentes a los de un procesamiento completo con el mismo modelo.
+        """
+        textos_contextualizados = [
+            self._contextualizar_texto_fragmento(
+                fila_fragmento.get("texto") or "",
+                fila_fragmento["metadatos"].get("nombre_archivo_fuente"),
+                fila_fragmento["metadatos"].get("titulo_documento_asociado"),
+            )
+            for fila_fragmento in filas_fragmentos
+        ]
+        return self.generar_embeddings_en_lotes(textos_contextualizados, nombre_modelo_embedding, tamano_lote)
+
     @staticmethod
     def construir_objetos_fragmento_para_bd(
         id_curso: int,
@@ -277,7 +766,8 @@ class GestorEmbeddings:
         for i, texto_fragmento_original in enumerate(lista_textos_fragmentos): # Iterar sobre el texto original
             embedding_actual = lista_embeddings_fragmentos[i]
             if not embedding_actual:
-                registrador.warning(f"Fragmento {i+1} ('{texto_fragmento_original[:30].replace('\n',' ')}...') del documento '{id_documento}' no tiene un embedding válido. Se omitirá.")
+                vista_previa_fragmento = texto_fragmento_original[:30].replace("\n", " ")
+                registrador.warning(f"Fragmento {i+1} ('{vista_previa_fragmento}...') del documento '{id_documento}' no tiene un embedding válido. Se omitirá.")
                 continue
 
             metadatos_base_fragmento = {
@@ -1,4 +1,6 @@
-from typing import Optional, Union, List, Dict, cast # Dict añadido para historial_chat_previo
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Union, List, Dict, Iterator, Callable, Tuple, cast # Dict añadido para historial_chat_previo
 from pathlib import Path
 
 from entrenai_refactor.config.configuracion import configuracion_global, ConfiguracionPrincipal
@@ -6,7 +8,13 @@ from entrenai_refactor.config.registrador import obtener_registrador
 # Corregir las rutas de importación para usar rutas relativas a los archivos ya refactorizados.
 from .envoltorio_gemini import EnvoltorioGemini, ErrorEnvoltorioGemini
 from .envoltorio_ollama import EnvoltorioOllama, ErrorEnvoltorioOllama
-# No se necesita importar utilidades_comunes_ia directamente aquí si no se usan sus funciones.
+from .utilidades_comunes_ia import (
+    preprocesar_contenido_texto,
+    dividir_texto_en_secciones_estructurales,
+    unir_secciones_markdown,
+    guardar_markdown_en_archivo,
+)
+from .cache_conversiones_markdown import CacheConversionesMarkdown, obtener_cache_conversiones_markdown
 
 registrador = obtener_registrador(__name__)
 
@@ -45,6 +53,9 @@ class ProveedorInteligencia:
         self._envoltorio_ia_activo: Union[EnvoltorioOllama, EnvoltorioGemini, None] = None
         self._inicializar_envoltorio_ia_seleccionado()
 
+        # Caché de conversiones a Markdown (opcional), compartida por todo el proceso: el proveedor se crea en cada petición.
+        self.cache_conversiones_markdown: Optional[CacheConversionesMarkdown] = obtener_cache_conversiones_markdown()
+
     def _inicializar_envoltorio_ia_seleccionado(self):
         """
         Inicializa el envoltorio de IA (Ollama o Gemini) que esté configurado
@@ -135,6 +146,27 @@ class ProveedorInteligencia:
             registrador.exception(f"Error inesperado al generar embedding a través del proveedor '{type(envoltorio_activo).__name__}': {e_general}")
             raise ErrorProveedorInteligencia(f"Error inesperado del proveedor al generar embedding: {e_general}", e_general)
 
+    def generar_embeddings_en_lote(self, textos_entrada: List[str], nombre_modelo_especifico: Optional[str] = None) -> List[List[float]]:
+        """
+        Genera los embeddings de una lista de textos con una sola petición al envoltorio de IA activo.
+
+        Returns:
+            Una lista de embeddings, en el mismo orden que los textos.
+
+        Raises:
+            ErrorProveedorInteligencia: Si falla la generación de cualquiera de los embeddings del lote.
+        """
+        envoltorio_activo = self.obtener_envoltorio_ia_activo()
+        registrador.debug(f"Delegando generación de {len(textos_entrada)} embeddings en lote al proveedor: {type(envoltorio_activo).__name__}")
+        try:
+            return envoltorio_activo.generar_embeddings_de_textos(textos_entrada, nombre_modelo_embedding=nombre_modelo_especifico)
+        except (ErrorEnvoltorioOllama, ErrorEnvoltorioGemini) as e_envoltorio:
+            registrador.error(f"Error específico del envoltorio '{type(envoltorio_activo).__name__}' al generar embeddings en lote: {e_envoltorio}")
+            raise ErrorProveedorInteligencia(f"Error del proveedor de IA al generar embeddings en lote: {e_envoltorio}", e_envoltorio)
+        except Exception as e_general:
+            registrador.exception(f"Error inesperado al generar embeddings en lote a través del proveedor '{type(envoltorio_activo).__name__}': {e_general}")
+            raise ErrorProveedorInteligencia(f"Error inesperado del proveedor al generar embeddings en lote: {e_general}", e_general)
+
 
     def generar_respuesta_de_chat(
         self,
@@ -143,7 +175,6 @@ class ProveedorInteligencia:
         mensaje_de_sistema: Optional[str] = None,
         historial_chat_previo: Optional[List[Dict[str, str]]] = None,
         fragmentos_de_contexto: Optional[List[str]] = None,
-        # transmitir: bool = False, # El streaming (transmitir) se maneja a nivel de envoltorio si se implementa allí
     ) -> str:
         """
         Genera una respuesta de chat (completación) para un prompt dado,
@@ -155,7 +186,6 @@ class ProveedorInteligencia:
             mensaje_de_sistema: Opcional. Instrucción a nivel de sistema para el modelo.
             historial_chat_previo: Opcional. Historial de la conversación.
             fragmentos_de_contexto: Opcional. Fragmentos de texto para proveer contexto adicional.
-            # transmitir: Opcional. Si se debe usar streaming para la respuesta (aún no implementado globalmente).
 
         Returns:
             La respuesta generada por el modelo de IA.
@@ -173,7 +203,6 @@ class ProveedorInteligencia:
                 mensaje_de_sistema=mensaje_de_sistema,
                 historial_chat_previo=historial_chat_previo,
                 fragmentos_de_contexto=fragmentos_de_contexto,
-                # stream=transmitir # El parámetro stream se pasaría aquí si la firma lo incluye
             )
         except (ErrorEnvoltorioOllama, ErrorEnvoltorioGemini) as e_envoltorio:
             mensaje_error_chat = f"Error específico del envoltorio '{type(envoltorio_activo).__name__}' al generar respuesta de chat: {e_envoltorio}"
@@ -184,19 +213,59 @@ class ProveedorInteligencia:
             raise ErrorProveedorInteligencia(f"Error inesperado del proveedor al generar respuesta de chat: {e_general}", e_general)
 
 
+    def generar_respuesta_de_chat_en_flujo(
+        self,
+        prompt_usuario: str,
+        nombre_modelo_especifico: Optional[str] = None,
+        mensaje_de_sistema: Optional[str] = None,
+        historial_chat_previo: Optional[List[Dict[str, str]]] = None,
+        fragmentos_de_contexto: Optional[List[str]] = None,
+    ) -> Iterator[str]:
+        """
+        Versión en flujo (streaming) de `generar_respuesta_de_chat`: devuelve un iterador
+        con los trozos de texto a medida que el envoltorio de IA activo los produce.
+
+        Raises:
+            ErrorProveedorInteligencia: Si ocurre un error al iniciar o durante la generación.
+        """
+        envoltorio_activo = self.obtener_envoltorio_ia_activo()
+        registrador.debug(f"Delegando generación de respuesta de chat en flujo al proveedor: {type(envoltorio_activo).__name__}")
+        try:
+            yield from envoltorio_activo.generar_respuesta_de_chat_en_flujo(
+                prompt_usuario=prompt_usuario,
+                nombre_modelo_chat=nombre_modelo_especifico,
+                mensaje_de_sistema=mensaje_de_sistema,
+                historial_chat_previo=historial_chat_previo,
+                fragmentos_de_contexto=fragmentos_de_contexto,
+            )
+        except (ErrorEnvoltorioOllama, ErrorEnvoltorioGemini) as e_envoltorio:
+            registrador.error(f"Error específico del envoltorio '{type(envoltorio_activo).__name__}' durante chat en flujo: {e_envoltorio}")
+            raise ErrorProveedorInteligencia(f"Error del proveedor de IA durante chat en flujo: {e_envoltorio}", e_envoltorio)
+        except Exception as e_general:
+            registrador.exception(f"Error inesperado durante chat en flujo a través del proveedor '{type(envoltorio_activo).__name__}': {e_general}")
+            raise ErrorProveedorInteligencia(f"Error inesperado del proveedor durante chat en flujo: {e_general}", e_general)
+
+
     def formatear_texto_a_markdown(
         self,
         texto_original: str,
         nombre_modelo_especifico: Optional[str] = None,
-        ruta_archivo_para_guardar: Optional[Path] = None
+        ruta_archivo_para_guardar: Optional[Path] = None,
+        notificar_progreso_seccion: Optional[Callable[[int, int], None]] = None,
     ) -> str:
         """
         Formatea un texto crudo a formato Markdown utilizando el envoltorio de IA activo.
+        Si el formateo por secciones está habilitado y el texto supera el tamaño máximo de sección
+        (ver `configuracion.procesamiento`), se delega en `_formatear_texto_a_markdown_por_secciones`.
+        Si la caché de conversiones está habilitada, se consulta antes de llamar al LLM y se
+        actualiza con el resultado.
 
         Args:
             texto_original: El texto a formatear.
             nombre_modelo_especifico: Opcional. Nombre del modelo a usar para el formateo.
             ruta_archivo_para_guardar: Opcional. Si se provee, guarda el Markdown resultante en esta ruta.
+            notificar_progreso_seccion: Opcional. Función llamada como (secciones_completadas, total_secciones)
+                                        cada vez que termina una sección (sólo en modo por secciones).
 
         Returns:
             El texto formateado en Markdown.
@@ -204,6 +273,56 @@ class ProveedorInteligencia:
         Raises:
             ErrorProveedorInteligencia: Si ocurre un error durante el formateo.
         """
+        config_procesamiento = self.config_aplicacion.procesamiento
+        formatear_por_secciones = config_procesamiento.formateo_markdown_por_secciones_habilitado and \
+            len(texto_original) > config_procesamiento.tamano_maximo_seccion_formateo_markdown
+
+        # Consultar la caché antes de llamar al LLM. El modo de formateo forma parte de la clave
+        # porque el resultado por secciones (y su tamaño de sección) difiere del de una sola llamada.
+        clave_cache: Optional[str] = None
+        if self.cache_conversiones_markdown is not None:
+            modo_formateo = f"secciones:{config_procesamiento.tamano_maximo_seccion_formateo_markdown}" if formatear_por_secciones else "completo"
+            clave_cache = CacheConversionesMarkdown.calcular_clave(
+                texto_original, self.nombre_proveedor_ia_configurado,
+                self._resolver_nombre_modelo_formateo(nombre_modelo_especifico), modo_formateo
+            )
+            markdown_cacheado = self.cache_conversiones_markdown.obtener(clave_cache)
+            if markdown_cacheado is not None:
+                registrador.info(f"Conversión a Markdown reutilizada desde la caché ({len(texto_original)} caracteres de entrada); se omite la llamada al LLM.")
+                if ruta_archivo_para_guardar:
+                    guardar_markdown_en_archivo(markdown_cacheado, ruta_archivo_para_guardar)
+                return markdown_cacheado
+
+        conversion_completa = True
+        if formatear_por_secciones:
+            texto_markdown, conversion_completa = self._formatear_texto_a_markdown_por_secciones(
+                texto_original, nombre_modelo_especifico, ruta_archivo_para_guardar, notificar_progreso_seccion
+            )
+        else:
+            texto_markdown = self._formatear_texto_a_markdown_en_una_llamada(
+                texto_original, nombre_modelo_especifico, ruta_archivo_para_guardar
+            )
+
+        # No se cachean conversiones parciales (secciones fallidas conservadas en crudo) para reintentarlas la próxima vez.
+        if clave_cache is not None and conversion_completa and texto_markdown and texto_markdown.strip():
+            self.cache_conversiones_markdown.guardar(clave_cache, texto_markdown)
+        return texto_markdown
+
+    def _resolver_nombre_modelo_formateo(self, nombre_modelo_especifico: Optional[str]) -> str:
+        """Devuelve el nombre del modelo que usará el envoltorio activo para formatear a Markdown."""
+        if nombre_modelo_especifico:
+            return nombre_modelo_especifico
+        if self.nombre_proveedor_ia_configurado == "gemini":
+            return self.config_aplicacion.gemini.modelo_texto_gemini
+        return self.config_aplicacion.ollama.modelo_markdown_ollama
+
+    def _formatear_texto_a_markdown_en_una_llamada(
+        self,
+        texto_original: str,
+        nombre_modelo_especifico: Optional[str] = None,
+        ruta_archivo_para_guardar: Optional[Path] = None,
+    ) -> str:
+        """Formatea el texto completo a Markdown con una única llamada al envoltorio de IA activo."""
         envoltorio_activo = self.obtener_envoltorio_ia_activo()
         registrador.debug(f"Delegando formateo a Markdown al proveedor: {type(envoltorio_activo).__name__}")
         try:
@@ -220,3 +339,84 @@ class ProveedorInteligencia:
         except Exception as e_general:
             registrador.exception(f"Error inesperado al formatear a Markdown a través del proveedor '{type(envoltorio_activo).__name__}': {e_general}")
             raise ErrorProveedorInteligencia(f"Error inesperado del proveedor al formatear a Markdown: {e_general}", e_general)
+
+    def _formatear_texto_a_markdown_por_secciones(
+        self,
+        texto_original: str,
+        nombre_modelo_especifico: Optional[str] = None,
+        ruta_archivo_para_guardar: Optional[Path] = None,
+        notificar_progreso_seccion: Optional[Callable[[int, int], None]] = None,
+    ) -> Tuple[str, bool]:
+        """
+        Formatea un texto largo a Markdown dividiéndolo en secciones estructurales que se envían
+        al modelo de forma concurrente (con un máximo de llamadas simultáneas configurable) y
+        se unen después respetando la continuidad de niveles de encabezado.
+
+        Si una sección falla, se conserva su texto preprocesado sin formatear para no perder
+        contenido del documento; sólo se lanza error si fallan todas las secciones.
+
+        Returns:
+            Tupla (markdown_unido, conversion_completa), donde conversion_completa es False
+            si alguna sección se conservó sin formatear.
+        """
+        envoltorio_activo = self.obtener_envoltorio_ia_activo()
+        config_procesamiento = self.config_aplicacion.procesamiento
+
+        texto_preprocesado = preprocesar_contenido_texto(texto_original)
+        secciones_texto = dividir_texto_en_secciones_estructurales(
+            texto_preprocesado, config_procesamiento.tamano_maximo_seccion_formateo_markdown
+        )
+        total_secciones = len(secciones_texto)
+        maximo_concurrencia = max(1, min(config_procesamiento.maximo_secciones_formateo_concurrentes, total_secciones))
+        registrador.info(
+            f"Formateando a Markdown por secciones con '{type(envoltorio_activo).__name__}': {len(texto_original)} caracteres "
+            f"en {total_secciones} secciones, concurrencia máxima {maximo_concurrencia}."
+        )
+
+        def _formatear_seccion(indice_seccion: int) -> str:
+            indicacion_seccion = (
+                f"Este texto es la sección {indice_seccion + 1} de {total_secciones} de un documento más largo. "
+                + ("Puedes usar un encabezado de primer nivel (#) para el título del documento si aparece."
+                   if indice_seccion == 0 else
+                   "No añadas un título general del documento: continúa la jerarquía usando encabezados de segundo nivel (##) o inferiores.")
+            )
+            return envoltorio_activo.convertir_texto_a_markdown(
+                secciones_texto[indice_seccion],
+                nombre_modelo_formateo=nombre_modelo_especifico,
+                ruta_archivo_guardado=None, # Se guarda el documento unido al final
+                indicacion_contexto_seccion=indicacion_seccion,
+            )
+
+        secciones_markdown: List[Optional[str]] = [None] * total_secciones
+        secciones_fallidas = 0
+        secciones_completadas = 0
+        instante_inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=maximo_concurrencia, thread_name_prefix="formateo_md") as ejecutor_secciones:
+            futuros_por_indice = {ejecutor_secciones.submit(_formatear_seccion, indice): indice for indice in range(total_secciones)}
+            for futuro_seccion in as_completed(futuros_por_indice):
+                indice_seccion = futuros_por_indice[futuro_seccion]
+                try:
+                    secciones_markdown[indice_seccion] = futuro_seccion.result()
+                except Exception as e_seccion: # Errores del envoltorio u otros: se conserva el texto crudo de la sección
+                    secciones_fallidas += 1
+                    secciones_markdown[indice_seccion] = secciones_texto[indice_seccion]
+                    registrador.error(f"Falló el formateo a Markdown de la sección {indice_seccion + 1}/{total_secciones}; se conserva su texto sin formatear: {e_seccion}")
+                secciones_completadas += 1
+                registrador.info(f"Formateo a Markdown: sección {indice_seccion + 1} lista ({secciones_completadas}/{total_secciones}, {time.perf_counter() - instante_inicio:.1f} s transcurridos).")
+                if notificar_progreso_seccion:
+                    try:
+                        notificar_progreso_seccion(secciones_completadas, total_secciones)
+                    except Exception as e_notificacion:
+                        registrador.warning(f"La función de notificación de progreso del formateo falló: {e_notificacion}")
+
+        if total_secciones and secciones_fallidas == total_secciones:
+            raise ErrorProveedorInteligencia(f"Falló el formateo a Markdown de las {total_secciones} secciones del documento.")
+
+        contenido_markdown_final = unir_secciones_markdown([seccion or "" for seccion in secciones_markdown])
+        registrador.info(
+            f"Formateo a Markdown por secciones finalizado en {time.perf_counter() - instante_inicio:.1f} s "
+            f"({total_secciones - secciones_fallidas}/{total_secciones} secciones formateadas, longitud final {len(contenido_markdown_final)})."
+        )
+        if ruta_archivo_para_guardar and contenido_markdown_final:
+            guardar_markdown_en_archivo(contenido_markdown_final, ruta_archivo_para_guardar)
+        return contenido_markdown_final, secciones_fallidas == 0
@@ -0,0 +1,216 @@
+import re
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from entrenai_refactor.config.configuracion import configuracion_global
+from entrenai_refactor.config.registrador import obtener_registrador
+
+registrador = obtener_registrador(__name__)
+
+try:
+    from tokenizers import Tokenizer # Tokenizadores rápidos de Hugging Face (implementación en Rust)
+except ImportError: # pragma: no cover - dependencia opcional
+    Tokenizer = None # type: ignore[assignment,misc]
+    registrador.warning("La biblioteca 'tokenizers' no está instalada. El conteo de tokens para fragmentar usará una estimación aproximada.")
+
+# Tokenizador local y máximo de tokens de entrada de los modelos de embedding más habituales.
+# La clave es el nombre del modelo sin etiqueta (p. ej. 'nomic-embed-text' para 'nomic-embed-text:latest').
+# Para modelos no listados (o para usar otro tokenizador) ver EMBEDDING_TOKENIZER_BY_MODEL.
+MODELOS_EMBEDDING_CONOCIDOS: Dict[str, Tuple[Optional[str], int]] = {
+    "nomic-embed-text": ("nomic-ai/nomic-embed-text-v1.5", 8192),
+    "mxbai-embed-large": ("mixedbread-ai/mxbai-embed-large-v1", 512),
+    "all-minilm": ("sentence-transformers/all-MiniLM-L6-v2", 256),
+    "snowflake-arctic-embed": ("Snowflake/snowflake-arctic-embed-m", 512),
+    "bge-m3": ("BAAI/bge-m3", 8192),
+    "models/embedding-001": (None, 2048), # Gemini: sin tokenizador local, se estima
+    "models/text-embedding-004": (None, 2048),
+}
+MAXIMO_TOKENS_MODELO_DESCONOCIDO = 512
+
+# Tiempo máximo de descarga de un tokenizador desde el Hub de Hugging Face si no se configura otro.
+SEGUNDOS_LIMITE_DESCARGA_TOKENIZADOR_PREDETERMINADO = 20
+
+# Estimación conservadora cuando no hay tokenizador local: cada trozo de hasta 4 caracteres de palabra
+# y cada signo de puntuación cuentan como un token (los tokenizadores BPE/WordPiece producen, para texto
+# en español con acentos, entre 1 y 3 tokens por palabra; esta estimación tiende a sobrestimar).
+_PATRON_TOKEN_APROXIMADO = re.compile(r"\w{1,4}|[^\w\s]")
+
+
+def _descargar_tokenizador_con_limite(identificador_tokenizador: str, segundos_limite_descarga: float) -> Optional[Any]:
+    """
+    Descarga un tokenizador del Hub de Hugging Face en un hilo aparte y espera como mucho `segundos_limite_descarga`
+    (`Tokenizer.from_pretrained` no admite timeout). Si no termina a tiempo devuelve None; el hilo sigue en segundo
+    plano y, si la descarga acaba, el tokenizador queda en la caché local de Hugging Face para el próximo arranque.
+    """
+    resultado_descarga: Dict[str, Any] = {}
+
+    def _descargar() -> None:
+        try:
+            resultado_descarga["tokenizador"] = Tokenizer.from_pretrained(identificador_tokenizador)
+        except Exception as e_descarga:
+            resultado_descarga["error"] = e_descarga
+
+    hilo_descarga = threading.Thread(target=_descargar, name=f"descarga-tokenizador-{identificador_tokenizador}", daemon=True)
+    hilo_descarga.start()
+    hilo_descarga.join(segundos_limite_descarga)
+    if hilo_descarga.is_alive():
+        registrador.warning(f"La descarga del tokenizador '{identificador_tokenizador}' superó {segundos_limite_descarga:.0f} s; se abandona la espera.")
+        return None
+    if "error" in resultado_descarga:
+        raise resultado_descarga["error"]
+    return resultado_descarga.get("tokenizador")
+
+
+@lru_cache(maxsize=8)
+def _cargar_tokenizador(identificador_tokenizador: str, segundos_limite_descarga: float = SEGUNDOS_LIMITE_DESCARGA_TOKENIZADOR_PREDETERMINADO) -> Optional[Any]:
+    """
+    Carga (una sola vez por proceso) un tokenizador desde un archivo 'tokenizer.json' local o, si no es
+    una ruta existente, desde el Hub de Hugging Face (que lo guarda en su caché local tras la primera descarga),
+    esperando la descarga como mucho `segundos_limite_descarga` (0 no descarga: sólo se admiten rutas locales).
+    Devuelve None si la biblioteca no está disponible o el tokenizador no puede cargarse a tiempo.
+    """
+    if Tokenizer is None:
+        return None
+    try:
+        ruta_tokenizador = Path(identificador_tokenizador).expanduser()
+        if ruta_tokenizador.is_dir():
+            ruta_tokenizador = ruta_tokenizador / "tokenizer.json"
+        if ruta_tokenizador.is_file():
+            tokenizador = Tokenizer.from_file(str(ruta_tokenizador))
+        elif segundos_limite_descarga <= 0:
+            registrador.warning(f"El tokenizador '{identificador_tokenizador}' no es una ruta local y la descarga está deshabilitada (EMBEDDING_TOKENIZER_DOWNLOAD_TIMEOUT_SECONDS=0).")
+            return None
+        else:
+            tokenizador = _descargar_tokenizador_con_limite(identificador_tokenizador, segundos_limite_descarga)
+            if tokenizador is None:
+                return None
+        tokenizador.no_truncation() # Se necesita el conteo completo, no el truncado por el modelo
+        tokenizador.no_padding()
+        registrador.info(f"Tokenizador '{identificador_tokenizador}' cargado para el conteo de tokens de los fragmentos.")
+        return tokenizador
+    except Exception as e_carga:
+        registrador.warning(f"No se pudo cargar el tokenizador '{identificador_tokenizador}': {e_carga}.")
+        return None
+
+
+class ContadorTokensEmbedding:
+    """
+    Cuenta tokens con el tokenizador local del modelo de embedding, para dimensionar los fragmentos en
+    tokens (la unidad en la que el modelo trunca su entrada) en lugar de caracteres. Si no hay tokenizador
+    disponible se usa una estimación conservadora basada en expresiones regulares (`es_exacto` es False).
+
+    `contar_tokens_en_lote` es la vía rápida para miles de textos: delega en `encode_batch` del tokenizador,
+    que tokeniza el lote en paralelo fuera del GIL.
+    """
+
+    def __init__(
+        self,
+        identificador_tokenizador: Optional[str] = None,
+        maximo_tokens_modelo: int = MAXIMO_TOKENS_MODELO_DESCONOCIDO,
+        segundos_limite_descarga: float = SEGUNDOS_LIMITE_DESCARGA_TOKENIZADOR_PREDETERMINADO,
+    ):
+        self.identificador_tokenizador = identificador_tokenizador
+        self.maximo_tokens_modelo = maximo_tokens_modelo
+        self._tokenizador = _cargar_tokenizador(identificador_tokenizador, segundos_limite_descarga) if identificador_tokenizador else None
+
+    @property
+    def es_exacto(self) -> bool:
+        """Indica si los conteos provienen del tokenizador real del modelo (y no de la estimación)."""
+        return self._tokenizador is not None
+
+    @property
+    def tokenizador_no_disponible(self) -> bool:
+        """Indica si el modelo tiene un tokenizador local (configurado o conocido) que no se pudo cargar."""
+        return self.identificador_tokenizador is not None and self._tokenizador is None
+
+    def contar_tokens(self, texto: str) -> int:
+        """Devuelve el número de tokens de un texto (sin tokens especiales)."""
+        if not texto:
+            return 0
+        if self._tokenizador is not None:
+            return len(self._tokenizador.encode(texto, add_special_tokens=False).ids)
+        return len(_PATRON_TOKEN_APROXIMADO.findall(texto))
+
+    def contar_tokens_en_lote(self, textos: Sequence[str]) -> List[int]:
+        """Devuelve el número de tokens de cada texto de la lista, tokenizándolos en un único lote."""
+        if not textos:
+            return []
+        if self._tokenizador is not None:
+            # 'encode_batch_fast' (versiones recientes) omite el cálculo de desplazamientos, que aquí no se necesitan.
+            codificar_lote = getattr(self._tokenizador, "encode_batch_fast", self._tokenizador.encode_batch)
+            return [len(codificacion.ids) for codificacion in codificar_lote(list(textos), add_special_tokens=False)]
+        return [len(_PATRON_TOKEN_APROXIMADO.findall(texto)) if texto else 0 for texto in textos]
+
+    def obtener_desplazamientos_tokens(self, texto: str) -> List[Tuple[int, int]]:
+        """
+        Devuelve, para cada token del texto, el tramo (inicio, fin) de caracteres que ocupa en él.
+        Permite cortar el texto original exactamente en límites de token.
+        """
+        if not texto:
+            return []
+        if self._tokenizador is not None:
+            return list(self._tokenizador.encode(texto, add_special_tokens=False).offsets)
+        return [coincidencia.span() for coincidencia in _PATRON_TOKEN_APROXIMADO.finditer(texto)]
+
+
+_contadores_por_modelo: Dict[Tuple[str, Optional[str]], ContadorTokensEmbedding] = {}
+_candado_contadores = threading.Lock()
+
+
+def obtener_contador_tokens_para_modelo(
+    nombre_modelo_embedding: str,
+    tokenizadores_por_modelo: Optional[Dict[str, str]] = None,
+    segundos_limite_descarga: float = SEGUNDOS_LIMITE_DESCARGA_TOKENIZADOR_PREDETERMINADO,
+) -> ContadorTokensEmbedding:
+    """
+    Devuelve el contador de tokens del modelo de embedding indicado, compartido por todo el proceso
+    (el tokenizador se carga una sola vez por modelo; si hay que descargarlo, se espera como mucho
+    `segundos_limite_descarga`).
+
+    El tokenizador se resuelve por este orden: `tokenizadores_por_modelo` (configuración
+    EMBEDDING_TOKENIZER_BY_MODEL, con el nombre completo o sin etiqueta), `MODELOS_EMBEDDING_CONOCIDOS`
+    y, si no hay ninguno, la estimación aproximada.
+    """
+    nombre_modelo_base = nombre_modelo_embedding.split(":", 1)[0].strip().lower()
+    tokenizadores_configurados = {clave.lower(): valor for clave, valor in (tokenizadores_por_modelo or {}).items()}
+    tokenizador_conocido, maximo_tokens_modelo = MODELOS_EMBEDDING_CONOCIDOS.get(nombre_modelo_base, (None, MAXIMO_TOKENS_MODELO_DESCONOCIDO))
+    identificador_tokenizador = (
+        tokenizadores_configurados.get(nombre_modelo_embedding.lower())
+        or tokenizadores_configurados.get(nombre_modelo_base)
+        or tokenizador_conocido
+    )
+
+    clave_contador = (nombre_modelo_base, identificador_tokenizador)
+    with _candado_contadores:
+        contador_tokens = _contadores_por_modelo.get(clave_contador)
+        if contador_tokens is None:
+            contador_tokens = ContadorTokensEmbedding(identificador_tokenizador, maximo_tokens_modelo, segundos_limite_descarga)
+            _contadores_por_modelo[clave_contador] = contador_tokens
+            registrador.info(
+                f"Contador de tokens para el modelo de embedding '{nombre_modelo_embedding}': "
+                f"{'tokenizador ' + repr(identificador_tokenizador) if contador_tokens.es_exacto else 'estimación aproximada'}, "
+                f"máximo de {maximo_tokens_modelo} tokens de entrada."
+            )
+    return contador_tokens
+
+
+def obtener_contador_tokens_configurado() -> Optional[ContadorTokensEmbedding]:
+    """
+    Devuelve el contador de tokens del modelo de embedding activo si la configuración dimensiona los fragmentos
+    en tokens (CHUNK_SIZE_UNIT=tokens), o None en caso contrario. Se llama al arrancar la API para que una
+    posible descarga del tokenizador no ocurra en mitad de una ingesta.
+    """
+    config_procesamiento = configuracion_global.procesamiento
+    if config_procesamiento.unidad_tamano_fragmento != "tokens":
+        return None
+    nombre_modelo_embedding = (
+        configuracion_global.gemini.modelo_embedding_gemini if configuracion_global.proveedor_ia_seleccionado == "gemini"
+        else configuracion_global.ollama.modelo_embedding_ollama
+    )
+    return obtener_contador_tokens_para_modelo(
+        nombre_modelo_embedding,
+        config_procesamiento.tokenizadores_embedding_por_modelo,
+        config_procesamiento.segundos_limite_descarga_tokenizador,
+    )
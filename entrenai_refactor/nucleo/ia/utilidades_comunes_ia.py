@@ -1,6 +1,8 @@
 import re
 from pathlib import Path
+from typing import List, Optional
 from entrenai_refactor.config.registrador import obtener_registrador
+from entrenai_refactor.nucleo.ia.fragmentador_estructural import actualizar_delimitador_bloque_codigo, iterar_lineas_con_encabezados_markdown
 
 registrador = obtener_registrador(__name__)
 
@@ -231,3 +233,153 @@ def es_contenido_markdown_valido_basico(contenido_markdown: str) -> bool:
         registrador.debug("Validación de Markdown: El contenido no presenta indicadores comunes de Markdown.")
 
     return es_valido
+
+
+def texto_parece_markdown_bien_formado(texto_entrada: str, longitud_maxima_linea: int = 2000) -> bool:
+    """
+    Heurística (más estricta que `es_contenido_markdown_valido_basico`) para decidir si un texto
+    extraído ya es Markdown utilizable tal cual y, por tanto, puede omitirse el formateo por LLM.
+
+    Se exige que el texto pase la validación básica, que tenga al menos un encabezado ATX
+    ('#', '##', ...) y que no contenga líneas desmesuradamente largas (típicas de texto
+    volcado sin saltos de línea desde PDFs u OCR, que sí se benefician del formateo).
+
+    Args:
+        texto_entrada: El texto a evaluar.
+        longitud_maxima_linea: Longitud máxima tolerada para una línea individual.
+
+    Returns:
+        True si el texto puede usarse directamente como Markdown, False en caso contrario.
+    """
+    if not es_contenido_markdown_valido_basico(texto_entrada):
+        return False
+    if not any(coincidencia_encabezado for _, coincidencia_encabezado in iterar_lineas_con_encabezados_markdown(texto_entrada)):
+        registrador.debug("Heurística de Markdown: El texto no contiene encabezados ATX; se requiere formateo.")
+        return False
+    if any(len(linea) > longitud_maxima_linea for linea in texto_entrada.splitlines()):
+        registrador.debug(f"Heurística de Markdown: El texto contiene líneas de más de {longitud_maxima_linea} caracteres; se requiere formateo.")
+        return False
+    registrador.debug("Heurística de Markdown: El texto ya está estructurado como Markdown; se puede omitir el formateo por LLM.")
+    return True
+
+# Patrón de líneas que suelen abrir una nueva unidad estructural en el texto crudo extraído:
+# encabezados Markdown, marcadores de diapositiva del procesador PPTX, numeraciones tipo "1." / "2.3 Título"
+# o líneas cortas completamente en mayúsculas (títulos en PDFs).
+_PATRON_INICIO_ESTRUCTURAL = re.compile(
+    r"^(#{1,6}\s|\[Contenido Diapositiva \d+\]|\d+(\.\d+)*\.?\s+\S|[A-ZÁÉÍÓÚÑÜ0-9][A-ZÁÉÍÓÚÑÜ0-9 ,:;\-]{3,80}$)"
+)
+
+
+def _partir_bloque_excedido(bloque_texto: str, tamano_maximo_seccion: int) -> List[str]:
+    """Parte un bloque (párrafo) más largo que el máximo: primero por líneas y, si no alcanza, por caracteres."""
+    trozos_resultado: List[str] = []
+    trozo_actual = ""
+    for linea_texto in bloque_texto.split("\n"):
+        while len(linea_texto) > tamano_maximo_seccion: # Línea sin saltos más larga que una sección completa
+            if trozo_actual:
+                trozos_resultado.append(trozo_actual)
+                trozo_actual = ""
+            trozos_resultado.append(linea_texto[:tamano_maximo_seccion])
+            linea_texto = linea_texto[tamano_maximo_seccion:]
+        if trozo_actual and len(trozo_actual) + 1 + len(linea_texto) > tamano_maximo_seccion:
+            trozos_resultado.append(trozo_actual)
+            trozo_actual = linea_texto
+        else:
+            trozo_actual = f"{trozo_actual}\n{linea_texto}" if trozo_actual else linea_texto
+    if trozo_actual:
+        trozos_resultado.append(trozo_actual)
+    return trozos_resultado
+
+
+def dividir_texto_en_secciones_estructurales(texto_entrada: str, tamano_maximo_seccion: int) -> List[str]:
+    """
+    Divide un texto crudo en secciones de como máximo `tamano_maximo_seccion` caracteres,
+    cortando en límites estructurales (párrafos, encabezados, diapositivas) para que cada
+    sección pueda formatearse a Markdown de forma independiente.
+
+    Los párrafos se agrupan de forma voraz; si un párrafo parece iniciar una nueva unidad
+    estructural y la sección actual ya supera la mitad del máximo, se corta antes de él.
+
+    Args:
+        texto_entrada: Texto crudo (idealmente ya preprocesado).
+        tamano_maximo_seccion: Tamaño máximo de cada sección, en caracteres.
+
+    Returns:
+        Lista de secciones en el orden original del texto.
+    """
+    if not texto_entrada or not texto_entrada.strip():
+        return []
+    if tamano_maximo_seccion <= 0 or len(texto_entrada) <= tamano_maximo_seccion:
+        return [texto_entrada]
+
+    bloques_texto = [bloque.strip() for bloque in re.split(r"\n\s*\n", texto_entrada) if bloque.strip()]
+    secciones_resultado: List[str] = []
+    seccion_actual = ""
+    delimitador_codigo_abierto: Optional[str] = None # Dentro de un bloque de código cercado no hay cortes estructurales
+    for bloque_texto in bloques_texto:
+        for trozo_bloque in (_partir_bloque_excedido(bloque_texto, tamano_maximo_seccion) if len(bloque_texto) > tamano_maximo_seccion else [bloque_texto]):
+            inicia_unidad_estructural = delimitador_codigo_abierto is None and bool(_PATRON_INICIO_ESTRUCTURAL.match(trozo_bloque.split("\n", 1)[0]))
+            for linea_trozo in trozo_bloque.split("\n"):
+                delimitador_codigo_abierto = actualizar_delimitador_bloque_codigo(linea_trozo, delimitador_codigo_abierto)
+            excede_maximo = len(seccion_actual) + 2 + len(trozo_bloque) > tamano_maximo_seccion
+            corte_estructural = inicia_unidad_estructural and len(seccion_actual) >= tamano_maximo_seccion // 2
+            if seccion_actual and (excede_maximo or corte_estructural):
+                secciones_resultado.append(seccion_actual)
+                seccion_actual = trozo_bloque
+            else:
+                seccion_actual = f"{seccion_actual}\n\n{trozo_bloque}" if seccion_actual else trozo_bloque
+    if seccion_actual:
+        secciones_resultado.append(seccion_actual)
+
+    registrador.debug(f"Texto de {len(texto_entrada)} caracteres dividido en {len(secciones_resultado)} secciones estructurales (máximo {tamano_maximo_seccion}).")
+    return secciones_resultado
+
+
+def _niveles_encabezados_markdown(texto_markdown: str) -> List[int]:
+    """Niveles de los encabezados ATX del texto, sin contar los '#' de las líneas de bloques de código."""
+    return [len(coincidencia_encabezado.group(1)) for _, coincidencia_encabezado in iterar_lineas_con_encabezados_markdown(texto_markdown) if coincidencia_encabezado]
+
+
+def unir_secciones_markdown(secciones_markdown: List[str]) -> str:
+    """
+    Une las secciones Markdown formateadas por separado en un único documento,
+    manteniendo la continuidad de niveles de encabezado.
+
+    Cada sección se formatea sin conocer a las demás, por lo que el modelo suele abrir
+    cada una con un encabezado de primer nivel. El nivel mínimo de encabezado de la
+    primera sección se toma como el nivel del título del documento; en las secciones
+    siguientes que vuelvan a usar ese nivel (o uno superior), todos sus encabezados
+    se desplazan hacia abajo para quedar por debajo del título (máximo nivel 6).
+
+    Args:
+        secciones_markdown: Secciones ya formateadas, en el orden original.
+
+    Returns:
+        El documento Markdown unido.
+    """
+    secciones_no_vacias = [seccion.strip() for seccion in secciones_markdown if seccion and seccion.strip()]
+    if not secciones_no_vacias:
+        return ""
+
+    niveles_primera_seccion = _niveles_encabezados_markdown(secciones_no_vacias[0])
+    nivel_titulo_documento = min(niveles_primera_seccion) if niveles_primera_seccion else None
+
+    secciones_ajustadas = [secciones_no_vacias[0]]
+    for seccion_markdown in secciones_no_vacias[1:]:
+        niveles_seccion = _niveles_encabezados_markdown(seccion_markdown)
+        if nivel_titulo_documento is None:
+            # La primera sección no tenía encabezados: la primera que sí los tenga fija el nivel del título.
+            if niveles_seccion:
+                nivel_titulo_documento = min(niveles_seccion)
+            secciones_ajustadas.append(seccion_markdown)
+            continue
+        if niveles_seccion and min(niveles_seccion) <= nivel_titulo_documento:
+            desplazamiento_niveles = nivel_titulo_documento + 1 - min(niveles_seccion)
+            seccion_markdown = "\n".join(
+                "#" * min(6, len(coincidencia_encabezado.group(1)) + desplazamiento_niveles) + linea_seccion[len(coincidencia_encabezado.group(1)):]
+                if coincidencia_encabezado else linea_seccion
+                for linea_seccion, coincidencia_encabezado in iterar_lineas_con_encabezados_markdown(seccion_markdown)
+            )
+        secciones_ajustadas.append(seccion_markdown)
+
+    return "\n\n".join(secciones_ajustadas)
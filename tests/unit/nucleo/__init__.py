@@ -0,0 +1 @@
+# tests/unit/nucleo/__init__.py
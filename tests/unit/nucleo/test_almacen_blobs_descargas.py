@@ -0,0 +1,142 @@
+import hashlib
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from entrenai_refactor.nucleo.clientes.almacen_blobs_descargas import AlmacenBlobsDescargas
+
+
+def _crear_archivo(directorio: Path, nombre: str, contenido: bytes) -> tuple:
+    ruta_archivo = directorio / nombre
+    ruta_archivo.write_bytes(contenido)
+    return ruta_archivo, hashlib.sha256(contenido).hexdigest()
+
+
+@pytest.fixture
+def directorio_descargas(tmp_path) -> Path:
+    directorio = tmp_path / "descargas"
+    directorio.mkdir()
+    return directorio
+
+
+@pytest.fixture
+def almacen(tmp_path) -> AlmacenBlobsDescargas:
+    return AlmacenBlobsDescargas(tmp_path / "almacen", tamano_maximo_bytes=1000)
+
+
+def test_guardar_direcciona_por_contenido_con_enlace_duro(almacen, directorio_descargas):
+    ruta_archivo, huella = _crear_archivo(directorio_descargas, "apunte.pdf", b"contenido del apunte")
+
+    almacen.guardar_archivo(ruta_archivo, huella)
+
+    ruta_blob = almacen.directorio_cache / huella[:2] / f"{huella}.blob"
+    assert almacen.contiene(huella)
+    assert ruta_blob.read_bytes() == b"contenido del apunte"
+    assert os.path.samefile(ruta_blob, ruta_archivo) # Mismo inodo: no se copiaron bytes
+    assert almacen.obtener_estadisticas()["tamano_bytes"] == len(b"contenido del apunte")
+
+
+def test_mismo_contenido_con_otro_nombre_se_guarda_una_vez(almacen, directorio_descargas):
+    ruta_original, huella = _crear_archivo(directorio_descargas, "tema1.pdf", b"mismo contenido")
+    ruta_duplicada, huella_duplicada = _crear_archivo(directorio_descargas, "copia_tema1.pdf", b"mismo contenido")
+    assert huella == huella_duplicada
+
+    almacen.guardar_archivo(ruta_original, huella)
+    almacen.guardar_archivo(ruta_duplicada, huella_duplicada)
+
+    estadisticas = almacen.obtener_estadisticas()
+    assert estadisticas["archivos_deduplicados"] == 1
+    assert estadisticas["tamano_bytes"] == len(b"mismo contenido")
+    assert len(list(almacen.directorio_cache.glob("*/*.blob"))) == 1
+
+
+def test_materializar_recupera_el_contenido_y_reemplaza_el_destino(almacen, directorio_descargas, tmp_path):
+    ruta_archivo, huella = _crear_archivo(directorio_descargas, "apunte.pdf", b"version nueva")
+    almacen.guardar_archivo(ruta_archivo, huella)
+    ruta_destino = tmp_path / "reproceso" / "curso_7" / "apunte.pdf"
+    ruta_destino.parent.mkdir(parents=True)
+    ruta_destino.write_bytes(b"version vieja")
+
+    assert almacen.materializar_archivo(huella, ruta_destino) is True
+
+    assert ruta_destino.read_bytes() == b"version nueva"
+    assert not list(ruta_destino.parent.glob("*.tmp"))
+    assert almacen.obtener_estadisticas()["aciertos"] == 1
+
+
+def test_materializar_contenido_ausente_devuelve_false(almacen, tmp_path):
+    ruta_destino = tmp_path / "destino" / "apunte.pdf"
+
+    assert almacen.materializar_archivo("ab" * 32, ruta_destino) is False
+
+    assert not ruta_destino.exists()
+    assert not list(ruta_destino.parent.glob("*.tmp"))
+    assert almacen.obtener_estadisticas()["fallos"] == 1
+
+
+def test_sin_enlace_duro_se_copia(almacen, directorio_descargas, tmp_path):
+    ruta_archivo, huella = _crear_archivo(directorio_descargas, "apunte.pdf", b"otro sistema de archivos")
+    ruta_destino = tmp_path / "destino" / "apunte.pdf"
+
+    with patch("entrenai_refactor.nucleo.clientes.almacen_blobs_descargas.os.link", side_effect=OSError(18, "Invalid cross-device link")):
+        almacen.guardar_archivo(ruta_archivo, huella)
+        assert almacen.materializar_archivo(huella, ruta_destino) is True
+
+    ruta_blob = almacen.directorio_cache / huella[:2] / f"{huella}.blob"
+    assert ruta_blob.read_bytes() == b"otro sistema de archivos"
+    assert ruta_destino.read_bytes() == b"otro sistema de archivos"
+    assert not os.path.samefile(ruta_blob, ruta_archivo)
+    assert not os.path.samefile(ruta_blob, ruta_destino)
+
+
+def test_archivo_mayor_que_el_maximo_no_se_guarda(almacen, directorio_descargas):
+    ruta_archivo, huella = _crear_archivo(directorio_descargas, "video.mp4", b"x" * 1001)
+
+    almacen.guardar_archivo(ruta_archivo, huella)
+
+    assert not almacen.contiene(huella)
+    assert almacen.obtener_estadisticas()["tamano_bytes"] == 0
+
+
+def test_superar_el_maximo_desaloja_los_blobs_menos_usados(almacen, directorio_descargas):
+    huellas = []
+    for indice, momento_uso in enumerate((1_000, 3_000, 2_000)):
+        ruta_archivo, huella = _crear_archivo(directorio_descargas, f"archivo_{indice}.pdf", bytes([indice]) * 300)
+        almacen.guardar_archivo(ruta_archivo, huella)
+        os.utime(almacen.directorio_cache / huella[:2] / f"{huella}.blob", (momento_uso, momento_uso))
+        huellas.append(huella)
+
+    ruta_nuevo, huella_nueva = _crear_archivo(directorio_descargas, "nuevo.pdf", b"n" * 300)
+    almacen.guardar_archivo(ruta_nuevo, huella_nueva) # 1200 bytes > 1000: se baja hasta el 90% (900)
+
+    # Se desaloja sólo el usado hace más tiempo; el blob recién guardado y los más recientes se conservan
+    assert not almacen.contiene(huellas[0])
+    assert almacen.contiene(huellas[1])
+    assert almacen.contiene(huellas[2])
+    assert almacen.contiene(huella_nueva)
+    assert almacen.obtener_estadisticas()["tamano_bytes"] == 900
+    # El archivo descargado sigue intacto aunque su blob se haya desalojado
+    assert (directorio_descargas / "archivo_0.pdf").read_bytes() == bytes([0]) * 300
+
+
+def test_materializar_renueva_el_uso_del_blob(almacen, directorio_descargas, tmp_path):
+    ruta_archivo, huella = _crear_archivo(directorio_descargas, "apunte.pdf", b"a" * 300)
+    almacen.guardar_archivo(ruta_archivo, huella)
+    ruta_blob = almacen.directorio_cache / huella[:2] / f"{huella}.blob"
+    os.utime(ruta_blob, (1_000, 1_000))
+
+    almacen.materializar_archivo(huella, tmp_path / "destino" / "apunte.pdf")
+
+    assert ruta_blob.stat().st_mtime > 1_000
+
+
+def test_tamano_inicial_se_calcula_desde_disco(almacen, directorio_descargas):
+    ruta_archivo, huella = _crear_archivo(directorio_descargas, "apunte.pdf", b"persistente")
+    almacen.guardar_archivo(ruta_archivo, huella)
+
+    almacen_reiniciado = AlmacenBlobsDescargas(almacen.directorio_cache, tamano_maximo_bytes=1000)
+
+    assert almacen_reiniciado.contiene(huella)
+    assert almacen_reiniciado.obtener_estadisticas()["tamano_bytes"] == len(b"persistente")
@@ -0,0 +1,192 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from entrenai_refactor.nucleo.clientes import cliente_moodle as modulo_cliente_moodle
+from entrenai_refactor.nucleo.clientes.cliente_moodle import (
+    CacheContenidosCursos,
+    ClienteMoodle,
+    ErrorAPIMoodle,
+    InstantaneaContenidosCurso,
+)
+
+ID_CURSO = 7
+URL_API = "https://moodle.ejemplo/webservice/rest/server.php"
+
+
+def _contenidos_curso():
+    return [
+        {
+            "id": 1,
+            "name": "General",
+            "modules": [
+                {"id": 10, "name": "Foro", "modname": "forum"},
+            ],
+        },
+        {
+            "id": 2,
+            "name": "EntrenAI",
+            "modules": [
+                {"id": 20, "name": "Documentos", "modname": "url"},
+                {"id": 21, "name": "Documentos", "modname": "folder", "contents": []},
+                "modulo_invalido",
+            ],
+        },
+        {"id": 3, "name": "EntrenAI", "modules": []}, # Nombre repetido: se conserva la primera sección
+    ]
+
+
+def _crear_cliente(cache: CacheContenidosCursos, ttl_segundos: float) -> ClienteMoodle:
+    cliente = ClienteMoodle()
+    cliente.url_base_api = URL_API
+    cliente.config_moodle = SimpleNamespace(ttl_cache_contenidos_curso_segundos=ttl_segundos)
+    cliente.cache_contenidos_cursos = cache
+    return cliente
+
+
+@pytest.fixture
+def cache() -> CacheContenidosCursos:
+    return CacheContenidosCursos()
+
+
+# --- InstantaneaContenidosCurso ---
+
+def test_instantanea_indexa_secciones_y_modulos():
+    instantanea = InstantaneaContenidosCurso(ID_CURSO, _contenidos_curso())
+
+    assert instantanea.obtener_seccion_por_nombre("EntrenAI")["id"] == 2
+    assert instantanea.obtener_seccion_por_nombre("Inexistente") is None
+    assert instantanea.obtener_modulo_por_id(21)["modname"] == "folder"
+    assert instantanea.obtener_modulo_por_id(99) is None
+    assert instantanea.obtener_modulo_por_nombre(2, "Documentos")["id"] == 20
+    assert instantanea.obtener_modulo_por_nombre(2, "Documentos", "folder")["id"] == 21
+    assert instantanea.obtener_modulo_por_nombre(2, "Documentos", "page") is None
+    assert instantanea.obtener_modulo_por_nombre(1, "Documentos") is None
+
+
+def test_instantanea_ignora_secciones_y_modulos_mal_formados():
+    instantanea = InstantaneaContenidosCurso(ID_CURSO, ["seccion_invalida", {"id": 4, "name": "Rota", "modules": "no_lista"}])
+
+    assert instantanea.obtener_seccion_por_nombre("Rota")["id"] == 4
+    assert instantanea.obtener_modulo_por_id(10) is None
+
+
+# --- CacheContenidosCursos ---
+
+def test_cache_devuelve_la_instantanea_hasta_que_caduca(cache):
+    clave = (URL_API, ID_CURSO)
+    with patch.object(modulo_cliente_moodle.time, "monotonic", return_value=100.0):
+        instantanea = InstantaneaContenidosCurso(ID_CURSO, [])
+    cache.guardar(clave, instantanea)
+
+    with patch.object(modulo_cliente_moodle.time, "monotonic", return_value=129.0):
+        assert cache.obtener(clave, ttl_segundos=30) is instantanea
+    with patch.object(modulo_cliente_moodle.time, "monotonic", return_value=131.0):
+        assert cache.obtener(clave, ttl_segundos=30) is None
+    # La entrada caducada se elimina al detectarla
+    assert cache.obtener(clave, ttl_segundos=10_000) is None
+
+
+def test_cache_invalidar_elimina_solo_la_clave_indicada(cache):
+    cache.guardar((URL_API, 1), InstantaneaContenidosCurso(1, []))
+    cache.guardar((URL_API, 2), InstantaneaContenidosCurso(2, []))
+
+    cache.invalidar((URL_API, 1))
+    cache.invalidar((URL_API, 99)) # Invalidar una clave inexistente no falla
+
+    assert cache.obtener((URL_API, 1), ttl_segundos=60) is None
+    assert cache.obtener((URL_API, 2), ttl_segundos=60) is not None
+
+
+# --- ClienteMoodle.obtener_instantanea_contenidos_curso ---
+
+def test_contenidos_se_obtienen_una_sola_vez_por_operacion(cache):
+    cliente = _crear_cliente(cache, ttl_segundos=0)
+    with patch.object(cliente, "obtener_contenidos_de_curso", return_value=_contenidos_curso()) as mock_contenidos:
+        seccion = cliente.obtener_seccion_por_nombre(ID_CURSO, "EntrenAI")
+        modulo = cliente.obtener_modulo_de_curso_por_nombre(ID_CURSO, seccion.id, "Documentos", "folder")
+        archivos = cliente.obtener_archivos_de_carpeta(modulo.id)
+
+    assert archivos == []
+    mock_contenidos.assert_called_once_with(ID_CURSO)
+
+
+def test_archivos_de_carpeta_memorizada_no_consultan_el_modulo(cache):
+    cliente = _crear_cliente(cache, ttl_segundos=0)
+    with patch.object(cliente, "obtener_contenidos_de_curso", return_value=_contenidos_curso()), \
+         patch.object(cliente, "_realizar_peticion_api") as mock_peticion:
+        cliente.obtener_instantanea_contenidos_curso(ID_CURSO)
+        cliente.obtener_archivos_de_carpeta(21)
+
+    mock_peticion.assert_not_called()
+
+
+def test_sin_ttl_no_se_comparte_entre_clientes(cache):
+    for _ in range(2):
+        cliente = _crear_cliente(cache, ttl_segundos=0)
+        with patch.object(cliente, "obtener_contenidos_de_curso", return_value=_contenidos_curso()) as mock_contenidos:
+            cliente.obtener_instantanea_contenidos_curso(ID_CURSO)
+        mock_contenidos.assert_called_once_with(ID_CURSO)
+
+    assert cache.obtener((URL_API, ID_CURSO), ttl_segundos=60) is None
+
+
+def test_con_ttl_se_comparte_entre_clientes(cache):
+    primer_cliente = _crear_cliente(cache, ttl_segundos=60)
+    with patch.object(primer_cliente, "obtener_contenidos_de_curso", return_value=_contenidos_curso()):
+        instantanea = primer_cliente.obtener_instantanea_contenidos_curso(ID_CURSO)
+
+    segundo_cliente = _crear_cliente(cache, ttl_segundos=60)
+    with patch.object(segundo_cliente, "obtener_contenidos_de_curso") as mock_contenidos:
+        assert segundo_cliente.obtener_instantanea_contenidos_curso(ID_CURSO) is instantanea
+    mock_contenidos.assert_not_called()
+
+
+def test_con_ttl_la_clave_distingue_instancias_de_moodle(cache):
+    primer_cliente = _crear_cliente(cache, ttl_segundos=60)
+    with patch.object(primer_cliente, "obtener_contenidos_de_curso", return_value=_contenidos_curso()):
+        primer_cliente.obtener_instantanea_contenidos_curso(ID_CURSO)
+
+    cliente_otra_instancia = _crear_cliente(cache, ttl_segundos=60)
+    cliente_otra_instancia.url_base_api = "https://otro.moodle/webservice/rest/server.php"
+    with patch.object(cliente_otra_instancia, "obtener_contenidos_de_curso", return_value=[]) as mock_contenidos:
+        cliente_otra_instancia.obtener_instantanea_contenidos_curso(ID_CURSO)
+    mock_contenidos.assert_called_once_with(ID_CURSO)
+
+
+def test_invalidar_descarta_la_instantanea_local_y_compartida(cache):
+    cliente = _crear_cliente(cache, ttl_segundos=60)
+    with patch.object(cliente, "obtener_contenidos_de_curso", return_value=_contenidos_curso()) as mock_contenidos:
+        primera = cliente.obtener_instantanea_contenidos_curso(ID_CURSO)
+        cliente.invalidar_contenidos_de_curso(ID_CURSO)
+        assert cache.obtener((URL_API, ID_CURSO), ttl_segundos=60) is None
+        segunda = cliente.obtener_instantanea_contenidos_curso(ID_CURSO)
+
+    assert segunda is not primera
+    assert mock_contenidos.call_count == 2
+
+
+def test_forzar_actualizacion_ignora_memoria_y_cache(cache):
+    cliente = _crear_cliente(cache, ttl_segundos=60)
+    with patch.object(cliente, "obtener_contenidos_de_curso", return_value=_contenidos_curso()) as mock_contenidos:
+        primera = cliente.obtener_instantanea_contenidos_curso(ID_CURSO)
+        segunda = cliente.obtener_instantanea_contenidos_curso(ID_CURSO, forzar_actualizacion=True)
+
+    assert segunda is not primera
+    assert mock_contenidos.call_count == 2
+    # La instantánea nueva sustituye a la anterior en la operación y en la caché compartida
+    assert cliente.obtener_instantanea_contenidos_curso(ID_CURSO) is segunda
+    assert cache.obtener((URL_API, ID_CURSO), ttl_segundos=60) is segunda
+
+
+def test_respuesta_que_no_es_lista_lanza_error_y_no_se_memoriza(cache):
+    cliente = _crear_cliente(cache, ttl_segundos=60)
+    with patch.object(cliente, "obtener_contenidos_de_curso", return_value={"exception": "x"}):
+        with pytest.raises(ErrorAPIMoodle):
+            cliente.obtener_instantanea_contenidos_curso(ID_CURSO)
+        # Las búsquedas de alto nivel lo convierten en "no encontrado"
+        assert cliente.obtener_seccion_por_nombre(ID_CURSO, "EntrenAI") is None
+
+    assert cache.obtener((URL_API, ID_CURSO), ttl_segundos=60) is None
+    assert ID_CURSO not in cliente._instantaneas_contenidos_por_curso
@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+ollama = pytest.importorskip("ollama")
+
+from entrenai_refactor.nucleo.ia.envoltorio_ollama import EnvoltorioOllama, ErrorEnvoltorioOllama  # noqa: E402
+
+
+def _crear_envoltorio(cliente_ollama: MagicMock) -> EnvoltorioOllama:
+    envoltorio = EnvoltorioOllama.__new__(EnvoltorioOllama) # Sin conectar a un servidor real
+    envoltorio.configuracion_ollama = SimpleNamespace(modelo_qa_ollama="modelo_qa")
+    envoltorio.cliente_ollama = cliente_ollama
+    return envoltorio
+
+
+def _trozo_chat(contenido: str, terminado: bool = False) -> "ollama.ChatResponse":
+    return ollama.ChatResponse(model="modelo_qa", message=ollama.Message(role="assistant", content=contenido), done=terminado)
+
+
+def test_chat_en_flujo_lee_trozos_chat_response():
+    cliente_ollama = MagicMock()
+    cliente_ollama.chat.return_value = iter([_trozo_chat("Hola"), _trozo_chat(", mundo"), _trozo_chat("", terminado=True)])
+    envoltorio = _crear_envoltorio(cliente_ollama)
+
+    trozos = list(envoltorio.generar_respuesta_de_chat_en_flujo("¿Qué es un TAD?"))
+
+    assert trozos == ["Hola", ", mundo"]
+    assert cliente_ollama.chat.call_args.kwargs["stream"] is True
+    assert cliente_ollama.chat.call_args.kwargs["model"] == "modelo_qa"
+
+
+def test_chat_en_flujo_admite_trozos_como_diccionario():
+    cliente_ollama = MagicMock()
+    cliente_ollama.chat.return_value = iter([{"message": {"role": "assistant", "content": "Hola"}}, {"done": True}])
+    envoltorio = _crear_envoltorio(cliente_ollama)
+
+    assert list(envoltorio.generar_respuesta_de_chat_en_flujo("Hola")) == ["Hola"]
+
+
+def test_chat_en_flujo_convierte_errores_del_servidor():
+    cliente_ollama = MagicMock()
+    cliente_ollama.chat.side_effect = ollama.ResponseError("modelo no encontrado", 404)
+    envoltorio = _crear_envoltorio(cliente_ollama)
+
+    with pytest.raises(ErrorEnvoltorioOllama):
+        list(envoltorio.generar_respuesta_de_chat_en_flujo("Hola"))
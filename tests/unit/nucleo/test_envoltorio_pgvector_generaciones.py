@@ -0,0 +1,159 @@
+import re
+from unittest.mock import MagicMock
+
+import pytest
+
+pytest.importorskip("psycopg2")
+pytest.importorskip("pgvector")
+
+from entrenai_refactor.nucleo.bd.envoltorio_pgvector import EnvoltorioPgVector, ErrorBaseDeDatosVectorial  # noqa: E402
+
+PREFIJO_TABLAS = "entrenai_vectores_curso_"
+NOMBRE_CURSO_LARGO = "Introducción a la Programación Orientada a Objetos y Patrones de Diseño 2024"
+
+
+class CursorBaseDatosSimulada:
+    """Cursor mínimo que simula las tablas e índices que ven las consultas de generaciones."""
+
+    def __init__(self, crear_indices: bool = True):
+        self.tablas = set()
+        self.indices = set()
+        self.crear_indices = crear_indices
+        self.sentencias = []
+        self.closed = False
+        self.rowcount = 0
+        self._resultado = None
+        self.generaciones_caducadas = []
+
+    def execute(self, sentencia, parametros=None):
+        self.sentencias.append(sentencia)
+        if "information_schema.tables" in sentencia:
+            self._resultado = {"exists": parametros[0] in self.tablas}
+        elif "pg_indexes" in sentencia:
+            self._resultado = {"exists": parametros[1] in self.indices}
+        elif sentencia.startswith("CREATE INDEX"):
+            if self.crear_indices:
+                self.indices.add(re.search(r'INDEX "([^"]+)"', sentencia).group(1))
+        elif sentencia.startswith("ALTER TABLE") and "RENAME TO" in sentencia:
+            tabla_origen, tabla_destino = re.findall(r'"([^"]+)"', sentencia)
+            self.tablas.discard(tabla_origen)
+            self.tablas.add(tabla_destino)
+        elif sentencia.startswith("DROP TABLE"):
+            self.tablas.discard(re.search(r'"([^"]+)"', sentencia).group(1))
+        elif sentencia.startswith("SELECT nombre_tabla_generacion"):
+            self._resultado = [{"nombre_tabla_generacion": nombre} for nombre in self.generaciones_caducadas]
+
+    def fetchone(self):
+        return self._resultado
+
+    def fetchall(self):
+        return self._resultado
+
+
+@pytest.fixture
+def cursor_bd() -> CursorBaseDatosSimulada:
+    return CursorBaseDatosSimulada()
+
+
+@pytest.fixture
+def envoltorio_bd(cursor_bd: CursorBaseDatosSimulada) -> EnvoltorioPgVector:
+    envoltorio = EnvoltorioPgVector()
+    envoltorio.config_db = MagicMock(prefijo_tabla_cursos_vectorial=PREFIJO_TABLAS, segundos_gracia_generaciones_retiradas=900)
+    envoltorio._conexion_activa_db = MagicMock(closed=False)
+    envoltorio._cursor_activo_db = cursor_bd
+    return envoltorio
+
+
+def test_identificador_con_sufijo_no_supera_63_caracteres():
+    nombre_base = "t" * 80
+    identificador = EnvoltorioPgVector._identificador_con_sufijo(nombre_base, "_g1760000000000")
+    assert len(identificador) == 63
+    assert identificador.endswith("_g1760000000000")
+    # Dos bases con el mismo comienzo no comparten nombre de generación.
+    assert identificador != EnvoltorioPgVector._identificador_con_sufijo("t" * 79 + "u", "_g1760000000000")
+    assert EnvoltorioPgVector._identificador_con_sufijo("tabla_corta", "_r1") == "tabla_corta_r1"
+
+
+def test_nombre_tabla_curso_conserva_el_nombre_de_las_tablas_existentes(envoltorio_bd: EnvoltorioPgVector):
+    # Los nombres publicados no cambian: prefijo y nombre normalizado, recortados a 63 como hace PostgreSQL.
+    assert envoltorio_bd.obtener_nombre_tabla_curso_normalizado("Programación Avanzada 2024") == f"{PREFIJO_TABLAS}programacin_avanzada_2024"
+    assert envoltorio_bd.obtener_nombre_tabla_curso_normalizado("Física I") == f"{PREFIJO_TABLAS}fsica_i"
+    nombre_tabla = envoltorio_bd.obtener_nombre_tabla_curso_normalizado(NOMBRE_CURSO_LARGO)
+    assert nombre_tabla == f"{PREFIJO_TABLAS}introduccin_a_la_programacin_orientada_a_objetos_y_patrones"[:63]
+    assert len(nombre_tabla) == 63
+
+
+def test_nombre_indice_hnsw_no_supera_63_caracteres():
+    nombre_tabla_generacion = "t" * 63
+    nombre_indice = EnvoltorioPgVector._nombre_indice_hnsw(nombre_tabla_generacion)
+    assert len(nombre_indice) <= 63
+    assert nombre_indice.startswith("idx_hnsw_")
+    assert nombre_indice != EnvoltorioPgVector._nombre_indice_hnsw("t" * 62 + "u")
+    assert EnvoltorioPgVector._nombre_indice_hnsw("tabla_corta") == "idx_hnsw_tabla_corta"
+
+
+def test_publicar_generacion_indexa_y_sustituye_la_tabla_publicada(envoltorio_bd: EnvoltorioPgVector, cursor_bd: CursorBaseDatosSimulada):
+    nombre_tabla_curso = envoltorio_bd.obtener_nombre_tabla_curso_normalizado(NOMBRE_CURSO_LARGO)
+    cursor_bd.tablas.add(nombre_tabla_curso)
+
+    nombre_tabla_generacion = envoltorio_bd.iniciar_generacion_tabla_curso(NOMBRE_CURSO_LARGO)
+    assert len(nombre_tabla_generacion) <= 63
+    assert envoltorio_bd._nombre_tabla_escritura_curso(NOMBRE_CURSO_LARGO) == nombre_tabla_generacion
+    cursor_bd.tablas.add(nombre_tabla_generacion) # Creada al insertar el primer fragmento
+
+    assert envoltorio_bd.publicar_generacion_tabla_curso(NOMBRE_CURSO_LARGO)
+
+    sentencias_indice = [sentencia for sentencia in cursor_bd.sentencias if sentencia.startswith("CREATE INDEX")]
+    assert len(sentencias_indice) == 1 and "IF NOT EXISTS" not in sentencias_indice[0]
+    assert EnvoltorioPgVector._nombre_indice_hnsw(nombre_tabla_generacion) in cursor_bd.indices
+    assert nombre_tabla_curso in cursor_bd.tablas and nombre_tabla_generacion not in cursor_bd.tablas
+    tablas_retiradas = [tabla for tabla in cursor_bd.tablas if tabla != nombre_tabla_curso]
+    assert len(tablas_retiradas) == 1 and len(tablas_retiradas[0]) <= 63
+    assert envoltorio_bd._nombre_tabla_escritura_curso(NOMBRE_CURSO_LARGO) == nombre_tabla_curso
+
+
+def test_no_se_publica_una_generacion_sin_indice(envoltorio_bd: EnvoltorioPgVector):
+    cursor_sin_indices = CursorBaseDatosSimulada(crear_indices=False)
+    envoltorio_bd._cursor_activo_db = cursor_sin_indices
+    nombre_tabla_curso = envoltorio_bd.obtener_nombre_tabla_curso_normalizado("Física I")
+    cursor_sin_indices.tablas.add(nombre_tabla_curso)
+    nombre_tabla_generacion = envoltorio_bd.iniciar_generacion_tabla_curso("Física I")
+    cursor_sin_indices.tablas.add(nombre_tabla_generacion)
+
+    with pytest.raises(ErrorBaseDeDatosVectorial):
+        envoltorio_bd.publicar_generacion_tabla_curso("Física I")
+
+    assert not any("RENAME TO" in sentencia for sentencia in cursor_sin_indices.sentencias)
+    assert cursor_sin_indices.tablas == {nombre_tabla_curso, nombre_tabla_generacion}
+
+
+def test_generacion_vacia_se_descarta_sin_tocar_la_tabla_publicada(envoltorio_bd: EnvoltorioPgVector, cursor_bd: CursorBaseDatosSimulada):
+    nombre_tabla_curso = envoltorio_bd.obtener_nombre_tabla_curso_normalizado("Física I")
+    cursor_bd.tablas.add(nombre_tabla_curso)
+    envoltorio_bd.iniciar_generacion_tabla_curso("Física I")
+
+    assert not envoltorio_bd.publicar_generacion_tabla_curso("Física I")
+    assert cursor_bd.tablas == {nombre_tabla_curso}
+    assert envoltorio_bd._nombre_tabla_escritura_curso("Física I") == nombre_tabla_curso
+
+
+def test_limpieza_elimina_caducadas_salvo_la_generacion_en_construccion(envoltorio_bd: EnvoltorioPgVector, cursor_bd: CursorBaseDatosSimulada):
+    nombre_tabla_generacion = envoltorio_bd.iniciar_generacion_tabla_curso("Física I")
+    cursor_bd.tablas.update({"tabla_retirada_r1", nombre_tabla_generacion})
+    cursor_bd.generaciones_caducadas = ["tabla_retirada_r1", nombre_tabla_generacion]
+
+    assert envoltorio_bd.eliminar_generaciones_caducadas() == 1
+    assert "tabla_retirada_r1" not in cursor_bd.tablas
+    assert nombre_tabla_generacion in cursor_bd.tablas
+
+
+def test_copiar_documentos_reemplaza_los_fragmentos_parciales_de_la_generacion(envoltorio_bd: EnvoltorioPgVector, cursor_bd: CursorBaseDatosSimulada):
+    nombre_tabla_curso = envoltorio_bd.obtener_nombre_tabla_curso_normalizado("Física I")
+    nombre_tabla_generacion = envoltorio_bd.iniciar_generacion_tabla_curso("Física I")
+    cursor_bd.tablas.update({nombre_tabla_curso, nombre_tabla_generacion}) # La generación ya tiene fragmentos de un archivo fallido
+
+    envoltorio_bd.copiar_documentos_a_generacion("Física I", ["apunte.pdf"])
+
+    sentencia_borrado = next(i for i, sentencia in enumerate(cursor_bd.sentencias) if sentencia.startswith(f'DELETE FROM "{nombre_tabla_generacion}" WHERE id_documento'))
+    sentencia_copia = next(i for i, sentencia in enumerate(cursor_bd.sentencias) if sentencia.startswith(f'INSERT INTO "{nombre_tabla_generacion}"'))
+    assert sentencia_borrado < sentencia_copia
@@ -0,0 +1,96 @@
+import pytest
+
+from entrenai_refactor.config.configuracion import _aux_obtener_entorno_como_mapa_por_curso
+from entrenai_refactor.nucleo.ia.fragmentador_estructural import (
+    actualizar_delimitador_bloque_codigo,
+    dividir_markdown_en_fragmentos_estructurales,
+    iterar_lineas_con_encabezados_markdown,
+)
+
+ORACION = "Una lista enlazada guarda cada elemento junto a la referencia al siguiente. "
+DOCUMENTO_MARKDOWN = (
+    "# Estructuras de datos\n\nIntroducción breve.\n\n"
+    "## Listas\n\n" + ORACION * 12 + "\n\n"
+    "```python\n# esto es un comentario, no un encabezado\nnodo = Nodo(1)\n```\n\n"
+    "## Árboles\n\nUn árbol binario tiene como mucho dos hijos por nodo."
+)
+
+
+def test_fragmentos_respetan_el_tamano_y_no_pierden_ni_cortan_palabras():
+    fragmentos = dividir_markdown_en_fragmentos_estructurales(DOCUMENTO_MARKDOWN, 300)
+
+    assert len(fragmentos) > 2
+    assert all(len(texto_fragmento) <= 300 for texto_fragmento, _ in fragmentos)
+    palabras_fragmentos = " ".join(texto_fragmento for texto_fragmento, _ in fragmentos).split()
+    assert palabras_fragmentos == DOCUMENTO_MARKDOWN.split()
+
+
+def test_metadatos_con_la_ruta_de_encabezados_comun():
+    fragmentos = dividir_markdown_en_fragmentos_estructurales(DOCUMENTO_MARKDOWN, 300)
+    rutas_encabezados = [metadatos["ruta_encabezados"] for _, metadatos in fragmentos]
+
+    assert rutas_encabezados[0] == "Estructuras de datos" # Mezcla la introducción y el comienzo de 'Listas'
+    assert "Estructuras de datos > Listas" in rutas_encabezados
+    assert rutas_encabezados[-1] == "Estructuras de datos > Árboles"
+
+
+def test_comentarios_de_codigo_no_abren_secciones():
+    fragmentos = dividir_markdown_en_fragmentos_estructurales(DOCUMENTO_MARKDOWN, 300)
+    fragmento_codigo = next((texto, metadatos) for texto, metadatos in fragmentos if "nodo = Nodo(1)" in texto)
+
+    assert "# esto es un comentario" in fragmento_codigo[0]
+    assert fragmento_codigo[1]["ruta_encabezados"] == "Estructuras de datos > Listas"
+
+
+def test_secciones_cortas_se_agrupan_hasta_el_minimo():
+    texto_markdown = "# A\n\nUno.\n\n# B\n\nDos.\n\n# C\n\n" + "Palabra " * 40
+    fragmentos = dividir_markdown_en_fragmentos_estructurales(texto_markdown, 200, tamano_minimo=50)
+
+    assert fragmentos[0][0].startswith("# A") and "# C" in fragmentos[0][0]
+    assert fragmentos[0][1]["ruta_encabezados"] == "" # Sin encabezado común a A, B y C
+
+
+def test_texto_sin_encabezados_y_casos_limite():
+    fragmentos = dividir_markdown_en_fragmentos_estructurales("Primer párrafo.\n\nSegundo párrafo.", 1000)
+    assert fragmentos == [("Primer párrafo.\n\nSegundo párrafo.", {"ruta_encabezados": ""})]
+    assert dividir_markdown_en_fragmentos_estructurales("  \n ", 100) == []
+    with pytest.raises(ValueError):
+        dividir_markdown_en_fragmentos_estructurales("Texto", 0)
+
+
+def test_palabra_mas_larga_que_el_objetivo_se_parte_sin_perder_caracteres():
+    palabra_larga = "a" * 50
+    fragmentos = dividir_markdown_en_fragmentos_estructurales(f"inicio {palabra_larga} fin", 20)
+    assert all(len(texto) <= 20 for texto, _ in fragmentos)
+    assert "".join(" ".join(texto for texto, _ in fragmentos).split()) == f"inicio{palabra_larga}fin"
+
+
+@pytest.mark.parametrize(
+    "linea, delimitador_abierto, delimitador_esperado",
+    [
+        ("```python", None, "```"),
+        ("```", "```", None),
+        ("~~~", "```", "```"), # Otro carácter: contenido del bloque
+        ("``", "```", "```"), # Más corto que el de apertura
+        ("````", "```", None),
+        ("``` texto", "```", "```"), # Un cierre no lleva nada detrás
+        ("    ```", None, None), # Cuatro espacios: bloque sangrado, no un delimitador
+        ("texto", "~~~", "~~~"),
+    ],
+)
+def test_delimitadores_de_bloques_de_codigo(linea, delimitador_abierto, delimitador_esperado):
+    assert actualizar_delimitador_bloque_codigo(linea, delimitador_abierto) == delimitador_esperado
+
+
+def test_iterar_lineas_solo_marca_encabezados_fuera_de_codigo():
+    encabezados = [
+        coincidencia.group(2)
+        for _, coincidencia in iterar_lineas_con_encabezados_markdown("# Uno\n~~~\n# dentro\n~~~\n## Dos ##")
+        if coincidencia
+    ]
+    assert encabezados == ["Uno", "Dos"]
+
+
+def test_estrategia_por_curso_desde_el_entorno(monkeypatch):
+    monkeypatch.setenv("CHUNKING_STRATEGY_BY_COURSE_PRUEBA", "12:Estructural, 40:ventana_fija,mal,7:")
+    assert _aux_obtener_entorno_como_mapa_por_curso("CHUNKING_STRATEGY_BY_COURSE_PRUEBA") == {12: "estructural", 40: "ventana_fija"}
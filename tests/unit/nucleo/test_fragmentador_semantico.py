@@ -0,0 +1,87 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from entrenai_refactor.nucleo.ia.fragmentador_semantico import dividir_texto_en_fragmentos_semanticos  # noqa: E402
+from entrenai_refactor.nucleo.ia.gestor_embeddings import CacheEmbeddingsEnMemoria, GestorEmbeddings  # noqa: E402
+
+ORACIONES_GATOS = [f"El gato número {numero} duerme junto a la ventana." for numero in range(6)]
+ORACIONES_PLANETAS = [f"El planeta número {numero} gira alrededor de su estrella." for numero in range(6)]
+TEXTO_DOS_TEMAS = " ".join(ORACIONES_GATOS + ORACIONES_PLANETAS)
+
+
+def _embeddings_por_tema(textos):
+    """Embedding de juguete: una dimensión por tema, proporcional a sus menciones en el texto."""
+    return [[float(texto.count("gato")), float(texto.count("planeta"))] for texto in textos]
+
+
+def test_corta_en_el_cambio_de_tema():
+    fragmentos = dividir_texto_en_fragmentos_semanticos(TEXTO_DOS_TEMAS, _embeddings_por_tema, tamano_maximo=500, tamano_minimo=50)
+
+    assert [texto for texto, _ in fragmentos] == [" ".join(ORACIONES_GATOS), " ".join(ORACIONES_PLANETAS)]
+    assert fragmentos[0][1]["similitud_corte"] < 1.0
+    assert fragmentos[-1][1]["similitud_corte"] is None
+
+
+def test_fragmentos_acotados_y_sin_perder_palabras():
+    fragmentos = dividir_texto_en_fragmentos_semanticos(TEXTO_DOS_TEMAS, _embeddings_por_tema, tamano_maximo=120)
+
+    assert all(len(texto) <= 120 for texto, _ in fragmentos)
+    assert " ".join(texto for texto, _ in fragmentos).split() == TEXTO_DOS_TEMAS.split()
+
+
+def test_sin_embeddings_solo_se_corta_por_tamano():
+    fragmentos = dividir_texto_en_fragmentos_semanticos(TEXTO_DOS_TEMAS, lambda textos: [None] * len(textos), tamano_maximo=200)
+
+    assert len(fragmentos) > 1
+    assert all(len(texto) <= 200 for texto, _ in fragmentos)
+    assert all(metadatos["similitud_corte"] in (1.0, None) for _, metadatos in fragmentos)
+
+
+def test_texto_corto_no_pide_embeddings():
+    generar_embeddings = MagicMock()
+    assert dividir_texto_en_fragmentos_semanticos("Una sola oración.", generar_embeddings, tamano_maximo=100) == [("Una sola oración.", {"similitud_corte": None})]
+    assert dividir_texto_en_fragmentos_semanticos("   ", generar_embeddings, tamano_maximo=100) == []
+    generar_embeddings.assert_not_called()
+    with pytest.raises(ValueError):
+        dividir_texto_en_fragmentos_semanticos("Texto.", generar_embeddings, tamano_maximo=0)
+
+
+def test_lineas_de_diapositiva_cuentan_como_oraciones():
+    texto_diapositivas = "\n".join(["- gato negro", "- gato blanco", "- gato gris"] * 3 + ["- planeta rojo", "- planeta azul", "- planeta verde"] * 3)
+    generar_embeddings = MagicMock(side_effect=_embeddings_por_tema)
+    fragmentos = dividir_texto_en_fragmentos_semanticos(texto_diapositivas, generar_embeddings, tamano_maximo=200, oraciones_contexto=0)
+
+    assert generar_embeddings.call_args.args[0] == texto_diapositivas.split("\n") # Una "oración" por línea, sin viñetas partidas
+    lineas_originales = set(texto_diapositivas.split("\n"))
+    assert all(set(texto.split("\n")) <= lineas_originales for texto, _ in fragmentos)
+    assert "planeta" not in fragmentos[0][0]
+
+
+def test_gestor_recurre_a_ventana_fija_si_no_hay_embeddings_de_oraciones():
+    proveedor_ia = MagicMock()
+    proveedor_ia.nombre_proveedor_ia_configurado = "pruebas"
+    proveedor_ia.generar_embeddings_en_lote.side_effect = lambda textos, modelo=None: [None] * len(textos)
+    gestor = GestorEmbeddings(proveedor_ia, tamano_fragmento_predeterminado=200, solapamiento_fragmento_predeterminado=20)
+    gestor.cache_embeddings = CacheEmbeddingsEnMemoria(capacidad_maxima=10)
+
+    fragmentos, metadatos = gestor.fragmentar_texto_segun_estrategia(TEXTO_DOS_TEMAS, "semantico")
+
+    assert len(fragmentos) > 1
+    assert {metadato["estrategia_fragmentacion"] for metadato in metadatos} == {"ventana_fija"}
+
+
+def test_gestor_anota_estrategia_y_similitud_en_los_metadatos():
+    proveedor_ia = MagicMock()
+    proveedor_ia.nombre_proveedor_ia_configurado = "pruebas"
+    proveedor_ia.generar_embeddings_en_lote.side_effect = lambda textos, modelo=None: _embeddings_por_tema(textos)
+    gestor = GestorEmbeddings(proveedor_ia, tamano_fragmento_predeterminado=500)
+    gestor.cache_embeddings = CacheEmbeddingsEnMemoria(capacidad_maxima=100)
+
+    fragmentos, metadatos = gestor.fragmentar_texto_segun_estrategia(TEXTO_DOS_TEMAS, "semantico")
+
+    assert fragmentos == [" ".join(ORACIONES_GATOS), " ".join(ORACIONES_PLANETAS)]
+    assert all(metadato["estrategia_fragmentacion"] == "semantico" for metadato in metadatos)
+    assert "similitud_corte" in metadatos[0]
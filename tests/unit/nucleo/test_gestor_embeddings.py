@@ -0,0 +1,109 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from entrenai_refactor.nucleo.ia.gestor_embeddings import CacheEmbeddingsEnMemoria, GestorEmbeddings, RESERVA_TOKENS_CONTEXTO
+from entrenai_refactor.nucleo.ia.proveedor_inteligencia import ErrorProveedorInteligencia
+from entrenai_refactor.nucleo.ia.tokenizador_embeddings import ContadorTokensEmbedding
+
+
+@pytest.fixture
+def proveedor_ia() -> MagicMock:
+    proveedor = MagicMock()
+    proveedor.nombre_proveedor_ia_configurado = "pruebas"
+    proveedor.generar_embeddings_en_lote.side_effect = lambda textos, modelo=None: [[float(len(texto))] for texto in textos]
+    return proveedor
+
+
+@pytest.fixture
+def gestor_embeddings(proveedor_ia: MagicMock) -> GestorEmbeddings:
+    gestor = GestorEmbeddings(proveedor_ia, tamano_lote_embeddings=32)
+    gestor.cache_embeddings = CacheEmbeddingsEnMemoria(capacidad_maxima=100) # Aislada de la caché compartida del proceso
+    return gestor
+
+
+def _fila_fragmento(texto: str, nombre_archivo: str = "tema1.pdf", titulo: str = "Tema 1") -> dict:
+    return {"texto": texto, "metadatos": {"nombre_archivo_fuente": nombre_archivo, "titulo_documento_asociado": titulo}}
+
+
+def test_revectorizacion_contextualiza_como_en_la_ingesta(gestor_embeddings: GestorEmbeddings, proveedor_ia: MagicMock):
+    gestor_embeddings.generar_embeddings_de_fragmentos_almacenados([_fila_fragmento("Contenido A")], "modelo-nuevo")
+
+    textos_enviados, modelo_enviado = proveedor_ia.generar_embeddings_en_lote.call_args.args
+    assert textos_enviados == [GestorEmbeddings._contextualizar_texto_fragmento("Contenido A", "tema1.pdf", "Tema 1")]
+    assert modelo_enviado == "modelo-nuevo"
+
+
+def test_revectorizacion_respeta_el_tamano_de_lote(gestor_embeddings: GestorEmbeddings, proveedor_ia: MagicMock):
+    filas = [_fila_fragmento(f"Fragmento {numero}") for numero in range(10)]
+
+    embeddings = gestor_embeddings.generar_embeddings_de_fragmentos_almacenados(filas, tamano_lote=4)
+
+    assert [len(llamada.args[0]) for llamada in proveedor_ia.generar_embeddings_en_lote.call_args_list] == [4, 4, 2]
+    assert all(embedding is not None for embedding in embeddings)
+
+
+def test_revectorizacion_deja_none_en_los_textos_de_un_lote_fallido(gestor_embeddings: GestorEmbeddings, proveedor_ia: MagicMock):
+    def _fallar_segundo_lote(textos, modelo=None):
+        if proveedor_ia.generar_embeddings_en_lote.call_count == 2:
+            raise ErrorProveedorInteligencia("proveedor caído")
+        return [[1.0] for _ in textos]
+    proveedor_ia.generar_embeddings_en_lote.side_effect = _fallar_segundo_lote
+    filas = [_fila_fragmento(f"Fragmento {numero}") for numero in range(4)]
+
+    embeddings = gestor_embeddings.generar_embeddings_de_fragmentos_almacenados(filas, tamano_lote=2)
+
+    assert embeddings[:2] == [[1.0], [1.0]]
+    assert embeddings[2:] == [None, None]
+
+
+def test_textos_repetidos_se_piden_una_sola_vez(gestor_embeddings: GestorEmbeddings, proveedor_ia: MagicMock):
+    filas = [_fila_fragmento("Pie de diapositiva")] * 3
+
+    embeddings = gestor_embeddings.generar_embeddings_de_fragmentos_almacenados(filas)
+
+    assert len(proveedor_ia.generar_embeddings_en_lote.call_args.args[0]) == 1
+    assert embeddings[0] == embeddings[1] == embeddings[2]
+
+
+@pytest.fixture
+def gestor_por_tokens(proveedor_ia: MagicMock) -> GestorEmbeddings:
+    # Sin tokenizador local: los tokens se estiman, lo que basta para comprobar los cortes.
+    return GestorEmbeddings(
+        proveedor_ia,
+        tamano_fragmento_predeterminado=1000,
+        solapamiento_fragmento_predeterminado=100,
+        contador_tokens=ContadorTokensEmbedding(None, 512),
+        maximo_tokens_fragmento=60 + RESERVA_TOKENS_CONTEXTO,
+    )
+
+
+TEXTO_LARGO = " ".join(f"Párrafo {numero} sobre estructuras de datos, grafos y árboles balanceados." for numero in range(40))
+
+
+def test_fragmentos_por_tokens_no_superan_el_maximo_ni_parten_palabras(gestor_por_tokens: GestorEmbeddings):
+    fragmentos = gestor_por_tokens.dividir_texto_en_fragmentos_por_tokens(TEXTO_LARGO)
+
+    assert len(fragmentos) > 1
+    conteos = gestor_por_tokens.contador_tokens.contar_tokens_en_lote(fragmentos)
+    assert max(conteos) <= 60
+    palabras_texto = set(TEXTO_LARGO.split())
+    assert all(fragmento.split()[0] in palabras_texto and fragmento.split()[-1] in palabras_texto for fragmento in fragmentos)
+    assert fragmentos[0].startswith("Párrafo 0") and fragmentos[-1].rstrip().endswith("balanceados.")
+
+
+def test_ventana_fija_por_tokens_no_vuelve_a_contar_los_fragmentos(gestor_por_tokens: GestorEmbeddings):
+    with patch.object(gestor_por_tokens.contador_tokens, "contar_tokens_en_lote", wraps=gestor_por_tokens.contador_tokens.contar_tokens_en_lote) as contar_en_lote:
+        fragmentos, metadatos = gestor_por_tokens.fragmentar_texto_segun_estrategia(TEXTO_LARGO, "ventana_fija")
+    contar_en_lote.assert_not_called()
+    # Los conteos de la primera pasada coinciden con los de tokenizar cada fragmento por separado.
+    assert [metadato["numero_tokens"] for metadato in metadatos] == gestor_por_tokens.contador_tokens.contar_tokens_en_lote(fragmentos)
+
+
+def test_estructural_por_tokens_cuenta_una_sola_vez(gestor_por_tokens: GestorEmbeddings):
+    texto_markdown = "# Tema 1\n\n" + TEXTO_LARGO + "\n\n# Tema 2\n\nResumen breve."
+    with patch.object(gestor_por_tokens.contador_tokens, "contar_tokens_en_lote", wraps=gestor_por_tokens.contador_tokens.contar_tokens_en_lote) as contar_en_lote:
+        fragmentos, metadatos = gestor_por_tokens.fragmentar_texto_segun_estrategia(texto_markdown, "estructural")
+    assert contar_en_lote.call_count == 1
+    assert all(metadato["numero_tokens"] <= 60 for metadato in metadatos)
+    assert len(fragmentos) == len(metadatos)
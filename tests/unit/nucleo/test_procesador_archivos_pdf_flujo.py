@@ -0,0 +1,65 @@
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from entrenai_refactor.nucleo.archivos import procesador_archivos as modulo_procesador
+from entrenai_refactor.nucleo.archivos.procesador_archivos import ProcesadorArchivosPDF
+
+RUTA_PDF = Path("/tmp/documento_grande.pdf")
+TEXTO_CAPA = "Texto embebido suficiente para no aplicar OCR a esta página."
+
+
+class RelojSimulado:
+    def __init__(self, instante_inicial: float = 1_000.0):
+        self.instante = instante_inicial
+
+    def __call__(self) -> float:
+        return self.instante
+
+
+@pytest.fixture
+def procesador_pdf() -> ProcesadorArchivosPDF:
+    with patch.object(modulo_procesador, "pytesseract", MagicMock()), patch.object(modulo_procesador, "convert_from_path", MagicMock()):
+        yield ProcesadorArchivosPDF(minimo_caracteres_capa_texto=10, paginas_por_ventana_rasterizado=2, trabajadores_ocr=1, limite_segundos_ocr_documento=60)
+
+
+def _paginas_pdf(*textos_por_pagina: str):
+    return lambda ruta: iter(enumerate(textos_por_pagina, start=1))
+
+
+def test_flujo_pasa_el_plazo_del_documento_a_cada_ventana_ocr(procesador_pdf):
+    reloj = RelojSimulado()
+    ventanas_ocr = []
+
+    def _ocr_ventana(ruta, primera, ultima, dpi, lenguaje, instante_limite=None):
+        ventanas_ocr.append((primera, ultima, instante_limite))
+        return {pagina: f"ocr {pagina}" for pagina in range(primera, ultima + 1)}, 0.0, 0
+
+    with patch.object(modulo_procesador.time, "time", reloj), \
+         patch.object(modulo_procesador, "_aplicar_ocr_a_ventana_pdf", side_effect=_ocr_ventana), \
+         patch.object(procesador_pdf, "_iterar_capa_texto_por_pagina", _paginas_pdf("", "", "", TEXTO_CAPA)):
+        bloques = list(procesador_pdf.iterar_bloques_de_archivo(RUTA_PDF))
+
+    assert [(bloque.posicion, bloque.metadatos["metodo_extraccion"]) for bloque in bloques] == [(1, "ocr"), (2, "ocr"), (3, "ocr"), (4, "capa_texto")]
+    assert ventanas_ocr == [(1, 2, 1_060.0), (3, 3, 1_060.0)]
+
+
+def test_flujo_omite_el_ocr_restante_al_agotar_el_plazo(procesador_pdf, caplog):
+    reloj = RelojSimulado()
+    ventanas_ocr = []
+
+    def _ocr_ventana_lenta(ruta, primera, ultima, dpi, lenguaje, instante_limite=None):
+        ventanas_ocr.append((primera, ultima))
+        reloj.instante = instante_limite + 1 # La ventana consume todo el plazo
+        return {primera: f"ocr {primera}"}, 0.0, ultima - primera
+
+    with patch.object(modulo_procesador.time, "time", reloj), \
+         patch.object(modulo_procesador, "_aplicar_ocr_a_ventana_pdf", side_effect=_ocr_ventana_lenta), \
+         patch.object(procesador_pdf, "_iterar_capa_texto_por_pagina", _paginas_pdf("", "", "", "", TEXTO_CAPA, "")):
+        bloques = list(procesador_pdf.iterar_bloques_de_archivo(RUTA_PDF))
+
+    # Sólo se rasteriza la primera ventana; las páginas con capa de texto se siguen produciendo.
+    assert ventanas_ocr == [(1, 2)]
+    assert [(bloque.posicion, bloque.metadatos["metodo_extraccion"]) for bloque in bloques] == [(1, "ocr"), (5, "capa_texto")]
+    assert "4 páginas quedaron sin OCR" in caplog.text
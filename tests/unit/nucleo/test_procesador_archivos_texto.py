@@ -0,0 +1,90 @@
+import codecs
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from entrenai_refactor.nucleo.archivos import procesador_archivos
+from entrenai_refactor.nucleo.archivos.procesador_archivos import ProcesadorArchivosTextoPlano
+
+TEXTO_CON_ACENTOS = "Introducción a la programación: árboles, señales y pingüinos.\n"
+
+
+@pytest.fixture
+def procesador_texto() -> ProcesadorArchivosTextoPlano:
+    return ProcesadorArchivosTextoPlano()
+
+
+def _escribir(tmp_path, contenido_bytes: bytes, nombre: str = "apuntes.txt"):
+    ruta_archivo = tmp_path / nombre
+    ruta_archivo.write_bytes(contenido_bytes)
+    return ruta_archivo
+
+
+@pytest.mark.parametrize(
+    "contenido_bytes, codificacion_esperada",
+    [
+        (TEXTO_CON_ACENTOS.encode("utf-8"), "utf-8"),
+        (codecs.BOM_UTF8 + TEXTO_CON_ACENTOS.encode("utf-8"), "utf-8-sig"),
+        (TEXTO_CON_ACENTOS.encode("utf-16"), "utf-16"), # Incluye la BOM del orden de bytes nativo
+        (TEXTO_CON_ACENTOS.encode("utf-32"), "utf-32"),
+    ],
+)
+def test_decodifica_utf_por_bom_o_utf8_estricto(contenido_bytes, codificacion_esperada):
+    texto_decodificado, codificacion_usada = ProcesadorArchivosTextoPlano._decodificar_contenido(contenido_bytes)
+    assert texto_decodificado == TEXTO_CON_ACENTOS # Sin la BOM
+    assert codificacion_usada == codificacion_esperada
+
+
+def test_sin_detector_los_bytes_no_utf8_se_leen_como_cp1252():
+    with patch.object(procesador_archivos, "chardet", None):
+        texto_decodificado, codificacion_usada = ProcesadorArchivosTextoPlano._decodificar_contenido("Año “nuevo” – café".encode("cp1252"))
+    assert (texto_decodificado, codificacion_usada) == ("Año “nuevo” – café", "cp1252")
+
+
+def test_usa_la_codificacion_del_detector_si_tiene_confianza_suficiente():
+    detector = MagicMock()
+    detector.detect.return_value = {"encoding": "ISO-8859-7", "confidence": 0.9}
+    with patch.object(procesador_archivos, "chardet", detector):
+        texto_decodificado, codificacion_usada = ProcesadorArchivosTextoPlano._decodificar_contenido("Καλημέρα".encode("iso-8859-7"))
+    assert (texto_decodificado, codificacion_usada) == ("Καλημέρα", "iso8859-7")
+
+
+def test_detector_con_poca_confianza_recurre_a_cp1252():
+    detector = MagicMock()
+    detector.detect.return_value = {"encoding": "ISO-8859-7", "confidence": 0.05}
+    with patch.object(procesador_archivos, "chardet", detector):
+        _, codificacion_usada = ProcesadorArchivosTextoPlano._decodificar_contenido("café".encode("cp1252"))
+    assert codificacion_usada == "cp1252"
+
+
+def test_la_muestra_del_detector_incluye_la_zona_del_primer_byte_invalido():
+    detector = MagicMock()
+    detector.detect.return_value = {"encoding": None, "confidence": 0.0}
+    contenido_bytes = b"a" * (200 * 1024) + "café".encode("cp1252")
+    with patch.object(procesador_archivos, "chardet", detector):
+        ProcesadorArchivosTextoPlano._decodificar_contenido(contenido_bytes)
+    muestra_deteccion = detector.detect.call_args.args[0]
+    assert len(muestra_deteccion) <= ProcesadorArchivosTextoPlano.TAMANO_MUESTRA_DETECCION_BYTES
+    assert "é".encode("cp1252") in muestra_deteccion
+
+
+def test_extraccion_completa_y_mapeada_coinciden(procesador_texto: ProcesadorArchivosTextoPlano, tmp_path):
+    ruta_archivo = _escribir(tmp_path, (TEXTO_CON_ACENTOS * 50).encode("cp1252"))
+    texto_en_buffer = procesador_texto.extraer_texto_de_archivo(ruta_archivo)
+    with patch.object(ProcesadorArchivosTextoPlano, "UMBRAL_LECTURA_MAPEADA_BYTES", 1):
+        texto_mapeado = procesador_texto.extraer_texto_de_archivo(ruta_archivo)
+    assert texto_en_buffer == texto_mapeado == TEXTO_CON_ACENTOS * 50
+    assert procesador_texto.extraer_texto_de_archivo(_escribir(tmp_path, b"", "vacio.txt")) == ""
+
+
+def test_extraccion_en_flujo_detecta_la_misma_codificacion(procesador_texto: ProcesadorArchivosTextoPlano, tmp_path):
+    # El primer byte no UTF-8 aparece después del primer bloque leído por la detección incremental.
+    texto_archivo = "linea ascii\n" * 20000 + TEXTO_CON_ACENTOS * 10
+    ruta_archivo = _escribir(tmp_path, texto_archivo.encode("cp1252"))
+
+    with patch.object(procesador_archivos, "chardet", None):
+        bloques = list(procesador_texto.iterar_bloques_de_archivo(ruta_archivo))
+        texto_completo = procesador_texto.extraer_texto_de_archivo(ruta_archivo)
+
+    assert "".join(bloque.texto for bloque in bloques) == texto_completo == texto_archivo
+    assert bloques[0].posicion == 1 and len(bloques) > 1
@@ -0,0 +1,144 @@
+import asyncio
+from unittest.mock import patch, MagicMock
+
+import pytest
+import requests
+
+from entrenai_refactor.nucleo.clientes.resiliencia_http import (
+    CortacircuitosHost,
+    EjecutorResilienteHttp,
+    es_fallo_transitorio_requests,
+)
+
+HOST = "moodle.ejemplo"
+
+
+class ErrorCircuitoAbierto(Exception):
+    pass
+
+
+def _crear_error_circuito_abierto(segundos_restantes: float) -> Exception:
+    return ErrorCircuitoAbierto(f"circuito abierto ({segundos_restantes:.1f} s)")
+
+
+@pytest.fixture
+def ejecutor() -> EjecutorResilienteHttp:
+    return EjecutorResilienteHttp(
+        intentos_maximos=3,
+        espera_base_segundos=0.0,
+        espera_maxima_segundos=0.0,
+        umbral_fallos_cortacircuitos=2,
+        segundos_apertura_cortacircuitos=30.0,
+    )
+
+
+def _ejecutar(ejecutor: EjecutorResilienteHttp, operacion, es_idempotente: bool = True):
+    return ejecutor.ejecutar(HOST, operacion, es_idempotente, es_fallo_transitorio_requests, _crear_error_circuito_abierto)
+
+
+def _error_http(codigo_estado: int) -> requests.exceptions.HTTPError:
+    respuesta = MagicMock()
+    respuesta.status_code = codigo_estado
+    return requests.exceptions.HTTPError(response=respuesta)
+
+
+def test_clasificacion_fallos_transitorios():
+    assert es_fallo_transitorio_requests(requests.exceptions.Timeout())
+    assert es_fallo_transitorio_requests(requests.exceptions.ConnectionError())
+    assert es_fallo_transitorio_requests(_error_http(503))
+    assert not es_fallo_transitorio_requests(_error_http(404))
+    assert not es_fallo_transitorio_requests(ValueError("no es HTTP"))
+
+
+def test_reintenta_fallos_transitorios_hasta_el_exito(ejecutor: EjecutorResilienteHttp):
+    ejecutor.umbral_fallos_cortacircuitos = 10
+    operacion = MagicMock(side_effect=[requests.exceptions.Timeout(), requests.exceptions.Timeout(), "respuesta"])
+
+    assert _ejecutar(ejecutor, operacion) == "respuesta"
+    assert operacion.call_count == 3
+    metricas_host = ejecutor.obtener_estadisticas()[HOST]
+    assert metricas_host["reintentos"] == 2
+    assert metricas_host["estado_circuito"] == CortacircuitosHost.CERRADO
+
+
+def test_no_reintenta_peticiones_no_idempotentes(ejecutor: EjecutorResilienteHttp):
+    operacion = MagicMock(side_effect=requests.exceptions.Timeout())
+
+    with pytest.raises(requests.exceptions.Timeout):
+        _ejecutar(ejecutor, operacion, es_idempotente=False)
+    assert operacion.call_count == 1
+
+
+def test_error_no_transitorio_se_propaga_sin_reintentar(ejecutor: EjecutorResilienteHttp):
+    operacion = MagicMock(side_effect=_error_http(400))
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        _ejecutar(ejecutor, operacion)
+    assert operacion.call_count == 1
+    assert ejecutor.obtener_cortacircuitos(HOST).estado == CortacircuitosHost.CERRADO
+
+
+def test_cortacircuitos_abierto_semiabierto_cerrado(ejecutor: EjecutorResilienteHttp):
+    with patch("entrenai_refactor.nucleo.clientes.resiliencia_http.time.monotonic", return_value=1000.0) as reloj:
+        operacion_caida = MagicMock(side_effect=requests.exceptions.ConnectionError())
+        with pytest.raises(requests.exceptions.ConnectionError):
+            _ejecutar(ejecutor, operacion_caida)
+        cortacircuitos = ejecutor.obtener_cortacircuitos(HOST)
+        assert cortacircuitos.estado == CortacircuitosHost.ABIERTO
+        assert operacion_caida.call_count == 2 # Umbral de 2 fallos: el segundo abre el circuito y corta los reintentos
+
+        # Abierto: falla al instante, sin llamar a la operación.
+        operacion_sana = MagicMock(return_value="respuesta")
+        with pytest.raises(ErrorCircuitoAbierto):
+            _ejecutar(ejecutor, operacion_sana)
+        operacion_sana.assert_not_called()
+
+        # Pasado el tiempo de apertura se admite una única petición de prueba.
+        reloj.return_value = 1031.0
+        assert cortacircuitos.permitir_peticion()
+        assert cortacircuitos.estado == CortacircuitosHost.SEMIABIERTO
+        assert not cortacircuitos.permitir_peticion()
+
+        # La prueba tiene éxito: el circuito se cierra.
+        cortacircuitos.registrar_exito()
+        assert _ejecutar(ejecutor, operacion_sana) == "respuesta"
+        assert cortacircuitos.estado == CortacircuitosHost.CERRADO
+    assert ejecutor.obtener_estadisticas()[HOST]["aperturas_circuito"] == 1
+
+
+def test_prueba_fallida_en_semiabierto_reabre_el_circuito():
+    cortacircuitos = CortacircuitosHost(HOST, umbral_fallos=3, segundos_apertura=0.0)
+    for _ in range(3):
+        cortacircuitos.registrar_fallo()
+    assert cortacircuitos.estado == CortacircuitosHost.ABIERTO
+
+    assert cortacircuitos.permitir_peticion()
+    assert cortacircuitos.estado == CortacircuitosHost.SEMIABIERTO
+    assert cortacircuitos.registrar_fallo() # Un solo fallo en la prueba vuelve a abrirlo
+    assert cortacircuitos.estado == CortacircuitosHost.ABIERTO
+
+
+def test_cancelar_la_prueba_asincrona_libera_el_circuito_semiabierto(ejecutor: EjecutorResilienteHttp):
+    ejecutor.segundos_apertura_cortacircuitos = 0.0
+    cortacircuitos = ejecutor.obtener_cortacircuitos(HOST)
+    for _ in range(2):
+        cortacircuitos.registrar_fallo()
+    assert cortacircuitos.estado == CortacircuitosHost.ABIERTO
+
+    async def operacion_que_no_termina():
+        await asyncio.sleep(60)
+
+    async def lanzar_y_cancelar_prueba():
+        tarea_prueba = asyncio.ensure_future(
+            ejecutor.ejecutar_asincrono(HOST, operacion_que_no_termina, True, es_fallo_transitorio_requests, _crear_error_circuito_abierto)
+        )
+        await asyncio.sleep(0)
+        tarea_prueba.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await tarea_prueba
+
+    asyncio.run(lanzar_y_cancelar_prueba())
+
+    # La prueba cancelada no cuenta como veredicto, pero deja paso a la siguiente.
+    assert cortacircuitos.estado == CortacircuitosHost.SEMIABIERTO
+    assert cortacircuitos.permitir_peticion()
@@ -0,0 +1,69 @@
+import time
+from unittest.mock import patch
+
+import pytest
+
+from entrenai_refactor.nucleo.ia import tokenizador_embeddings
+from entrenai_refactor.nucleo.ia.tokenizador_embeddings import ContadorTokensEmbedding, obtener_contador_tokens_para_modelo
+
+
+@pytest.fixture(autouse=True)
+def limpiar_tokenizadores_cargados():
+    tokenizador_embeddings._cargar_tokenizador.cache_clear()
+    tokenizador_embeddings._contadores_por_modelo.clear()
+    yield
+    tokenizador_embeddings._cargar_tokenizador.cache_clear()
+    tokenizador_embeddings._contadores_por_modelo.clear()
+
+
+def test_estimacion_sin_tokenizador():
+    contador = ContadorTokensEmbedding(None, 256)
+    assert not contador.es_exacto
+    assert not contador.tokenizador_no_disponible
+    assert contador.contar_tokens("Hola, mundo") == 4 # 'Hola' ',' 'mund' 'o'
+    assert contador.contar_tokens_en_lote(["Hola", "", "mundo"]) == [1, 0, 2]
+
+
+def test_tokenizador_desde_archivo_local(tmp_path):
+    tokenizers = pytest.importorskip("tokenizers")
+    vocabulario = {"[UNK]": 0, "hola": 1, "mundo": 2}
+    tokenizador = tokenizers.Tokenizer(tokenizers.models.WordLevel(vocabulario, unk_token="[UNK]"))
+    tokenizador.pre_tokenizer = tokenizers.pre_tokenizers.Whitespace()
+    tokenizador.save(str(tmp_path / "tokenizer.json"))
+
+    contador = ContadorTokensEmbedding(str(tmp_path), 512, segundos_limite_descarga=0)
+
+    assert contador.es_exacto
+    assert contador.contar_tokens("hola mundo hola") == 3
+    assert contador.obtener_desplazamientos_tokens("hola mundo") == [(0, 4), (5, 10)]
+
+
+def test_descarga_que_supera_el_limite_deja_el_tokenizador_no_disponible():
+    if tokenizador_embeddings.Tokenizer is None:
+        pytest.skip("La biblioteca 'tokenizers' no está instalada.")
+    with patch.object(tokenizador_embeddings.Tokenizer, "from_pretrained", side_effect=lambda identificador: time.sleep(2)):
+        instante_inicio = time.monotonic()
+        contador = ContadorTokensEmbedding("organizacion/tokenizador-lento", 512, segundos_limite_descarga=0.1)
+    assert time.monotonic() - instante_inicio < 1.5
+    assert contador.tokenizador_no_disponible
+    assert contador.contar_tokens("Hola, mundo") == 4 # Sigue contando con la estimación
+
+
+def test_descarga_deshabilitada_no_accede_a_la_red():
+    if tokenizador_embeddings.Tokenizer is None:
+        pytest.skip("La biblioteca 'tokenizers' no está instalada.")
+    with patch.object(tokenizador_embeddings.Tokenizer, "from_pretrained") as descarga:
+        contador = ContadorTokensEmbedding("organizacion/tokenizador", 512, segundos_limite_descarga=0)
+    descarga.assert_not_called()
+    assert contador.tokenizador_no_disponible
+
+
+def test_contador_por_modelo_resuelve_configuracion_y_se_comparte():
+    contador_gemini = obtener_contador_tokens_para_modelo("models/text-embedding-004")
+    assert contador_gemini.identificador_tokenizador is None and contador_gemini.maximo_tokens_modelo == 2048
+
+    with patch.object(tokenizador_embeddings, "_cargar_tokenizador", return_value=None) as cargar:
+        contador = obtener_contador_tokens_para_modelo("nomic-embed-text:latest", {"nomic-embed-text": "/modelos/nomic"}, 5)
+        assert obtener_contador_tokens_para_modelo("nomic-embed-text:v1.5", {"nomic-embed-text": "/modelos/nomic"}, 5) is contador
+    cargar.assert_called_once_with("/modelos/nomic", 5)
+    assert contador.maximo_tokens_modelo == 8192